@@ -8,20 +8,78 @@ Features:
 - Supports multiple symbols and timeframes
 - Can run batch tests with different configurations
 - Saves results to JSON for later analysis
+- "sweep" analyzer profile: one fused O(1)-memory analyzer instead of seven
+- Memoizes complete results by (parameters, data fingerprint, engine version and
+  a hash of the strategy and runner source), so code edits never serve stale results
+- Bars are fed through bt_extensions.NumpyData: converted to line arrays once
+  per dataset and bulk-preloaded per run
+- Heavy libraries are imported lazily; --worker-socket forwards runs to a
+  persistent backtest_worker so import cost is paid once per session
+- Multi-symbol mode: per-symbol contract specs, concurrent cached fetches,
+  parallel runs and a portfolio-aggregate report
+- --monte-carlo N resamples each run's trade P&L into N equity paths and
+  reports drawdown, final P&L, loss-streak and ruin distributions
+- --results-jsonl streams each run to an append-only JSONL file as it
+  completes; rerunning with the same file resumes where it stopped
+- --optimize-grid runs a parameter grid through cerebro.optstrategy: the feed
+  is preloaded once and shared by --maxcpus worker processes
+- Every run records a "resources" block (wall/CPU time, peak RSS delta, bars/sec,
+  optionally --trace-allocations sites); the comparison aggregates them
+- --quotes also fetches bid/ask quotes and stores each bar's closing quote next
+  to OHLCV, so the strategy's MAX_SPREAD_POINTS filter sees real spreads
+- --queue-db spreads a sweep (configurations x --periods) over worker processes
+  on one or many machines through a shared SQLite job queue (job_queue)
+- --abort-max-drawdown-pct / --abort-min-trades stop hopeless runs early
+  (bt_extensions.EarlyAbortAnalyzer); they keep their partial metrics, tagged "aborted"
 """
 
+from __future__ import annotations
+
 import argparse
+import copy
 import json
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-import backtrader as bt
-import pandas as pd
-import requests
+from bar_store import (
+    TIMESPAN_MINUTES,
+    BarStore,
+    IntrabarIndex,
+    attach_quotes,
+    resample_bars,
+    timeframe_minutes,
+)
+from job_queue import add_queue_arguments, grid_combinations, load_periods, queue_from_args, run_worker
+from lazy_imports import LazyModule
+from monte_carlo import monte_carlo, ruin_level_for
+from resource_meter import ResourceMeter, aggregate_resources, format_resources
+from result_sink import ResultSink
+from results_store import (
+    ENGINE_BACKTRADER,
+    ResultMemo,
+    ResultsStore,
+    config_hash,
+    data_fingerprint,
+    param_hash,
+    source_hash,
+)
+from symbols import session_spec, symbol_spec as lookup_symbol_spec
+
+bt = LazyModule("backtrader")
+pd = LazyModule("pandas")
+requests = LazyModule("requests")
+
 
-from ken_gold_candle import GoldCandleKenStrategy
+# Analyzer bundles selectable per run:
+# - full:  the stock backtrader analyzers (adds VWR and the per-bar TimeReturn series)
+# - sweep: a single FusedMetricsAnalyzer for optimization runs
+ANALYZER_PROFILES = ("full", "sweep")
+
+# Sweep-mode early-abort rules (EarlyAbortAnalyzer) -> value that disables them
+ABORT_RULES = {"abort_max_drawdown_pct": None, "abort_min_trades": 0, "abort_min_trades_bar": 0}
 
 
 class PolygonDataFetcher:
@@ -108,20 +166,184 @@ class PolygonDataFetcher:
         logging.info(f"Date range: {df.index[0]} to {df.index[-1]}")
         
         return df
+    
+    def fetch_quotes(self, ticker: str, start_date: str, end_date: str, limit: int = 50000) -> pd.DataFrame:
+        """
+        Fetch bid/ask quotes from Polygon API (all pages)
+        
+        Args:
+            ticker: Symbol (e.g., "C:XAUUSD")
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format (inclusive)
+            limit: Quotes per page (default 50000, the API maximum)
+        
+        Returns:
+            DataFrame with bid and ask columns, indexed by quote time (UTC)
+        """
+        until = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        url = f"{self.base_url}/v3/quotes/{ticker}"
+        params = {
+            "timestamp.gte": start_date,
+            "timestamp.lt": until,
+            "order": "asc",
+            "sort": "timestamp",
+            "limit": limit,
+            "apiKey": self.api_key
+        }
+        
+        logging.info(f"Fetching quotes for {ticker} from {start_date} to {end_date}")
+        
+        times, bids, asks = [], [], []
+        while url:
+            response = requests.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            for quote in data.get("results", []):
+                times.append(quote.get("participant_timestamp") or quote.get("sip_timestamp"))
+                bids.append(quote.get("bid_price"))
+                asks.append(quote.get("ask_price"))
+            # next_url already carries the query, only the key must be added again
+            url = data.get("next_url")
+            params = {"apiKey": self.api_key}
+        
+        if not times:
+            raise Exception(f"No quotes returned for {ticker}")
+        
+        df = pd.DataFrame(
+            {"bid": bids, "ask": asks},
+            index=pd.DatetimeIndex(pd.to_datetime(times, unit="ns"), name="datetime"),
+            dtype=float
+        )
+        logging.info(f"Fetched {len(df)} quotes")
+        return df
 
 
 class BacktestRunner:
     """Run backtests with comprehensive metrics"""
     
-    def __init__(self, initial_cash: float = 10000.0):
+    # Memo keys hash the source of RESULT_SOURCES, so editing the strategy or the runner
+    # retires memoized results by itself; bump only for changes outside these files
+    ENGINE_VERSION = "2"
+    RESULT_SOURCES = (
+        "backtest_runner.py", "ken_gold_candle.py", "bt_extensions.py", "calendar_index.py",
+        "bar_store.py", "symbols.py", "strategy_state.py",
+    )
+    
+    def __init__(
+        self,
+        initial_cash: float = 10000.0,
+        analyzer_profile: str = "full",
+        memo: Optional[ResultMemo] = None,
+        sink: Optional[ResultSink] = None,
+        mc_paths: int = 0,
+        trace_allocations: bool = False,
+        abort_rules: Optional[Dict] = None
+    ):
+        """
+        Args:
+            initial_cash: Starting cash of every run
+            analyzer_profile: Default analyzer bundle ("full" or "sweep")
+            memo: Result memo (default: in-memory)
+            sink: Append-only JSONL sink; runs are streamed there instead of being
+                kept in self.results, and runs already in it are not re-run
+            mc_paths: Monte Carlo paths resampled from each run's trade P&L (0 = off);
+                ruin is losing half of initial_cash
+            trace_allocations: Add the top tracemalloc allocation sites to each run's
+                resources block (slows runs down)
+            abort_rules: Early-abort rules (ABORT_RULES keys): a run that breaks one stops
+                at that bar and keeps the metrics of the bars run, tagged under "aborted"
+        """
+        if analyzer_profile not in ANALYZER_PROFILES:
+            raise ValueError(f"Unknown analyzer profile '{analyzer_profile}'. Choose from {ANALYZER_PROFILES}")
         self.initial_cash = initial_cash
+        self.analyzer_profile = analyzer_profile
+        self.memo = memo if memo is not None else ResultMemo()
+        self.sink = sink
+        self.mc_paths = mc_paths
+        self.trace_allocations = trace_allocations
+        self.abort_rules = self.active_abort_rules(abort_rules)
         self.results = []
+        self._fingerprint = (None, None)  # (DataFrame, fingerprint) of the last feed
+        self._feed_arrays = (None, None)  # (DataFrame, bt_extensions.bar_arrays) of the last feed
+    
+    def data_feed(self, df: pd.DataFrame) -> bt.feed.DataBase:
+        """
+        NumpyData feed over a bar DataFrame (QuoteData if it has bid/ask columns)
+        
+        Consecutive feeds of the same DataFrame (one per configuration of a batch)
+        share one conversion to line arrays; each run then preloads with one bulk
+        copy per line.
+        """
+        from bt_extensions import NumpyData, QuoteData, bar_arrays, has_quotes
+        if self._feed_arrays[0] is not df:
+            self._feed_arrays = (df, bar_arrays(df))
+        feed_class = QuoteData if has_quotes(self._feed_arrays[1]) else NumpyData
+        return feed_class(dataname=df, arrays=self._feed_arrays[1])
+    
+    def _feed_fingerprint(self, data_feed: bt.feed.DataBase) -> Optional[str]:
+        """Fingerprint of a DataFrame-backed feed: DataFrame content plus feed parameters"""
+        df = data_feed.p.dataname
+        if not isinstance(df, pd.DataFrame):
+            return None
+        if self._fingerprint[0] is not df:
+            self._fingerprint = (df, data_fingerprint(df))
+        feed_params = {
+            k: str(v) for k, v in data_feed.p._getkwargs().items() if k not in ("dataname", "arrays")
+        }
+        return param_hash({"data": self._fingerprint[1], "feed": feed_params})
+    
+    def memo_key(
+        self,
+        data_feed: bt.feed.DataBase,
+        strategy_params: Optional[Dict],
+        profile: str,
+        symbol_spec: Optional[Dict] = None,
+        intrabar_bars: Optional[pd.DataFrame] = None
+    ) -> Optional[str]:
+        """Memo key of a run, or None when the feed cannot be fingerprinted"""
+        fingerprint = self._feed_fingerprint(data_feed)
+        if fingerprint is None:
+            return None
+        params = self.config_params(
+            strategy_params, self.initial_cash, symbol_spec=symbol_spec, intrabar=intrabar_bars is not None,
+            abort_rules=self.abort_rules
+        )
+        params["analyzer_profile"] = profile
+        if self.mc_paths:
+            params["monte_carlo_paths"] = self.mc_paths
+        if intrabar_bars is not None:
+            params["intrabar_data"] = data_fingerprint(intrabar_bars)
+        return config_hash(params, fingerprint, ENGINE_BACKTRADER, self.engine_version())
+    
+    @classmethod
+    def engine_version(cls) -> str:
+        """Engine part of memo keys: ENGINE_VERSION, backtrader's version and the RESULT_SOURCES hash"""
+        return f"{cls.ENGINE_VERSION}/bt{bt.__version__}/{source_hash(*cls.RESULT_SOURCES)}"
+    
+    def _record(self, metrics: Dict, key: Optional[str] = None) -> None:
+        """Keep a finished run: append it to the sink, or to self.results without one"""
+        if self.sink is not None:
+            self.sink.append(metrics, key)
+        else:
+            self.results.append(metrics)
+    
+    def _resume(self, key: Optional[str], run_name: str) -> Optional[Dict]:
+        """Metrics of a run already streamed to the sink, or None"""
+        if self.sink is None or key not in self.sink:
+            return None
+        metrics = self.sink.get(key)
+        metrics.pop("key", None)
+        logging.info(f"⏩ {run_name}: already in {self.sink.path} ({key[:12]}), not re-run")
+        return metrics
     
     def run_backtest(
         self,
-        data_feed: bt.feeds.PandasData,
+        data_feed: bt.feed.DataBase,
         strategy_params: Optional[Dict] = None,
-        run_name: str = "Backtest"
+        run_name: str = "Backtest",
+        analyzer_profile: Optional[str] = None,
+        symbol_spec: Optional[Dict] = None,
+        intrabar_bars: Optional[pd.DataFrame] = None
     ) -> Dict:
         """
         Run a single backtest with specified parameters
@@ -130,41 +352,62 @@ class BacktestRunner:
             data_feed: Backtrader data feed
             strategy_params: Dictionary of strategy parameters to override
             run_name: Name/description of this backtest run
+            analyzer_profile: "full" or "sweep" (defaults to the runner's profile)
+            symbol_spec: Instrument spec from symbols.symbol_spec (default: XAUUSD contract)
+            intrabar_bars: 1-minute bars of the same period; single-trade TP/SL are then
+                resolved against the minutes inside each bar and filled at the touched level
         
         Returns:
             Dictionary with backtest results and metrics
         """
+        profile = analyzer_profile or self.analyzer_profile
+        if profile not in ANALYZER_PROFILES:
+            raise ValueError(f"Unknown analyzer profile '{profile}'. Choose from {ANALYZER_PROFILES}")
+        
+        # Serve identical (params, data, engine) runs from the sink (resume) or the memo
+        memo_key = self.memo_key(data_feed, strategy_params, profile, symbol_spec, intrabar_bars)
+        resumed = self._resume(memo_key, run_name)
+        if resumed is not None:
+            return resumed
+        cached = self.memo.get(memo_key) if memo_key else None
+        if cached is not None:
+            metrics = copy.deepcopy(cached)
+            metrics["run_name"] = run_name
+            metrics["timestamp"] = datetime.now().isoformat()
+            metrics.pop("resources", None)  # Nothing was run
+            logging.info(f"♻️  {run_name}: served from memo ({memo_key[:12]})")
+            self._print_summary(metrics)
+            self._record(metrics, memo_key)
+            return metrics
+        
+        from ken_gold_candle import GoldCandleKenStrategy
+        
+        meter = ResourceMeter(self.trace_allocations).start()
         cerebro = bt.Cerebro()
         
+        # Instrument: per-symbol contract/point size on the strategy, multiplier/commission on the broker
+        settings = self.instrument_settings(symbol_spec) if symbol_spec else {}
+        
+        # Intrabar execution: minute-to-bar index on the strategy, a broker that fills at the touched level
+        if intrabar_bars is not None:
+            from bt_extensions import IntrabarBroker
+            settings["intrabar"] = IntrabarIndex(data_feed.p.dataname.index, intrabar_bars)
+            cerebro.setbroker(IntrabarBroker())
+        
         # Add strategy with custom parameters
-        if strategy_params:
-            cerebro.addstrategy(GoldCandleKenStrategy, **strategy_params)
-        else:
-            cerebro.addstrategy(GoldCandleKenStrategy)
+        cerebro.addstrategy(GoldCandleKenStrategy, **settings, **(strategy_params or {}))
         
         # Add data
         cerebro.adddata(data_feed)
         
-        # Set initial cash
-        cerebro.broker.setcash(self.initial_cash)
-        
-        # Configure broker for XAUUSD
-        comminfo = bt.CommInfoBase(
-            commission=0.0002,  # 0.02% commission
-            mult=100.0,  # 1 lot = 100 oz for XAUUSD
-            margin=True,
-            commtype=bt.CommInfoBase.COMM_PERC
-        )
-        cerebro.broker.addcommissioninfo(comminfo)
+        self._setup_broker(cerebro, symbol_spec)
         
         # Add analyzers for comprehensive metrics
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name="sharpe", timeframe=bt.TimeFrame.Days, annualize=True)
-        cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
-        cerebro.addanalyzer(bt.analyzers.Returns, _name="returns", timeframe=bt.TimeFrame.Days)
-        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="trades")
-        cerebro.addanalyzer(bt.analyzers.SQN, _name="sqn")
-        cerebro.addanalyzer(bt.analyzers.VWR, _name="vwr")  # Variability-Weighted Return
-        cerebro.addanalyzer(bt.analyzers.TimeReturn, _name="time_return")
+        self._add_analyzers(cerebro, profile)
+        if self.mc_paths:
+            from bt_extensions import TradePnLAnalyzer
+            cerebro.addanalyzer(TradePnLAnalyzer, _name="trade_pnl")
+        self._add_abort_analyzer(cerebro)
         
         # Record starting value
         starting_value = cerebro.broker.getvalue()
@@ -183,22 +426,249 @@ class BacktestRunner:
         ending_value = cerebro.broker.getvalue()
         
         # Extract metrics
-        metrics = self._extract_metrics(strat, starting_value, ending_value, run_name)
+        metrics = self._extract_metrics(strat, starting_value, ending_value, run_name, profile)
+        self._tag_aborted(metrics, strat)
+        metrics["resources"] = meter.stop().result(bars=data_feed.buflen())
+        if self.mc_paths:
+            metrics["monte_carlo"] = monte_carlo(
+                strat.analyzers.trade_pnl.get_analysis(), self.mc_paths,
+                ruin_level=ruin_level_for(starting_value)
+            )
+        if memo_key:
+            self.memo.put(memo_key, copy.deepcopy(metrics))
         
         # Print summary
         self._print_summary(metrics)
         
         # Store results
-        self.results.append(metrics)
+        self._record(metrics, memo_key)
         
         return metrics
     
+    def optimize(
+        self,
+        data_feed: bt.feed.DataBase,
+        grid: Dict[str, List],
+        maxcpus: Optional[int] = None,
+        strategy_params: Optional[Dict] = None,
+        run_name: str = "Optimize",
+        symbol_spec: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Run every combination of a parameter grid through cerebro.optstrategy
+        
+        Backtrader preloads the feed once and hands it to maxcpus worker processes;
+        each run returns only its params and analyzers (optreturn), read through the
+        "sweep" analyzer profile. Every run is memoized and recorded like a
+        run_backtest() run, but the grid is always run in full: combinations already
+        in the memo or sink are not skipped.
+        
+        Args:
+            data_feed: Backtrader data feed
+            grid: Strategy setting -> list of values to try (a scalar is a single value)
+            maxcpus: Worker processes (None = all cores, 1 = no multiprocessing)
+            strategy_params: Settings fixed for every combination (grid values take precedence)
+            run_name: Prefix of the per-combination run names
+            symbol_spec: Instrument spec from symbols.symbol_spec (default: XAUUSD contract)
+        
+        Returns:
+            One metrics dictionary per combination, with the combination under "params"
+        """
+        from ken_gold_candle import GoldCandleKenStrategy
+        
+        grid = {name: values if isinstance(values, (list, tuple)) else [values] for name, values in grid.items()}
+        fixed = {**(self.instrument_settings(symbol_spec) if symbol_spec else {}), **(strategy_params or {})}
+        fixed = {name: value for name, value in fixed.items() if name not in grid}
+        unknown = [name for name in [*grid, *fixed] if name not in GoldCandleKenStrategy.params._getkeys()]
+        if unknown:
+            raise ValueError(f"Unknown strategy settings: {unknown}")
+        
+        cerebro = bt.Cerebro(optreturn=True, maxcpus=maxcpus)
+        cerebro.optstrategy(GoldCandleKenStrategy, **{name: [value] for name, value in fixed.items()}, **grid)
+        cerebro.adddata(data_feed)
+        self._setup_broker(cerebro, symbol_spec)
+        self._add_analyzers(cerebro, "sweep")
+        if self.mc_paths:
+            from bt_extensions import TradePnLAnalyzer
+            cerebro.addanalyzer(TradePnLAnalyzer, _name="trade_pnl")
+        from bt_extensions import ResourceAnalyzer
+        cerebro.addanalyzer(ResourceAnalyzer, _name="resources", trace_allocations=self.trace_allocations)
+        self._add_abort_analyzer(cerebro)
+        
+        combinations = 1
+        for values in grid.values():
+            combinations *= len(values)
+        logging.info("=" * 80)
+        logging.info(f"OPTIMIZING: {run_name} ({combinations} combinations, maxcpus={maxcpus or 'all'})")
+        logging.info("=" * 80)
+        
+        results = []
+        for (ret,) in cerebro.run():
+            params = {name: getattr(ret.params, name) for name in grid}
+            name = f"{run_name} [" + ", ".join(f"{k}={v}" for k, v in params.items()) + "]"
+            stats = ret.analyzers.fused.get_analysis()
+            metrics = self._extract_metrics(ret, stats["value_start"], stats["value_end"], name, "sweep")
+            self._tag_aborted(metrics, ret)
+            metrics["params"] = params
+            metrics["resources"] = ret.analyzers.resources.get_analysis()
+            if self.mc_paths:
+                metrics["monte_carlo"] = monte_carlo(
+                    ret.analyzers.trade_pnl.get_analysis(), self.mc_paths,
+                    ruin_level=ruin_level_for(stats["value_start"])
+                )
+            memo_key = self.memo_key(data_feed, {**(strategy_params or {}), **params}, "sweep", symbol_spec)
+            if memo_key:
+                self.memo.put(memo_key, copy.deepcopy(metrics))
+            self._print_summary(metrics)
+            self._record(metrics, memo_key)
+            results.append(metrics)
+        return results
+    
+    @staticmethod
+    def active_abort_rules(abort_rules: Optional[Dict]) -> Dict:
+        """The abort rules that are switched on (validated)"""
+        unknown = set(abort_rules or {}) - set(ABORT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown abort rules {sorted(unknown)}. Choose from {list(ABORT_RULES)}")
+        rules = {name: value for name, value in (abort_rules or {}).items() if value != ABORT_RULES[name]}
+        if ("abort_min_trades" in rules) != ("abort_min_trades_bar" in rules):
+            raise ValueError("abort_min_trades and abort_min_trades_bar must be set together")
+        return rules
+    
+    def _add_abort_analyzer(self, cerebro: bt.Cerebro) -> None:
+        """Attach the EarlyAbortAnalyzer when abort rules are on"""
+        if self.abort_rules:
+            from bt_extensions import EarlyAbortAnalyzer
+            params = {name[len("abort_"):]: value for name, value in self.abort_rules.items()}
+            cerebro.addanalyzer(EarlyAbortAnalyzer, _name="early_abort", **params)
+    
+    def _tag_aborted(self, metrics: Dict, strategy) -> None:
+        """Tag a run stopped by an abort rule (its metrics cover the bars it ran)"""
+        if not self.abort_rules:
+            return
+        aborted = strategy.analyzers.early_abort.get_analysis()
+        if aborted is not None:
+            metrics["aborted"] = aborted
+            logging.info(
+                f"✂️  {metrics['run_name']}: aborted early ({aborted['rule']} at bar {aborted['bar']}, "
+                f"{aborted['progress']:.0%} of the data)"
+            )
+    
+    def _setup_broker(self, cerebro: bt.Cerebro, symbol_spec: Optional[Dict]) -> None:
+        """Initial cash plus the instrument's commission scheme (default: XAUUSD, 0.02%, 1 lot = 100 oz)"""
+        from ken_gold_candle import GoldCandleKenStrategy
+        
+        contract_size, commission = GoldCandleKenStrategy.CONTRACT_SIZE, 0.0002
+        if symbol_spec:
+            contract_size, commission = symbol_spec["contract_size"], symbol_spec["commission"]
+        cerebro.broker.setcash(self.initial_cash)
+        comminfo = bt.CommInfoBase(
+            commission=commission,
+            mult=contract_size,
+            margin=True,
+            commtype=bt.CommInfoBase.COMM_PERC
+        )
+        cerebro.broker.addcommissioninfo(comminfo)
+    
+    @staticmethod
+    def _add_analyzers(cerebro: bt.Cerebro, profile: str) -> None:
+        """Attach the analyzer bundle for the given profile"""
+        if profile == "sweep":
+            from bt_extensions import FusedMetricsAnalyzer
+            cerebro.addanalyzer(FusedMetricsAnalyzer, _name="fused")
+            return
+        
+        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name="sharpe", timeframe=bt.TimeFrame.Days, annualize=True)
+        cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
+        cerebro.addanalyzer(bt.analyzers.Returns, _name="returns", timeframe=bt.TimeFrame.Days)
+        cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="trades")
+        cerebro.addanalyzer(bt.analyzers.SQN, _name="sqn")
+        cerebro.addanalyzer(bt.analyzers.VWR, _name="vwr")  # Variability-Weighted Return
+        cerebro.addanalyzer(bt.analyzers.TimeReturn, _name="time_return")
+    
+    @staticmethod
+    def _read_full_analyzers(strategy) -> Dict:
+        """Flatten the stock analyzers into the FusedMetricsAnalyzer field layout"""
+        sharpe_analysis = strategy.analyzers.sharpe.get_analysis()
+        drawdown_analysis = strategy.analyzers.drawdown.get_analysis()
+        returns_analysis = strategy.analyzers.returns.get_analysis()
+        trade_analysis = strategy.analyzers.trades.get_analysis()
+        sqn_analysis = strategy.analyzers.sqn.get_analysis()
+        vwr_analysis = strategy.analyzers.vwr.get_analysis()
+        
+        return {
+            # Sharpe Ratio
+            "sharpe_ratio": sharpe_analysis.get("sharperatio", None),
+            # Drawdown
+            "max_drawdown_pct": drawdown_analysis.get("max", {}).get("drawdown", 0.0),
+            "max_drawdown_money": drawdown_analysis.get("max", {}).get("moneydown", 0.0),
+            # Returns
+            "avg_daily_return": returns_analysis.get("ravg", 0.0),
+            "total_compounded_return": returns_analysis.get("rtot", 0.0),
+            # SQN (System Quality Number) and VWR (Variability-Weighted Return)
+            "sqn": sqn_analysis.get("sqn", None),
+            "vwr": vwr_analysis.get("vwr", None),
+            # Trade Analysis
+            "total_trades": trade_analysis.get("total", {}).get("total", 0),
+            "won_trades": trade_analysis.get("won", {}).get("total", 0),
+            "lost_trades": trade_analysis.get("lost", {}).get("total", 0),
+            # P&L statistics
+            "pnl_net_total": trade_analysis.get("pnl", {}).get("net", {}).get("total", 0.0),
+            "pnl_net_avg": trade_analysis.get("pnl", {}).get("net", {}).get("average", 0.0),
+            "won_pnl_total": trade_analysis.get("won", {}).get("pnl", {}).get("total", 0.0),
+            "won_pnl_avg": trade_analysis.get("won", {}).get("pnl", {}).get("average", 0.0),
+            "won_pnl_max": trade_analysis.get("won", {}).get("pnl", {}).get("max", 0.0),
+            "lost_pnl_total": trade_analysis.get("lost", {}).get("pnl", {}).get("total", 0.0),
+            "lost_pnl_avg": trade_analysis.get("lost", {}).get("pnl", {}).get("average", 0.0),
+            "lost_pnl_max": trade_analysis.get("lost", {}).get("pnl", {}).get("max", 0.0),
+            # Average trade duration
+            "avg_trade_bars": trade_analysis.get("len", {}).get("average", 0.0),
+            # Longest winning/losing streaks
+            "win_streak": trade_analysis.get("streak", {}).get("won", {}).get("longest", 0),
+            "loss_streak": trade_analysis.get("streak", {}).get("lost", {}).get("longest", 0),
+        }
+    
+    @staticmethod
+    def instrument_settings(symbol_spec: Dict) -> Dict:
+        """Strategy class settings derived from a symbol spec"""
+        return {
+            "CONTRACT_SIZE": symbol_spec["contract_size"],
+            "POINT_SIZE": symbol_spec["point"],
+            "LOT_STEP": symbol_spec["lot_step"],
+            "MIN_LOT_SIZE": symbol_spec["min_lot"],
+        }
+    
+    @staticmethod
+    def config_params(
+        strategy_params: Optional[Dict],
+        initial_cash: float,
+        timeframe: Optional[str] = None,
+        symbol_spec: Optional[Dict] = None,
+        intrabar: bool = False,
+        abort_rules: Optional[Dict] = None
+    ) -> Dict:
+        """Full parameter set of a run (effective strategy settings plus runner settings)"""
+        from ken_gold_candle import GoldCandleKenStrategy
+        params = GoldCandleKenStrategy.trading_settings(strategy_params)
+        if symbol_spec:
+            params.update(BacktestRunner.instrument_settings(symbol_spec))
+            params["commission"] = symbol_spec["commission"]
+        params["initial_cash"] = initial_cash
+        if intrabar:
+            params["execution"] = "intrabar"
+        if timeframe is not None:
+            params["timeframe"] = timeframe
+        # Only active abort rules, so the parameters of runs without them stay unchanged
+        params.update(BacktestRunner.active_abort_rules(abort_rules))
+        return params
+    
     def _extract_metrics(
         self,
         strategy,
         starting_value: float,
         ending_value: float,
-        run_name: str
+        run_name: str,
+        profile: str = "full"
     ) -> Dict:
         """Extract all metrics from strategy analyzers"""
         
@@ -206,62 +676,26 @@ class BacktestRunner:
         total_return = ending_value - starting_value
         return_pct = (total_return / starting_value) * 100.0
         
-        # Sharpe Ratio
-        sharpe_analysis = strategy.analyzers.sharpe.get_analysis()
-        sharpe_ratio = sharpe_analysis.get("sharperatio", None)
-        
-        # Drawdown
-        drawdown_analysis = strategy.analyzers.drawdown.get_analysis()
-        max_drawdown_pct = drawdown_analysis.get("max", {}).get("drawdown", 0.0)
-        max_drawdown_money = drawdown_analysis.get("max", {}).get("moneydown", 0.0)
-        
-        # Returns
-        returns_analysis = strategy.analyzers.returns.get_analysis()
-        avg_return = returns_analysis.get("ravg", 0.0)
-        total_compounded_return = returns_analysis.get("rtot", 0.0)
-        
-        # Trade Analysis
-        trade_analysis = strategy.analyzers.trades.get_analysis()
-        total_trades = trade_analysis.get("total", {}).get("total", 0)
-        won_trades = trade_analysis.get("won", {}).get("total", 0)
-        lost_trades = trade_analysis.get("lost", {}).get("total", 0)
+        if profile == "sweep":
+            stats = strategy.analyzers.fused.get_analysis()
+        else:
+            stats = self._read_full_analyzers(strategy)
         
+        total_trades = stats["total_trades"]
+        won_trades = stats["won_trades"]
+        lost_trades = stats["lost_trades"]
         win_rate = (won_trades / total_trades * 100.0) if total_trades > 0 else 0.0
         
-        # P&L statistics
-        pnl_net_total = trade_analysis.get("pnl", {}).get("net", {}).get("total", 0.0)
-        pnl_net_avg = trade_analysis.get("pnl", {}).get("net", {}).get("average", 0.0)
-        
-        won_pnl_total = trade_analysis.get("won", {}).get("pnl", {}).get("total", 0.0)
-        won_pnl_avg = trade_analysis.get("won", {}).get("pnl", {}).get("average", 0.0)
-        won_pnl_max = trade_analysis.get("won", {}).get("pnl", {}).get("max", 0.0)
-        
-        lost_pnl_total = trade_analysis.get("lost", {}).get("pnl", {}).get("total", 0.0)
-        lost_pnl_avg = trade_analysis.get("lost", {}).get("pnl", {}).get("average", 0.0)
-        lost_pnl_max = trade_analysis.get("lost", {}).get("pnl", {}).get("max", 0.0)
-        
         # Profit factor
+        won_pnl_total = stats["won_pnl_total"]
+        lost_pnl_total = stats["lost_pnl_total"]
         profit_factor = abs(won_pnl_total / lost_pnl_total) if lost_pnl_total != 0 else 0.0
         
-        # Average trade duration
-        avg_trade_bars = trade_analysis.get("len", {}).get("average", 0.0)
-        
-        # Longest winning/losing streaks
-        win_streak = trade_analysis.get("streak", {}).get("won", {}).get("longest", 0)
-        loss_streak = trade_analysis.get("streak", {}).get("lost", {}).get("longest", 0)
-        
-        # SQN (System Quality Number)
-        sqn_analysis = strategy.analyzers.sqn.get_analysis()
-        sqn = sqn_analysis.get("sqn", None)
-        
-        # VWR (Variability-Weighted Return)
-        vwr_analysis = strategy.analyzers.vwr.get_analysis()
-        vwr = vwr_analysis.get("vwr", None)
-        
         # Build metrics dictionary
         metrics = {
             "run_name": run_name,
             "timestamp": datetime.now().isoformat(),
+            "analyzer_profile": profile,
             "portfolio": {
                 "starting_value": starting_value,
                 "ending_value": ending_value,
@@ -269,36 +703,36 @@ class BacktestRunner:
                 "return_pct": return_pct,
             },
             "performance": {
-                "sharpe_ratio": sharpe_ratio,
-                "max_drawdown_pct": max_drawdown_pct,
-                "max_drawdown_money": max_drawdown_money,
-                "avg_daily_return": avg_return,
-                "total_compounded_return": total_compounded_return,
-                "sqn": sqn,
-                "vwr": vwr,
+                "sharpe_ratio": stats["sharpe_ratio"],
+                "max_drawdown_pct": stats["max_drawdown_pct"],
+                "max_drawdown_money": stats["max_drawdown_money"],
+                "avg_daily_return": stats["avg_daily_return"],
+                "total_compounded_return": stats["total_compounded_return"],
+                "sqn": stats["sqn"],
+                "vwr": stats["vwr"],
             },
             "trades": {
                 "total": total_trades,
                 "won": won_trades,
                 "lost": lost_trades,
                 "win_rate": win_rate,
-                "win_streak": win_streak,
-                "loss_streak": loss_streak,
-                "avg_duration_bars": avg_trade_bars,
+                "win_streak": stats["win_streak"],
+                "loss_streak": stats["loss_streak"],
+                "avg_duration_bars": stats["avg_trade_bars"],
             },
             "pnl": {
-                "net_total": pnl_net_total,
-                "net_avg": pnl_net_avg,
+                "net_total": stats["pnl_net_total"],
+                "net_avg": stats["pnl_net_avg"],
                 "profit_factor": profit_factor,
                 "won": {
                     "total": won_pnl_total,
-                    "avg": won_pnl_avg,
-                    "max": won_pnl_max,
+                    "avg": stats["won_pnl_avg"],
+                    "max": stats["won_pnl_max"],
                 },
                 "lost": {
                     "total": lost_pnl_total,
-                    "avg": lost_pnl_avg,
-                    "max": lost_pnl_max,
+                    "avg": stats["lost_pnl_avg"],
+                    "max": stats["lost_pnl_max"],
                 }
             }
         }
@@ -350,17 +784,160 @@ class BacktestRunner:
         logging.info(f"  Largest Win:       ${pnl['won']['max']:,.2f}")
         logging.info(f"  Largest Loss:      ${pnl['lost']['max']:,.2f}")
         
+        # Monte Carlo distributions (resampled trade order)
+        mc = metrics.get("monte_carlo")
+        if mc:
+            logging.info(f"\n🎲 MONTE CARLO ({mc['paths']:,} {mc['method']} paths)")
+            logging.info(f"  Net P&L p5/p50/p95:  ${mc['final_pnl']['p5']:,.2f} / ${mc['final_pnl']['p50']:,.2f} / ${mc['final_pnl']['p95']:,.2f}")
+            logging.info(f"  Max Drawdown p95:    ${mc['max_drawdown']['p95']:,.2f} (p99 ${mc['max_drawdown']['p99']:,.2f})")
+            logging.info(f"  Loss Streak p95:     {mc['loss_streak']['p95']:.0f}")
+            logging.info(f"  Losing Paths:        {mc['prob_loss'] * 100:.2f}%")
+            logging.info(f"  Ruin Probability:    {mc['ruin_probability'] * 100:.2f}% (loss of ${mc['ruin_level']:,.2f})")
+        
+        logging.info("\n" + "=" * 80)
+    
+    def run_multi_symbol(
+        self,
+        datasets: Dict[str, pd.DataFrame],
+        strategy_params: Optional[Dict] = None,
+        symbol_specs: Optional[Dict[str, Dict]] = None,
+        run_name: str = "Backtest",
+        workers: Optional[int] = None
+    ) -> Dict:
+        """
+        Run the same configuration on several instruments and aggregate the results.
+        
+        Each symbol trades its own account of initial_cash with its own contract
+        spec; the portfolio section sums the accounts.
+        
+        Args:
+            datasets: Ticker -> bars (see fetch_bars)
+            strategy_params: Dictionary of strategy parameters to override
+            symbol_specs: Ticker -> spec (default: symbols.symbol_spec(ticker))
+            run_name: Name/description of this batch
+            workers: Worker processes (default: one per symbol, capped at CPU count; 1 = in-process)
+        
+        Returns:
+            {"symbols": {ticker: metrics}, "portfolio": aggregate metrics}
+        """
+        symbol_specs = symbol_specs or {}
+        tasks = [
+            {
+                "ticker": ticker,
+                "df": df,
+                "spec": symbol_specs.get(ticker) or lookup_symbol_spec(ticker),
+                "strategy_params": strategy_params or {},
+                "run_name": f"{run_name} [{ticker}]",
+                "initial_cash": self.initial_cash,
+                "analyzer_profile": self.analyzer_profile,
+                "mc_paths": self.mc_paths,
+                "trace_allocations": self.trace_allocations,
+                "abort_rules": self.abort_rules,
+            }
+            for ticker, df in datasets.items()
+        ]
+        workers = workers or min(len(tasks), os.cpu_count() or 1)
+        
+        logging.info(f"\n🌐 Running {len(tasks)} symbol(s) on {workers} worker(s): {', '.join(datasets)}")
+        if workers > 1 and len(tasks) > 1:
+            # Runs already in the sink are served from it; the rest are streamed as they finish
+            outcomes = [None] * len(tasks)
+            if self.sink is not None:
+                for i, task in enumerate(tasks):
+                    task["key"] = self.memo_key(
+                        self.data_feed(task["df"]), task["strategy_params"],
+                        self.analyzer_profile, task["spec"]
+                    )
+                    outcomes[i] = self._resume(task["key"], task["run_name"])
+            pending = [i for i, metrics in enumerate(outcomes) if metrics is None]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for i, metrics in zip(pending, pool.map(_run_symbol_job, [tasks[i] for i in pending])):
+                    self._print_summary(metrics)
+                    self._record(metrics, tasks[i].get("key"))
+                    outcomes[i] = metrics
+        else:
+            outcomes = [
+                self.run_backtest(
+                    data_feed=self.data_feed(task["df"]),
+                    strategy_params=task["strategy_params"],
+                    run_name=task["run_name"],
+                    symbol_spec=task["spec"]
+                )
+                for task in tasks
+            ]
+        
+        per_symbol = {}
+        for task, metrics in zip(tasks, outcomes):
+            metrics["symbol"] = task["ticker"]
+            metrics["symbol_spec"] = task["spec"]
+            per_symbol[task["ticker"]] = metrics
+        
+        report = {"symbols": per_symbol, "portfolio": self._aggregate_portfolio(per_symbol.values())}
+        self._print_portfolio_report(report)
+        return report
+    
+    @staticmethod
+    def _aggregate_portfolio(results) -> Dict:
+        """Sum per-symbol accounts into portfolio-level metrics"""
+        results = list(results)
+        starting_value = sum(r["portfolio"]["starting_value"] for r in results)
+        ending_value = sum(r["portfolio"]["ending_value"] for r in results)
+        total = sum(r["trades"]["total"] for r in results)
+        won = sum(r["trades"]["won"] for r in results)
+        won_pnl = sum(r["pnl"]["won"]["total"] for r in results)
+        lost_pnl = sum(r["pnl"]["lost"]["total"] for r in results)
+        return {
+            "symbols": len(results),
+            "starting_value": starting_value,
+            "ending_value": ending_value,
+            "total_return": ending_value - starting_value,
+            "return_pct": (ending_value / starting_value - 1.0) * 100.0 if starting_value else 0.0,
+            "total_trades": total,
+            "won_trades": won,
+            "lost_trades": sum(r["trades"]["lost"] for r in results),
+            "win_rate": won / total * 100.0 if total else 0.0,
+            "net_pnl": sum(r["pnl"]["net_total"] for r in results),
+            "profit_factor": abs(won_pnl / lost_pnl) if lost_pnl != 0 else 0.0,
+            # Accounts are simulated separately, so only the worst single-symbol drawdown is known
+            "worst_symbol_drawdown_pct": max((r["performance"]["max_drawdown_pct"] for r in results), default=0.0),
+            "resources": aggregate_resources(r.get("resources") for r in results),
+        }
+    
+    @staticmethod
+    def _print_portfolio_report(report: Dict) -> None:
+        """Print per-symbol rows followed by the portfolio aggregate"""
         logging.info("\n" + "=" * 80)
+        logging.info("MULTI-SYMBOL REPORT")
+        logging.info("=" * 80)
+        logging.info(f"\n{'Symbol':<14} {'Return %':<12} {'Trades':<8} {'Win %':<10} {'PF':<8} {'DD %':<10} {'Net P&L':<12}")
+        logging.info("-" * 80)
+        for ticker, metrics in report["symbols"].items():
+            logging.info(
+                f"{ticker:<14} {metrics['portfolio']['return_pct']:>11.2f}% {metrics['trades']['total']:>7} "
+                f"{metrics['trades']['win_rate']:>9.2f}% {metrics['pnl']['profit_factor']:>7.2f} "
+                f"{metrics['performance']['max_drawdown_pct']:>9.2f}% ${metrics['pnl']['net_total']:>11,.2f}"
+            )
+        portfolio = report["portfolio"]
+        logging.info("-" * 80)
+        logging.info(
+            f"{'PORTFOLIO':<14} {portfolio['return_pct']:>11.2f}% {portfolio['total_trades']:>7} "
+            f"{portfolio['win_rate']:>9.2f}% {portfolio['profit_factor']:>7.2f} "
+            f"{portfolio['worst_symbol_drawdown_pct']:>9.2f}% ${portfolio['net_pnl']:>11,.2f}"
+        )
+        if portfolio.get("resources"):
+            logging.info(f"🧮 Resources: {format_resources(portfolio['resources'])}")
+        logging.info("=" * 80)
     
     def save_results(self, output_file: str = "backtest_results.json"):
-        """Save all backtest results to JSON file"""
+        """Save all backtest results to JSON file (runs streamed to a sink are already on disk)"""
         with open(output_file, "w") as f:
             json.dump(self.results, f, indent=2)
         logging.info(f"\n💾 Results saved to {output_file}")
     
     def print_comparison(self):
-        """Print comparison table of all backtest runs"""
-        if len(self.results) < 2:
+        """Print comparison table of all backtest runs (streamed from the sink when there is one)"""
+        results = self.sink if self.sink is not None else self.results
+        if len(results) < 2:
             return
         
         logging.info("\n" + "=" * 80)
@@ -372,8 +949,10 @@ class BacktestRunner:
         logging.info("-" * 80)
         
         # Print each run
-        for result in self.results:
+        for result in results:
             name = result["run_name"][:28]
+            if "aborted" in result:
+                name = "✂️ " + result["run_name"][:25]
             return_pct = result["portfolio"]["return_pct"]
             sharpe = result["performance"]["sharpe_ratio"]
             dd = result["performance"]["max_drawdown_pct"]
@@ -387,9 +966,93 @@ class BacktestRunner:
                 f"{dd:>9.2f}% {win_rate:>9.2f}% {pf:>7.2f}"
             )
         
+        summary = aggregate_resources(result.get("resources") for result in results)
+        if summary:
+            logging.info("-" * 80)
+            logging.info(f"🧮 Resources: {format_resources(summary)}")
         logging.info("=" * 80)
 
 
+def fetch_bars(
+    fetcher: PolygonDataFetcher,
+    tickers: List[str],
+    start_date: str,
+    end_date: str,
+    timeframe: str = "1",
+    timespan: str = "hour",
+    bar_store: Optional[BarStore] = None,
+    max_workers: int = 4,
+    derive_from_minute: bool = False,
+    with_quotes: bool = False
+) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch several tickers concurrently, reusing (and filling) the bar cache.
+    
+    Periods that end today or later are fetched but not cached, since they are
+    still incomplete.
+    
+    With derive_from_minute, only 1-minute bars are fetched (or loaded from the
+    cache) and the requested timeframe is aggregated from them, anchored at the
+    symbol's session open, so further timeframes of the same period need no
+    download.
+    
+    With with_quotes, bid/ask quotes are fetched as well and each bar carries
+    its closing quote (bar_store.attach_quotes); such datasets are cached under
+    their own key.
+    
+    Returns:
+        Ticker -> DataFrame, in the order of tickers
+    """
+    cacheable = end_date < datetime.now().strftime("%Y-%m-%d")
+    minutes = timeframe_minutes(timeframe, timespan) if derive_from_minute else 1
+    base_timeframe, base_timespan = ("1", "minute") if derive_from_minute else (timeframe, timespan)
+    
+    def fetch_one(ticker: str) -> pd.DataFrame:
+        def fetch() -> pd.DataFrame:
+            df = fetcher.fetch_aggregates(
+                ticker=ticker, start_date=start_date, end_date=end_date,
+                timeframe=base_timeframe, timespan=base_timespan
+            )
+            if with_quotes:
+                df = attach_quotes(df, fetcher.fetch_quotes(ticker, start_date, end_date))
+            return df
+        
+        session = session_spec(lookup_symbol_spec(ticker))
+        if bar_store is None:
+            df = fetch()
+            return resample_bars(df, minutes, session) if minutes > 1 else df
+        key = BarStore.dataset_key(ticker, start_date, end_date, base_timeframe, base_timespan)
+        if with_quotes:
+            key += "_quotes"
+        if key in bar_store:
+            logging.info(f"📦 {ticker}: loaded from bar cache")
+        df = bar_store.get_or_fetch(key, fetch, cache=cacheable)
+        if minutes == 1:
+            return df
+        if not cacheable:
+            return resample_bars(df, minutes, session)
+        logging.info(f"🧱 {ticker}: {timeframe} {timespan} bars derived from cached minutes")
+        return bar_store.resampled(key, minutes, session)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+        frames = list(pool.map(fetch_one, tickers))
+    return dict(zip(tickers, frames))
+
+
+def _run_symbol_job(task: Dict) -> Dict:
+    """Process-pool entry point of BacktestRunner.run_multi_symbol"""
+    runner = BacktestRunner(
+        initial_cash=task["initial_cash"], analyzer_profile=task["analyzer_profile"], mc_paths=task["mc_paths"],
+        trace_allocations=task["trace_allocations"], abort_rules=task["abort_rules"]
+    )
+    return runner.run_backtest(
+        data_feed=runner.data_feed(task["df"]),
+        strategy_params=task["strategy_params"],
+        run_name=task["run_name"],
+        symbol_spec=task["spec"]
+    )
+
+
 def main():
     """Main entry point for backtesting script"""
     parser = argparse.ArgumentParser(description="Run backtests on GoldCandleKenStrategy")
@@ -446,6 +1109,51 @@ def main():
         default="backtest_results.json",
         help="Output file for results (default: backtest_results.json)"
     )
+    parser.add_argument(
+        "--analyzer-profile",
+        type=str,
+        default="full",
+        choices=ANALYZER_PROFILES,
+        help="Analyzer bundle: full (stock analyzers incl. VWR) or sweep (single fused analyzer, faster)"
+    )
+    parser.add_argument(
+        "--trace-allocations",
+        action="store_true",
+        help="Record each run's top tracemalloc allocation sites in its resources block (slower runs)"
+    )
+    parser.add_argument(
+        "--abort-max-drawdown-pct",
+        type=float,
+        default=None,
+        help="Sweep pruning: stop a run once its drawdown exceeds this percent (partial metrics are kept)"
+    )
+    parser.add_argument(
+        "--abort-min-trades",
+        type=int,
+        nargs=2,
+        default=None,
+        metavar=("TRADES", "BAR"),
+        help="Sweep pruning: stop a run that opened fewer than TRADES trades by bar BAR"
+    )
+    parser.add_argument(
+        "--monte-carlo",
+        type=int,
+        default=0,
+        metavar="PATHS",
+        help="Resample each run's trades into PATHS equity paths (e.g. 100000) and report the distributions"
+    )
+    parser.add_argument(
+        "--optimize-grid",
+        type=str,
+        default=None,
+        help='JSON (or JSON file) grid run through cerebro.optstrategy, e.g. \'{"TP_ATR_MULTIPLIER": [3.6, 4.2]}\''
+    )
+    parser.add_argument(
+        "--maxcpus",
+        type=int,
+        default=None,
+        help="Worker processes for --optimize-grid (default: all cores; 1 = no multiprocessing)"
+    )
     parser.add_argument(
         "--run-name",
         type=str,
@@ -468,8 +1176,120 @@ def main():
         help="Run multiple backtests with different configurations"
     )
     
+    # Results store
+    parser.add_argument(
+        "--results-db",
+        type=str,
+        default=None,
+        help="SQLite results store to record runs in (e.g. results.db)"
+    )
+    parser.add_argument(
+        "--skip-evaluated",
+        action="store_true",
+        help="Skip configurations already recorded in --results-db for this ticker/period"
+    )
+    parser.add_argument(
+        "--results-jsonl",
+        type=str,
+        default=None,
+        help="Append each run to this JSONL file as it completes; rerun with the same file to resume"
+    )
+    
+    # Result memo
+    parser.add_argument(
+        "--memo-dir",
+        type=str,
+        default=None,
+        help="Directory for the on-disk result memo (identical configs on identical data are not re-run)"
+    )
+    parser.add_argument(
+        "--memo-max-mb",
+        type=float,
+        default=512.0,
+        help="Size limit of --memo-dir in MB; least recently used entries are evicted (default: 512)"
+    )
+    parser.add_argument(
+        "--worker-socket",
+        type=str,
+        default=None,
+        help="Forward runs to a backtest_worker.py listening on this Unix socket instead of running locally"
+    )
+    
+    # Multi-symbol mode
+    parser.add_argument(
+        "--symbols",
+        type=str,
+        default=None,
+        help="Comma-separated tickers to run in one batch (e.g. C:XAUUSD,C:XAGUSD,I:SPX); overrides --ticker"
+    )
+    parser.add_argument(
+        "--symbol-specs",
+        type=str,
+        default=None,
+        help='JSON (or JSON file) of per-ticker spec overrides, e.g. \'{"C:XAGUSD": {"contract_size": 5000}}\''
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for --symbols (default: one per symbol, capped at CPU count)"
+    )
+    parser.add_argument(
+        "--bar-cache",
+        type=str,
+        default=None,
+        help="Directory caching fetched bars as NumPy columns (e.g. .bar_cache)"
+    )
+    parser.add_argument(
+        "--derive-from-minute",
+        action="store_true",
+        help="Fetch 1-minute bars once and aggregate --timeframe/--timespan from them (use with --bar-cache)"
+    )
+    parser.add_argument(
+        "--quotes",
+        action="store_true",
+        help="Also fetch bid/ask quotes so MAX_SPREAD_POINTS filters on each bar's closing spread"
+    )
+    parser.add_argument(
+        "--intrabar",
+        action="store_true",
+        help="Resolve TP/SL against the 1-minute bars inside each bar (fills at the touched level)"
+    )
+    add_queue_arguments(parser)
+    
     args = parser.parse_args()
     
+    if args.skip_evaluated and not args.results_db:
+        parser.error("--skip-evaluated requires --results-db")
+    if args.symbols and (args.batch_test or args.worker_socket):
+        parser.error("--symbols cannot be combined with --batch-test or --worker-socket")
+    if (args.derive_from_minute or args.quotes) and args.worker_socket:
+        parser.error("--derive-from-minute and --quotes cannot be combined with --worker-socket")
+    if args.intrabar and (args.symbols or args.worker_socket):
+        parser.error("--intrabar cannot be combined with --symbols or --worker-socket")
+    if args.optimize_grid and (args.batch_test or args.symbols or args.worker_socket or args.intrabar):
+        parser.error("--optimize-grid cannot be combined with --batch-test, --symbols, --worker-socket or --intrabar")
+    if args.optimize_grid and args.skip_evaluated:
+        parser.error("--optimize-grid runs the whole grid; it cannot be combined with --skip-evaluated")
+    if args.intrabar and args.timespan == "minute" and args.timeframe == "1":
+        parser.error("--intrabar needs a timeframe above 1 minute")
+    if args.derive_from_minute and args.timespan not in TIMESPAN_MINUTES:
+        parser.error(f"--derive-from-minute supports --timespan {', '.join(TIMESPAN_MINUTES)}")
+    queue_role = args.enqueue or args.queue_worker or args.queue_wait
+    if bool(args.queue_db) != bool(queue_role):
+        parser.error("--queue-db needs one of --enqueue, --queue-worker or --queue-wait (and they need --queue-db)")
+    if args.queue_db and (args.symbols or args.worker_socket or args.intrabar or args.skip_evaluated):
+        parser.error("--queue-db cannot be combined with --symbols, --worker-socket, --intrabar or --skip-evaluated")
+    if args.periods and not args.enqueue:
+        parser.error("--periods is only used with --enqueue")
+    if args.abort_min_trades and min(args.abort_min_trades) < 1:
+        parser.error("--abort-min-trades needs a positive trade count and bar")
+    abort_rules = BacktestRunner.active_abort_rules({
+        "abort_max_drawdown_pct": args.abort_max_drawdown_pct,
+        "abort_min_trades": args.abort_min_trades[0] if args.abort_min_trades else 0,
+        "abort_min_trades_bar": args.abort_min_trades[1] if args.abort_min_trades else 0,
+    })
+    
     # Setup logging
     logging.basicConfig(
         level=logging.INFO,
@@ -477,35 +1297,13 @@ def main():
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     
-    # Validate API key
-    if not args.api_key:
+    # Validate API key (a worker can use its own; queue coordinators fetch nothing)
+    if not args.api_key and not (args.worker_socket or args.enqueue or args.queue_wait):
         logging.error("Polygon API key required. Set --api-key or POLYGON_API_KEY environment variable")
         return
     
-    # Fetch data
-    try:
-        fetcher = PolygonDataFetcher(args.api_key)
-        df = fetcher.fetch_aggregates(
-            ticker=args.ticker,
-            start_date=args.start_date,
-            end_date=args.end_date,
-            timeframe=args.timeframe,
-            timespan=args.timespan
-        )
-    except Exception as e:
-        logging.error(f"Failed to fetch data: {e}")
-        return
-    
-    # Create Backtrader data feed
-    data_feed = bt.feeds.PandasData(dataname=df)
-    
-    # Initialize backtest runner
-    runner = BacktestRunner(initial_cash=args.initial_cash)
-    
     if args.batch_test:
         # Run multiple backtests with different configurations
-        logging.info("\n🔄 Running batch backtests...")
-        
         test_configs = [
             {"name": "Default Strategy", "params": {}},
             {"name": "Grid Enabled", "params": {"ENABLE_GRID": True}},
@@ -516,18 +1314,6 @@ def main():
             {"name": "Wide SL (2x ATR)", "params": {"SL_ATR_MULTIPLIER": 2.0}},
             {"name": "Higher Lot Size (0.05)", "params": {"LOT_SIZE": 0.05}},
         ]
-        
-        for config in test_configs:
-            # Create fresh data feed for each test
-            test_feed = bt.feeds.PandasData(dataname=df)
-            runner.run_backtest(
-                data_feed=test_feed,
-                strategy_params=config["params"],
-                run_name=config["name"]
-            )
-        
-        # Print comparison
-        runner.print_comparison()
     else:
         # Single backtest run
         strategy_params = {}
@@ -546,15 +1332,304 @@ def main():
         if args.max_drawdown:
             strategy_params["MAX_DRAWDOWN_PERCENT"] = args.max_drawdown
         
-        runner.run_backtest(
-            data_feed=data_feed,
-            strategy_params=strategy_params,
-            run_name=args.run_name
+        test_configs = [{"name": args.run_name, "params": strategy_params}]
+    
+    if args.queue_db:
+        _main_queue(args, test_configs, abort_rules)
+        return
+    
+    # Results store: skip configurations already evaluated on this symbol/period
+    store = ResultsStore(args.results_db) if args.results_db else None
+    timeframe = f"{args.timeframe}{args.timespan}"
+    # Same instrument overrides as the --symbols mode
+    spec_overrides = _load_json_option(args.symbol_specs).get(args.ticker)
+    spec = lookup_symbol_spec(args.ticker, spec_overrides)
+    if store is not None:
+        for config in test_configs:
+            config["full_params"] = BacktestRunner.config_params(
+                config["params"], args.initial_cash, timeframe, spec, intrabar=args.intrabar,
+                abort_rules=abort_rules
+            )
+    
+    if store is not None and args.skip_evaluated:
+        done = store.evaluated_hashes(ENGINE_BACKTRADER, args.ticker, args.start_date, args.end_date)
+        skipped = [c for c in test_configs if param_hash(c["full_params"]) in done]
+        test_configs = [c for c in test_configs if param_hash(c["full_params"]) not in done]
+        for config in skipped:
+            logging.info(f"⏭️  Skipping '{config['name']}': already evaluated in {args.results_db}")
+        if not test_configs:
+            logging.info("All configurations already evaluated. Nothing to run.")
+            store.close()
+            return
+    
+    # Initialize backtest runner
+    memo = ResultMemo(args.memo_dir, max_bytes=int(args.memo_max_mb * 1024 * 1024)) if args.memo_dir else None
+    sink = ResultSink(args.results_jsonl) if args.results_jsonl else None
+    if sink is not None and len(sink):
+        logging.info(f"📜 Resuming {args.results_jsonl}: {len(sink)} run(s) already streamed")
+    runner = BacktestRunner(
+        initial_cash=args.initial_cash, analyzer_profile=args.analyzer_profile, memo=memo, sink=sink,
+        mc_paths=args.monte_carlo, trace_allocations=args.trace_allocations, abort_rules=abort_rules
+    )
+    bar_store = BarStore(args.bar_cache) if args.bar_cache else None
+    completed = []  # (config, metrics) of every run that produced results
+    
+    if args.symbols:
+        _main_multi_symbol(args, test_configs[0], runner, store, bar_store, timeframe)
+        if sink is not None:
+            sink.close()
+        return
+    
+    if args.worker_socket:
+        # Forward to a persistent worker: no backtrader/pandas import in this process
+        from backtest_worker import submit_jobs
+        
+        jobs = [
+            {
+                "name": config["name"], "params": config["params"], "ticker": args.ticker,
+                "start_date": args.start_date, "end_date": args.end_date,
+                "timeframe": args.timeframe, "timespan": args.timespan,
+                "initial_cash": args.initial_cash, "analyzer_profile": args.analyzer_profile,
+                "mc_paths": args.monte_carlo, "trace_allocations": args.trace_allocations,
+                "abort_rules": abort_rules, "api_key": args.api_key,
+                **({"symbol_spec": spec_overrides} if spec_overrides else {}),
+            }
+            for config in test_configs
+        ]
+        try:
+            replies = submit_jobs(args.worker_socket, jobs)
+        except OSError as e:
+            logging.error(f"Cannot reach backtest worker at {args.worker_socket}: {e}")
+            return
+        for config, reply in zip(test_configs, replies):
+            if not reply.get("ok"):
+                logging.error(f"❌ {config['name']}: {reply.get('error')}")
+                continue
+            runner._print_summary(reply["metrics"])
+            runner._record(reply["metrics"])
+            completed.append((config, reply["metrics"]))
+    else:
+        # Fetch data
+        try:
+            fetcher = PolygonDataFetcher(args.api_key)
+            df = fetch_bars(
+                fetcher, [args.ticker], args.start_date, args.end_date,
+                args.timeframe, args.timespan, bar_store, derive_from_minute=args.derive_from_minute,
+                with_quotes=args.quotes
+            )[args.ticker]
+            minute_bars = None
+            if args.intrabar:
+                minute_bars = fetch_bars(
+                    fetcher, [args.ticker], args.start_date, args.end_date, "1", "minute", bar_store
+                )[args.ticker]
+        except Exception as e:
+            logging.error(f"Failed to fetch data: {e}")
+            return
+        
+        if args.optimize_grid:
+            # One optstrategy run over the grid: the feed is preloaded once and shared by the workers
+            base = test_configs[0]
+            for metrics in runner.optimize(
+                runner.data_feed(df), _load_json_option(args.optimize_grid), args.maxcpus,
+                strategy_params=base["params"], run_name=base["name"], symbol_spec=spec
+            ):
+                config = {"name": metrics["run_name"], "params": {**base["params"], **metrics["params"]}}
+                if store is not None:
+                    config["full_params"] = BacktestRunner.config_params(
+                        config["params"], args.initial_cash, timeframe, spec, abort_rules=abort_rules
+                    )
+                completed.append((config, metrics))
+        else:
+            if len(test_configs) > 1:
+                logging.info("\n🔄 Running batch backtests...")
+            
+            for config in test_configs:
+                # Fresh feed for each test (the bar arrays are converted once and shared)
+                metrics = runner.run_backtest(
+                    data_feed=runner.data_feed(df),
+                    strategy_params=config["params"],
+                    run_name=config["name"],
+                    symbol_spec=spec,
+                    intrabar_bars=minute_bars
+                )
+                completed.append((config, metrics))
+    
+    if runner.memo.hits:
+        logging.info(f"♻️  Memo: {runner.memo.hits} hit(s), {runner.memo.misses} miss(es)")
+    
+    if len(test_configs) > 1 or args.optimize_grid:
+        # Print comparison
+        runner.print_comparison()
+    
+    if store is not None:
+        store.record_runs(
+            ResultsStore.make_record(
+                ENGINE_BACKTRADER, config["full_params"], metrics,
+                symbol=args.ticker, period_start=args.start_date, period_end=args.end_date,
+                timeframe=timeframe, run_name=config["name"]
+            )
+            for config, metrics in completed
         )
+        store.close()
+        logging.info(f"🗄️  Recorded {len(completed)} run(s) in {args.results_db}")
     
     # Save results
+    if sink is not None:
+        sink.close()
+        logging.info(f"\n📜 {sink.appended} new run(s) streamed to {args.results_jsonl} ({len(sink)} in total)")
+    else:
+        runner.save_results(args.output)
+    
+    logging.info("\n✅ Backtesting complete!")
+
+
+def _load_json_option(value: Optional[str]) -> Dict:
+    """Parse a JSON option such as --symbol-specs or --optimize-grid (inline JSON or a path to a JSON file)"""
+    if not value:
+        return {}
+    if os.path.exists(value):
+        with open(value) as f:
+            return json.load(f)
+    return json.loads(value)
+
+
+def _main_queue(args, test_configs: List[Dict], abort_rules: Dict) -> None:
+    """--queue-db branch of main(): enqueue a sweep, work on it, or collect its results"""
+    queue = queue_from_args(args)
+    
+    if args.queue_worker:
+        from backtest_worker import BacktestWorker
+        
+        memo = ResultMemo(args.memo_dir, max_bytes=int(args.memo_max_mb * 1024 * 1024)) if args.memo_dir else None
+        worker = BacktestWorker(
+            api_key=args.api_key, memo=memo, bar_store=BarStore(args.bar_cache) if args.bar_cache else None
+        )
+        run_worker(queue, worker.run_job, idle_timeout=args.queue_idle_timeout)
+        queue.close()
+        return
+    
+    if args.enqueue:
+        configs = test_configs
+        if args.optimize_grid:
+            base = test_configs[0]
+            configs = [
+                {
+                    "name": f"{base['name']} [" + ", ".join(f"{k}={v}" for k, v in combo.items()) + "]",
+                    "params": {**base["params"], **combo},
+                }
+                for combo in grid_combinations(_load_json_option(args.optimize_grid))
+            ]
+        periods = load_periods(args.periods, args.start_date, args.end_date)
+        spec_overrides = _load_json_option(args.symbol_specs).get(args.ticker)
+        # Job dicts of backtest_worker; the API key stays with the workers
+        jobs = [
+            {
+                "name": config["name"] if len(periods) == 1 else f"{config['name']} {start}..{end}",
+                "params": config["params"], "ticker": args.ticker, "start_date": start, "end_date": end,
+                "timeframe": args.timeframe, "timespan": args.timespan, "initial_cash": args.initial_cash,
+                "analyzer_profile": args.analyzer_profile, "mc_paths": args.monte_carlo,
+                "trace_allocations": args.trace_allocations, "quotes": args.quotes,
+                "derive_from_minute": args.derive_from_minute,
+                **({"abort_rules": abort_rules} if abort_rules else {}),
+                **({"symbol_spec": spec_overrides} if spec_overrides else {}),
+            }
+            for config in configs
+            for start, end in periods
+        ]
+        added, existing = queue.enqueue(jobs)
+        logging.info(
+            f"📬 Enqueued {added} job(s) on '{args.queue_name}' in {args.queue_db} "
+            f"({len(configs)} configuration(s) x {len(periods)} period(s); {existing} already queued)"
+        )
+        queue.close()
+        return
+    
+    # --queue-wait: report the sweep once every job is done or has failed
+    queue.wait()
+    finished = queue.results()
+    queue.close()
+    runner = BacktestRunner(initial_cash=args.initial_cash, analyzer_profile=args.analyzer_profile)
+    store = ResultsStore(args.results_db) if args.results_db else None
+    records = []
+    for job in finished:
+        payload = job["payload"]
+        if job["status"] != "done":
+            logging.error(f"❌ {payload['name']}: failed after {job['attempts']} attempt(s): {job['error']}")
+            continue
+        metrics = job["result"]
+        runner.results.append(metrics)
+        if store is not None:
+            timeframe = f"{payload['timeframe']}{payload['timespan']}"
+            full_params = BacktestRunner.config_params(
+                payload["params"], payload["initial_cash"], timeframe, lookup_symbol_spec(payload["ticker"], payload.get("symbol_spec")),
+                abort_rules=payload.get("abort_rules")
+            )
+            records.append(ResultsStore.make_record(
+                ENGINE_BACKTRADER, full_params, metrics, symbol=payload["ticker"],
+                period_start=payload["start_date"], period_end=payload["end_date"],
+                timeframe=timeframe, run_name=payload["name"]
+            ))
+    runner.print_comparison()
+    if store is not None:
+        store.record_runs(records)
+        store.close()
+        logging.info(f"🗄️  Recorded {len(records)} run(s) in {args.results_db}")
     runner.save_results(args.output)
+    logging.info("\n✅ Queue sweep complete!")
+
+
+def _main_multi_symbol(args, config: Dict, runner: BacktestRunner, store, bar_store, timeframe: str) -> None:
+    """--symbols branch of main(): one configuration across several instruments"""
+    tickers = [t.strip() for t in args.symbols.split(",") if t.strip()]
+    overrides = _load_json_option(args.symbol_specs)
+    specs = {ticker: lookup_symbol_spec(ticker, overrides.get(ticker)) for ticker in tickers}
+    full_params = {
+        ticker: BacktestRunner.config_params(
+            config["params"], args.initial_cash, timeframe, specs[ticker], abort_rules=runner.abort_rules
+        )
+        for ticker in tickers
+    }
+    
+    if store is not None and args.skip_evaluated:
+        for ticker in list(tickers):
+            done = store.evaluated_hashes(ENGINE_BACKTRADER, ticker, args.start_date, args.end_date)
+            if param_hash(full_params[ticker]) in done:
+                logging.info(f"⏭️  Skipping {ticker}: already evaluated in {args.results_db}")
+                tickers.remove(ticker)
+        if not tickers:
+            logging.info("All symbols already evaluated. Nothing to run.")
+            store.close()
+            return
+    
+    try:
+        fetcher = PolygonDataFetcher(args.api_key)
+        datasets = fetch_bars(
+            fetcher, tickers, args.start_date, args.end_date, args.timeframe, args.timespan, bar_store,
+            derive_from_minute=args.derive_from_minute, with_quotes=args.quotes
+        )
+    except Exception as e:
+        logging.error(f"Failed to fetch data: {e}")
+        return
+    
+    report = runner.run_multi_symbol(
+        datasets, config["params"], specs, run_name=config["name"], workers=args.workers
+    )
+    
+    if store is not None:
+        store.record_runs(
+            ResultsStore.make_record(
+                ENGINE_BACKTRADER, full_params[ticker], metrics,
+                symbol=ticker, period_start=args.start_date, period_end=args.end_date,
+                timeframe=timeframe, run_name=metrics["run_name"]
+            )
+            for ticker, metrics in report["symbols"].items()
+        )
+        store.close()
+        logging.info(f"🗄️  Recorded {len(report['symbols'])} run(s) in {args.results_db}")
     
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"\n💾 Results saved to {args.output}")
     logging.info("\n✅ Backtesting complete!")
 
 
@@ -0,0 +1,260 @@
+"""
+Persistent backtest worker
+
+Keeps one interpreter with backtrader and pandas already imported and runs
+backtest jobs received as JSON lines over a Unix socket or stdin/stdout. Shell
+loops that start one backtest_runner.py per period pay the library import cost
+once per session instead of once per run, and fetched bars and memoized results
+are reused across jobs.
+
+Job (one JSON object per line; every key except the dates is optional):
+    {"name": "Jan", "ticker": "C:XAUUSD", "start_date": "2024-01-15", "end_date": "2024-02-01",
+     "timeframe": "1", "timespan": "minute", "initial_cash": 10000,
+     "analyzer_profile": "sweep", "params": {"TP_ATR_MULTIPLIER": 4.0},
+     "symbol_spec": {"commission": 0.0001}, "mc_paths": 100000, "trace_allocations": false,
+     "quotes": false, "derive_from_minute": false, "abort_rules": {"abort_max_drawdown_pct": 20}}
+Reply (one line per job):
+    {"ok": true, "metrics": {...}}  or  {"ok": false, "error": "..."}
+Control messages: {"op": "ping"}, {"op": "shutdown"}
+
+The same job dicts are the payloads of backtest_runner's --queue-db job queue;
+queue workers run them through BacktestWorker.run_job.
+
+Usage:
+    python backtest_worker.py --socket /tmp/backtest.sock &
+    python backtest_runner.py --worker-socket /tmp/backtest.sock --start-date 2024-01-15 --end-date 2024-02-01
+    python backtest_worker.py --stdio < jobs.jsonl > results.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import socket
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bar_store import BarStore
+from lazy_imports import LazyModule
+from results_store import ResultMemo
+
+bt = LazyModule("backtrader")
+
+
+class BacktestWorker:
+    """Executes backtest jobs in a long-lived process"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        memo: Optional[ResultMemo] = None,
+        max_datasets: int = 8,
+        bar_store: Optional[BarStore] = None
+    ):
+        """
+        Args:
+            api_key: Polygon.io API key used when a job does not carry one
+            memo: ResultMemo shared by all jobs (default: in-process LRU only)
+            max_datasets: Number of fetched bar sets kept in memory (LRU)
+            bar_store: Bar cache consulted (and filled) before fetching
+        """
+        self.api_key = api_key
+        self.memo = memo if memo is not None else ResultMemo()
+        self.max_datasets = max_datasets
+        self.bar_store = bar_store
+        self.jobs_done = 0
+        self._datasets = OrderedDict()
+
+    def _bars(self, job: Dict):
+        """Fetch (or reuse) the bars a job runs on"""
+        from backtest_runner import PolygonDataFetcher, fetch_bars
+
+        key = (
+            job["ticker"], job["start_date"], job["end_date"], job["timeframe"], job["timespan"],
+            bool(job.get("quotes")), bool(job.get("derive_from_minute"))
+        )
+        if key in self._datasets:
+            self._datasets.move_to_end(key)
+            return self._datasets[key]
+
+        api_key = job.get("api_key") or self.api_key
+        if not api_key:
+            raise ValueError("No Polygon API key (set POLYGON_API_KEY for the worker or pass api_key in the job)")
+        df = fetch_bars(
+            PolygonDataFetcher(api_key), [key[0]], key[1], key[2], key[3], key[4], self.bar_store,
+            derive_from_minute=key[6], with_quotes=key[5]
+        )[key[0]]
+        self._datasets[key] = df
+        while len(self._datasets) > self.max_datasets:
+            self._datasets.popitem(last=False)
+        return df
+
+    def run_job(self, job: Dict) -> Dict:
+        """Run one backtest job and return its metrics"""
+        from backtest_runner import BacktestRunner
+        from symbols import symbol_spec
+
+        job = dict(job)
+        for field in ("start_date", "end_date"):
+            if not job.get(field):
+                raise ValueError(f"Job is missing '{field}'")
+        job.setdefault("ticker", "X:XAUUSD")
+        job.setdefault("timeframe", "1")
+        job.setdefault("timespan", "hour")
+
+        df = self._bars(job)
+        runner = BacktestRunner(
+            initial_cash=float(job.get("initial_cash", 10000.0)),
+            analyzer_profile=job.get("analyzer_profile", "full"),
+            memo=self.memo,
+            mc_paths=int(job.get("mc_paths", 0)),
+            trace_allocations=bool(job.get("trace_allocations", False)),
+            abort_rules=job.get("abort_rules")
+        )
+        metrics = runner.run_backtest(
+            data_feed=runner.data_feed(df),
+            strategy_params=job.get("params") or {},
+            run_name=job.get("name", "Backtest"),
+            symbol_spec=symbol_spec(job["ticker"], job.get("symbol_spec"))
+        )
+        self.jobs_done += 1
+        return metrics
+
+    def handle(self, line: str) -> Tuple[Optional[Dict], bool]:
+        """
+        Handle one request line.
+
+        Returns:
+            (reply or None for blank lines, True if the worker should stop)
+        """
+        line = line.strip()
+        if not line:
+            return None, False
+        try:
+            request = json.loads(line)
+            op = request.get("op", "run")
+            if op == "ping":
+                return {"ok": True, "jobs_done": self.jobs_done, "memo_hits": self.memo.hits}, False
+            if op == "shutdown":
+                return {"ok": True}, True
+            if op != "run":
+                raise ValueError(f"Unknown op '{op}'")
+            return {"ok": True, "metrics": self.run_job(request)}, False
+        except Exception as e:
+            logging.exception("Job failed")
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}, False
+
+    def serve_stream(self, rfile, wfile) -> bool:
+        """
+        Answer JSON-line requests from rfile on wfile until EOF or shutdown.
+
+        Returns:
+            True if a shutdown was requested
+        """
+        for line in rfile:
+            reply, stop = self.handle(line)
+            if reply is not None:
+                wfile.write(json.dumps(reply, default=str) + "\n")
+                wfile.flush()
+            if stop:
+                return True
+        return False
+
+    def serve_stdio(self) -> None:
+        """Serve requests from stdin; stdout carries replies only (job output goes to stderr)"""
+        replies = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            self.serve_stream(sys.stdin, replies)
+
+    def serve_socket(self, path: str) -> None:
+        """Serve requests on a Unix socket, one connection at a time"""
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen()
+        logging.info(f"🛰️  Backtest worker listening on {path}")
+        try:
+            stop = False
+            while not stop:
+                conn, _ = server.accept()
+                with conn, conn.makefile("r", encoding="utf-8") as rfile, conn.makefile("w", encoding="utf-8") as wfile:
+                    stop = self.serve_stream(rfile, wfile)
+        finally:
+            server.close()
+            if os.path.exists(path):
+                os.unlink(path)
+            logging.info(f"🛰️  Backtest worker stopped after {self.jobs_done} job(s)")
+
+
+def submit_jobs(socket_path: str, jobs: Iterable[Dict]) -> List[Dict]:
+    """
+    Send jobs to a running worker and collect the replies (same order as jobs).
+
+    Args:
+        socket_path: Unix socket the worker listens on
+        jobs: Job dicts (see module docstring)
+
+    Returns:
+        One reply dict per job
+    """
+    replies = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        with conn.makefile("r", encoding="utf-8") as rfile, conn.makefile("w", encoding="utf-8") as wfile:
+            for job in jobs:
+                wfile.write(json.dumps(job, default=str) + "\n")
+                wfile.flush()
+                line = rfile.readline()
+                if not line:
+                    raise ConnectionError("Worker closed the connection")
+                replies.append(json.loads(line))
+    return replies
+
+
+def main():
+    """Main entry point for the backtest worker"""
+    parser = argparse.ArgumentParser(description="Persistent backtest worker (JSON-line jobs)")
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument("--socket", type=str, help="Unix socket path to listen on")
+    transport.add_argument("--stdio", action="store_true", help="Read jobs from stdin, write replies to stdout")
+    parser.add_argument(
+        "--api-key",
+        type=str,
+        default=os.environ.get("POLYGON_API_KEY"),
+        help="Polygon.io API key (or set POLYGON_API_KEY env var)"
+    )
+    parser.add_argument("--memo-dir", type=str, default=None, help="Directory for the on-disk result memo")
+    parser.add_argument("--memo-max-mb", type=float, default=512.0, help="Size limit of --memo-dir in MB (default: 512)")
+    parser.add_argument("--max-datasets", type=int, default=8, help="Fetched bar sets kept in memory (default: 8)")
+    parser.add_argument("--bar-cache", type=str, default=None, help="Directory caching fetched bars (shared with backtest_runner)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stderr
+    )
+
+    memo = ResultMemo(args.memo_dir, max_bytes=int(args.memo_max_mb * 1024 * 1024)) if args.memo_dir else None
+    bar_store = BarStore(args.bar_cache) if args.bar_cache else None
+    worker = BacktestWorker(api_key=args.api_key, memo=memo, max_datasets=args.max_datasets, bar_store=bar_store)
+
+    # Pay the import cost up front, before the first job arrives
+    import backtest_runner  # noqa: F401
+    import ken_gold_candle  # noqa: F401
+    bt._load()
+
+    if args.stdio:
+        worker.serve_stdio()
+    else:
+        worker.serve_socket(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+On-disk cache of fetched OHLCV bars
+
+Every Polygon download is stored once as one .npy file per column plus a small
+meta.json, keyed by ticker, period and timeframe. Later runs (and parallel
+workers) memory-map the columns instead of fetching and parsing JSON again.
+
+Layout:
+    <root>/<dataset key>/meta.json
+    <root>/<dataset key>/datetime.npy      # datetime64 index (UTC)
+    <root>/<dataset key>/<column>.npy      # open, high, low, close, volume[, bid, ask]
+
+Higher timeframes are derived from cached minute bars instead of downloaded
+again: resample_bars() aggregates OHLCV into N-minute buckets anchored at the
+symbol's session open, and BarStore.resampled() stores each derived timeframe
+next to its source (<source key>@<N>m), so every timeframe is built once.
+
+Usage:
+    store = BarStore(".bar_cache")
+    key = BarStore.dataset_key("C:XAUUSD", "2024-01-15", "2024-02-01", "1", "minute")
+    df = store.get_or_fetch(key, lambda: fetcher.fetch_aggregates(...))
+    hourly = store.resampled(key, 60, session=SESSIONS["fx"])
+
+Datasets fetched with quotes carry bid/ask columns next to OHLCV: the quote
+standing at each bar's close (attach_quotes()). They are cached, resampled and
+fed like the price columns, so MAX_SPREAD_POINTS filters on real spreads;
+spread_ok_mask() turns their spread into one boolean array per spread limit.
+
+IntrabarIndex maps each bar of a higher timeframe to the slice of minute bars
+inside it (computed once with searchsorted), so intrabar execution can resolve
+which of a stop and a target was touched first without searching per bar.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+
+DEFAULT_BAR_CACHE = ".bar_cache"
+
+# Quote columns a dataset may carry next to OHLCV (closing bid/ask of each bar)
+QUOTE_COLUMNS = ("bid", "ask")
+
+# Length of one Polygon timespan unit in minutes
+TIMESPAN_MINUTES = {"minute": 1, "hour": 60, "day": 1440}
+
+
+def timeframe_minutes(timeframe: str, timespan: str) -> int:
+    """Bar length in minutes, e.g. ("4", "hour") -> 240"""
+    if timespan not in TIMESPAN_MINUTES:
+        raise ValueError(f"Cannot derive '{timespan}' bars from minutes. Choose from {list(TIMESPAN_MINUTES)}")
+    return int(timeframe) * TIMESPAN_MINUTES[timespan]
+
+
+def resample_bars(df: pd.DataFrame, minutes: int, session: Optional[Dict] = None) -> pd.DataFrame:
+    """
+    Aggregate bars into `minutes`-minute bars.
+
+    open = first, high = max, low = min, close = last and volume = sum of each
+    bucket; buckets without bars produce no row. Each bar is labelled with the
+    start of its bucket, like Polygon aggregates.
+
+    Args:
+        df: Bars with a sorted DatetimeIndex (naive = UTC) and open/high/low/close[/volume]
+        minutes: Target bar length in minutes
+        session: Session spec ({"tz", "open"}, see symbols.SESSIONS) anchoring the
+            buckets at the session open in local time; default: UTC midnight
+
+    Returns:
+        Resampled DataFrame with the same columns and index timezone
+    """
+    if minutes < 1:
+        raise ValueError(f"minutes must be >= 1, got {minutes}")
+    if len(df) == 0:
+        return df.copy()
+    index = df.index
+    if not index.is_monotonic_increasing:
+        raise ValueError("resample_bars needs bars sorted by time")
+
+    utc = index.tz_convert("UTC") if index.tz is not None else index.tz_localize("UTC")
+    anchor = 0
+    local = utc
+    if session is not None:
+        local = utc.tz_convert(session["tz"])
+        hour, minute = session["open"].split(":")
+        anchor = int(hour) * 60 + int(minute)
+    # Wall-clock minutes since the epoch in the session timezone
+    local_minutes = local.tz_localize(None).to_numpy().astype("datetime64[m]").astype(np.int64)
+    bucket_start = (local_minutes - anchor) // minutes * minutes + anchor
+    # Label each bar with its bucket start in UTC minutes; around DST changes the
+    # local start may not exist or repeat, so buckets are delimited by this label
+    utc_minutes = utc.tz_localize(None).to_numpy().astype("datetime64[m]").astype(np.int64)
+    bucket_utc = utc_minutes - (local_minutes - bucket_start)
+
+    boundaries = np.flatnonzero(np.diff(bucket_utc)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(df)])) - 1
+
+    columns = {
+        "open": df["open"].to_numpy()[starts],
+        "high": np.maximum.reduceat(df["high"].to_numpy(), starts),
+        "low": np.minimum.reduceat(df["low"].to_numpy(), starts),
+        "close": df["close"].to_numpy()[ends],
+    }
+    if "volume" in df.columns:
+        columns["volume"] = np.add.reduceat(df["volume"].to_numpy(), starts)
+    for name in QUOTE_COLUMNS:
+        if name in df.columns:
+            columns[name] = df[name].to_numpy()[ends]
+
+    labels = pd.DatetimeIndex(bucket_utc[starts].astype("datetime64[m]").astype("datetime64[ns]"), name=index.name)
+    if index.tz is not None:
+        labels = labels.tz_localize("UTC").tz_convert(index.tz)
+    return pd.DataFrame(columns, index=labels, columns=[c for c in df.columns if c in columns])
+
+
+def _bar_seconds(bar_times: np.ndarray) -> int:
+    """Most common spacing of bar start times (epoch seconds), i.e. the bar period"""
+    deltas = np.diff(bar_times)
+    spacings, counts = np.unique(deltas[deltas > 0], return_counts=True)
+    return int(spacings[np.argmax(counts)]) if len(spacings) else 60
+
+
+def attach_quotes(bars: pd.DataFrame, quotes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bars with the bid/ask standing at each bar's close.
+
+    A bar ends at the next bar or after one bar period, whichever is first
+    (gaps). Its closing quote is the last one before that end, so bars without
+    a quote of their own keep the prevailing quote; bars before the first quote
+    get NaN (the spread filter lets them pass).
+
+    Args:
+        bars: Bars with a sorted DatetimeIndex (bar start times)
+        quotes: Quotes with a sorted DatetimeIndex and bid/ask columns, on the
+            same clock as the bars
+
+    Returns:
+        Copy of bars with bid and ask columns
+    """
+    bar_times = bars.index.to_numpy().astype("datetime64[ns]").astype(np.int64)
+    quote_times = quotes.index.to_numpy().astype("datetime64[ns]").astype(np.int64)
+    period = _bar_seconds(bar_times // 1_000_000_000) * 1_000_000_000
+    ends = np.minimum(np.append(bar_times[1:], np.iinfo(np.int64).max), bar_times + period)
+    last = np.searchsorted(quote_times, ends, side="left") - 1
+    quoted = last >= 0
+    result = bars.copy()
+    for name in QUOTE_COLUMNS:
+        values = np.full(len(bars), np.nan)
+        values[quoted] = quotes[name].to_numpy(dtype=np.float64)[last[quoted]]
+        result[name] = values
+    return result
+
+
+def quoted_spread(bid, ask) -> np.ndarray:
+    """Quoted spread (ask - bid, price units) of each bar as float64; NaN where unquoted"""
+    return np.asarray(ask, dtype=np.float64) - np.asarray(bid, dtype=np.float64)
+
+
+def spread_ok_mask(spread: np.ndarray, point: float, max_spread_points: float) -> np.ndarray:
+    """
+    Bars whose quoted spread (see quoted_spread) is within max_spread_points.
+
+    Bars without a quote (NaN) pass, like the strategy's spread check.
+    """
+    if point <= 0:
+        return np.ones(len(spread), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        return ~(spread / point > max_spread_points)
+
+
+class IntrabarIndex:
+    """
+    Minute bars grouped by the higher-timeframe bar they fall into.
+
+    Bar i of the higher timeframe covers minute rows starts[i]:ends[i]; both
+    frames must use the same clock (naive UTC or the same timezone).
+    """
+
+    def __init__(self, bar_index: pd.DatetimeIndex, minutes: pd.DataFrame):
+        """
+        Args:
+            bar_index: Index of the higher-timeframe bars (bar start times)
+            minutes: 1-minute bars covering the same period
+        """
+        bar_times = bar_index.to_numpy().astype("datetime64[s]").astype(np.int64)
+        minute_times = minutes.index.to_numpy().astype("datetime64[s]").astype(np.int64)
+        bar_seconds = _bar_seconds(bar_times)
+
+        self.starts = np.searchsorted(minute_times, bar_times, side="left").astype(np.int32)
+        # A bar ends at the next bar or after one bar period, whichever is first (gaps)
+        next_starts = np.append(self.starts[1:], len(minute_times))
+        period_ends = np.searchsorted(minute_times, bar_times + bar_seconds, side="left")
+        self.ends = np.minimum(next_starts, period_ends).astype(np.int32)
+        self.open = minutes["open"].to_numpy(dtype=np.float64)
+        self.high = minutes["high"].to_numpy(dtype=np.float64)
+        self.low = minutes["low"].to_numpy(dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def has_minutes(self, bar: int) -> bool:
+        """True if minute data exists for the bar"""
+        return 0 <= bar < len(self.starts) and self.starts[bar] < self.ends[bar]
+
+    def first_exit(self, bar: int, is_long: bool, sl: Optional[float], tp: Optional[float]) -> Optional[Tuple[str, float]]:
+        """
+        First stop or target touched inside a bar.
+
+        If both are touched in the same minute, the level closer to that minute's
+        open is taken (as in StrategyAnalyzer.simulate_trade). A minute that opens
+        beyond a level fills at its open (gap through the stop or target).
+
+        Args:
+            bar: Higher-timeframe bar number
+            is_long: Position direction
+            sl: Stop level (None = no stop)
+            tp: Target level (None = no target)
+
+        Returns:
+            ("sl" | "tp", fill price), or None if neither level was touched or the
+            bar has no minute data
+        """
+        lo, hi = self.starts[bar], self.ends[bar]
+        if lo >= hi or (sl is None and tp is None):
+            return None
+        highs, lows = self.high[lo:hi], self.low[lo:hi]
+        none = np.zeros(hi - lo, dtype=bool)
+        if is_long:
+            sl_hit = lows <= sl if sl is not None else none
+            tp_hit = highs >= tp if tp is not None else none
+        else:
+            sl_hit = highs >= sl if sl is not None else none
+            tp_hit = lows <= tp if tp is not None else none
+        hits = sl_hit | tp_hit
+        if not hits.any():
+            return None
+        k = int(np.argmax(hits))
+        minute_open = self.open[lo + k]
+        if sl_hit[k] and tp_hit[k]:
+            kind = "tp" if abs(tp - minute_open) < abs(sl - minute_open) else "sl"
+        else:
+            kind = "sl" if sl_hit[k] else "tp"
+        level = sl if kind == "sl" else tp
+        # Gap through the level: the minute opened beyond it
+        if kind == "sl":
+            gapped = minute_open < level if is_long else minute_open > level
+        else:
+            gapped = minute_open > level if is_long else minute_open < level
+        return kind, float(minute_open if gapped else level)
+
+
+class BarStore:
+    """Directory of cached bar datasets stored as NumPy columns"""
+
+    def __init__(self, root: str = DEFAULT_BAR_CACHE):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def dataset_key(ticker: str, start_date: str, end_date: str, timeframe: str = "1", timespan: str = "hour") -> str:
+        """Directory-safe key of a fetched dataset"""
+        raw = f"{ticker}_{start_date}_{end_date}_{timeframe}{timespan}"
+        return re.sub(r"[^A-Za-z0-9_.-]", "-", raw)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.path(key), "meta.json"))
+
+    def save(self, key: str, df: pd.DataFrame, **meta) -> None:
+        """
+        Store a bar DataFrame (DatetimeIndex + numeric columns).
+
+        The dataset is written to a temporary directory and renamed into place,
+        so concurrent readers never see a partial dataset.
+        """
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            index = df.index
+            tz = getattr(index, "tz", None)
+            np.save(os.path.join(tmp_dir, "datetime.npy"), (index.tz_convert(None) if tz is not None else index).to_numpy())
+            for column in df.columns:
+                np.save(os.path.join(tmp_dir, f"{column}.npy"), df[column].to_numpy())
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({
+                    "columns": [str(c) for c in df.columns],
+                    "rows": len(df),
+                    "tz": str(tz) if tz is not None else None,
+                    "created": datetime.now().isoformat(),
+                    **meta,
+                }, f, indent=2)
+            target = self.path(key)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(tmp_dir, target)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def meta(self, key: str) -> dict:
+        with open(os.path.join(self.path(key), "meta.json")) as f:
+            return json.load(f)
+
+    def load(self, key: str, mmap: bool = True) -> pd.DataFrame:
+        """
+        Load a dataset as a DataFrame.
+
+        Args:
+            key: Dataset key
+            mmap: Memory-map the column files (read-only, nothing is copied until touched)
+        """
+        directory = self.path(key)
+        meta = self.meta(key)
+        mode = "r" if mmap else None
+        index = pd.DatetimeIndex(np.load(os.path.join(directory, "datetime.npy"), mmap_mode=mode), name="datetime")
+        if meta.get("tz"):
+            index = index.tz_localize("UTC").tz_convert(meta["tz"])
+        columns = {c: np.load(os.path.join(directory, f"{c}.npy"), mmap_mode=mode) for c in meta["columns"]}
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def columns(self, key: str, mmap: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Raw column arrays of a dataset, "datetime" (UTC datetime64) included.
+
+        Skips building a DataFrame; bt_extensions.NumpyData accepts the result as
+        its dataname.
+        """
+        directory = self.path(key)
+        mode = "r" if mmap else None
+        names = ["datetime", *self.meta(key)["columns"]]
+        return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in names}
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], pd.DataFrame], cache: bool = True) -> pd.DataFrame:
+        """
+        Cached dataset, or fetch() it and store the result.
+
+        Args:
+            key: Dataset key
+            fetch: Zero-argument callable returning the bars
+            cache: Store freshly fetched bars (pass False for periods that are still open)
+        """
+        if key in self:
+            return self.load(key)
+        df = fetch()
+        if cache:
+            self.save(key, df)
+        return df
+
+    def resampled(self, key: str, minutes: int, session: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        A cached dataset resampled to `minutes`-minute bars (derived once, then cached).
+
+        Args:
+            key: Key of the source dataset (normally 1-minute bars)
+            minutes: Target bar length in minutes
+            session: Session spec anchoring the buckets (see resample_bars)
+        """
+        derived_key = f"{key}@{minutes}m"
+        if session is not None:
+            derived_key += "-" + re.sub(r"[^A-Za-z0-9]", "", f"{session['tz']}{session['open']}")
+        return self.get_or_fetch(
+            derived_key,
+            lambda: resample_bars(self.load(key), minutes, session)
+        )
+
+    def remove(self, key: str) -> None:
+        shutil.rmtree(self.path(key), ignore_errors=True)
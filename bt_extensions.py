@@ -0,0 +1,398 @@
+"""
+Backtrader extensions used by backtest_runner
+
+- FusedMetricsAnalyzer: one analyzer that accumulates every statistic
+  BacktestRunner._extract_metrics reports (equity, drawdown, daily-return Sharpe,
+  trade P&L stats, streaks, SQN inputs) with running sums only. It is attached
+  instead of the seven stock analyzers when the runner uses the "sweep" profile.
+- TradePnLAnalyzer: net P&L of every closed trade, in closing order, as the
+  input of a monte_carlo run.
+- IntrabarBroker: BackBroker that fills market orders carrying an
+  `intrabar_price` at that price on the bar they were created on. The strategy
+  tags its exits this way when intrabar execution resolves a stop or target
+  inside the bar (see bar_store.IntrabarIndex).
+- NumpyData: data feed over NumPy columns (a DataFrame, or the memory-mapped
+  columns of a BarStore dataset). The index is converted to backtrader float
+  datetimes once and preload() fills each line with one bulk copy, instead of
+  PandasData's per-row Python loop.
+- ResourceAnalyzer: resource_meter block (wall/CPU time, peak RSS, bars/sec)
+  of one run, measured in the process that runs it, so optstrategy runs in
+  worker processes report their own resources.
+- QuoteData: NumpyData with bid/ask lines, for datasets fetched with quotes
+  (see bar_store.attach_quotes); the strategy's spread filter reads them.
+- EarlyAbortAnalyzer: sweep-mode pruning. Stops the run through
+  cerebro.runstop() as soon as its drawdown or minimum-trades rule fires; the
+  other analyzers then report the bars run so far.
+"""
+
+import math
+from array import array
+from typing import Dict, Mapping
+
+import backtrader as bt
+import numpy as np
+
+from bar_store import QUOTE_COLUMNS
+from calendar_index import datetime64_to_bt_num
+from resource_meter import ResourceMeter
+
+# Price/volume lines a feed fills from same-named columns (datetime comes from the index)
+_FEED_COLUMNS = ("open", "high", "low", "close", "volume", "openinterest", *QUOTE_COLUMNS)
+
+
+class FusedMetricsAnalyzer(bt.Analyzer):
+    """
+    Single-pass replacement for SharpeRatio, DrawDown, Returns, TradeAnalyzer and SQN.
+
+    Memory is O(1) per bar: daily returns and trade P&L are folded into Welford
+    accumulators instead of being stored. The numbers match the stock analyzers
+    as configured by BacktestRunner (daily Sharpe, annualized with 252 days and a
+    1% risk-free rate; population standard deviations). VWR is not computed.
+    """
+
+    params = (
+        ('riskfreerate', 0.01),
+        ('factor', 252),  # Trading days per year for Sharpe annualization
+    )
+
+    def start(self):
+        self._value_start = self.strategy.broker.getvalue()
+        self._value = self._value_start
+        self._prev_value = self._value_start
+        self._value_end = self._value_start
+        self._peak = float('-inf')
+        self._max_drawdown = 0.0
+        self._max_moneydown = 0.0
+
+        # Daily returns (Welford)
+        self._day = None
+        self._day_start_value = self._value_start
+        self._days = 0
+        self._ret_n = 0
+        self._ret_mean = 0.0
+        self._ret_m2 = 0.0
+
+        # Trades
+        self._opened = 0
+        self._closed = 0
+        self._won = 0
+        self._lost = 0
+        self._pnl_total = 0.0
+        self._won_total = 0.0
+        self._won_max = 0.0
+        self._lost_total = 0.0
+        self._lost_max = 0.0
+        self._bars_total = 0
+        self._streak = {'won': 0, 'lost': 0}
+        self._streak_longest = {'won': 0, 'lost': 0}
+        self._pnl_mean = 0.0
+        self._pnl_m2 = 0.0
+
+    def notify_fund(self, cash, value, fundvalue, shares):
+        self._value = value
+        self._peak = max(self._peak, value)
+
+    def notify_trade(self, trade):
+        if trade.justopened:
+            self._opened += 1
+            return
+        if trade.status != trade.Closed:
+            return
+
+        pnl = trade.pnlcomm
+        won = pnl >= 0.0
+        self._closed += 1
+        self._pnl_total += pnl
+        self._bars_total += trade.barlen
+
+        if won:
+            self._won += 1
+            self._won_total += pnl
+            self._won_max = max(self._won_max, pnl)
+        else:
+            self._lost += 1
+            self._lost_total += pnl
+            self._lost_max = min(self._lost_max, pnl)
+
+        for name, hit in (('won', won), ('lost', not won)):
+            self._streak[name] = self._streak[name] + 1 if hit else 0
+            self._streak_longest[name] = max(self._streak_longest[name], self._streak[name])
+
+        # SQN inputs
+        delta = pnl - self._pnl_mean
+        self._pnl_mean += delta / self._closed
+        self._pnl_m2 += delta * (pnl - self._pnl_mean)
+
+    def _add_daily_return(self, ret: float) -> None:
+        self._ret_n += 1
+        delta = ret - self._ret_mean
+        self._ret_mean += delta / self._ret_n
+        self._ret_m2 += delta * (ret - self._ret_mean)
+
+    def next(self):
+        day = self.data.datetime.date(0)
+        if day != self._day:
+            if self._day is not None:
+                self._add_daily_return(self._prev_value / self._day_start_value - 1.0)
+                self._day_start_value = self._prev_value
+            self._day = day
+            self._days += 1
+
+        moneydown = self._peak - self._value
+        self._max_moneydown = max(self._max_moneydown, moneydown)
+        self._max_drawdown = max(self._max_drawdown, 100.0 * moneydown / self._peak)
+        self._prev_value = self._value
+
+    def stop(self):
+        if self._day is not None:
+            self._add_daily_return(self._prev_value / self._day_start_value - 1.0)
+        self._value_end = self.strategy.broker.getvalue()
+
+    def _sharpe_ratio(self):
+        if not self._ret_n:
+            return None
+        rate = pow(1.0 + self.p.riskfreerate, 1.0 / self.p.factor) - 1.0
+        std = math.sqrt(self._ret_m2 / self._ret_n)
+        if std == 0:
+            return None
+        return math.sqrt(self.p.factor) * (self._ret_mean - rate) / std
+
+    def _sqn(self):
+        if self._closed <= 1:
+            return 0
+        std = math.sqrt(self._pnl_m2 / self._closed)
+        if std == 0:
+            return None
+        return math.sqrt(self._closed) * self._pnl_mean / std
+
+    def get_analysis(self):
+        # Final value captured in stop(): with cerebro optreturn the analyzer outlives its broker
+        value_end = self._value_end
+        ratio = value_end / self._value_start if self._value_start else 0.0
+        rtot = math.log(ratio) if ratio > 0 else float('-inf')
+        closed = self._closed
+
+        return {
+            'value_start': self._value_start,
+            'value_end': value_end,
+            'sharpe_ratio': self._sharpe_ratio(),
+            'max_drawdown_pct': self._max_drawdown,
+            'max_drawdown_money': self._max_moneydown,
+            'avg_daily_return': rtot / self._days if self._days else 0.0,
+            'total_compounded_return': rtot,
+            'sqn': self._sqn(),
+            'vwr': None,
+            'total_trades': self._opened,
+            'won_trades': self._won,
+            'lost_trades': self._lost,
+            'pnl_net_total': self._pnl_total,
+            'pnl_net_avg': self._pnl_total / closed if closed else 0.0,
+            'won_pnl_total': self._won_total,
+            'won_pnl_avg': self._won_total / (self._won or 1.0),
+            'won_pnl_max': self._won_max,
+            'lost_pnl_total': self._lost_total,
+            'lost_pnl_avg': self._lost_total / (self._lost or 1.0),
+            'lost_pnl_max': self._lost_max,
+            'avg_trade_bars': self._bars_total / closed if closed else 0.0,
+            'win_streak': self._streak_longest['won'],
+            'loss_streak': self._streak_longest['lost'],
+        }
+
+
+class TradePnLAnalyzer(bt.Analyzer):
+    """Net P&L (after commission) of each closed trade, 8 bytes per trade"""
+
+    def start(self):
+        self._pnl = array('d')
+
+    def notify_trade(self, trade):
+        if trade.status == trade.Closed:
+            self._pnl.append(trade.pnlcomm)
+
+    def get_analysis(self):
+        return self._pnl
+
+
+class ResourceAnalyzer(bt.Analyzer):
+    """Resources of one run, from strategy start to stop (see resource_meter)"""
+
+    params = (
+        ('trace_allocations', False),
+    )
+
+    def start(self):
+        self._meter = ResourceMeter(self.p.trace_allocations).start()
+        self._resources = None
+
+    def stop(self):
+        self._resources = self._meter.stop().result(bars=self.data.buflen())
+        self._meter = None  # Only the result travels back with optreturn
+
+    def get_analysis(self):
+        return self._resources
+
+
+class EarlyAbortAnalyzer(bt.Analyzer):
+    """
+    Early-abort rules checked on every bar (the Cerebro side of sim_kernel's ABORT_RULES).
+
+    max_drawdown_pct stops the run once the account value is more than that many
+    percent below its peak (the drawdown FusedMetricsAnalyzer reports);
+    min_trades stops it at bar min_trades_bar if fewer trades were opened by then.
+    The strategy's and analyzers' stop() still run, so the run's metrics cover
+    the bars processed. get_analysis() is the rule that fired (rule, bar, time,
+    progress), or None. The P&L-bound rule needs the remaining signals known in
+    advance and exists on the StrategyAnalyzer side only.
+    """
+
+    params = (
+        ('max_drawdown_pct', None),
+        ('min_trades', 0),
+        ('min_trades_bar', 0),
+    )
+
+    def start(self):
+        # runstop() leaves cerebro's stop flag set: reset it for the next optstrategy run in this process
+        self.strategy.env._event_stop = False
+        self._peak = self.strategy.broker.getvalue()
+        self._value = self._peak
+        self._opened = 0
+        self._aborted = None
+
+    def notify_fund(self, cash, value, fundvalue, shares):
+        self._value = value
+        self._peak = max(self._peak, value)
+
+    def notify_trade(self, trade):
+        if trade.justopened:
+            self._opened += 1
+
+    def prenext(self):
+        self.next()
+
+    def next(self):
+        if self._aborted is not None:
+            return
+        bar = len(self.data) - 1
+        rule = None
+        if self.p.max_drawdown_pct is not None and 100.0 * (self._peak - self._value) / self._peak > self.p.max_drawdown_pct:
+            rule = 'max_drawdown'
+        elif self.p.min_trades and bar >= self.p.min_trades_bar and self._opened < self.p.min_trades:
+            rule = 'min_trades'
+        if rule is not None:
+            self._aborted = {
+                'rule': rule,
+                'bar': bar,
+                'time': self.data.datetime.datetime(0).isoformat(),
+                'progress': round(bar / self.data.buflen(), 4),
+            }
+            self.strategy.env.runstop()
+
+    def get_analysis(self):
+        return self._aborted
+
+
+class IntrabarBroker(bt.brokers.BackBroker):
+    """
+    BackBroker honouring intrabar fill prices.
+
+    A market order submitted with intrabar_price=<price> (e.g.
+    strategy.close(intrabar_price=sl)) executes at that price, dated to the bar
+    that created it, instead of at the next bar's open. All other orders behave
+    exactly as in BackBroker.
+    """
+
+    def _try_exec_market(self, order, popen, phigh, plow):
+        price = order.info.get('intrabar_price')
+        if price is None:
+            return super()._try_exec_market(order, popen, phigh, plow)
+        self._execute(order, ago=0, price=price, dtcoc=order.created.dt)
+
+
+def bar_arrays(data) -> Dict[str, np.ndarray]:
+    """
+    Line columns of a bar dataset as float64 arrays, datetime as backtrader float days.
+
+    Args:
+        data: DataFrame with a DatetimeIndex (naive = UTC, like PandasData), or a
+            mapping of column arrays with a datetime64 "datetime" column (BarStore.columns)
+
+    Returns:
+        Mapping of line name -> array; float64 columns (memory-mapped ones included)
+        are not copied
+    """
+    if isinstance(data, Mapping):
+        stamps = data["datetime"]
+        columns = {str(name).lower(): values for name, values in data.items() if name != "datetime"}
+    else:
+        index = data.index
+        if getattr(index, "tz", None) is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        stamps = index.to_numpy()
+        columns = {str(name).lower(): data[name].to_numpy() for name in data.columns}
+    arrays = {"datetime": datetime64_to_bt_num(stamps)}
+    for name in _FEED_COLUMNS:
+        if name in columns:
+            arrays[name] = np.asarray(columns[name], dtype=np.float64)
+    return arrays
+
+
+class NumpyData(bt.feed.DataBase):
+    """
+    Data feed over NumPy columns, preloaded with one bulk copy per line.
+
+    dataname is a DataFrame or a column mapping (see bar_arrays); missing
+    columns load as NaN, like PandasData. Pass the arrays of an earlier
+    bar_arrays(dataname) call to skip the datetime conversion when many feeds
+    share the same bars (one per configuration of a batch).
+    """
+
+    params = (
+        ('arrays', None),  # Precomputed bar_arrays(dataname)
+    )
+
+    def start(self):
+        super().start()
+        self._arrays = self.p.arrays if self.p.arrays is not None else bar_arrays(self.p.dataname)
+        self._row = -1
+
+    def _load(self):
+        self._row += 1
+        if self._row >= len(self._arrays["datetime"]):
+            return False
+        for name in self.getlinealiases():
+            values = self._arrays.get(name)
+            if values is not None:
+                getattr(self.lines, name)[0] = float(values[self._row])
+        return True
+
+    def preload(self):
+        # Filters and input timezones work bar by bar: keep the generic path for them
+        if self._filters or self._ffilters or self._tzinput is not None:
+            return super().preload()
+
+        # Bars are in time order, so fromdate/todate select one contiguous slice
+        stamps = self._arrays["datetime"]
+        start = int(np.searchsorted(stamps, self.fromdate, side="left"))
+        stop = int(np.searchsorted(stamps, self.todate, side="right"))
+        for name in self.getlinealiases():
+            values = self._arrays.get(name)
+            if values is None:
+                values = np.full(len(stamps), np.nan)
+            line = getattr(self.lines, name)
+            line.array = array('d')
+            line.array.frombytes(memoryview(np.ascontiguousarray(values[start:stop], dtype=np.float64)).cast("B"))
+        self._row = len(stamps)
+        self._last()
+        self.home()
+
+
+class QuoteData(NumpyData):
+    """NumpyData with the closing bid/ask of each bar as extra lines"""
+
+    lines = QUOTE_COLUMNS
+
+
+def has_quotes(arrays: Mapping) -> bool:
+    """True if bar arrays (or DataFrame columns) include bid and ask"""
+    return all(name in arrays for name in QUOTE_COLUMNS)
@@ -0,0 +1,158 @@
+"""
+Per-dataset calendar index
+
+The hour-of-day filter used to be re-derived from a datetime for every bar of
+every configuration, both in GoldCandleKenStrategy.next() and in
+StrategyAnalyzer.backtest_strategy(). CalendarIndex computes the calendar fields
+of a dataset once as small integer arrays. A trading-hours window then becomes
+a 24-entry lookup table indexed by the hour array, so sweeping 7-17 against
+8-16 only builds another mask.
+
+Fields (one entry per bar):
+    hour       int8   hour of day in the index timezone (naive = UTC, as the strategy sees it)
+    weekday    int8   0 = Monday
+    session    int16  trading-session number, 0 = first session in the data
+    day_start  bool   first bar of a session
+    gap        bool   bar follows a gap longer than the bar period (missing bars,
+                      weekends, session breaks)
+
+Usage:
+    calendar = CalendarIndex(df.index, session=SESSIONS["fx"])
+    allowed = calendar.hour_mask(7, 17)       # bool per bar
+    allowed = calendar.hour_mask(20, 5)       # windows may cross midnight
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+pd = LazyModule("pandas")
+
+
+def bt_num2datetime64(values: np.ndarray) -> np.ndarray:
+    """
+    Backtrader float datetimes (days since 0001-01-01, plus one) as datetime64[us].
+
+    Vectorized equivalent of backtrader.num2date for naive datetimes. The float
+    carries only ~10us of precision at today's dates, so times are rounded to the
+    millisecond (otherwise 00:15 can come back as 00:14:59.999997).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    days = np.floor(values)
+    millis = np.round((values - days) * 86_400_000).astype(np.int64)
+    return (
+        np.datetime64("0001-01-01", "us")
+        + (days.astype(np.int64) - 1).astype("timedelta64[D]")
+        + millis.astype("timedelta64[ms]")
+    )
+
+
+def datetime64_to_bt_num(values: np.ndarray) -> np.ndarray:
+    """
+    Naive (UTC) datetimes as backtrader float datetimes, bit-identical to backtrader.date2num.
+
+    date2num adds the hour, minute, second and microsecond fractions to the day
+    ordinal with math.fsum (one rounding). Here the fraction of each distinct
+    time of day is computed once as an exact hi + lo pair, and the day is added
+    with an error-free two-sum before the single final rounding.
+    """
+    micros = (np.asarray(values, dtype="datetime64[us]") - np.datetime64("0001-01-01", "us")).astype(np.int64)
+    days, micros = np.divmod(micros, 86_400_000_000)
+    times, inverse = np.unique(micros, return_inverse=True)
+    hi = np.empty(len(times))
+    lo = np.empty(len(times))
+    for i, time in enumerate(times.tolist()):
+        seconds, microsecond = divmod(time, 1_000_000)
+        minutes, second = divmod(seconds, 60)
+        hour, minute = divmod(minutes, 60)
+        terms = [hour / 24.0, minute / 1440.0, second / 86400.0, microsecond / 86_400_000_000.0]
+        hi[i] = math.fsum(terms)
+        lo[i] = math.fsum(terms + [-hi[i]])
+    base = (days + 1).astype(np.float64)
+    hi, lo = hi[inverse.ravel()], lo[inverse.ravel()]
+    total = base + hi
+    error = (base - (total - (total - base))) + (hi - (total - base))
+    return total + (error + lo)
+
+
+def hour_window(start_hour: int, end_hour: int) -> np.ndarray:
+    """
+    Hours of day inside a trading window, as a 24-entry lookup table.
+
+    start_hour <= end_hour trades start_hour <= hour < end_hour; otherwise the
+    window crosses midnight and trades hour >= start_hour or hour < end_hour.
+    """
+    hours = np.arange(24)
+    if start_hour <= end_hour:
+        return (hours >= start_hour) & (hours < end_hour)
+    return (hours >= start_hour) | (hours < end_hour)
+
+
+class CalendarIndex:
+    """Calendar fields of one dataset, computed once"""
+
+    def __init__(self, index, session: Optional[Dict] = None):
+        """
+        Args:
+            index: DatetimeIndex or datetime64 array of the bars (naive = UTC)
+            session: Session spec ({"tz", "open"}, see symbols.SESSIONS) defining
+                session numbers and day starts; default: UTC calendar days
+        """
+        tz = getattr(index, "tz", None)
+        if tz is not None:
+            wall = index.tz_localize(None).to_numpy()
+            utc = index.tz_convert("UTC").tz_localize(None).to_numpy()
+        else:
+            wall = utc = np.asarray(index, dtype="datetime64[ns]")
+        wall_minutes = wall.astype("datetime64[m]").astype(np.int64)
+
+        self.length = len(wall_minutes)
+        self.hour = (wall_minutes // 60 % 24).astype(np.int8)
+        self.weekday = ((wall_minutes // 1440 + 3) % 7).astype(np.int8)  # 1970-01-01 was a Thursday
+
+        if session is not None:
+            local = pd.DatetimeIndex(utc).tz_localize("UTC").tz_convert(session["tz"]).tz_localize(None)
+            hour, minute = session["open"].split(":")
+            session_minutes = local.to_numpy().astype("datetime64[m]").astype(np.int64)
+            session_minutes -= int(hour) * 60 + int(minute)
+        else:
+            session_minutes = utc.astype("datetime64[m]").astype(np.int64)
+        session_days = session_minutes // 1440
+        self.session = (session_days - (session_days[0] if self.length else 0)).astype(np.int16)
+        self.day_start = np.ones(self.length, dtype=bool)
+        self.day_start[1:] = session_days[1:] != session_days[:-1]
+
+        # Bar period: the most common spacing between consecutive bars
+        utc_seconds = utc.astype("datetime64[s]").astype(np.int64)
+        deltas = np.diff(utc_seconds)
+        if len(deltas):
+            spacings, counts = np.unique(deltas[deltas > 0], return_counts=True)
+            self.bar_seconds = int(spacings[np.argmax(counts)]) if len(spacings) else 0
+        else:
+            self.bar_seconds = 0
+        self.gap = np.zeros(self.length, dtype=bool)
+        self.gap[1:] = deltas > self.bar_seconds
+
+        self._hour_masks: Dict[Tuple[int, int], np.ndarray] = {}
+
+    @classmethod
+    def from_bt_line(cls, values: np.ndarray, session: Optional[Dict] = None) -> 'CalendarIndex':
+        """Calendar of a preloaded backtrader datetime line (its .array)"""
+        return cls(bt_num2datetime64(values), session=session)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def hour_mask(self, start_hour: int, end_hour: int) -> np.ndarray:
+        """Bars inside the trading window (cached per window; treat as read-only)"""
+        key = (start_hour, end_hour)
+        mask = self._hour_masks.get(key)
+        if mask is None:
+            mask = hour_window(start_hour, end_hour)[self.hour]
+            self._hour_masks[key] = mask
+        return mask
@@ -0,0 +1,478 @@
+"""
+SQLite job queue for sweeps spread over several processes and machines
+
+A coordinator enqueues one job per (configuration, period). Any number of workers
+lease jobs, run them, and write the metrics back into the same database. Both
+CLIs drive it (--queue-db; see add_queue_arguments): backtest_runner jobs are
+backtest_worker job dicts, strategy_optimizer jobs are backtest_strategy cells.
+
+Leases:
+    A worker leases the oldest pending job for lease_seconds and renews the
+    lease from a heartbeat thread while the job runs. A worker that dies stops
+    renewing. Once its lease has expired, the next lease() call puts the job
+    back to pending, or marks it failed after max_attempts leases. Every lease
+    carries a random token. A worker whose lease was taken over can no longer
+    complete, fail or renew the job.
+
+Jobs are keyed by a hash of their payload, so enqueueing the same grid twice
+adds nothing and an interrupted coordinator can simply be rerun. Leasing runs in
+a BEGIN IMMEDIATE transaction, so two workers never get the same job.
+
+The database uses WAL journaling: readers (status, wait) never block the
+writers. WAL's shared-memory index only works between processes on one host.
+For workers on several machines sharing the file over NFS/SMB, open the queue
+with journal_mode="delete" (--queue-journal delete), which uses the filesystem's
+locks. Lease times are wall-clock times, so machine clocks must roughly agree
+(well within lease_seconds).
+
+API keys are not stored in jobs; each worker uses its own.
+
+Usage:
+    python backtest_runner.py --queue-db sweep.db --enqueue --optimize-grid grid.json --periods periods.json
+    python backtest_runner.py --queue-db sweep.db --queue-worker &   # one per core / machine
+    python backtest_runner.py --queue-db sweep.db --queue-wait --output results.json
+    python job_queue.py --db sweep.db --status
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from results_store import _json_default, param_hash
+
+
+DEFAULT_QUEUE = "default"
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+JOURNAL_MODES = ("wal", "delete")
+
+STATUSES = ("pending", "leased", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue          TEXT NOT NULL,
+    job_key        TEXT NOT NULL,
+    payload_json   TEXT NOT NULL,
+    status         TEXT NOT NULL DEFAULT 'pending',
+    attempts       INTEGER NOT NULL DEFAULT 0,
+    worker         TEXT,
+    lease_token    TEXT,
+    lease_expires  REAL,
+    created_at     REAL NOT NULL,
+    finished_at    REAL,
+    result_json    TEXT,
+    error          TEXT,
+    UNIQUE (queue, job_key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (queue, status, job_id);
+"""
+
+
+def worker_name() -> str:
+    """host:pid of this process, stored with its leases"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Lease:
+    """A job leased by one worker"""
+
+    def __init__(self, job_id: int, token: str, payload: Dict, attempts: int):
+        self.job_id = job_id
+        self.token = token
+        self.payload = payload
+        self.attempts = attempts
+        self.lost = False  # Set by the heartbeat once another worker took the job over
+
+
+class JobQueue:
+    """Named job queue in a SQLite database shared by a coordinator and its workers"""
+
+    def __init__(
+        self,
+        path: str,
+        queue: str = DEFAULT_QUEUE,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        journal_mode: str = "wal"
+    ):
+        """
+        Args:
+            path: SQLite file (created if missing)
+            queue: Queue name; one database can hold several sweeps
+            lease_seconds: Lease length; heartbeats renew it every third of that
+            max_attempts: Leases per job before it is marked failed
+            journal_mode: "wal" (one host) or "delete" (workers on several hosts)
+        """
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal mode '{journal_mode}'. Choose from {JOURNAL_MODES}")
+        self.path = path
+        self.queue = queue
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.journal_mode = journal_mode
+        self.conn = self._connect()
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """New connection (one per thread); transactions are opened explicitly"""
+        conn = sqlite3.connect(self.path, timeout=60.0, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def enqueue(self, payloads: Iterable[Dict]) -> Tuple[int, int]:
+        """
+        Add jobs; payloads already in the queue are left as they are.
+
+        Returns:
+            (jobs added, jobs already present)
+        """
+        now = time.time()
+        added = existing = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for payload in payloads:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO jobs (queue, job_key, payload_json, created_at) VALUES (?, ?, ?, ?)",
+                    (self.queue, param_hash(payload), json.dumps(payload, sort_keys=True, default=_json_default), now)
+                )
+                if cursor.rowcount:
+                    added += 1
+                else:
+                    existing += 1
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added, existing
+
+    def _requeue_expired(self, now: float) -> int:
+        """Return expired leases to pending (or failed after max_attempts); inside a transaction"""
+        self.conn.execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, lease_token = NULL, "
+            "error = COALESCE(error, 'lease expired ' || attempts || ' times') "
+            "WHERE queue = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, self.queue, now, self.max_attempts)
+        )
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'pending', worker = NULL, lease_token = NULL, lease_expires = NULL "
+            "WHERE queue = ? AND status = 'leased' AND lease_expires < ?",
+            (self.queue, now)
+        )
+        if cursor.rowcount:
+            logging.warning(f"⏰ Re-queued {cursor.rowcount} job(s) with expired leases")
+        return cursor.rowcount
+
+    def lease(self, worker: Optional[str] = None) -> Optional[Lease]:
+        """Lease the oldest pending job, or None if there is none"""
+        now = time.time()
+        token = secrets.token_hex(8)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._requeue_expired(now)
+            row = self.conn.execute(
+                "SELECT job_id, payload_json, attempts FROM jobs WHERE queue = ? AND status = 'pending' "
+                "ORDER BY job_id LIMIT 1",
+                (self.queue,)
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'leased', worker = ?, lease_token = ?, lease_expires = ?, "
+                    "attempts = attempts + 1 WHERE job_id = ?",
+                    (worker or worker_name(), token, now + self.lease_seconds, row["job_id"])
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return Lease(row["job_id"], token, json.loads(row["payload_json"]), row["attempts"] + 1)
+
+    def heartbeat(self, lease: Lease, conn: Optional[sqlite3.Connection] = None) -> bool:
+        """Renew a lease; False if it was lost (expired and taken over)"""
+        cursor = (conn or self.conn).execute(
+            "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND lease_token = ? AND status = 'leased'",
+            (time.time() + self.lease_seconds, lease.job_id, lease.token)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, lease: Lease, result: Dict) -> bool:
+        """Store a leased job's result; False if the lease was lost (the result is dropped)"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'done', result_json = ?, error = NULL, finished_at = ?, lease_token = NULL "
+            "WHERE job_id = ? AND lease_token = ? AND status = 'leased'",
+            (json.dumps(result, default=_json_default), time.time(), lease.job_id, lease.token)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        """Give a leased job back after an error: pending again, or failed after max_attempts"""
+        status = "failed" if lease.attempts >= self.max_attempts else "pending"
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, worker = NULL, lease_token = NULL, lease_expires = NULL, "
+            "finished_at = CASE WHEN ? = 'failed' THEN ? END "
+            "WHERE job_id = ? AND lease_token = ? AND status = 'leased'",
+            (status, error, status, time.time(), lease.job_id, lease.token)
+        )
+        return cursor.rowcount == 1
+
+    def retry_failed(self) -> int:
+        """Put failed jobs back to pending with a fresh attempt count"""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, finished_at = NULL WHERE queue = ? AND status = 'failed'",
+            (self.queue,)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs per status"""
+        counts = dict.fromkeys(STATUSES, 0)
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs WHERE queue = ? GROUP BY status", (self.queue,))
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def results(self) -> List[Dict]:
+        """Finished jobs in enqueue order: payload, status, result (done) or error (failed)"""
+        rows = self.conn.execute(
+            "SELECT job_id, payload_json, status, attempts, worker, result_json, error FROM jobs "
+            "WHERE queue = ? AND status IN ('done', 'failed') ORDER BY job_id",
+            (self.queue,)
+        )
+        return [
+            {
+                "job_id": row["job_id"],
+                "payload": json.loads(row["payload_json"]),
+                "status": row["status"],
+                "attempts": row["attempts"],
+                "worker": row["worker"],
+                "result": json.loads(row["result_json"]) if row["result_json"] is not None else None,
+                "error": row["error"],
+            }
+            for row in rows
+        ]
+
+    def wait(self, poll_seconds: float = 5.0, timeout: Optional[float] = None) -> Dict[str, int]:
+        """
+        Block until no job is pending or leased (expired leases are re-queued meanwhile).
+
+        Returns:
+            Final counts
+        """
+        deadline = time.time() + timeout if timeout else None
+        last = None
+        while True:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(time.time())
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            counts = self.counts()
+            if counts != last:
+                logging.info(f"📬 Queue '{self.queue}': {format_counts(counts)}")
+                last = counts
+            if not counts["pending"] and not counts["leased"]:
+                return counts
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(f"Queue '{self.queue}' not drained after {timeout:.0f}s: {format_counts(counts)}")
+            time.sleep(poll_seconds)
+
+
+class _Heartbeat(threading.Thread):
+    """Renews a lease every third of the lease length until stopped"""
+
+    def __init__(self, queue: JobQueue, lease: Lease):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.lease = lease
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        conn = self.queue._connect()
+        try:
+            while not self._stop_event.wait(self.queue.lease_seconds / 3):
+                try:
+                    alive = self.queue.heartbeat(self.lease, conn)
+                except sqlite3.Error as e:
+                    logging.warning(f"💓 Heartbeat of job {self.lease.job_id} failed: {e}")
+                    continue
+                if not alive:
+                    self.lease.lost = True
+                    logging.warning(f"💔 Lease of job {self.lease.job_id} was lost; its result will be dropped")
+                    return
+        finally:
+            conn.close()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def run_worker(
+    queue: JobQueue,
+    handler: Callable[[Dict], Dict],
+    idle_timeout: float = 0.0,
+    poll_seconds: float = 2.0,
+    max_jobs: Optional[int] = None
+) -> int:
+    """
+    Lease and run jobs until the queue is drained.
+
+    The worker exits when nothing is pending and no other worker holds a lease (a
+    held lease may still expire and come back), after waiting up to idle_timeout
+    seconds for new jobs. A handler exception fails the job (it is retried until
+    max_attempts).
+
+    Args:
+        queue: Queue to work on
+        handler: Job payload -> JSON-serializable result
+        idle_timeout: Seconds to keep polling an empty queue
+        poll_seconds: Pause between polls while idle
+        max_jobs: Stop after this many jobs (None = no limit)
+
+    Returns:
+        Number of jobs completed by this worker
+    """
+    name = worker_name()
+    done = 0
+    idle_since = None
+    logging.info(f"🛠️  Worker {name} on queue '{queue.queue}' ({queue.path})")
+    while max_jobs is None or done < max_jobs:
+        lease = queue.lease(name)
+        if lease is None:
+            counts = queue.counts()
+            idle_since = idle_since or time.time()
+            if not counts["leased"] and time.time() - idle_since >= idle_timeout:
+                break
+            time.sleep(poll_seconds)
+            continue
+        idle_since = None
+        heartbeat = _Heartbeat(queue, lease)
+        heartbeat.start()
+        try:
+            result = handler(lease.payload)
+        except Exception as e:
+            heartbeat.stop()
+            logging.exception(f"❌ Job {lease.job_id} failed (attempt {lease.attempts}/{queue.max_attempts})")
+            queue.fail(lease, f"{type(e).__name__}: {e}")
+            continue
+        heartbeat.stop()
+        if queue.complete(lease, result):
+            done += 1
+        else:
+            logging.warning(f"⚠️  Job {lease.job_id} finished after its lease was lost; result dropped")
+    logging.info(f"🛠️  Worker {name} done: {done} job(s), queue {format_counts(queue.counts())}")
+    return done
+
+
+def grid_combinations(grid: Dict) -> List[Dict]:
+    """Every combination of a grid of name -> list of values (a scalar is one value)"""
+    grid = {name: values if isinstance(values, (list, tuple)) else [values] for name, values in grid.items()}
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+def load_periods(value: Optional[str], start: Optional[str], end: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Periods of a sweep: a JSON list of [start, end] pairs (inline or a file), else (start, end).
+    """
+    if not value:
+        return [(start, end)]
+    if os.path.exists(value):
+        with open(value) as f:
+            periods = json.load(f)
+    else:
+        periods = json.loads(value)
+    return [(str(first), str(last)) for first, last in periods]
+
+
+def format_counts(counts: Dict[str, int]) -> str:
+    return ", ".join(f"{counts[status]} {status}" for status in STATUSES)
+
+
+def add_queue_arguments(parser: argparse.ArgumentParser) -> None:
+    """The --queue-* options shared by backtest_runner and strategy_optimizer"""
+    group = parser.add_argument_group("job queue (multi-process / multi-machine sweeps)")
+    group.add_argument("--queue-db", type=str, default=None, help="SQLite job queue shared by coordinator and workers")
+    group.add_argument("--queue-name", type=str, default=DEFAULT_QUEUE, help=f"Queue within --queue-db (default: {DEFAULT_QUEUE})")
+    role = group.add_mutually_exclusive_group()
+    role.add_argument("--enqueue", action="store_true", help="Coordinator: write this run's configurations x --periods as jobs, then exit")
+    role.add_argument("--queue-worker", action="store_true", help="Worker: lease and run jobs until the queue is drained")
+    role.add_argument("--queue-wait", action="store_true", help="Coordinator: wait for the queue to drain and report its results")
+    group.add_argument(
+        "--periods", type=str, default=None,
+        help='JSON list (or JSON file) of [start, end] periods to enqueue, e.g. \'[["2024-01-01", "2024-01-31"]]\' '
+             '(default: the start/end dates)'
+    )
+    group.add_argument(
+        "--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+        help=f"Lease length; a job whose worker stops heartbeating is re-queued after it (default: {DEFAULT_LEASE_SECONDS:g})"
+    )
+    group.add_argument(
+        "--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+        help=f"Leases per job before it is marked failed (default: {DEFAULT_MAX_ATTEMPTS})"
+    )
+    group.add_argument(
+        "--queue-idle-timeout", type=float, default=0.0,
+        help="Worker: seconds to keep polling an empty queue for new jobs (default: 0)"
+    )
+    group.add_argument(
+        "--queue-journal", choices=JOURNAL_MODES, default="wal",
+        help="SQLite journal: wal (workers on one host) or delete (workers on several hosts over a network filesystem)"
+    )
+
+
+def queue_from_args(args) -> JobQueue:
+    """JobQueue configured by add_queue_arguments options"""
+    return JobQueue(
+        args.queue_db, args.queue_name, lease_seconds=args.lease_seconds,
+        max_attempts=args.max_attempts, journal_mode=args.queue_journal
+    )
+
+
+def main():
+    """Inspect or maintain a job queue from the command line"""
+    parser = argparse.ArgumentParser(description="Inspect a sweep job queue")
+    parser.add_argument("--db", type=str, required=True, help="SQLite job queue file")
+    parser.add_argument("--queue", type=str, default=DEFAULT_QUEUE, help=f"Queue name (default: {DEFAULT_QUEUE})")
+    parser.add_argument("--status", action="store_true", help="Show job counts per status")
+    parser.add_argument("--failed", action="store_true", help="List failed jobs with their errors")
+    parser.add_argument("--retry-failed", action="store_true", help="Put failed jobs back to pending")
+    args = parser.parse_args()
+
+    with JobQueue(args.db, args.queue) as queue:
+        if args.retry_failed:
+            print(f"Re-queued {queue.retry_failed()} failed job(s)")
+        if args.failed:
+            for job in queue.results():
+                if job["status"] == "failed":
+                    print(f"{job['job_id']:<6} {job['attempts']} attempt(s)  {job['error']}  {json.dumps(job['payload'])[:120]}")
+        if args.status or not (args.failed or args.retry_failed):
+            print(f"Queue '{args.queue}' in {args.db}: {format_counts(queue.counts())}")
+
+
+if __name__ == "__main__":
+    main()
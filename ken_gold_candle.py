@@ -12,7 +12,7 @@ Key features:
 - Adaptive candle sizing: ATR-based OR percentile-based dynamic thresholds
 - Grid recovery (optional) with ATR-based spacing and lot multiplier
 - Trend filter via Moving Average
-- Time window and spread filter (spread filter stubbed; requires broker-specific data)
+- Time window and spread filter (spread filter needs bid/ask lines, e.g. bt_extensions.QuoteData)
 - Take Profit management and shared TP for grid baskets
 - Trailing individual stop-loss per position (optional)
 - Trailing equity stop: closes all positions if drawdown from peak exceeds threshold
@@ -57,23 +57,51 @@ Signal Invalidation Protection:
   * Prevents getting stuck in trades where market rejects the breakout
   * Critical for avoiding detection-execution gap losses
 
+State Snapshots (warm restarts):
+- STATE_FILE = None (default) - Path of a snapshot of the strategy's bookkeeping,
+  the last bars and the ATR/MA lines, rewritten atomically every bar (or only after
+  trades with STATE_SAVE_ON = "trade")
+  * At start an existing STATE_FILE is restored on the snapshot's bar: feed
+    strategy_state.warm_bars(snapshot) ahead of the live bars and the strategy
+    resumes with identical decisions instead of re-warming its indicators
+  * Needs cerebro runonce=False (live feeds always run that way)
+
 Account Optimization:
 - Optimized for $10,000 account with minimum lot size (0.01 lots)
-- Uses proper CONTRACT_SIZE = 100 for XAUUSD (1 lot = 100 oz)
+- Uses CONTRACT_SIZE = 100 for XAUUSD (1 lot = 100 oz); other instruments get their
+  contract, point and lot sizes from the symbols.py registry
 - Position size validation prevents over-leverage
 - Grid trading enabled with 85% max exposure allowing 2 positions (~79% actual)
 
 Notes:
 - Parameters are hardcoded per request since TradeLocker bots typically lack adjustable inputs.
 - Backtrader does not provide native account equity; we track portfolio value to simulate equity.
-- Spread filtering requires bid/ask; most feeds in Backtrader provide mid. A conservative stub is used.
+- Spread filtering requires bid/ask lines; feeds without them (mid prices only) pass every bar.
+  Datasets fetched with quotes (backtest_runner --quotes) are fed through QuoteData, and on
+  preloaded feeds the MAX_SPREAD_POINTS check is one precomputed mask per run.
 """
 
+import copy
 import logging
-from typing import List
+import os
+from typing import Dict, List, Optional
 
 import backtrader as bt
 
+from bar_store import quoted_spread, spread_ok_mask
+from calendar_index import CalendarIndex, hour_window
+from strategy_state import (
+    BAR_LINES,
+    SAVE_MODES,
+    STATE_ATTRIBUTES,
+    STATE_VERSION,
+    capture_window,
+    indicator_lines,
+    read_snapshot,
+    restore_window,
+    write_snapshot,
+)
+
 
 class GoldCandleKenStrategy(bt.Strategy):
     # Hardcoded defaults from provided template
@@ -83,6 +111,16 @@ class GoldCandleKenStrategy(bt.Strategy):
     MIN_LOT_SIZE = 0.03  # Broker's minimum lot size
     LOT_STEP = 0.03  # Broker's lot size increment
     
+    # --- Instrument Specification (BacktestRunner sets these from the symbols.py registry) ---
+    CONTRACT_SIZE = 100.0  # Units per 1.0 lot (XAUUSD: 1 lot = 100 oz)
+    POINT_SIZE = 0.01  # Price value of one point (XAUUSD: $0.01)
+    
+    # --- Intrabar Execution (set by BacktestRunner with --intrabar) ---
+    # bar_store.IntrabarIndex over the minute bars of the feed: single-trade TP/SL are
+    # resolved against the minutes inside each bar and filled at the touched level
+    # (needs bt_extensions.IntrabarBroker). None = check TP/SL against the bar close.
+    intrabar = None
+    
     # --- Adaptive Candle Size Settings ---
     USE_ATR_CALCULATION = True  # Dynamically set candle size based on ATR multipliers
     USE_PERCENTILE_CALCULATION = False  # Dynamically set candle size based on percentiles
@@ -174,6 +212,7 @@ class GoldCandleKenStrategy(bt.Strategy):
     USE_LIMIT_ENTRY = False  # Config L6: Disabled (immediate entries better)
 
     LIMIT_RETRACEMENT_PERCENT = 50.0
+    MAX_BARS_PENDING = 5  # Cancel a pending limit order after this many bars (signal likely expired)
 
     # Fix C: Momentum confirmation filters
     USE_MOMENTUM_FILTER = True   # Config HF9: Critical for quality (tested on/off, on required)
@@ -198,7 +237,56 @@ class GoldCandleKenStrategy(bt.Strategy):
     LOG_FILE = None  # Set to file path for file logging, e.g., "/var/log/trading_bot.log"
     DEBUG_EQUITY = False  # Set to True to enable verbose equity calculation logging
     
-    def __init__(self):
+    # --- State Snapshots (warm restarts, see strategy_state.py) ---
+    STATE_FILE = None  # Snapshot path: restored at start when it exists, then rewritten while running
+    STATE_SAVE_ON = "bar"  # "bar": every bar; "trade": only after fills and closed trades (equity peaks may lag)
+    
+    # --- Backtrader Params ---
+    # Every setting above (plus intrabar) is a backtrader param defaulting to the value
+    # assigned here, so cerebro.addstrategy/optstrategy accept them as keyword arguments,
+    # e.g. optstrategy(GoldCandleKenStrategy, TP_ATR_MULTIPLIER=[3.6, 4.2]). __init__ copies
+    # the effective values onto the instance, so the code keeps reading self.LOT_SIZE.
+    params = tuple(
+        (name, value) for name, value in list(locals().items())
+        if (name.isupper() and not name.startswith("_")) or name == "intrabar"
+    )
+    
+    # Upper-case settings that do not influence trading decisions (excluded from config hashes)
+    _NON_TRADING_SETTINGS = ("MAGIC_NUMBER", "LOG_LEVEL", "LOG_FILE", "DEBUG_EQUITY", "STATE_FILE", "STATE_SAVE_ON")
+    
+    @classmethod
+    def trading_settings(cls, overrides: Optional[Dict] = None) -> Dict:
+        """Effective trading configuration: the upper-case param defaults merged with overrides"""
+        settings = {
+            name: value
+            for name, value in cls.params._getitems()
+            if name.isupper() and name not in cls._NON_TRADING_SETTINGS
+        }
+        if overrides:
+            settings.update(overrides)
+        return settings
+    
+    @classmethod
+    def configured(cls, **settings) -> type:
+        """
+        Subclass with the given param defaults (e.g. a symbol's CONTRACT_SIZE).
+        
+        Dynamically created classes cannot be pickled, so cerebro.optstrategy with
+        maxcpus > 1 needs the settings passed as keyword arguments instead.
+        """
+        unknown = [name for name in settings if name not in cls.params._getkeys()]
+        if unknown:
+            raise ValueError(f"Unknown strategy settings: {unknown}")
+        return type(cls)(cls.__name__, (cls,), {**settings, "params": tuple(settings.items())})
+    
+    def __init__(self, **unknown):
+        if unknown:
+            raise ValueError(f"Unknown strategy settings: {sorted(unknown)}")
+        
+        # Effective settings: param defaults overridden by addstrategy/optstrategy keyword arguments
+        for name, value in self.p._getkwargs().items():
+            setattr(self, name, value)
+        
         # Setup logging
         self.logger = logging.getLogger(f"{self.__class__.__name__}_{id(self)}")
         self.logger.setLevel(self.LOG_LEVEL)
@@ -260,6 +348,9 @@ class GoldCandleKenStrategy(bt.Strategy):
                 "\n  2) USE_ATR_TP_SL=False with ENABLE_TRAILING_POSITION_SL=True (fixed-point trailing SL)"
             )
         
+        if self.STATE_SAVE_ON not in SAVE_MODES:
+            raise ValueError(f"Configuration Error: STATE_SAVE_ON must be one of {SAVE_MODES}, got {self.STATE_SAVE_ON!r}")
+        
         data = self.datas[0]
         self.data_close = data.close
         self.data_high = data.high
@@ -267,13 +358,18 @@ class GoldCandleKenStrategy(bt.Strategy):
         self.data_open = data.open
         self.data_datetime = data.datetime
 
-        # Point size estimation: Backtrader doesn't provide symbol point
-        # Assume 1 pip = 0.01 for 2-decimal instruments and 0.0001 for FX; fallback to price resolution.
-        self.point = self._infer_point()
+        # Point size comes from the symbol registry (Backtrader doesn't provide symbol point)
+        self.point = self.POINT_SIZE
 
         # Bid/Ask presence for spread filtering
         self._has_bidask = hasattr(data, 'ask') and hasattr(data, 'bid')
 
+        # Time filter: 24-entry hour lookup, expanded to a per-bar mask in start() when the feed is preloaded
+        self._hour_table = hour_window(self.START_HOUR, self.END_HOUR)
+        self.calendar = None
+        self._trading_hours = None
+        self._spread_ok = None  # Per-bar MAX_SPREAD_POINTS mask, built in start() on preloaded quote feeds
+
         # Trend MA
         if self.MA_METHOD == 1:
             self.ma = bt.ind.EMA(data, period=self.MA_PERIOD)
@@ -306,16 +402,107 @@ class GoldCandleKenStrategy(bt.Strategy):
         self.adaptive_small_candle = self.SMALL_CANDLE_POINTS  # Current adaptive threshold
         
         # Limit order tracking (Fix B)
-        self.pending_limit_order = None  # {direction: 1|-1, limit_price: float, signal_bar: int}
+        self.pending_limit_order = None  # {direction: 1|-1, limit_price: float, signal_bar: int (bar ordinal)}
         
         # Signal invalidation tracking
-        self.entry_bar_datetime = None  # Track when we entered (for invalidation window)
+        self.entry_bar = None  # Bar ordinal of the entry (for invalidation window)
+        
+        # State snapshots: a snapshot loaded in start() is applied on its own bar
+        self._restore = None
+        self._state_changed = True  # Write a "trade" mode snapshot on the first bar too
+
+    def start(self):
+        """Build the calendar index once if the feed is preloaded; load STATE_FILE if it exists"""
+        buflen = self.data.buflen()
+        if buflen > 0 and len(self.data_datetime.array) == buflen:
+            self.calendar = CalendarIndex.from_bt_line(self.data_datetime.array)
+            self._trading_hours = self.calendar.hour_mask(self.START_HOUR, self.END_HOUR)
+            if self._has_bidask and self.MAX_SPREAD_POINTS is not None:
+                spread = quoted_spread(self.data.bid.array, self.data.ask.array)
+                self._spread_ok = spread_ok_mask(spread, self.point, self.MAX_SPREAD_POINTS)
+        
+        if self.STATE_FILE and os.path.exists(self.STATE_FILE):
+            snapshot = read_snapshot(self.STATE_FILE)
+            changed = sorted(
+                name for name, value in self._effective_settings().items()
+                if snapshot["settings"].get(name) != value
+            )
+            if changed:
+                raise ValueError(f"Snapshot {self.STATE_FILE} was taken with different settings: {changed}")
+            if self.env._dorunonce:
+                raise ValueError("Restoring a snapshot needs cerebro runonce=False (indicators must run bar by bar)")
+            self._restore = snapshot
+            self.log(f"Snapshot loaded from {self.STATE_FILE}: restoring on bar {bt.num2date(snapshot['datetime'])}")
+
+    # State snapshots (see strategy_state.py)
+    def _effective_settings(self) -> Dict:
+        """Trading settings of this instance (param defaults plus keyword overrides)"""
+        return {name: getattr(self, name) for name in self.trading_settings()}
+
+    def _state_window(self) -> int:
+        """Bars (and indicator values) a snapshot keeps: enough for every indicator to continue"""
+        return min(len(self.data), max(self.MA_PERIOD, self.ATR_PERIOD + 1) + 2)
+
+    def snapshot_state(self) -> Dict:
+        """Bookkeeping, bars and indicator lines as of the start of the current bar"""
+        state = {name: copy.deepcopy(getattr(self, name)) for name in STATE_ATTRIBUTES}
+        if state["last_bar_datetime"] is not None:
+            state["last_bar_datetime"] = bt.date2num(state["last_bar_datetime"])  # Builtins only
+        size = self._state_window()
+        return {
+            "version": STATE_VERSION,
+            "settings": self._effective_settings(),
+            "bar": self._bar_ordinal(),
+            "datetime": self.data_datetime[0],
+            "state": state,
+            "bars": {name: capture_window(getattr(self.data.lines, name), size) for name in BAR_LINES},
+            "indicators": [capture_window(line, size) for line in indicator_lines([self.ma, self.atr])],
+            "position": {"size": self.position.size, "price": self.position.price},
+            "cash": self.broker.get_cash(),
+        }
+
+    def restore_state(self, snapshot: Dict) -> None:
+        """
+        Apply a snapshot at the current bar.
+        
+        On the snapshot's own bar the indicator lines are restored too; on a later
+        bar (the warm-up bars were not fed) only the bookkeeping is, and the
+        indicators continue from the feed. Bar ordinals are shifted to this feed.
+        """
+        offset = self._bar_ordinal() - snapshot["bar"]
+        for name, value in snapshot["state"].items():
+            setattr(self, name, copy.deepcopy(value))
+        if self.last_bar_datetime is not None:
+            self.last_bar_datetime = bt.num2date(self.last_bar_datetime)
+        if self.entry_bar is not None:
+            self.entry_bar += offset
+        if self.pending_limit_order is not None:
+            self.pending_limit_order["signal_bar"] += offset
+        
+        if self.data_datetime[0] == snapshot["datetime"]:
+            for line, packed in zip(indicator_lines([self.ma, self.atr]), snapshot["indicators"]):
+                restore_window(line, packed)
+            self.log(f"State restored on bar {self.data_datetime.datetime(0)} ({len(self._entries)} tracked entries)")
+        else:
+            self.log(
+                f"Snapshot bar {bt.num2date(snapshot['datetime'])} was not in the feed: bookkeeping restored on "
+                f"{self.data_datetime.datetime(0)}, indicators continue from the feed",
+                "WARNING"
+            )
+        
+        if self.position.size != snapshot["position"]["size"]:
+            self.log(
+                f"Broker position {self.position.size} differs from the snapshot's {snapshot['position']['size']} "
+                f"({len(self._entries)} tracked entries)",
+                "WARNING"
+            )
 
     # Order and Trade Notifications
     def notify_order(self, order):
         """Track order lifecycle - remove failed orders from tracking"""
         if order.status in [order.Submitted, order.Accepted]:
             return
+        self._state_changed = True
         
         if order.status in [order.Completed]:
             # Order successfully filled
@@ -334,26 +521,27 @@ class GoldCandleKenStrategy(bt.Strategy):
     def notify_trade(self, trade):
         """Log P&L when positions close"""
         if trade.isclosed:
+            self._state_changed = True
             self.log(f"Trade closed: P&L=${trade.pnl:.2f}")
     
     # Utilities
-    def _infer_point(self) -> float:
-        # Try to infer from data price decimals
-        # Get two recent closes and compute minimal tick
-        lookback = min(len(self.datas[0]), 10)
-        if lookback >= 2:
-            diffs = []
-            for i in range(1, lookback):
-                d = abs(self.datas[0].close[-i] - self.datas[0].close[-i - 1])
-                if d > 0:
-                    diffs.append(d)
-            if diffs:
-                min_step = min(diffs)
-                # round to nearest power of 10 step
-                for p in [1e-5, 1e-4, 1e-3, 1e-2, 1e-1]:
-                    if min_step >= p:
-                        return p
-        return 1e-2
+    def _bar_ordinal(self) -> int:
+        """Position of the current bar in the feed (0-based): bar distances ignore time gaps"""
+        return len(self.data) - 1
+
+    def _in_trading_hours(self) -> bool:
+        """Current bar lies inside START_HOUR..END_HOUR (mask lookup on preloaded feeds)"""
+        bar = self._bar_ordinal()
+        if self._trading_hours is not None and bar < len(self._trading_hours):
+            return bool(self._trading_hours[bar])
+        return bool(self._hour_table[self.data_datetime.time(0).hour])
+
+    def _spread_allowed(self) -> bool:
+        """Current bar's spread is within MAX_SPREAD_POINTS (mask lookup on preloaded feeds)"""
+        bar = self._bar_ordinal()
+        if self._spread_ok is not None and bar < len(self._spread_ok):
+            return bool(self._spread_ok[bar])
+        return not self._spread_points() > self.MAX_SPREAD_POINTS
 
     def _spread_points(self) -> float:
         if self._has_bidask:
@@ -398,8 +586,7 @@ class GoldCandleKenStrategy(bt.Strategy):
             return cash
         
         # Calculate unrealized P&L manually
-        CONTRACT_SIZE = 100  # XAUUSD: 1 lot = 100 oz
-        unrealized_pnl = self.position.size * (self.data_close[0] - self.position.price) * CONTRACT_SIZE
+        unrealized_pnl = self.position.size * (self.data_close[0] - self.position.price) * self.CONTRACT_SIZE
         true_equity = cash + unrealized_pnl
         
         # Verbose logging for debugging (enable with DEBUG_EQUITY = True)
@@ -419,9 +606,8 @@ class GoldCandleKenStrategy(bt.Strategy):
         if self.position.size == 0:
             return
         
-        CONTRACT_SIZE = 100  # XAUUSD: 1 lot = 100 oz
         current_price = self.data_close[0]
-        position_pnl = self.position.size * (current_price - self.position.price) * CONTRACT_SIZE
+        position_pnl = self.position.size * (current_price - self.position.price) * self.CONTRACT_SIZE
         true_equity = self._get_true_equity()
         
         self.log("POSITION STATE:")
@@ -430,7 +616,7 @@ class GoldCandleKenStrategy(bt.Strategy):
         
         # Verbose breakdown (enable with DEBUG_EQUITY = True)
         if self.DEBUG_EQUITY:
-            position_value = abs(self.position.size) * current_price * CONTRACT_SIZE
+            position_value = abs(self.position.size) * current_price * self.CONTRACT_SIZE
             available_balance = self.broker.getvalue()
             self.log(f"   [DEBUG] Notional: ${position_value:.2f} ({(position_value / true_equity * 100.0):.1f}%)", "DEBUG")
             self.log(f"   [DEBUG] Available Balance: ${available_balance:.2f} | Margin: ${true_equity - available_balance:.2f}", "DEBUG")
@@ -484,6 +670,17 @@ class GoldCandleKenStrategy(bt.Strategy):
 
     # Entry logic is evaluated on each bar
     def next(self):
+        # Warm restart: bars before the snapshot's bar only warm up the indicators
+        if self._restore is not None:
+            if self.data_datetime[0] < self._restore["datetime"]:
+                return
+            self.restore_state(self._restore)
+            self._restore = None
+        
+        if self.STATE_FILE and (self.STATE_SAVE_ON == "bar" or self._state_changed):
+            write_snapshot(self.STATE_FILE, self.snapshot_state())
+            self._state_changed = False
+        
         # Stop all trading if equity stop was triggered
         if self.equity_stop_triggered:
             return
@@ -535,7 +732,7 @@ class GoldCandleKenStrategy(bt.Strategy):
                 self._entries.clear()
                 self.trailing_stop_level = None
                 self._last_entry_price = None
-                self.entry_bar_datetime = None  # Clear invalidation tracking when flat
+                self.entry_bar = None  # Clear invalidation tracking when flat
 
         # 5) Check pending limit orders (Fix B) - runs every tick when there's a pending order
         if self.USE_LIMIT_ENTRY and self.pending_limit_order is not None:
@@ -546,25 +743,14 @@ class GoldCandleKenStrategy(bt.Strategy):
         if not self._is_new_bar():
             return
 
-        # 7) Time filter
-        if self.ENABLE_TIME_FILTER:
-            hour = self.data_datetime.time(0).hour
-            # Handle time windows that cross midnight (e.g., START_HOUR=20, END_HOUR=5)
-            if self.START_HOUR <= self.END_HOUR:
-                # Normal case: trade between START_HOUR and END_HOUR
-                if hour < self.START_HOUR or hour >= self.END_HOUR:
-                    return
-            else:
-                # Crosses midnight: trade if hour >= START_HOUR OR hour < END_HOUR
-                if hour < self.START_HOUR and hour >= self.END_HOUR:
-                    return
+        # 7) Time filter (windows may cross midnight, e.g. START_HOUR=20, END_HOUR=5)
+        if self.ENABLE_TIME_FILTER and not self._in_trading_hours():
+            return
 
         # 8) Spread filter using bid/ask when available
-        if self.MAX_SPREAD_POINTS is not None:
-            spread_pts = self._spread_points()
-            if spread_pts > self.MAX_SPREAD_POINTS:
-                self.log(f"Spread too high: {spread_pts:.2f} > {self.MAX_SPREAD_POINTS}")
-                return
+        if self.MAX_SPREAD_POINTS is not None and not self._spread_allowed():
+            self.log(f"Spread too high: {self._spread_points():.2f} > {self.MAX_SPREAD_POINTS}")
+            return
 
         # 9) Check pattern on completed bars: use [-1] and [-2]
         # Need at least 2 completed bars
@@ -703,28 +889,15 @@ class GoldCandleKenStrategy(bt.Strategy):
             return False
         
         # Only check within invalidation window after entry
-        if self.entry_bar_datetime is None:
+        if self.entry_bar is None:
             return False
         
-        # Calculate bars since entry using datetime comparison
-        current_dt = self.data_datetime.datetime(0)
-        time_delta = (current_dt - self.entry_bar_datetime)
-
-        # Get bar period in seconds by comparing current and previous bars
-        try:
-            prev_dt = self.data_datetime.datetime(-1)
-            bar_period_seconds = (current_dt - prev_dt).total_seconds()
-        except:
-            bar_period_seconds = 60  # Default to 1 minute for 1-minute bars
-
-        if bar_period_seconds <= 0:
-            bar_period_seconds = 60  # Default to 1 minute if unable to determine
-
-        bars_since_entry = time_delta.total_seconds() / bar_period_seconds
+        # Bars since entry (counts bars, so weekend and session gaps don't shorten the window)
+        bars_since_entry = self._bar_ordinal() - self.entry_bar
         
         # Stop checking after invalidation window expires
         if bars_since_entry > self.INVALIDATION_WINDOW_BARS:
-            self.entry_bar_datetime = None  # Clear to stop checking
+            self.entry_bar = None  # Clear to stop checking
             self.log(f"Signal invalidation window expired ({self.INVALIDATION_WINDOW_BARS} bars). No invalidation detected.", "DEBUG")
             return False
         
@@ -766,12 +939,12 @@ class GoldCandleKenStrategy(bt.Strategy):
                 self.log(f"   Invalidation Bar: {'BEARISH' if candle_is_bearish else 'BULLISH'} candle (Range: {recent_range / self.point:.1f} pts)", "WARNING")
                 self.log(f"   Threshold: {large_threshold / self.point:.1f} pts (Big candle definition)", "WARNING")
                 self.log(f"   Current Price: {current_price:.5f} | P&L: {pnl_points:+.1f} pts", "WARNING")
-                self.log(f"   Bars Since Entry: {int(bars_since_entry)}", "WARNING")
+                self.log(f"   Bars Since Entry: {bars_since_entry}", "WARNING")
                 self.log("   → Closing position immediately to prevent catastrophic loss", "WARNING")
                 self.log("=" * 60, "WARNING")
                 
                 self.close()
-                self.entry_bar_datetime = None  # Clear tracking
+                self.entry_bar = None  # Clear tracking
                 return True
         
         return False
@@ -802,7 +975,7 @@ class GoldCandleKenStrategy(bt.Strategy):
         self.pending_limit_order = {
             "direction": 1 if is_buy else -1,
             "limit_price": limit_price,
-            "signal_bar": len(self.data_close),
+            "signal_bar": self._bar_ordinal(),
             "is_buy": is_buy
         }
         
@@ -818,14 +991,11 @@ class GoldCandleKenStrategy(bt.Strategy):
         if self.pending_limit_order is None:
             return False
         
-        current_bar = len(self.data_close)
-        signal_bar = self.pending_limit_order["signal_bar"]
-        bars_since_signal = current_bar - signal_bar
+        bars_since_signal = self._bar_ordinal() - self.pending_limit_order["signal_bar"]
         
-        # Cancel limit order after 5 bars (signal likely expired)
-        MAX_BARS_PENDING = 5
-        if bars_since_signal > MAX_BARS_PENDING:
-            self.log(f"Limit order CANCELLED: {bars_since_signal} bars since signal (max {MAX_BARS_PENDING})")
+        # Cancel limit order once the signal is too old
+        if bars_since_signal > self.MAX_BARS_PENDING:
+            self.log(f"Limit order CANCELLED: {bars_since_signal} bars since signal (max {self.MAX_BARS_PENDING})")
             self.pending_limit_order = None
             return True
         
@@ -1010,8 +1180,7 @@ class GoldCandleKenStrategy(bt.Strategy):
                 sl = price + sl_distance
 
         # Calculate true notional value with contract size
-        CONTRACT_SIZE = 100  # XAUUSD: 1 lot = 100 oz
-        true_notional = size * price * CONTRACT_SIZE
+        true_notional = size * price * self.CONTRACT_SIZE
         
         # Log trade details
         if self.USE_ATR_TP_SL:
@@ -1023,7 +1192,7 @@ class GoldCandleKenStrategy(bt.Strategy):
         if is_buy:
             self.buy(size=size)
             self.log(f"BUY ORDER PLACED:")
-            self.log(f"   Size: {size} broker units ({size * CONTRACT_SIZE:.2f} oz)")
+            self.log(f"   Size: {size} broker units ({size * self.CONTRACT_SIZE:.2f} oz)")
             self.log(f"   Price: {price:.5f}")
             self.log(f"   TP: {tp:.5f} ({tp_sl_mode})" if tp else "   TP: None")
             self.log(f"   SL: {sl:.5f}" if sl else "   SL: None")
@@ -1031,7 +1200,7 @@ class GoldCandleKenStrategy(bt.Strategy):
         else:
             self.sell(size=size)
             self.log(f"SELL ORDER PLACED:")
-            self.log(f"   Size: {size} broker units ({size * CONTRACT_SIZE:.2f} oz)")
+            self.log(f"   Size: {size} broker units ({size * self.CONTRACT_SIZE:.2f} oz)")
             self.log(f"   Price: {price:.5f}")
             self.log(f"   TP: {tp:.5f} ({tp_sl_mode})" if tp else "   TP: None")
             self.log(f"   SL: {sl:.5f}" if sl else "   SL: None")
@@ -1047,9 +1216,9 @@ class GoldCandleKenStrategy(bt.Strategy):
             "sl": sl,
         })
         
-        # Track entry time for signal invalidation monitoring
+        # Track entry bar for signal invalidation monitoring
         if self.ENABLE_SIGNAL_INVALIDATION:
-            self.entry_bar_datetime = self.data_datetime.datetime(0)
+            self.entry_bar = self._bar_ordinal()
         
         # Log position tracking info
         self.log(f"   Entry #{len(self._entries)} tracked (Total entries: {len(self._entries)})")
@@ -1082,11 +1251,10 @@ class GoldCandleKenStrategy(bt.Strategy):
         Validate that adding new position won't exceed maximum position size limits.
         Uses true equity (cash + unrealized P&L) for accurate validation.
         """
-        CONTRACT_SIZE = 100  # XAUUSD: 1 lot = 100 oz
         
         # Calculate position values
-        current_position_value = abs(self.position.size) * price * CONTRACT_SIZE if self.position.size != 0 else 0.0
-        new_position_value = new_size * price * CONTRACT_SIZE
+        current_position_value = abs(self.position.size) * price * self.CONTRACT_SIZE if self.position.size != 0 else 0.0
+        new_position_value = new_size * price * self.CONTRACT_SIZE
         total_position_value = current_position_value + new_position_value
         
         # Get true account equity and calculate limits
@@ -1191,23 +1359,22 @@ class GoldCandleKenStrategy(bt.Strategy):
                 self.log("Grid recovery stopped: position size limit would be exceeded.")
                 return False
             
-            CONTRACT_SIZE = 100  # XAUUSD: 1 lot = 100 oz
             
             if direction_is_long:
                 self.buy(size=size)
                 self.log(f"GRID BUY RECOVERY #{len(self._entries) + 1}:")
-                self.log(f"   Size: {size} broker units ({size * CONTRACT_SIZE:.2f} oz)")
+                self.log(f"   Size: {size} broker units ({size * self.CONTRACT_SIZE:.2f} oz)")
                 self.log(f"   Price: {current_price:.5f}")
-                self.log(f"   Notional: ${size * current_price * CONTRACT_SIZE:.2f}")
+                self.log(f"   Notional: ${size * current_price * self.CONTRACT_SIZE:.2f}")
                 tp = None
                 sl = (current_price - self.POSITION_SL_POINTS * self.point) if self.ENABLE_POSITION_SL else None
                 self._entries.append({"dir": 1, "entry": current_price, "tp": tp, "sl": sl})
             else:
                 self.sell(size=size)
                 self.log(f"GRID SELL RECOVERY #{len(self._entries) + 1}:")
-                self.log(f"   Size: {size} broker units ({size * CONTRACT_SIZE:.2f} oz)")
+                self.log(f"   Size: {size} broker units ({size * self.CONTRACT_SIZE:.2f} oz)")
                 self.log(f"   Price: {current_price:.5f}")
-                self.log(f"   Notional: ${size * current_price * CONTRACT_SIZE:.2f}")
+                self.log(f"   Notional: ${size * current_price * self.CONTRACT_SIZE:.2f}")
                 tp = None
                 sl = (current_price + self.POSITION_SL_POINTS * self.point) if self.ENABLE_POSITION_SL else None
                 self._entries.append({"dir": -1, "entry": current_price, "tp": tp, "sl": sl})
@@ -1326,6 +1493,22 @@ class GoldCandleKenStrategy(bt.Strategy):
         entry = self._entries[-1]
         direction_is_long = self.position.size > 0
 
+        # Intrabar execution: first level touched by the minute bars inside this bar
+        bar = self._bar_ordinal()
+        if self.intrabar is not None and self.intrabar.has_minutes(bar):
+            sl_level = entry.get("sl") if self.ENABLE_POSITION_SL else None
+            touched = self.intrabar.first_exit(bar, direction_is_long, sl_level, entry.get("tp"))
+            if touched is None:
+                return False
+            kind, fill_price = touched
+            if kind == "sl":
+                if not self._should_stop_for_drawdown():
+                    self.log(f"Static SL hit intrabar @ {fill_price:.5f} (SL: {sl_level:.5f}). Closing single position.")
+            else:
+                self.log(f"Single trade TP reached intrabar @ {fill_price:.5f} (TP: {entry['tp']:.5f}). Closing.")
+            self.close(intrabar_price=fill_price)
+            return True
+
         # Static SL if enabled - CHECK THIS FIRST (most important)
         if self.ENABLE_POSITION_SL and entry.get("sl") is not None:
             sl_level = entry["sl"]
@@ -1361,7 +1544,7 @@ def run_backtest(datafeed):
     # instead of 0.01 lots = 1 oz = $3,844 exposure (100x difference!)
     comminfo = bt.CommInfoBase(
         commission=0.0002,  # 0.02% commission
-        mult=100.0,         # CONTRACT_SIZE: 1 lot = 100 oz for XAUUSD
+        mult=GoldCandleKenStrategy.CONTRACT_SIZE,  # 1 lot = 100 oz for XAUUSD
         margin=True,        # Not using margin calc, TradeLocker handles this
         commtype=bt.CommInfoBase.COMM_PERC  # Percentage-based commission
     )
@@ -0,0 +1,51 @@
+"""
+Deferred imports for fast CLI startup
+
+backtrader, pandas, numpy and requests together take well over a second to
+import. The entry points bind them as LazyModule proxies instead, so `--help`,
+argument errors, results-store queries and jobs forwarded to a running
+backtest_worker never pay for libraries they do not touch.
+
+Usage:
+    from lazy_imports import LazyModule
+    pd = LazyModule("pandas")      # nothing imported yet
+    df = pd.DataFrame(...)         # pandas is imported on first attribute access
+
+Annotations that mention a lazy module must not be evaluated at definition
+time; modules using LazyModule start with `from __future__ import annotations`.
+"""
+
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_module"] = module
+            # Copy the namespace so later lookups hit __dict__ and skip __getattr__
+            self.__dict__.update(module.__dict__)
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        """True once the underlying module has been imported"""
+        return self.__dict__["_lazy_module"] is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
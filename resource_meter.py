@@ -0,0 +1,203 @@
+"""
+Per-run resource accounting
+
+ResourceMeter measures one backtest (BacktestRunner.run_backtest, one
+optstrategy run, or StrategyAnalyzer.backtest_strategy) and produces the
+"resources" block stored in its metrics:
+
+    wall_s              elapsed time
+    cpu_s               process CPU time (user + system)
+    cpu_util            cpu_s / wall_s (1.0 = one core busy throughout)
+    peak_rss_delta_mb   how far the run raised the process's peak resident memory
+    bars / bars_per_sec simulated bars and throughput
+    allocations         optional tracemalloc top allocation sites (file:line)
+
+Peak RSS is the kernel's high-water mark. On Linux the mark is reset at the
+start of each run (/proc/self/clear_refs), so the delta is this run's own peak
+above the memory in use when it started. Elsewhere it falls back to
+getrusage's lifetime maximum, which only grows when a run exceeds every earlier
+one. The mark is per process, so concurrent runs in threads share it. Runs in
+worker processes (optstrategy, process pools) are measured separately.
+
+Allocation tracing (trace_allocations) makes runs several times slower, so
+timings taken with it are not comparable to timings taken without it.
+
+aggregate_resources() folds the blocks of a sweep into one summary, to size
+worker pools (cpu_util, peak memory per run) and to spot memory-hungry cells.
+
+Usage:
+    with ResourceMeter() as meter:
+        ...  # run
+    metrics["resources"] = meter.result(bars=len(data))
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Allocation sites reported per run when tracing
+TOP_ALLOCATIONS = 10
+
+_STATUS = "/proc/self/status"
+_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def _status_kb(field: str) -> Optional[int]:
+    """A memory field of /proc/self/status in kB (Linux), else None"""
+    try:
+        with open(_STATUS) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak RSS mark to the current RSS (Linux 4.0+)"""
+    try:
+        with open(_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _maxrss_kb() -> Optional[int]:
+    """Lifetime peak RSS from getrusage in kB (macOS reports bytes)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class ResourceMeter:
+    """Wall time, CPU time, peak RSS and (optionally) allocation sites of one run"""
+
+    def __init__(self, trace_allocations: bool = False, top: int = TOP_ALLOCATIONS):
+        """
+        Args:
+            trace_allocations: Record the top allocation sites with tracemalloc
+            top: Number of allocation sites to report
+        """
+        self.trace_allocations = trace_allocations
+        self.top = top
+        self._started_tracing = False
+        self._result = None
+
+    def start(self) -> "ResourceMeter":
+        if self.trace_allocations:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            self._trace_start = tracemalloc.take_snapshot()
+        self._hwm_reset = _reset_peak_rss()
+        self._rss_start = _status_kb("VmRSS") if self._hwm_reset else _maxrss_kb()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def stop(self) -> "ResourceMeter":
+        self._wall = time.perf_counter() - self._wall_start
+        self._cpu = time.process_time() - self._cpu_start
+        rss_end = _status_kb("VmHWM") if self._hwm_reset else _maxrss_kb()
+        self._rss_delta_kb = None
+        if rss_end is not None and self._rss_start is not None:
+            self._rss_delta_kb = max(rss_end - self._rss_start, 0)
+        self._allocations = None
+        if self.trace_allocations:
+            snapshot = tracemalloc.take_snapshot()
+            if self._started_tracing:
+                tracemalloc.stop()
+            self._allocations = self._top_sites(snapshot)
+        return self
+
+    def _top_sites(self, snapshot) -> List[Dict]:
+        """Allocation sites that grew most during the run"""
+        exclude = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+        growth = snapshot.filter_traces(exclude).compare_to(self._trace_start.filter_traces(exclude), "lineno")
+        sites = []
+        for stat in growth[:self.top]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            sites.append({
+                "site": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                "size_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            })
+        return sites
+
+    def __enter__(self) -> "ResourceMeter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def result(self, bars: int = 0) -> Dict:
+        """The resources block of a finished run"""
+        block = {
+            "wall_s": round(self._wall, 4),
+            "cpu_s": round(self._cpu, 4),
+            "cpu_util": round(self._cpu / self._wall, 3) if self._wall > 0 else None,
+            "peak_rss_delta_mb": round(self._rss_delta_kb / 1024, 2) if self._rss_delta_kb is not None else None,
+            "bars": int(bars),
+            "bars_per_sec": round(bars / self._wall, 1) if self._wall > 0 else None,
+        }
+        if self._allocations is not None:
+            block["allocations"] = self._allocations
+        return block
+
+
+def aggregate_resources(blocks: Iterable[Optional[Dict]]) -> Optional[Dict]:
+    """
+    Sweep summary of per-run resources blocks (runs without one are skipped).
+
+    Returns:
+        Totals, means and maxima, or None if no run was measured
+    """
+    blocks = [block for block in blocks if block]
+    if not blocks:
+        return None
+    wall = [block["wall_s"] for block in blocks]
+    cpu = [block["cpu_s"] for block in blocks]
+    bars = sum(block["bars"] for block in blocks)
+    peaks = [block["peak_rss_delta_mb"] for block in blocks if block.get("peak_rss_delta_mb") is not None]
+    return {
+        "runs": len(blocks),
+        "wall_s": round(sum(wall), 3),
+        "wall_s_mean": round(sum(wall) / len(wall), 4),
+        "wall_s_max": round(max(wall), 4),
+        "cpu_s": round(sum(cpu), 3),
+        "cpu_util": round(sum(cpu) / sum(wall), 3) if sum(wall) > 0 else None,
+        "peak_rss_delta_mb_max": max(peaks) if peaks else None,
+        "peak_rss_delta_mb_mean": round(sum(peaks) / len(peaks), 2) if peaks else None,
+        "bars_per_sec": round(bars / sum(wall), 1) if sum(wall) > 0 else None,
+    }
+
+
+def format_resources(summary: Optional[Dict]) -> str:
+    """One-line rendering of an aggregate_resources summary"""
+    if not summary:
+        return "no measured runs"
+    peak = summary["peak_rss_delta_mb_max"]
+    return (
+        f"{summary['runs']} runs, {summary['wall_s']:.2f}s wall ({summary['wall_s_mean'] * 1000:.1f} ms/run, "
+        f"max {summary['wall_s_max'] * 1000:.1f} ms), CPU {summary['cpu_s']:.2f}s "
+        f"(util {summary['cpu_util'] or 0:.2f}), peak RSS +{peak if peak is not None else 'n/a'} MB max, "
+        f"{summary['bars_per_sec'] or 0:,.0f} bars/s"
+    )
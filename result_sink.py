@@ -0,0 +1,179 @@
+"""
+Append-only JSON-lines result sink for long sweeps
+
+BacktestRunner and StrategyAnalyzer used to keep every result in memory and
+write one JSON document when the whole batch had finished, so a crash three
+hours in lost everything. With a ResultSink each run is appended as one JSON
+line and flushed as soon as it completes:
+
+- Resume: records carry the run's config hash under "key"; reopening the file
+  indexes the keys (offsets only, not the records), and the engines serve runs
+  found there instead of re-running them.
+- Crash safety: a partially written last line is cut off when the file is
+  reopened.
+- Streaming reads: iter_records() and top_records() walk the file line by line,
+  so comparisons and rankings never load the whole file.
+
+Usage:
+    with ResultSink("sweep.jsonl") as sink:
+        runner = BacktestRunner(sink=sink)
+        ...
+    python result_sink.py sweep.jsonl --top 20 --order-by metrics.total_pnl
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from results_store import _json_default
+
+
+class ResultSink:
+    """Append-only JSONL file of result records, indexed by record key"""
+
+    def __init__(self, path: str, fsync: bool = False):
+        """
+        Args:
+            path: JSONL file (created if missing, appended to otherwise)
+            fsync: fsync after every record (survives power loss, not only crashes)
+        """
+        self.path = path
+        self.fsync = fsync
+        self.records = 0   # Complete records in the file
+        self.appended = 0  # Records written by this process
+        self.resumed = 0   # Records served by get()
+        self._offsets: Dict[str, int] = {}
+        self._index_existing()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _index_existing(self) -> None:
+        """Record the offset of every keyed record; drop a torn last line"""
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn write from an interrupted run
+                key = json.loads(line).get("key")
+                if key is not None:
+                    self._offsets[key] = offset
+                self.records += 1
+                offset += len(line)
+        if offset < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        return key is not None and key in self._offsets
+
+    def __len__(self) -> int:
+        return self.records
+
+    def get(self, key: Optional[str]) -> Optional[Dict]:
+        """Stored record of a key (read from disk), or None"""
+        offset = self._offsets.get(key) if key is not None else None
+        if offset is None:
+            return None
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            record = json.loads(f.readline())
+        self.resumed += 1
+        return record
+
+    def append(self, record: Dict, key: Optional[str] = None) -> None:
+        """Write one record and flush it to the OS (plus fsync if enabled)"""
+        if key is not None:
+            record = {"key": key, **record}
+        line = json.dumps(record, default=_json_default) + "\n"
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(line)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if key is not None:
+            self._offsets[key] = offset
+        self.records += 1
+        self.appended += 1
+
+    def __iter__(self) -> Iterator[Dict]:
+        self._file.flush()
+        return iter_records(self.path)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> 'ResultSink':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Stream the records of a JSONL result file (a torn last line is skipped)"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                return
+            if line.strip():
+                yield json.loads(line)
+
+
+def field_getter(path: str) -> Callable[[Dict], Optional[float]]:
+    """Accessor for a dotted field path, e.g. "metrics.total_pnl" or "portfolio.return_pct" """
+    parts = path.split(".")
+
+    def get(record: Dict) -> Optional[float]:
+        value = record
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                return None
+            value = value[part]
+        return value
+
+    return get
+
+
+def top_records(records: Iterable[Dict], n: int, order_by: str, ascending: bool = False) -> List[Dict]:
+    """
+    Best n records by a (dotted) field, keeping only n records in memory.
+
+    Records without a numeric value for the field are skipped.
+    """
+    get = field_getter(order_by)
+    scored = ((get(record), record) for record in records)
+    scored = ((value, record) for value, record in scored if isinstance(value, (int, float)))
+    pick = heapq.nsmallest if ascending else heapq.nlargest
+    return [record for _, record in pick(n, scored, key=lambda item: item[0])]
+
+
+def main():
+    """Rank the records of a JSONL result file"""
+    parser = argparse.ArgumentParser(description="Rank results streamed by --results-jsonl")
+    parser.add_argument("path", type=str, help="JSONL result file")
+    parser.add_argument("--top", type=int, default=20, help="Number of records to show (default: 20)")
+    parser.add_argument(
+        "--order-by",
+        type=str,
+        default="metrics.total_pnl",
+        help="Dotted field to rank by (default: metrics.total_pnl; backtests: portfolio.return_pct)"
+    )
+    parser.add_argument("--ascending", action="store_true", help="Smallest values first")
+    args = parser.parse_args()
+
+    get = field_getter(args.order_by)
+    for rank, record in enumerate(top_records(iter_records(args.path), args.top, args.order_by, args.ascending), 1):
+        label = record.get("run_name") or json.dumps(record.get("params", {}), default=str)[:100]
+        print(f"{rank:>3}. {get(record):>12.2f}  {label}")
+
+
+if __name__ == "__main__":
+    main()
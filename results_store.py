@@ -0,0 +1,490 @@
+"""
+SQLite results store shared by backtest_runner and strategy_optimizer
+
+Every evaluated configuration becomes one row in `runs` holding the run metadata
+(engine, code version, symbol, period, timeframe), the full parameter set, the
+metrics and a few indexed summary columns. Trade ledgers can optionally be kept
+as packed NumPy blobs in `ledgers`.
+
+Rows are written in bulk transactions and indexed by parameter hash and period,
+so a CLI can skip configurations that were already evaluated and comparisons
+across thousands of runs stay in the millisecond range.
+
+ResultMemo is the companion memoization layer: complete results keyed by a hash
+of (full parameters, data fingerprint, engine, engine version), held in an
+in-process LRU and optionally in a size-bounded on-disk directory, so re-running
+a mostly unchanged batch only pays for the new configurations.
+
+Usage:
+    python results_store.py --db results.db --top 20
+    python results_store.py --db results.db --engine backtrader --start 2024-01-15 --end 2024-02-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import pickle
+import sqlite3
+import subprocess
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+
+
+# Engine identifiers stored with each run
+ENGINE_BACKTRADER = "backtrader"  # Full GoldCandleKenStrategy via BacktestRunner
+ENGINE_ANALYZER = "analyzer"      # Simplified simulator in StrategyAnalyzer
+
+DEFAULT_DB_PATH = "results.db"
+
+# profit_factor column value of runs without losing trades (infinite profit factor),
+# so they rank first instead of sorting last as NULL
+INFINITE_PROFIT_FACTOR = 1e9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at    TEXT NOT NULL,
+    engine        TEXT NOT NULL,
+    code_version  TEXT NOT NULL,
+    symbol        TEXT,
+    period_start  TEXT,
+    period_end    TEXT,
+    timeframe     TEXT,
+    run_name      TEXT,
+    param_hash    TEXT NOT NULL,
+    params_json   TEXT NOT NULL,
+    metrics_json  TEXT NOT NULL,
+    total_pnl     REAL,
+    profit_factor REAL,
+    win_rate      REAL,
+    max_drawdown  REAL,
+    total_trades  INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_runs_config ON runs (param_hash, engine, symbol, period_start, period_end);
+CREATE INDEX IF NOT EXISTS idx_runs_period ON runs (period_start, period_end, engine);
+CREATE INDEX IF NOT EXISTS idx_runs_pnl ON runs (engine, total_pnl);
+CREATE TABLE IF NOT EXISTS ledgers (
+    run_id  INTEGER PRIMARY KEY REFERENCES runs (run_id) ON DELETE CASCADE,
+    dtype   TEXT NOT NULL,
+    data    BLOB NOT NULL
+);
+"""
+
+
+def _normalize(value):
+    """Canonical JSON-safe form of a parameter value (floats rounded to absorb arange noise)"""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if math.isnan(value) or math.isinf(value):
+            return str(value)
+        rounded = round(value, 10)
+        return int(rounded) if rounded.is_integer() else rounded
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def param_hash(params: Dict) -> str:
+    """Stable hash of a parameter set (key order and float noise independent)"""
+    canonical = json.dumps(_normalize(params), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Git revision of this checkout (with a -dirty suffix), or 'unknown'"""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=repo_dir, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+        if not rev:
+            return "unknown"
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=repo_dir, capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+        return f"{rev}-dirty" if dirty else rev
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def source_hash(*modules: str) -> str:
+    """Content hash of source files next to this module (e.g. "ken_gold_candle.py"), for memo keys"""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in modules:
+        digest.update(name.encode("utf-8"))
+        with open(os.path.join(repo_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def data_fingerprint(df) -> str:
+    """Content hash of an OHLCV DataFrame (index, column names and values)"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(df.index.asi8 if hasattr(df.index, "asi8") else df.index.to_numpy()).tobytes())
+    for column in df.columns:
+        digest.update(str(column).encode("utf-8"))
+        digest.update(np.ascontiguousarray(df[column].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()[:32]
+
+
+def config_hash(params: Dict, fingerprint: str, engine: str, engine_version: str) -> str:
+    """Memo key of a complete run: parameters + data fingerprint + engine version"""
+    return param_hash({
+        "params": params,
+        "data": fingerprint,
+        "engine": engine,
+        "engine_version": engine_version,
+    })
+
+
+class ResultMemo:
+    """
+    Two-level memo of complete run results keyed by config_hash().
+
+    Level 1 is an in-process LRU of `max_entries` results. Level 2 (when `directory`
+    is given) is one pickle per key on disk, bounded to `max_bytes` by evicting the
+    least recently used files; disk hits are promoted into the LRU.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 512, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._disk_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".pkl"))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str):
+        """Cached result for key, or None"""
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return self._lru[key]
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+                os.utime(path)  # Mark as recently used for eviction
+            except (OSError, pickle.UnpicklingError, EOFError):
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value) -> None:
+        """Store a result in the LRU and (if configured) on disk"""
+        self._remember(key, value)
+        if not self.directory:
+            return
+        path = self._path(key)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._disk_bytes += os.path.getsize(path) - previous
+        if self._disk_bytes > self.max_bytes:
+            self._evict_disk()
+
+    def _remember(self, key: str, value) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the directory is back under 90% of max_bytes"""
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".pkl")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        target = self.max_bytes * 0.9
+        for entry in entries:
+            if self._disk_bytes <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._disk_bytes -= size
+            except OSError:
+                continue
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _finite(value, infinity: Optional[float] = None) -> Optional[float]:
+    """Value as a float for an indexed column; NaN -> NULL, +-inf -> +-infinity (NULL if None)"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isinf(value) and infinity is not None:
+        return math.copysign(infinity, value)
+    return value if math.isfinite(value) else None
+
+
+def summary_fields(engine: str, metrics: Dict) -> Dict:
+    """Indexed summary columns from either engine's metrics layout"""
+    if engine == ENGINE_BACKTRADER:
+        return {
+            "total_pnl": _finite(metrics["pnl"]["net_total"]),
+            "profit_factor": _finite(metrics["pnl"]["profit_factor"], INFINITE_PROFIT_FACTOR),
+            "win_rate": _finite(metrics["trades"]["win_rate"]),
+            "max_drawdown": _finite(metrics["performance"]["max_drawdown_pct"]),
+            "total_trades": int(metrics["trades"]["total"]),
+        }
+    return {
+        "total_pnl": _finite(metrics.get("total_pnl")),
+        "profit_factor": _finite(metrics.get("profit_factor"), INFINITE_PROFIT_FACTOR),
+        "win_rate": _finite(metrics.get("win_rate")),
+        "max_drawdown": _finite(metrics.get("max_drawdown")),
+        "total_trades": int(metrics.get("total_trades", 0)),
+    }
+
+
+class ResultsStore:
+    """Local SQLite store of backtest / optimizer runs"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def make_record(
+        engine: str,
+        params: Dict,
+        metrics: Dict,
+        symbol: Optional[str] = None,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None,
+        timeframe: Optional[str] = None,
+        run_name: Optional[str] = None,
+        ledger: Optional[np.ndarray] = None
+    ) -> Dict:
+        """
+        Build one run record for record_runs().
+
+        Args:
+            engine: ENGINE_BACKTRADER or ENGINE_ANALYZER
+            params: Full parameter set of the run
+            metrics: Metrics dict as produced by the engine (ledger entries are dropped)
+            symbol: Ticker/symbol the run was evaluated on
+            period_start: First date of the evaluated period (YYYY-MM-DD)
+            period_end: Last date of the evaluated period (YYYY-MM-DD)
+            timeframe: Bar timeframe, e.g. "1minute"
+            run_name: Optional human-readable name
+            ledger: Optional trade ledger record array to store alongside the run
+        """
+        return {
+            "engine": engine,
+            "params": params,
+            "metrics": {k: v for k, v in metrics.items() if k != "ledger"},
+            "symbol": symbol,
+            "period_start": period_start,
+            "period_end": period_end,
+            "timeframe": timeframe,
+            "run_name": run_name,
+            "ledger": ledger,
+        }
+
+    def record_runs(self, records: Iterable[Dict]) -> List[int]:
+        """Insert run records (see make_record) in a single transaction; returns run ids"""
+        created_at = datetime.now().isoformat()
+        version = code_version()
+        run_ids = []
+        with self.conn:
+            for rec in records:
+                summary = summary_fields(rec["engine"], rec["metrics"])
+                cursor = self.conn.execute(
+                    "INSERT INTO runs (created_at, engine, code_version, symbol, period_start, period_end, "
+                    "timeframe, run_name, param_hash, params_json, metrics_json, "
+                    "total_pnl, profit_factor, win_rate, max_drawdown, total_trades) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        created_at, rec["engine"], version, rec["symbol"],
+                        rec["period_start"], rec["period_end"], rec["timeframe"], rec["run_name"],
+                        param_hash(rec["params"]),
+                        json.dumps(_normalize(rec["params"]), sort_keys=True),
+                        json.dumps(rec["metrics"], default=_json_default),
+                        summary["total_pnl"], summary["profit_factor"], summary["win_rate"],
+                        summary["max_drawdown"], summary["total_trades"],
+                    )
+                )
+                run_ids.append(cursor.lastrowid)
+                ledger = rec.get("ledger")
+                if ledger is not None:
+                    ledger = np.ascontiguousarray(ledger)
+                    self.conn.execute(
+                        "INSERT INTO ledgers (run_id, dtype, data) VALUES (?, ?, ?)",
+                        (cursor.lastrowid, json.dumps(ledger.dtype.descr), ledger.tobytes())
+                    )
+        return run_ids
+
+    def evaluated_hashes(
+        self,
+        engine: str,
+        symbol: Optional[str] = None,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None
+    ) -> Set[str]:
+        """Parameter hashes already evaluated for this engine/symbol/period"""
+        rows = self.conn.execute(
+            "SELECT DISTINCT param_hash FROM runs WHERE engine = ? AND symbol IS ? "
+            "AND period_start IS ? AND period_end IS ?",
+            (engine, symbol, period_start, period_end)
+        )
+        return {row["param_hash"] for row in rows}
+
+    def find_run(
+        self,
+        params_hash: str,
+        engine: str,
+        symbol: Optional[str] = None,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Most recent run for a configuration, with params/metrics decoded"""
+        row = self.conn.execute(
+            "SELECT * FROM runs WHERE param_hash = ? AND engine = ? AND symbol IS ? "
+            "AND period_start IS ? AND period_end IS ? ORDER BY run_id DESC LIMIT 1",
+            (params_hash, engine, symbol, period_start, period_end)
+        ).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def load_ledger(self, run_id: int) -> Optional[np.ndarray]:
+        """Stored trade ledger of a run, or None"""
+        row = self.conn.execute("SELECT dtype, data FROM ledgers WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        dtype = np.dtype([tuple(field) for field in json.loads(row["dtype"])])
+        return np.frombuffer(row["data"], dtype=dtype)
+
+    def top_runs(
+        self,
+        engine: Optional[str] = None,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None,
+        order_by: str = "total_pnl",
+        limit: int = 20
+    ) -> List[Dict]:
+        """Best runs by an indexed summary column, optionally filtered by engine/period"""
+        if order_by not in ("total_pnl", "profit_factor", "win_rate", "max_drawdown", "total_trades"):
+            raise ValueError(f"Cannot order by '{order_by}'")
+        clauses, args = [], []
+        for column, value in (("engine", engine), ("period_start", period_start), ("period_end", period_end)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "ASC" if order_by == "max_drawdown" else "DESC"
+        rows = self.conn.execute(
+            f"SELECT * FROM runs {where} ORDER BY {order_by} {direction} LIMIT ?", (*args, limit)
+        )
+        return [self._decode(row) for row in rows]
+
+    def compare_periods(self, params_hash: str, engine: Optional[str] = None) -> List[Dict]:
+        """All periods a configuration was evaluated on (latest run per period)"""
+        engine_clause = "AND engine = ?" if engine else ""
+        args = (params_hash, engine) if engine else (params_hash,)
+        rows = self.conn.execute(
+            "SELECT * FROM runs WHERE run_id IN ("
+            f"  SELECT MAX(run_id) FROM runs WHERE param_hash = ? {engine_clause}"
+            "  GROUP BY engine, symbol, period_start, period_end"
+            ") ORDER BY period_start",
+            args
+        )
+        return [self._decode(row) for row in rows]
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        record["params"] = json.loads(record.pop("params_json"))
+        record["metrics"] = json.loads(record.pop("metrics_json"))
+        return record
+
+
+def main():
+    """Query the results store from the command line"""
+    parser = argparse.ArgumentParser(description="Query the backtest/optimizer results store")
+    parser.add_argument("--db", type=str, default=DEFAULT_DB_PATH, help=f"SQLite results file (default: {DEFAULT_DB_PATH})")
+    parser.add_argument("--engine", type=str, choices=[ENGINE_BACKTRADER, ENGINE_ANALYZER], help="Filter by engine")
+    parser.add_argument("--start", type=str, help="Filter by period start (YYYY-MM-DD)")
+    parser.add_argument("--end", type=str, help="Filter by period end (YYYY-MM-DD)")
+    parser.add_argument("--order-by", type=str, default="total_pnl", help="Summary column to rank by (default: total_pnl)")
+    parser.add_argument("--top", type=int, default=20, help="Number of runs to show (default: 20)")
+    parser.add_argument("--param-hash", type=str, help="Show every period evaluated for this configuration")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        if args.param_hash:
+            rows = store.compare_periods(args.param_hash, engine=args.engine)
+        else:
+            rows = store.top_runs(args.engine, args.start, args.end, args.order_by, args.top)
+
+    print(f"{'Run':<6} {'Engine':<11} {'Period':<23} {'Hash':<10} {'P&L':>10} {'PF':>6} {'Win %':>7} {'Trades':>7}")
+    print("-" * 86)
+    for row in rows:
+        period = f"{row['period_start'] or '?'}..{row['period_end'] or '?'}"
+        pnl = f"{row['total_pnl']:.2f}" if row["total_pnl"] is not None else "N/A"
+        pf = row["profit_factor"]
+        pf = "N/A" if pf is None else "inf" if pf >= INFINITE_PROFIT_FACTOR else f"{pf:.2f}"
+        win = f"{row['win_rate']:.1f}" if row["win_rate"] is not None else "N/A"
+        print(f"{row['run_id']:<6} {row['engine']:<11} {period:<23} {row['param_hash'][:8]:<10} "
+              f"{pnl:>10} {pf:>6} {win:>7} {row['total_trades']:>7}")
+
+
+if __name__ == "__main__":
+    main()
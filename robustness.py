@@ -0,0 +1,173 @@
+"""
+Parameter-neighbourhood robustness surface
+
+The best cell of a sweep is often a spike: one grid step away the same
+configuration loses money. RobustnessSurface lays a completed sweep out as an
+N-dimensional tensor (one axis per swept parameter, e.g. small/big ATR
+multipliers, TP/SL multipliers, hours) and scores every cell by its neighbourhood,
+the box of cells within `radius` grid steps on every axis:
+
+    neighborhood_mean  mean score over the neighbourhood (cell included)
+    neighborhood_min   worst score in the neighbourhood
+    neighborhood_std   dispersion of the neighbourhood
+    coverage           share of the neighbourhood that has been evaluated
+    stability          neighborhood_mean - neighborhood_std (default ranking)
+
+Box sums and minima are separable, so they are computed one axis at a time from
+shifted slices of the padded tensor; a 6-axis grid costs 6 passes, not 3**6.
+
+Cells missing from the tensor (holes of an irregular, filtered or two-stage
+sweep) are not re-run wholesale: fill() asks an evaluate callback - normally the
+memoized backtest engine - for the missing neighbours of the best candidates only.
+
+Usage:
+    surface = RobustnessSurface(results, ["tp_multiplier", "sl_multiplier"])
+    surface.fill(evaluate, top=10)        # evaluate(cell) -> summary row or None
+    ranked = surface.ranked()             # sorted by stability
+"""
+
+from __future__ import annotations
+
+from itertools import product
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+pd = LazyModule("pandas")
+
+
+RANKINGS = ("stability", "neighborhood_mean", "neighborhood_min")
+
+
+def _box(values: np.ndarray, radius: int, combine: Callable, fill: float) -> np.ndarray:
+    """Reduce every +-radius box with combine (np.add, np.minimum), one axis at a time"""
+    out = values
+    for axis in range(values.ndim):
+        pad = [(0, 0)] * values.ndim
+        pad[axis] = (radius, radius)
+        padded = np.pad(out, pad, constant_values=fill)
+        length = out.shape[axis]
+        window = [slice(None)] * values.ndim
+        acc = None
+        for shift in range(2 * radius + 1):
+            window[axis] = slice(shift, shift + length)
+            acc = padded[tuple(window)].copy() if acc is None else combine(acc, padded[tuple(window)])
+        out = acc
+    return out
+
+
+class RobustnessSurface:
+    """Completed sweep as a score tensor with neighbourhood statistics"""
+
+    def __init__(self, results: pd.DataFrame, axes: Sequence[str], score: str = "total_pnl", radius: int = 1):
+        """
+        Args:
+            results: Sweep summary rows (one per cell) with the axis and score columns
+            axes: Swept parameter columns, one tensor axis each
+            score: Column to smooth and rank (higher is better)
+            radius: Neighbourhood half-width in grid steps
+        """
+        missing = [column for column in [*axes, score] if column not in results.columns]
+        if missing:
+            raise KeyError(f"Sweep results have no column(s) {missing}")
+        self.axes = list(axes)
+        self.score = score
+        self.radius = radius
+        self.rows = results.drop_duplicates(subset=self.axes).reset_index(drop=True)
+        self.coords = [np.unique(self.rows[axis].to_numpy()) for axis in self.axes]
+        self.values = np.full(tuple(len(c) for c in self.coords), np.nan)
+        self.values[self._cells(self.rows)] = self.rows[score].to_numpy(dtype=np.float64)
+        self.filled: List[Dict] = []
+        self._attempted: Set[Tuple[int, ...]] = set()
+
+    def _cells(self, rows: pd.DataFrame) -> Tuple[np.ndarray, ...]:
+        """Tensor index arrays of result rows"""
+        return tuple(np.searchsorted(c, rows[axis].to_numpy()) for axis, c in zip(self.axes, self.coords))
+
+    def cell_params(self, cell: Tuple[int, ...]) -> Dict:
+        """Axis values of a tensor cell"""
+        return {axis: c[i].item() for axis, c, i in zip(self.axes, self.coords, cell)}
+
+    def statistics(self) -> Dict[str, np.ndarray]:
+        """Neighbourhood statistics of every cell (NaN where nothing is known)"""
+        valid = ~np.isnan(self.values)
+        values = np.where(valid, self.values, 0.0)
+        count = _box(valid.astype(np.float64), self.radius, np.add, 0.0)
+        size = _box(np.ones(self.values.shape), self.radius, np.add, 0.0)
+        total = _box(values, self.radius, np.add, 0.0)
+        squares = _box(values ** 2, self.radius, np.add, 0.0)
+        lowest = _box(np.where(valid, self.values, np.inf), self.radius, np.minimum, np.inf)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+            std = np.sqrt(np.maximum(np.where(count > 0, squares / count, np.nan) - mean ** 2, 0.0))
+        return {
+            'neighborhood_mean': mean,
+            'neighborhood_min': np.where(np.isinf(lowest), np.nan, lowest),
+            'neighborhood_std': std,
+            'coverage': count / size,
+            'stability': mean - std,
+        }
+
+    def missing_neighbours(self, cells: Sequence[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+        """Unevaluated in-grid cells within radius of the given cells"""
+        shape = self.values.shape
+        offsets = list(product(range(-self.radius, self.radius + 1), repeat=len(shape)))
+        missing = {}
+        for cell in cells:
+            for offset in offsets:
+                neighbour = tuple(i + d for i, d in zip(cell, offset))
+                if all(0 <= i < n for i, n in zip(neighbour, shape)) and np.isnan(self.values[neighbour]):
+                    missing[neighbour] = None
+        return [cell for cell in missing if cell not in self._attempted]
+
+    def fill(self, evaluate: Callable[[Dict], Optional[Dict]], top: int = 10, by: str = "stability", rounds: int = 3) -> int:
+        """
+        Evaluate the missing neighbours of the best-ranked cells.
+
+        Ranking and filling alternate (up to rounds times), since a filled
+        neighbour can move a cell up or down the ranking.
+
+        Args:
+            evaluate: Axis values -> summary row holding the score column (None if
+                the cell cannot be evaluated)
+            top: Number of best cells whose neighbourhoods are completed
+            by: Ranking statistic (see RANKINGS)
+            rounds: Maximum rank/fill iterations
+
+        Returns:
+            Number of cells evaluated
+        """
+        evaluated = 0
+        for _ in range(rounds):
+            ranking = self.statistics()[by]
+            known = np.flatnonzero(~np.isnan(self.values))
+            best = known[np.argsort(-np.nan_to_num(ranking.ravel()[known], nan=-np.inf), kind='stable')[:top]]
+            missing = self.missing_neighbours([np.unravel_index(i, self.values.shape) for i in best])
+            if not missing:
+                break
+            for cell in missing:
+                self._attempted.add(cell)
+                params = self.cell_params(cell)
+                row = evaluate(params)
+                if row is None:
+                    continue
+                self.values[cell] = row[self.score]
+                self.filled.append({**row, **params})
+                evaluated += 1
+        return evaluated
+
+    def ranked(self, by: str = "stability") -> pd.DataFrame:
+        """Result rows (including filled cells) with neighbourhood statistics, best first"""
+        if by not in RANKINGS:
+            raise ValueError(f"Unknown ranking '{by}'. Choose from {RANKINGS}")
+        rows = self.rows
+        if self.filled:
+            rows = pd.concat([rows, pd.DataFrame(self.filled)], ignore_index=True)
+        cells = self._cells(rows)
+        rows = rows.copy()
+        rows['filled'] = np.arange(len(rows)) >= len(self.rows)
+        for name, values in self.statistics().items():
+            rows[name] = np.round(values[cells], 4)
+        return rows.sort_values(by, ascending=False, kind='stable').reset_index(drop=True)
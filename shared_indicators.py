@@ -0,0 +1,202 @@
+"""
+Shared-memory indicator precompute for parallel optimizer sweeps
+
+A sweep over indicator settings (ATR period, trend MA period and EMA/SMA method)
+would otherwise make every worker recompute true range, ATR, moving averages and
+candle ranges for every configuration. SharedIndicatorStore computes each
+distinct variant once, packs all columns into one multiprocessing.shared_memory
+block and describes the layout in a small JSON-safe manifest. Workers call
+attach_frame() with the manifest and get a DataFrame whose columns are views
+into the block - nothing is pickled or copied.
+
+Variant names are "<kind>_<period>": atr_20, ema_100, sma_200.
+
+Usage:
+    with SharedIndicatorStore(data, indicator_variants([14, 20], [50, 100], ["ema", "sma"])) as store:
+        manifest = store.manifest          # pass to worker processes
+        ...
+    # in a worker
+    shm, frame = attach_frame(manifest, {"atr_14": "atr_20", "ema_100": "sma_100"})
+"""
+
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+pd = LazyModule("pandas")
+
+
+# StrategyAnalyzer defaults (its columns are still named atr_14 / ema_100)
+DEFAULT_ATR_PERIOD = 20
+DEFAULT_MA_PERIOD = 100
+DEFAULT_MA_METHOD = "ema"
+MA_METHODS = ("ema", "sma")
+
+# Columns every attached frame carries besides the selected variants
+BASE_COLUMNS = ("open", "high", "low", "close", "range", "bullish", "price_change")
+
+# Columns published (and attached) only when the source frame has them
+OPTIONAL_COLUMNS = ("spread",)
+
+_ALIGNMENT = 64  # Byte alignment of each column inside the block
+
+
+def true_range(data: pd.DataFrame) -> pd.Series:
+    """True range of an OHLC frame (first bar falls back to high - low)"""
+    high_low = data['high'] - data['low']
+    high_close = abs(data['high'] - data['close'].shift())
+    low_close = abs(data['low'] - data['close'].shift())
+    return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+
+
+def moving_average(close: pd.Series, method: str, period: int) -> pd.Series:
+    """Trend filter moving average ("ema" or "sma")"""
+    if method == "ema":
+        return close.ewm(span=period, adjust=False).mean()
+    if method == "sma":
+        return close.rolling(window=period).mean()
+    raise ValueError(f"Unknown moving average method '{method}'. Choose from {MA_METHODS}")
+
+
+def variant_name(kind: str, period: int) -> str:
+    """Column name of an indicator variant, e.g. ('atr', 20) -> 'atr_20'"""
+    return f"{kind}_{int(period)}"
+
+
+def indicator_variants(
+    atr_periods: Iterable[int],
+    ma_periods: Iterable[int],
+    ma_methods: Iterable[str] = (DEFAULT_MA_METHOD,)
+) -> List[str]:
+    """Every distinct variant a grid over these settings needs"""
+    names = [variant_name("atr", p) for p in atr_periods]
+    names += [variant_name(method, p) for method in ma_methods for p in ma_periods]
+    return list(dict.fromkeys(names))
+
+
+def compute_variant(data: pd.DataFrame, name: str, tr: Optional[pd.Series] = None) -> pd.Series:
+    """Compute one named variant from an OHLC frame"""
+    kind, _, period = name.rpartition("_")
+    if kind == "atr":
+        if tr is None:
+            tr = true_range(data)
+        return tr.rolling(window=int(period)).mean()
+    return moving_average(data['close'], kind, int(period))
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without taking ownership of it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedIndicatorStore:
+    """
+    Owner of a shared-memory block holding bars, base columns and indicator variants.
+
+    The creating process must keep the store open while workers run and close it
+    afterwards (or use it as a context manager), which unlinks the block.
+    """
+
+    def __init__(self, data: pd.DataFrame, variants: Iterable[str], fingerprint: Optional[str] = None):
+        """
+        Args:
+            data: Frame with at least open/high/low/close
+            variants: Variant names to precompute (see indicator_variants)
+            fingerprint: Data fingerprint recorded in the manifest
+        """
+        price_dtype = data['close'].dtype
+        tz = getattr(data.index, "tz", None)
+        tr = true_range(data)
+        columns = {
+            "__index__": (data.index.tz_convert(None) if tz is not None else data.index).to_numpy(),
+            "open": data['open'].to_numpy(),
+            "high": data['high'].to_numpy(),
+            "low": data['low'].to_numpy(),
+            "close": data['close'].to_numpy(),
+            "range": (data['high'] - data['low']).to_numpy(),
+            "bullish": (data['close'] > data['open']).to_numpy(),
+            "price_change": data['close'].diff().to_numpy(),
+        }
+        for name in OPTIONAL_COLUMNS:
+            if name in data.columns:
+                columns[name] = data[name].to_numpy()
+        for name in variants:
+            columns[name] = compute_variant(data, name, tr).to_numpy().astype(price_dtype, copy=False)
+
+        layout = {}
+        offset = 0
+        for name, values in columns.items():
+            layout[name] = {"offset": offset, "dtype": values.dtype.str}
+            offset += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, values in columns.items():
+            self._view(self._shm, layout[name], len(data))[:] = values
+
+        self.manifest = {
+            "block": self._shm.name,
+            "length": len(data),
+            "tz": str(tz) if tz is not None else None,
+            "fingerprint": fingerprint,
+            "columns": layout,
+        }
+
+    @staticmethod
+    def _view(shm: shared_memory.SharedMemory, entry: Dict, length: int) -> np.ndarray:
+        return np.ndarray((length,), dtype=np.dtype(entry["dtype"]), buffer=shm.buf, offset=entry["offset"])
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def close(self) -> None:
+        """Release and unlink the block"""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> 'SharedIndicatorStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def attach_frame(manifest: Dict, select: Dict[str, str]) -> Tuple[shared_memory.SharedMemory, pd.DataFrame]:
+    """
+    Build a zero-copy DataFrame over a published block.
+
+    Args:
+        manifest: SharedIndicatorStore.manifest
+        select: Output column -> variant name, e.g. {"atr_14": "atr_20", "ema_100": "sma_100"}
+
+    Returns:
+        (attached block, frame). Keep the block referenced as long as the frame is used.
+    """
+    shm = _attach(manifest["block"])
+    length = manifest["length"]
+    layout = manifest["columns"]
+    missing = [variant for variant in select.values() if variant not in layout]
+    if missing:
+        shm.close()
+        raise KeyError(f"Variants not published in shared block: {missing}")
+
+    index = pd.DatetimeIndex(SharedIndicatorStore._view(shm, layout["__index__"], length))
+    if manifest["tz"]:
+        index = index.tz_localize("UTC").tz_convert(manifest["tz"])
+    columns = {name: SharedIndicatorStore._view(shm, layout[name], length) for name in BASE_COLUMNS}
+    for name in OPTIONAL_COLUMNS:
+        if name in layout:
+            columns[name] = SharedIndicatorStore._view(shm, layout[name], length)
+    for column, variant in select.items():
+        columns[column] = SharedIndicatorStore._view(shm, layout[variant], length)
+    return shm, pd.DataFrame(columns, index=index, copy=False)
@@ -0,0 +1,610 @@
+"""
+Array kernels of the StrategyAnalyzer backtest
+
+StrategyAnalyzer.backtest_strategy walks the bars one at a time through pandas
+lookups. Most of that work does not depend on earlier trades: which bars pass
+the time/spread filters, the candle thresholds and the two-candle pattern are
+computed here for all bars at once. What remains is sequential: blocking
+entries while MAX_OPEN_TRADES positions are open, and resolving each accepted
+trade's exit (take profit, stop loss, signal invalidation, trailing stop,
+timeout).
+
+That sequential part has two backends:
+    numpy   one pass over the signals; each exit is found with array
+            operations over the bars after the entry (in growing chunks)
+    numba   the same rules as a plain bar loop compiled with Numba's njit,
+            used when numba is installed (pip install numba)
+
+Both follow simulate_trade() exactly, including the float32 arithmetic of
+compact mode, so their trades match the reference loop bar for bar.
+StrategyAnalyzer.check_engine_parity() runs the same comparison for every
+available backend.
+
+Beyond the reference loop (all off by default):
+    max_open_trades     a signal is skipped while this many trades are still
+                        open (0 = unlimited, the reference behaviour)
+    invalidation_bars   within this many bars after the entry, a bar at least
+                        as big as the entry's big-candle threshold that closes
+                        against the trade exits at its close
+    trail_offset        trailing stop at this distance behind the best close;
+                        starts on the first bar after the entry and exits at
+                        the close that reaches it (like the strategy's
+                        TRAILING_POSITION_SL_POINTS). The ATR stop stays in place.
+Take profit and stop loss are checked intrabar first; invalidation and the
+trailing stop act on the bar's close.
+
+Sweep-mode early-abort rules (ABORT_RULES, all off by default) end a run as
+soon as it is provably unviable; the trades taken until then are returned,
+with the rule and the bar it fired at:
+    abort_max_drawdown     the equity curve (trade P&L summed in entry order,
+                           as in the run's metrics) falls more than this below
+                           its peak; fires at the entry of the trade that did it
+    abort_min_trades       fewer trades than this were entered before bar
+      / abort_min_trades_bar   abort_min_trades_bar
+    abort_min_pnl          even if every signal still possible took profit, the
+                           total P&L would stay below this. The bound comes from
+                           reachable_pnl(): take-profit distances summed over
+                           signal_candidates(), a superset of the signals that
+                           needs no thresholds
+Each rule fires at a bar that depends only on the data and the trades before it,
+so a run that is scanned and simulated in blocks (scanned_to) aborts exactly
+where a single full pass would.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Exit codes, equal to strategy_optimizer's OUTCOME_* ledger codes
+EXIT_SL = -1
+EXIT_TIMEOUT = 0
+EXIT_TP = 1
+EXIT_INVALIDATED = 2
+EXIT_TRAILING_SL = 3
+
+BACKENDS = ("numpy", "numba")
+
+# Early-abort rules and their "off" values
+ABORT_RULES = {
+    "abort_max_drawdown": None,
+    "abort_min_trades": 0,
+    "abort_min_trades_bar": 0,
+    "abort_min_pnl": None,
+}
+
+# Abort codes (0 = the run was not aborted)
+ABORT_NONE = 0
+ABORT_MAX_DRAWDOWN = 1
+ABORT_MIN_TRADES = 2
+ABORT_PNL_BOUND = 3
+ABORT_NAMES = {ABORT_MAX_DRAWDOWN: "max_drawdown", ABORT_MIN_TRADES: "min_trades", ABORT_PNL_BOUND: "pnl_bound"}
+
+# Bars scanned per step of the NumPy exit search (doubles while no exit is found)
+_FIRST_CHUNK = 32
+
+# Percentile windows materialized per np.quantile call (bounds the float64 copy)
+_QUANTILE_ROWS = 4096
+
+_jit_kernel = None
+
+
+def numba_available() -> bool:
+    """True if numba can be imported"""
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_backends() -> Tuple[str, ...]:
+    """Backends usable in this environment"""
+    return BACKENDS if numba_available() else ("numpy",)
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """
+    Backend name for a requested one ("auto" prefers numba).
+
+    Raises:
+        ValueError: Unknown backend, or numba requested but not installed
+    """
+    if backend == "auto":
+        return "numba" if numba_available() else "numpy"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{backend}'. Choose from {('auto',) + BACKENDS}")
+    if backend == "numba" and not numba_available():
+        raise ValueError("Kernel backend 'numba' needs numba installed (pip install numba)")
+    return backend
+
+
+def eligible_bars(
+    n_bars: int,
+    start: int,
+    atr: np.ndarray,
+    in_hours: Optional[np.ndarray] = None,
+    spread_ok: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Bars that may take an entry: inside the time window, quoted within the spread
+    limit, and a positive ATR.
+
+    Args:
+        n_bars: Number of bars (the last bar never enters)
+        start: First bar with enough history
+        atr: ATR per bar
+        in_hours: Time filter mask, None to disable
+        spread_ok: Spread filter mask (checked on the entry bar), None to disable
+
+    Returns:
+        Bar indices (int64), ascending
+    """
+    idx = np.arange(start, max(n_bars - 1, start), dtype=np.int64)
+    keep = atr[idx] > 0  # False for NaN too
+    if in_hours is not None:
+        keep &= in_hours[idx]
+    if spread_ok is not None:
+        keep &= spread_ok[idx]
+    return idx[keep]
+
+
+def window_quantiles(values: np.ndarray, idx: np.ndarray, lookback: int, quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Quantiles of values[i - lookback:i] for every i in idx, like pandas Series.quantile
+    (linear interpolation in float64, NaN skipped).
+
+    Returns:
+        Array of shape (len(quantiles), len(idx))
+    """
+    out = np.empty((len(quantiles), len(idx)))
+    if not len(idx):
+        return out
+    windows = sliding_window_view(values, lookback)
+    quantile = np.nanquantile if np.isnan(values).any() else np.quantile
+    for lo in range(0, len(idx), _QUANTILE_ROWS):
+        rows = windows[idx[lo:lo + _QUANTILE_ROWS] - lookback].astype(np.float64)
+        out[:, lo:lo + _QUANTILE_ROWS] = quantile(rows, quantiles, axis=1)
+    return out
+
+
+def entry_signals(
+    candle_range: np.ndarray,
+    bullish: np.ndarray,
+    close: np.ndarray,
+    trend_ma: np.ndarray,
+    idx: np.ndarray,
+    small_threshold: np.ndarray,
+    big_threshold: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-candle pattern with the trend filter, evaluated at the bars idx.
+
+    Setup candle i-2 no bigger than small_threshold, trigger candle i-1 at least
+    big_threshold; buy if the setup is bullish and close[i-1] is above the trend
+    MA, sell if bearish and not above.
+
+    Args:
+        small_threshold, big_threshold: Thresholds aligned with idx
+
+    Returns:
+        (positions in idx that signal, direction per signal: 1 buy, -1 sell)
+    """
+    pattern = (candle_range[idx - 2] <= small_threshold) & (candle_range[idx - 1] >= big_threshold)
+    setup_bullish = bullish[idx - 2]
+    trend_up = close[idx - 1] > trend_ma[idx - 1]
+    buy = pattern & setup_bullish & trend_up
+    sell = pattern & ~setup_bullish & ~trend_up
+    signals = np.flatnonzero(buy | sell)
+    return signals, np.where(buy[signals], 1, -1).astype(np.int8)
+
+
+def signal_candidates(
+    candle_range: np.ndarray,
+    bullish: np.ndarray,
+    close: np.ndarray,
+    trend_ma: np.ndarray,
+    idx: np.ndarray,
+    ordered: bool = True
+) -> np.ndarray:
+    """
+    Bars of idx that could signal under any thresholds: the trend filter agrees
+    with the setup candle and, when the small threshold never exceeds the big one
+    (ordered), the trigger candle is at least as big as the setup candle.
+
+    Returns:
+        Mask aligned with idx (a superset of entry_signals' signals)
+    """
+    setup_bullish = bullish[idx - 2]
+    trend_up = close[idx - 1] > trend_ma[idx - 1]
+    candidates = setup_bullish == trend_up
+    if ordered:
+        candidates &= candle_range[idx - 1] >= candle_range[idx - 2]
+    return candidates
+
+
+def reachable_pnl(n_bars: int, bars: np.ndarray, gains: np.ndarray) -> np.ndarray:
+    """
+    Upper bound of the P&L still reachable from each bar on (abort_min_pnl).
+
+    Args:
+        n_bars: Number of bars
+        bars: Bars that may still enter (e.g. signal_candidates), ascending, unique
+        gains: Largest P&L of a trade entered at each of those bars (its take profit)
+
+    Returns:
+        float64 array of n_bars + 1: the gains at or after each bar summed, 0 at the end
+    """
+    out = np.zeros(n_bars + 1)
+    out[bars] = gains
+    return np.cumsum(out[::-1])[::-1]
+
+
+def _pnl_abort_bar(unreachable: np.ndarray, lo: int, threshold: float) -> int:
+    """First bar >= lo whose reachable P&L (given negated, ascending) is below threshold"""
+    bar = int(np.searchsorted(unreachable, -threshold, side="right"))
+    return max(bar, lo)
+
+
+def _first(mask: np.ndarray) -> int:
+    """Index of the first True, or len(mask)"""
+    return int(mask.argmax()) if mask.any() else len(mask)
+
+
+def _exit_numpy(
+    prices: Dict[str, np.ndarray], e: int, sign: int, tp: float, sl: float, max_bars: int,
+    invalidation_bars: int, invalidation_threshold: float, trail: Optional[np.ndarray]
+) -> Tuple[int, int]:
+    """Exit bar and EXIT_* code of one trade entered at the close of bar e"""
+    open_, high, low, close, candle_range = (
+        prices["open"], prices["high"], prices["low"], prices["close"], prices["range"]
+    )
+    end = min(e + max_bars, len(close))
+    level = None  # Trailing stop carried across chunks
+    lo, size = e + 1, _FIRST_CHUNK
+    while lo < end:
+        hi = min(lo + size, end)
+        if sign > 0:
+            tp_hit = high[lo:hi] >= tp
+            sl_hit = low[lo:hi] <= sl
+        else:
+            tp_hit = low[lo:hi] <= tp
+            sl_hit = high[lo:hi] >= sl
+        both = tp_hit & sl_hit
+        if both.any():
+            # Same rule as simulate_trade: the level closer to the open was hit first
+            bar_open = open_[lo:hi][both]
+            tp_first = abs(tp - bar_open) < abs(sl - bar_open)
+            tp_hit[both] = tp_first
+            sl_hit[both] = ~tp_first
+        hits = [_first(tp_hit | sl_hit)]
+        invalidated = hi - lo
+        if invalidation_bars and lo <= e + invalidation_bars:
+            stop = min(hi, e + invalidation_bars + 1)
+            against = close[lo:stop] < open_[lo:stop] if sign > 0 else close[lo:stop] > open_[lo:stop]
+            found = _first(against & (candle_range[lo:stop] >= invalidation_threshold))
+            if found < stop - lo:
+                invalidated = found
+        hits.append(invalidated)
+        if trail is not None:
+            if sign > 0:
+                levels = np.maximum.accumulate(trail[lo:hi])
+                if level is not None:
+                    levels = np.maximum(levels, level)
+                stopped = close[lo:hi] <= levels
+            else:
+                levels = np.minimum.accumulate(trail[lo:hi])
+                if level is not None:
+                    levels = np.minimum(levels, level)
+                stopped = close[lo:hi] >= levels
+            level = levels[-1]
+            hits.append(_first(stopped))
+        first = min(hits)
+        if first < hi - lo:
+            # Intrabar TP/SL before the close-based rules, invalidation before the trail
+            if first == hits[0]:
+                return lo + first, EXIT_SL if sl_hit[first] else EXIT_TP
+            return lo + first, EXIT_INVALIDATED if first == hits[1] else EXIT_TRAILING_SL
+        lo, size = hi, size * 2
+    return min(e + max_bars - 1, len(close) - 1), EXIT_TIMEOUT
+
+
+def _trades_numpy(
+    prices: Dict[str, np.ndarray], entries: np.ndarray, signs: np.ndarray, tp_level: np.ndarray,
+    sl_level: np.ndarray, tp_distance: np.ndarray, sl_distance: np.ndarray, max_bars: int,
+    max_open_trades: int, invalidation_bars: int, invalidation_threshold: np.ndarray,
+    trail_long: Optional[np.ndarray], trail_short: Optional[np.ndarray], max_drawdown: float,
+    min_trades: int, min_trades_bar: int, reachable: Optional[np.ndarray], min_pnl: float, scanned_to: int
+) -> Tuple[np.ndarray, np.ndarray, int, int]:
+    """Exit bar (-1 = skipped) and EXIT_* code of every signal in entry order, abort code and bar"""
+    n = len(prices["close"])
+    close = prices["close"]
+    exit_idx = np.full(len(entries), -1, dtype=np.int64)
+    outcome = np.zeros(len(entries), dtype=np.int8)
+    open_exits = []
+    taken, equity, peak = 0, 0.0, 0.0
+    unreachable = None if reachable is None else -reachable
+    pnl_bar = n + 1 if reachable is None else _pnl_abort_bar(unreachable, 0, min_pnl)
+    for k, e in enumerate(entries.tolist()):
+        if min_trades and taken < min_trades and e >= min_trades_bar:
+            return exit_idx, outcome, ABORT_MIN_TRADES, min_trades_bar
+        if pnl_bar <= e:
+            return exit_idx, outcome, ABORT_PNL_BOUND, pnl_bar
+        if max_open_trades:
+            open_exits = [x for x in open_exits if x > e]
+            if len(open_exits) >= max_open_trades:
+                continue
+        sign = int(signs[k])
+        trail = None if trail_long is None else (trail_long if sign > 0 else trail_short)
+        x, code = _exit_numpy(
+            prices, e, sign, tp_level[k], sl_level[k], max_bars,
+            invalidation_bars, invalidation_threshold[k], trail
+        )
+        exit_idx[k], outcome[k] = x, code
+        if max_open_trades:
+            open_exits.append(x)
+        taken += 1
+        # Same P&L (and dtype) as simulate_trades' ledger, summed like the metrics' equity curve
+        if code == EXIT_TP:
+            equity += float(tp_distance[k])
+        elif code == EXIT_SL:
+            equity += float(-sl_distance[k])
+        else:
+            move = close[x] - close[e]
+            equity += float(move if sign > 0 else -move)
+        peak = max(peak, equity)
+        if peak - equity > max_drawdown:
+            return exit_idx, outcome, ABORT_MAX_DRAWDOWN, e
+        if reachable is not None:
+            pnl_bar = _pnl_abort_bar(unreachable, e + 1, min_pnl - equity)
+    # Rules that fire between the last signal and the end of the scanned bars
+    if min_trades and taken < min_trades and min_trades_bar <= scanned_to and min_trades_bar < n:
+        return exit_idx, outcome, ABORT_MIN_TRADES, min_trades_bar
+    if pnl_bar <= scanned_to and pnl_bar < n:
+        return exit_idx, outcome, ABORT_PNL_BOUND, pnl_bar
+    return exit_idx, outcome, ABORT_NONE, -1
+
+
+def _trades_loop(
+    open_, high, low, close, candle_range, entries, signs, tp_level, sl_level, tp_distance, sl_distance,
+    max_bars, max_open_trades, invalidation_bars, invalidation_threshold, trailing, trail_long, trail_short,
+    max_drawdown, min_trades, min_trades_bar, pnl_bound, reachable, min_pnl, scanned_to, exit_idx, outcome
+):
+    """
+    Bar-loop version of _trades_numpy writing into exit_idx/outcome and returning
+    (abort code, abort bar) (numba nopython subset: scalars and arrays only; trail
+    arrays are unused when trailing is False, reachable when pnl_bound is False)
+    """
+    n = close.shape[0]
+    open_exits = np.empty(max(max_open_trades, 1), dtype=np.int64)
+    n_open = 0
+    taken = 0
+    equity = 0.0
+    peak = 0.0
+    pnl_bar = n + 1
+    threshold = min_pnl
+    search_from = 0 if pnl_bound else -1
+    for k in range(entries.shape[0] + 1):
+        if search_from >= 0:
+            # First bar >= search_from whose reachable P&L is below threshold (reachable never increases)
+            lo = search_from
+            hi = n + 1
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if reachable[mid] < threshold:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            pnl_bar = lo
+            search_from = -1
+        if k == entries.shape[0]:
+            break
+        e = entries[k]
+        exit_idx[k] = -1
+        if min_trades > 0 and taken < min_trades and e >= min_trades_bar:
+            return ABORT_MIN_TRADES, min_trades_bar
+        if pnl_bar <= e:
+            return ABORT_PNL_BOUND, pnl_bar
+        if max_open_trades > 0:
+            still_open = 0
+            for t in range(n_open):
+                if open_exits[t] > e:
+                    open_exits[still_open] = open_exits[t]
+                    still_open += 1
+            n_open = still_open
+            if n_open >= max_open_trades:
+                continue
+        sign = signs[k]
+        tp = tp_level[k]
+        sl = sl_level[k]
+        x = min(e + max_bars - 1, n - 1)
+        code = EXIT_TIMEOUT
+        level = 0.0
+        for j in range(e + 1, min(e + max_bars, n)):
+            if sign > 0:
+                tp_hit = high[j] >= tp
+                sl_hit = low[j] <= sl
+            else:
+                tp_hit = low[j] <= tp
+                sl_hit = high[j] >= sl
+            if tp_hit and sl_hit:
+                tp_hit = abs(tp - open_[j]) < abs(sl - open_[j])
+                sl_hit = not tp_hit
+            if sl_hit or tp_hit:
+                x = j
+                code = EXIT_SL if sl_hit else EXIT_TP
+                break
+            if j - e <= invalidation_bars and candle_range[j] >= invalidation_threshold[k]:
+                if (sign > 0 and close[j] < open_[j]) or (sign < 0 and close[j] > open_[j]):
+                    x = j
+                    code = EXIT_INVALIDATED
+                    break
+            if trailing:
+                if sign > 0:
+                    if j == e + 1 or trail_long[j] > level:
+                        level = trail_long[j]
+                    stopped = close[j] <= level
+                else:
+                    if j == e + 1 or trail_short[j] < level:
+                        level = trail_short[j]
+                    stopped = close[j] >= level
+                if stopped:
+                    x = j
+                    code = EXIT_TRAILING_SL
+                    break
+        exit_idx[k] = x
+        outcome[k] = code
+        if max_open_trades > 0:
+            open_exits[n_open] = x
+            n_open += 1
+        taken += 1
+        if code == EXIT_TP:
+            pnl = tp_distance[k]
+        elif code == EXIT_SL:
+            pnl = -sl_distance[k]
+        elif sign > 0:
+            pnl = close[x] - close[e]
+        else:
+            pnl = -(close[x] - close[e])
+        equity += float(pnl)
+        if equity > peak:
+            peak = equity
+        if peak - equity > max_drawdown:
+            return ABORT_MAX_DRAWDOWN, e
+        if pnl_bound:
+            search_from = e + 1
+            threshold = min_pnl - equity
+    if min_trades > 0 and taken < min_trades and min_trades_bar <= scanned_to and min_trades_bar < n:
+        return ABORT_MIN_TRADES, min_trades_bar
+    if pnl_bar <= scanned_to and pnl_bar < n:
+        return ABORT_PNL_BOUND, pnl_bar
+    return ABORT_NONE, -1
+
+
+def _compiled_loop():
+    """_trades_loop compiled by numba (compiled once per process, cached on disk)"""
+    global _jit_kernel
+    if _jit_kernel is None:
+        import numba
+        _jit_kernel = numba.njit(cache=True, nogil=True)(_trades_loop)
+    return _jit_kernel
+
+
+def simulate_trades(
+    prices: Dict[str, np.ndarray],
+    entries: np.ndarray,
+    signs: np.ndarray,
+    tp_distance: np.ndarray,
+    sl_distance: np.ndarray,
+    max_bars: int = 1000,
+    max_open_trades: int = 0,
+    invalidation_bars: int = 0,
+    invalidation_threshold: Optional[np.ndarray] = None,
+    trail_offset: Optional[float] = None,
+    abort_max_drawdown: Optional[float] = None,
+    abort_min_trades: int = 0,
+    abort_min_trades_bar: int = 0,
+    abort_min_pnl: Optional[float] = None,
+    reachable: Optional[np.ndarray] = None,
+    scanned_to: Optional[int] = None,
+    backend: str = "auto",
+    compiled: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Resolve the trades of a signal list.
+
+    Args:
+        prices: 'open', 'high', 'low', 'close' and 'range' arrays of one dtype
+        entries: Entry bars (entry at their close), ascending
+        signs: 1 buy / -1 sell per entry
+        tp_distance, sl_distance: Take profit / stop loss distances per entry
+        max_bars: Bars held before a timeout exit
+        max_open_trades: Skip signals while this many trades are open (0 = unlimited)
+        invalidation_bars: Invalidation window in bars after the entry (0 = off)
+        invalidation_threshold: Big-candle threshold per entry (needed with invalidation_bars)
+        trail_offset: Trailing stop distance in price units, None = off
+        abort_max_drawdown: Abort once the equity curve is this far (price units)
+            below its peak, None = off
+        abort_min_trades: Abort at abort_min_trades_bar if fewer trades were entered
+            before it (0 = off)
+        abort_min_trades_bar: Bar of the abort_min_trades check
+        abort_min_pnl: Abort once the total P&L can no longer reach this, None = off
+        reachable: reachable_pnl() bound (needed with abort_min_pnl)
+        scanned_to: entries hold every signal before this bar (default: all bars);
+            rules that would fire at a later bar wait for the rest of the signals
+        backend: "numpy", "numba" or "auto"
+        compiled: Run the numba backend's loop compiled (False runs the same loop in
+            Python, for checking it where numba is missing)
+
+    Returns:
+        Columns of the trades taken, in entry order: entry_idx, direction, outcome
+        (EXIT_* codes), pnl, bars_held, exit_price, tp_distance, sl_distance; plus
+        abort_rule (ABORT_* code) and abort_bar (-1 if the run was not aborted)
+    """
+    backend = resolve_backend(backend) if compiled else backend
+    open_, close = prices["open"], prices["close"]
+    entries = np.asarray(entries, dtype=np.int64)
+    signs = np.asarray(signs, dtype=np.int8)
+    # Level arithmetic in the prices' dtype, as simulate_trade does on its scalars
+    entry_price = close[entries]
+    buy = signs > 0
+    tp_level = np.where(buy, entry_price + tp_distance, entry_price - tp_distance)
+    sl_level = np.where(buy, entry_price - sl_distance, entry_price + sl_distance)
+    if invalidation_threshold is None:
+        invalidation_threshold = np.full(len(entries), np.inf)
+    trail_long = trail_short = None
+    if trail_offset is not None:
+        trail_long, trail_short = close - trail_offset, close + trail_offset
+    if abort_min_pnl is not None and reachable is None:
+        raise ValueError("abort_min_pnl needs the reachable_pnl() bound")
+    max_drawdown = np.inf if abort_max_drawdown is None else float(abort_max_drawdown)
+    min_pnl = 0.0 if abort_min_pnl is None else float(abort_min_pnl)
+    scanned_to = len(close) if scanned_to is None else scanned_to
+    tp_distance, sl_distance = np.asarray(tp_distance), np.asarray(sl_distance)
+
+    if backend == "numpy":
+        exit_idx, outcome, abort_rule, abort_bar = _trades_numpy(
+            prices, entries, signs, tp_level, sl_level, tp_distance, sl_distance, max_bars,
+            max_open_trades, invalidation_bars, invalidation_threshold, trail_long, trail_short,
+            max_drawdown, abort_min_trades, abort_min_trades_bar,
+            None if abort_min_pnl is None else reachable, min_pnl, scanned_to
+        )
+    else:
+        kernel = _compiled_loop() if compiled else _trades_loop
+        exit_idx = np.full(len(entries), -1, dtype=np.int64)
+        outcome = np.zeros(len(entries), dtype=np.int8)
+        unused = close[:0]
+        abort_rule, abort_bar = kernel(
+            open_, prices["high"], prices["low"], close, prices["range"], entries, signs,
+            tp_level, sl_level, tp_distance, sl_distance, max_bars, max_open_trades, invalidation_bars,
+            np.asarray(invalidation_threshold), trail_offset is not None,
+            unused if trail_long is None else trail_long, unused if trail_short is None else trail_short,
+            max_drawdown, abort_min_trades, abort_min_trades_bar, abort_min_pnl is not None,
+            np.zeros(1) if abort_min_pnl is None else reachable, min_pnl, scanned_to,
+            exit_idx, outcome
+        )
+
+    taken = exit_idx >= 0
+    entries, signs, exit_idx, outcome = entries[taken], signs[taken], exit_idx[taken], outcome[taken]
+    tp_distance, sl_distance = tp_distance[taken], sl_distance[taken]
+    move = close[exit_idx] - close[entries]
+    pnl = np.where(signs > 0, move, -move)
+    pnl = np.where(outcome == EXIT_TP, tp_distance, np.where(outcome == EXIT_SL, -sl_distance, pnl))
+    exit_price = np.where(
+        outcome == EXIT_TP, tp_level[taken], np.where(outcome == EXIT_SL, sl_level[taken], close[exit_idx])
+    )
+    return {
+        "entry_idx": entries,
+        "direction": signs,
+        "outcome": outcome,
+        "pnl": pnl,
+        "bars_held": np.where(outcome == EXIT_TIMEOUT, max_bars, exit_idx - entries),
+        "exit_price": exit_price,
+        "tp_distance": tp_distance,
+        "sl_distance": sl_distance,
+        "abort_rule": int(abort_rule),
+        "abort_bar": int(abort_bar),
+    }
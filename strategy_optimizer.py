@@ -13,17 +13,210 @@ Optimizes:
 - ATR-based multipliers (how many ATRs define "small" vs "big" candles)
 - Other strategy parameters like take profit, stop loss, etc.
 
+With --quotes the bid/ask quotes are downloaded too and every bar carries its
+closing quote; --max-spread-points then skips signals whose entry bar was quoted
+wider than the limit (the strategy's MAX_SPREAD_POINTS), through one precomputed
+boolean mask per limit.
+
+Backtests run on sim_kernel by default (--engine): the signal scan is vectorized
+and the sequential part (exits, and the optional --max-open-trades,
+--invalidation-bars and --trailing-sl-points rules) runs compiled with Numba when
+it is installed, else on NumPy. --engine loop keeps the original pandas loop;
+--check-engines compares both backends with it trade by trade.
+
+--abort-max-drawdown, --abort-min-trades and --abort-min-pnl prune sweeps: a
+cell that is provably unviable stops early and is kept with its partial metrics,
+tagged 'aborted' and ranked after the completed cells.
+
+--queue-db spreads a sweep over processes or machines: --enqueue writes one job
+per cell and period to a SQLite queue, any number of --queue-worker runs lease
+and backtest them (see job_queue.py), and --queue-wait ranks the results.
+
 Usage:
     python strategy_optimizer.py --api-key YOUR_KEY --symbol BTCUSD --start 2025-09-01 --end 2025-09-30
 """
 
+from __future__ import annotations
+
 import argparse
-import requests
-import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional
+import inspect
 import json
+import logging
+import os
+
+from job_queue import add_queue_arguments, grid_combinations, load_periods, queue_from_args, run_worker
+from lazy_imports import LazyModule
+from result_sink import ResultSink
+from results_store import (
+    ENGINE_ANALYZER,
+    ResultMemo,
+    ResultsStore,
+    config_hash,
+    data_fingerprint,
+    param_hash,
+    source_hash,
+)
+from shared_indicators import (
+    DEFAULT_ATR_PERIOD,
+    DEFAULT_MA_METHOD,
+    DEFAULT_MA_PERIOD,
+    SharedIndicatorStore,
+    attach_frame,
+    indicator_variants,
+    moving_average,
+    true_range,
+    variant_name,
+)
+from bar_store import BarStore, attach_quotes, quoted_spread, resample_bars, spread_ok_mask
+from calendar_index import CalendarIndex
+from monte_carlo import METHODS as MC_METHODS, monte_carlo, ruin_level_for, summary_fields
+from resource_meter import ResourceMeter, aggregate_resources, format_resources
+from robustness import RANKINGS, RobustnessSurface
+import sim_kernel
+from symbols import session_spec, symbol_spec as lookup_symbol_spec
+
+# pandas/requests are only needed once data is downloaded; deferring them keeps --help fast
+pd = LazyModule("pandas")
+requests = LazyModule("requests")
+
+
+# Outcome codes stored in the trade ledger (int8 column; sim_kernel's EXIT_* codes).
+# Timeouts and early exits (invalidation, trailing stop) add to P&L but count as
+# neither wins nor losses.
+OUTCOME_LOSS = -1
+OUTCOME_TIMEOUT = 0
+OUTCOME_WIN = 1
+OUTCOME_INVALIDATED = 2
+OUTCOME_TRAILING_SL = 3
+OUTCOME_NAMES = {
+    OUTCOME_LOSS: 'loss', OUTCOME_TIMEOUT: 'timeout', OUTCOME_WIN: 'win',
+    OUTCOME_INVALIDATED: 'invalidated', OUTCOME_TRAILING_SL: 'trailing_sl',
+}
+
+# Column layout of the trade ledger: one fixed-width record per simulated trade
+TRADE_LEDGER_FIELDS = [
+    ('entry_idx', 'i4'),
+    ('direction', 'i1'),    # 1 = buy, -1 = sell
+    ('outcome', 'i1'),      # OUTCOME_* code
+    ('pnl', 'f8'),
+    ('bars_held', 'i4'),
+    ('exit_price', 'f8'),
+    ('tp_distance', 'f8'),
+    ('sl_distance', 'f8'),
+]
+TRADE_DTYPE = np.dtype(TRADE_LEDGER_FIELDS)
+
+# Columns kept in compact mode: OHLC as float32 plus the indicators the analyses read
+COMPACT_PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+COMPACT_DTYPE = np.float32
+
+# Monte Carlo summary attached to every backtest_strategy result: paths per cell, and
+# the account whose loss of half its capital (at the symbol's minimum lot) is ruin
+MC_SWEEP_PATHS = 1000
+MC_ACCOUNT_CAPITAL = 10000.0
+
+# Bars a simulated trade is held before it times out
+MAX_TRADE_BARS = 1000
+
+# backtest_strategy engines: the reference pandas loop, or sim_kernel with a backend
+ENGINES = ('auto', 'loop', 'numpy', 'numba')
+
+# Sequential trade rules only the sim_kernel engines apply -> value that disables them
+SEQUENTIAL_RULES = {'max_open_trades': 0, 'invalidation_bars': 0, 'trailing_sl_points': None}
+
+# Sweep-mode early-abort rules (sim_kernel engines only) -> value that disables them
+ABORT_RULES = sim_kernel.ABORT_RULES
+
+# Eligible bars scanned by the first block of a run with abort rules (later blocks double)
+ABORT_FIRST_BLOCK = 2048
+
+# Sweep row columns that can be robustness-surface axes -> backtest_strategy argument
+SWEEP_AXIS_ARGS = {
+    'small_percentile': 'small_percentile',
+    'big_percentile': 'big_percentile',
+    'small_multiplier': 'small_atr_mult',
+    'big_multiplier': 'big_atr_mult',
+    'small_atr_multiplier': 'small_atr_mult',
+    'big_atr_multiplier': 'big_atr_mult',
+    'tp_multiplier': 'tp_atr_mult',
+    'sl_multiplier': 'sl_atr_mult',
+    'start_hour': 'start_hour',
+    'end_hour': 'end_hour',
+    'max_spread_points': 'max_spread_points',
+    'max_open_trades': 'max_open_trades',
+    'invalidation_bars': 'invalidation_bars',
+    'trailing_sl_points': 'trailing_sl_points',
+}
+
+
+class TradeLedger:
+    """
+    Struct-of-arrays trade ledger backed by a single NumPy record array.
+    
+    Replaces the per-trade dicts previously returned by backtest_strategy. Rows are
+    appended into a preallocated buffer that grows geometrically, so a run with
+    thousands of trades costs a handful of allocations instead of one dict each.
+    """
+    
+    def __init__(self, capacity: int = 256):
+        self._rows = np.empty(max(capacity, 1), dtype=TRADE_DTYPE)
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, field: str) -> np.ndarray:
+        """Column view, e.g. ledger['pnl']"""
+        return self._rows[field][:self._size]
+    
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> 'TradeLedger':
+        """Ledger holding a copy of a TRADE_DTYPE record array"""
+        ledger = cls(capacity=len(records))
+        ledger._rows[:len(records)] = records
+        ledger._size = len(records)
+        return ledger
+    
+    @property
+    def records(self) -> np.ndarray:
+        """Record array view of the filled rows (no copy)"""
+        return self._rows[:self._size]
+    
+    def append(
+        self,
+        entry_idx: int,
+        direction: int,
+        outcome: int,
+        pnl: float,
+        bars_held: int,
+        exit_price: float,
+        tp_distance: float = np.nan,
+        sl_distance: float = np.nan
+    ) -> None:
+        """Append one trade row"""
+        if self._size == len(self._rows):
+            grown = np.empty(len(self._rows) * 2, dtype=TRADE_DTYPE)
+            grown[:self._size] = self._rows
+            self._rows = grown
+        self._rows[self._size] = (
+            entry_idx, direction, outcome, pnl, bars_held,
+            exit_price, tp_distance, sl_distance
+        )
+        self._size += 1
+    
+    def to_dicts(self) -> List[Dict]:
+        """Expand to a list of dicts (for JSON export / inspection only)"""
+        rows = []
+        for rec in self.records:
+            row = {name: rec[name].item() for name in TRADE_DTYPE.names}
+            row['direction'] = 'buy' if row['direction'] > 0 else 'sell'
+            row['outcome'] = OUTCOME_NAMES[row['outcome']]
+            rows.append(row)
+        return rows
 
 
 class PolygonDataDownloader:
@@ -31,9 +224,23 @@ class PolygonDataDownloader:
     
     BASE_URL = "https://api.polygon.io/v2/aggs/ticker"
     
+    QUOTES_URL = "https://api.polygon.io/v3/quotes"
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
     
+    @staticmethod
+    def api_ticker(symbol: str, asset_class: str = 'crypto') -> str:
+        """Polygon ticker of a symbol, e.g. ('XAUUSD', 'forex') -> 'C:XAUUSD'"""
+        prefix_map = {
+            'crypto': 'X',
+            'forex': 'C',
+            'stocks': 'T', # This is usually just the ticker, but we'll use T for clarity if needed
+            'indices': 'I',
+        }
+        prefix = prefix_map.get(asset_class.lower(), '')
+        return f"{prefix}:{symbol.upper()}" if prefix else symbol.upper()
+    
     def download_data(
         self, 
         symbol: str, 
@@ -55,18 +262,7 @@ class PolygonDataDownloader:
         Returns:
             DataFrame with OHLCV data and timestamp index
         """
-        # Determine API prefix based on asset class
-        prefix_map = {
-            'crypto': 'X',
-            'forex': 'C',
-            'stocks': 'T', # This is usually just the ticker, but we'll use T for clarity if needed
-            'indices': 'I',
-        }
-        
-        prefix = prefix_map.get(asset_class.lower(), '')
-        
-        # Format ticker for API call
-        api_ticker = f"{prefix}:{symbol.upper()}" if prefix else symbol.upper()
+        api_ticker = self.api_ticker(symbol, asset_class)
         
         url = (
             f"{self.BASE_URL}/{api_ticker}/range/{interval}/minute/"
@@ -100,23 +296,363 @@ class PolygonDataDownloader:
         
         print(f"✅ Downloaded {len(df)} candles")
         return df[['open', 'high', 'low', 'close', 'volume']]
+    
+    def download_quotes(
+        self,
+        symbol: str,
+        start_date: str,
+        end_date: str,
+        asset_class: str = 'crypto'
+    ) -> pd.DataFrame:
+        """
+        Download every bid/ask quote of a period (all result pages).
+        
+        Args:
+            symbol: Ticker symbol (e.g., 'BTCUSD', 'XAUUSD')
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format (inclusive)
+            asset_class: Type of asset ('crypto', 'forex', 'stocks', 'indices')
+        
+        Returns:
+            DataFrame with bid and ask columns, indexed by quote time (UTC)
+        """
+        api_ticker = self.api_ticker(symbol, asset_class)
+        until = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        url = (
+            f"{self.QUOTES_URL}/{api_ticker}?timestamp.gte={start_date}&timestamp.lt={until}"
+            f"&order=asc&sort=timestamp&limit=50000&apiKey={self.api_key}"
+        )
+        
+        print(f"Downloading {api_ticker} quotes from {start_date} to {end_date}...")
+        times, bids, asks = [], [], []
+        while url:
+            response = requests.get(url)
+            if response.status_code != 200:
+                raise Exception(f"API Error: {response.status_code} - {response.text}")
+            data = response.json()
+            for quote in data.get('results', []):
+                times.append(quote.get('participant_timestamp') or quote.get('sip_timestamp'))
+                bids.append(quote.get('bid_price'))
+                asks.append(quote.get('ask_price'))
+            # next_url carries the query but not the key
+            url = f"{data['next_url']}&apiKey={self.api_key}" if data.get('next_url') else None
+        
+        if not times:
+            raise Exception(f"No quotes found for {api_ticker} between {start_date} and {end_date}")
+        
+        df = pd.DataFrame(
+            {'bid': bids, 'ask': asks},
+            index=pd.DatetimeIndex(pd.to_datetime(times, unit='ns'), name='timestamp'),
+            dtype=float
+        )
+        print(f"✅ Downloaded {len(df)} quotes")
+        return df
+
+
+def _longest_run(mask: np.ndarray) -> np.ndarray:
+    """Longest run of True values along the last axis of a 2-D boolean array"""
+    counts = np.cumsum(mask, axis=1)
+    resets = np.maximum.accumulate(np.where(mask, 0, counts), axis=1)
+    return (counts - resets).max(axis=1, initial=0)
+
+
+def performance_metrics_kernel(
+    pnl: np.ndarray,
+    outcome: Optional[np.ndarray] = None,
+    bars_held: Optional[np.ndarray] = None
+) -> Dict:
+    """
+    Vectorized trade statistics for one or many P&L vectors.
+    
+    A 1-D pnl vector scores a single run and returns Python scalars. A 2-D
+    (n_configs, n_trades) matrix scores every row at once and returns arrays;
+    rows shorter than the matrix are padded with NaN (see stack_ledgers).
+    
+    Args:
+        pnl: Trade P&L, 1-D or 2-D (NaN = padding)
+        outcome: OUTCOME_* codes aligned with pnl; derived from the P&L sign if omitted
+        bars_held: Bars each trade was held, aligned with pnl (optional)
+    
+    Returns:
+        Dictionary with the same keys as calculate_performance_metrics plus
+        win_streak / loss_streak
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    single = pnl.ndim == 1
+    if single:
+        pnl = pnl[np.newaxis, :]
+    
+    valid = ~np.isnan(pnl)
+    pnl = np.where(valid, pnl, 0.0)
+    if outcome is None:
+        outcome = np.sign(pnl)
+    else:
+        outcome = np.where(valid, np.asarray(outcome).reshape(pnl.shape), OUTCOME_TIMEOUT)
+    wins = outcome == OUTCOME_WIN
+    losses = outcome == OUTCOME_LOSS
+    
+    n_trades = valid.sum(axis=1)
+    n_wins = wins.sum(axis=1)
+    n_losses = losses.sum(axis=1)
+    total_pnl = pnl.sum(axis=1)
+    total_wins = np.where(wins, pnl, 0.0).sum(axis=1)
+    total_losses = -np.where(losses, pnl, 0.0).sum(axis=1)
+    
+    # Drawdown from the running peak of the equity curve (which starts at 0)
+    equity = np.cumsum(pnl, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+    max_drawdown = (peak - equity).max(axis=1, initial=0.0)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_trades = n_trades > 0
+        expectancy = np.where(has_trades, total_pnl / n_trades, 0.0)
+        deviation = np.where(valid, pnl - expectancy[:, np.newaxis], 0.0)
+        std = np.sqrt(np.where(has_trades, (deviation ** 2).sum(axis=1) / n_trades, 0.0))
+        
+        metrics = {
+            'total_trades': n_trades,
+            'winning_trades': n_wins,
+            'losing_trades': n_losses,
+            'win_rate': np.where(has_trades, n_wins / n_trades * 100, 0.0),
+            'profit_factor': np.where(
+                total_losses > 0, total_wins / total_losses, np.where(has_trades, np.inf, 0.0)
+            ),
+            'total_pnl': total_pnl,
+            'max_drawdown': max_drawdown,
+            'avg_win': np.where(n_wins > 0, total_wins / n_wins, 0.0),
+            'avg_loss': np.where(n_losses > 0, total_losses / n_losses, 0.0),
+            'avg_bars_held': np.zeros(len(pnl)),
+            # Not annualized since trade frequency varies - use raw ratio
+            'sharpe_ratio': np.where(std > 0, expectancy / std, 0.0),
+            'expectancy': expectancy,
+            'win_streak': _longest_run(wins),
+            'loss_streak': _longest_run(losses)
+        }
+        if bars_held is not None:
+            bars = np.where(valid, np.asarray(bars_held, dtype=np.float64).reshape(pnl.shape), 0.0)
+            metrics['avg_bars_held'] = np.where(has_trades, bars.sum(axis=1) / n_trades, 0.0)
+    
+    if single:
+        return {key: value[0].item() for key, value in metrics.items()}
+    return metrics
+
+
+def stack_ledgers(ledgers: List['TradeLedger']) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pack several ledgers into NaN-padded 2-D (pnl, outcome, bars_held) matrices
+    for the batched form of performance_metrics_kernel.
+    """
+    width = max((len(ledger) for ledger in ledgers), default=0)
+    pnl = np.full((len(ledgers), width), np.nan)
+    outcome = np.zeros((len(ledgers), width), dtype=np.int8)
+    bars_held = np.zeros((len(ledgers), width), dtype=np.int32)
+    for row, ledger in enumerate(ledgers):
+        n = len(ledger)
+        pnl[row, :n] = ledger['pnl']
+        outcome[row, :n] = ledger['outcome']
+        bars_held[row, :n] = ledger['bars_held']
+    return pnl, outcome, bars_held
 
 
 class StrategyAnalyzer:
     """Analyzes historical data to find optimal strategy parameters"""
     
-    def __init__(self, data: pd.DataFrame):
+    # Memo and sink keys hash the source of RESULT_SOURCES, so editing the simulator
+    # retires stored results by itself; bump only for changes outside these files
+    ENGINE_VERSION = "3"
+    RESULT_SOURCES = (
+        "strategy_optimizer.py", "sim_kernel.py", "shared_indicators.py", "calendar_index.py",
+        "bar_store.py", "monte_carlo.py",
+    )
+    
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        results_store: Optional[ResultsStore] = None,
+        run_context: Optional[Dict] = None,
+        skip_evaluated: bool = False,
+        store_ledgers: bool = False,
+        memo: Optional[ResultMemo] = None,
+        compact: bool = False,
+        atr_period: int = DEFAULT_ATR_PERIOD,
+        ma_period: int = DEFAULT_MA_PERIOD,
+        ma_method: str = DEFAULT_MA_METHOD,
+        precomputed: bool = False,
+        symbol_spec: Optional[Dict] = None,
+        sink: Optional[ResultSink] = None,
+        mc_paths: int = MC_SWEEP_PATHS,
+        mc_method: str = 'bootstrap',
+        max_spread_points: Optional[float] = None,
+        trace_allocations: bool = False,
+        engine: str = 'auto',
+        sequential_rules: Optional[Dict] = None,
+        abort_rules: Optional[Dict] = None
+    ):
         """
         Initialize analyzer with historical data.
         
         Args:
             data: DataFrame with OHLCV data
+            results_store: Optional ResultsStore that records every sweep cell
+            run_context: Metadata stored with each run (symbol, period_start, period_end, timeframe)
+            skip_evaluated: Serve sweep cells already in the results store instead of re-running them
+            store_ledgers: Also store each cell's trade ledger in the results store
+            memo: ResultMemo serving repeated backtest_strategy calls (default: in-process LRU only)
+            compact: Keep OHLC and indicators as float32 and skip columns no analysis reads
+                (tr, body, sma_100, price_change_pct, volume); roughly a third of the memory
+            atr_period: ATR window feeding the 'atr_14' column
+            ma_period: Trend filter moving average period feeding the 'ema_100' column
+            ma_method: Trend filter moving average type ("ema" or "sma")
+            precomputed: data already holds every indicator column (e.g. a shared-memory
+                frame from from_shared()); use it as-is without copying
+            symbol_spec: Symbol metadata used to express distances in points
+                (default: registry entry of run_context['symbol'], else XAUUSD)
+            sink: Append-only JSONL sink every evaluated sweep cell is streamed to as it
+                completes; cells already in it are served from it (resume)
+            mc_paths: Monte Carlo paths resampled from each backtest's trades (0 disables)
+            mc_method: Monte Carlo resampling, "bootstrap" or "permute"
+            max_spread_points: Spread limit (points) applied to every backtest that does not
+                set its own, like the strategy's MAX_SPREAD_POINTS; needs bid/ask columns
+                (bars without quotes pass)
+            trace_allocations: Add the top tracemalloc allocation sites to each backtest's
+                resources block (slows backtests down)
+            engine: backtest_strategy implementation: "loop" (reference pandas loop),
+                "numpy" or "numba" (sim_kernel backends), "auto" (numba if installed,
+                else numpy); all produce the same trades
+            sequential_rules: Defaults for the SEQUENTIAL_RULES arguments of every
+                backtest (max_open_trades, invalidation_bars, trailing_sl_points)
+            abort_rules: Early-abort rules (ABORT_RULES keys) of every backtest: a cell
+                that is provably unviable stops early and keeps its partial metrics,
+                tagged under 'aborted'. Drawdown and P&L in price units, like the metrics
+        """
+        if mc_method not in MC_METHODS:
+            raise ValueError(f"Unknown Monte Carlo method '{mc_method}'. Choose from {MC_METHODS}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Choose from {ENGINES}")
+        unknown = set(sequential_rules or {}) - set(SEQUENTIAL_RULES)
+        if unknown:
+            raise ValueError(f"Unknown sequential rules {sorted(unknown)}. Choose from {list(SEQUENTIAL_RULES)}")
+        self.engine = engine if engine == 'loop' else sim_kernel.resolve_backend(engine)
+        self.sequential_rules = {**SEQUENTIAL_RULES, **(sequential_rules or {})}
+        self.abort_rules = self._abort_rules(abort_rules, {})
+        self.memo = memo if memo is not None else ResultMemo()
+        self.indicator_settings = {'atr_period': atr_period, 'ma_period': ma_period, 'ma_method': ma_method}
+        # Quoted spread per bar (ask - bid, price units); shared frames publish it as 'spread'
+        if 'spread' in data.columns:
+            spread = data['spread'].to_numpy(dtype=np.float64)
+        elif 'bid' in data.columns and 'ask' in data.columns:
+            spread = quoted_spread(data['bid'], data['ask'])
+        else:
+            spread = None
+        prices = data[['open', 'high', 'low', 'close']]
+        self.data_fingerprint = data_fingerprint(prices if spread is None else prices.assign(spread=spread))
+        if self._custom_indicators:
+            self.data_fingerprint = param_hash({'data': self.data_fingerprint, **self.indicator_settings})
+        self.results_store = results_store
+        self.sink = sink
+        self.skip_evaluated = skip_evaluated
+        self.store_ledgers = store_ledgers
+        self._pending_records = []
+        self.compact = compact
+        if precomputed:
+            self.data = data
+        elif compact:
+            # astype() already produces a new frame, so no full float64 copy is made
+            self.data = data[COMPACT_PRICE_COLUMNS].astype(COMPACT_DTYPE)
+        else:
+            self.data = data.copy()
+        if not precomputed:
+            self._calculate_indicators()
+            if spread is not None:
+                self.data['spread'] = spread
+        self._spread = spread
+        self._spread_masks = {}
+        self.max_spread_points = max_spread_points
+        self.trace_allocations = trace_allocations
+        self._resources = []  # Resources blocks of the backtests run since the last sweep summary
+        self.sweep_resources = {}  # Sweep name -> aggregate_resources summary
+        
+        # Raw price arrays for the bar-by-bar trade simulator
+        self._open = self.data['open'].to_numpy()
+        self._high = self.data['high'].to_numpy()
+        self._low = self.data['low'].to_numpy()
+        self._close = self.data['close'].to_numpy()
+        
+        self.run_context = {
+            'symbol': None,
+            'period_start': self.data.index[0].strftime('%Y-%m-%d') if len(self.data) else None,
+            'period_end': self.data.index[-1].strftime('%Y-%m-%d') if len(self.data) else None,
+            'timeframe': None,
+        }
+        self.run_context.update(run_context or {})
+        self.symbol_spec = symbol_spec or lookup_symbol_spec(self.run_context['symbol'] or 'XAUUSD')
+        self.point = self.symbol_spec['point']
+        self.mc_paths = mc_paths
+        self.mc_method = mc_method
+        # Trade P&L is in price units per unit of the instrument
+        self.mc_ruin_level = ruin_level_for(MC_ACCOUNT_CAPITAL) / (
+            self.symbol_spec['contract_size'] * self.symbol_spec['min_lot']
+        )
+        self.calendar = CalendarIndex(self.data.index, session=session_spec(self.symbol_spec))
+    
+    @classmethod
+    def from_shared(
+        cls,
+        manifest: Dict,
+        atr_period: int = DEFAULT_ATR_PERIOD,
+        ma_period: int = DEFAULT_MA_PERIOD,
+        ma_method: str = DEFAULT_MA_METHOD,
+        **kwargs
+    ) -> 'StrategyAnalyzer':
+        """
+        Analyzer over a SharedIndicatorStore block (no indicator computation, no copy).
+        
+        Args:
+            manifest: SharedIndicatorStore.manifest published by the parent process
+            atr_period: ATR variant to attach as 'atr_14'
+            ma_period: Moving average variant period to attach as 'ema_100'
+            ma_method: Moving average variant type ("ema" or "sma")
+            **kwargs: Remaining StrategyAnalyzer arguments
         """
-        self.data = data.copy()
-        self._calculate_indicators()
+        shm, frame = attach_frame(manifest, {
+            'atr_14': variant_name('atr', atr_period),
+            'ema_100': variant_name(ma_method, ma_period),
+        })
+        analyzer = cls(
+            frame, atr_period=atr_period, ma_period=ma_period, ma_method=ma_method,
+            precomputed=True, **kwargs
+        )
+        analyzer._shared_block = shm  # Keep the mapping alive as long as the frame
+        return analyzer
+    
+    def spread_mask(self, max_spread_points: float) -> Optional[np.ndarray]:
+        """
+        Bars whose quoted spread is within max_spread_points (built once per limit).
+        
+        Returns:
+            Boolean array over the bars, or None if the data has no quotes
+        """
+        if self._spread is None:
+            return None
+        mask = self._spread_masks.get(max_spread_points)
+        if mask is None:
+            mask = spread_ok_mask(self._spread, self.point, max_spread_points)
+            self._spread_masks[max_spread_points] = mask
+        return mask
+    
+    @property
+    def _custom_indicators(self) -> bool:
+        """True if indicator settings differ from the historical defaults"""
+        return self.indicator_settings != {
+            'atr_period': DEFAULT_ATR_PERIOD, 'ma_period': DEFAULT_MA_PERIOD, 'ma_method': DEFAULT_MA_METHOD
+        }
     
     def _calculate_indicators(self):
         """Calculate all necessary indicators"""
+        if self.compact:
+            self._calculate_compact_indicators()
+            return
+        
         # Candle range (high - low)
         self.data['range'] = self.data['high'] - self.data['low']
         
@@ -126,12 +662,13 @@ class StrategyAnalyzer:
         # Candle direction
         self.data['bullish'] = self.data['close'] > self.data['open']
         
-        # ATR calculation (14-period default)
+        # ATR calculation (column keeps its historical name; window is atr_period, default 20)
+        settings = self.indicator_settings
         self.data['tr'] = self._calculate_true_range()
-        self.data['atr_14'] = self.data['tr'].rolling(window=20).mean()
+        self.data['atr_14'] = self.data['tr'].rolling(window=settings['atr_period']).mean()
         
-        # Moving averages for trend filter
-        self.data['ema_100'] = self.data['close'].ewm(span=100, adjust=False).mean()
+        # Moving averages for trend filter ('ema_100' holds the configured trend MA)
+        self.data['ema_100'] = moving_average(self.data['close'], settings['ma_method'], settings['ma_period'])
         self.data['sma_100'] = self.data['close'].rolling(window=100).mean()
         
         # Price changes for volatility analysis
@@ -140,12 +677,25 @@ class StrategyAnalyzer:
         
         print(f"✅ Calculated indicators for {len(self.data)} candles")
     
+    def _calculate_compact_indicators(self):
+        """Calculate only the indicators the analyses read, stored as float32"""
+        self.data['range'] = self.data['high'] - self.data['low']
+        self.data['bullish'] = self.data['close'] > self.data['open']
+        
+        # True range stays a temporary; only its rolling mean is kept
+        settings = self.indicator_settings
+        atr = self._calculate_true_range().rolling(window=settings['atr_period']).mean()
+        self.data['atr_14'] = atr.astype(COMPACT_DTYPE)
+        trend_ma = moving_average(self.data['close'], settings['ma_method'], settings['ma_period'])
+        self.data['ema_100'] = trend_ma.astype(COMPACT_DTYPE)
+        self.data['price_change'] = self.data['close'].diff()
+        
+        megabytes = self.data.memory_usage(deep=True).sum() / 1024 ** 2
+        print(f"✅ Calculated compact indicators for {len(self.data)} candles ({megabytes:.1f} MB)")
+    
     def _calculate_true_range(self) -> pd.Series:
         """Calculate True Range for ATR"""
-        high_low = self.data['high'] - self.data['low']
-        high_close = abs(self.data['high'] - self.data['close'].shift())
-        low_close = abs(self.data['low'] - self.data['close'].shift())
-        return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        return true_range(self.data)
     
     def analyze_candle_distribution(self) -> Dict:
         """Analyze the distribution of candle sizes"""
@@ -304,7 +854,8 @@ class StrategyAnalyzer:
         tp_atr_mult: float = 2.0,
         sl_atr_mult: float = 1.0,
         start_hour: int = None,
-        end_hour: int = None
+        end_hour: int = None,
+        keep_ledgers: bool = False
     ) -> pd.DataFrame:
         """
         Test multiple combinations of percentile thresholds.
@@ -317,6 +868,7 @@ class StrategyAnalyzer:
             sl_atr_mult: Stop loss multiplier (default: 1.0x ATR)
             start_hour: Start hour for time filter (0-23), None to disable
             end_hour: End hour for time filter (0-23), None to disable
+            keep_ledgers: If True, keep each cell's TradeLedger in df.attrs['ledgers']
         
         Returns:
             DataFrame with results for each combination, ranked by profitability
@@ -331,6 +883,7 @@ class StrategyAnalyzer:
             print("Time Filter: Disabled (24/7 trading)")
         
         results = []
+        ledgers = {}
         small_percentiles = range(small_range[0], small_range[1] + 1, step)
         big_percentiles = range(big_range[0], big_range[1] + 1, step)
         
@@ -343,30 +896,31 @@ class StrategyAnalyzer:
                 print(f"Testing {test_count}/{total_tests}: Small={small_p}%, Big={big_p}%", end='\r')
                 
                 # Run backtest to get profitability metrics
-                backtest = self.backtest_strategy(
+                backtest = self._run_cell(
                     small_percentile=small_p,
                     big_percentile=big_p,
                     tp_atr_mult=tp_atr_mult,
                     sl_atr_mult=sl_atr_mult,
                     use_atr=False,
                     start_hour=start_hour,
-                    end_hour=end_hour
+                    end_hour=end_hour,
+                    keep_ledger=keep_ledgers
                 )
                 
-                results.append({
-                    'small_percentile': small_p,
-                    'big_percentile': big_p,
-                    'total_trades': backtest['total_trades'],
-                    'total_pnl': round(backtest['total_pnl'], 2),
-                    'win_rate': round(backtest['win_rate'], 2),
-                    'profit_factor': round(backtest['profit_factor'], 2),
-                    'max_drawdown': round(backtest['max_drawdown'], 2),
-                    'expectancy': round(backtest['expectancy'], 2)
-                })
+                results.append(self._summary_row(
+                    backtest,
+                    small_percentile=small_p,
+                    big_percentile=big_p
+                ))
+                if keep_ledgers:
+                    ledgers[len(results) - 1] = backtest['ledger']
         
         print()  # New line after progress
-        df = pd.DataFrame(results)
-        df = df.sort_values('total_pnl', ascending=False)
+        self._flush_records()
+        df = self._rank_results(results, ledgers, cell_kwargs={
+            'tp_atr_mult': tp_atr_mult, 'sl_atr_mult': sl_atr_mult, 'use_atr': False,
+            'start_hour': start_hour, 'end_hour': end_hour,
+        }, sweep='percentile')
         
         print(f"\n✅ Tested {len(df)} combinations")
         print("\nTop 10 Configurations by Profitability:")
@@ -382,7 +936,8 @@ class StrategyAnalyzer:
         tp_atr_mult: float = 2.0,
         sl_atr_mult: float = 1.0,
         start_hour: int = None,
-        end_hour: int = None
+        end_hour: int = None,
+        keep_ledgers: bool = False
     ) -> pd.DataFrame:
         """
         Test multiple combinations of ATR multipliers.
@@ -395,6 +950,7 @@ class StrategyAnalyzer:
             sl_atr_mult: Stop loss multiplier (default: 1.0x ATR)
             start_hour: Start hour for time filter (0-23), None to disable
             end_hour: End hour for time filter (0-23), None to disable
+            keep_ledgers: If True, keep each cell's TradeLedger in df.attrs['ledgers']
         
         Returns:
             DataFrame with results for each combination, ranked by profitability
@@ -409,6 +965,7 @@ class StrategyAnalyzer:
             print("Time Filter: Disabled (24/7 trading)")
         
         results = []
+        ledgers = {}
         
         # Generate ranges
         small_multipliers = np.arange(small_range[0], small_range[1] + step, step)
@@ -423,7 +980,7 @@ class StrategyAnalyzer:
                 print(f"Testing {test_count}/{total_tests}: Small={small_m:.1f}x, Big={big_m:.1f}x", end='\r')
                 
                 # Run backtest to get profitability metrics
-                backtest = self.backtest_strategy(
+                backtest = self._run_cell(
                     small_percentile=30,  # Not used when use_atr=True
                     big_percentile=80,    # Not used when use_atr=True
                     tp_atr_mult=tp_atr_mult,
@@ -432,23 +989,25 @@ class StrategyAnalyzer:
                     small_atr_mult=small_m,
                     big_atr_mult=big_m,
                     start_hour=start_hour,
-                    end_hour=end_hour
+                    end_hour=end_hour,
+                    keep_ledger=keep_ledgers
                 )
                 
-                results.append({
-                    'small_multiplier': round(small_m, 2),
-                    'big_multiplier': round(big_m, 2),
-                    'total_trades': backtest['total_trades'],
-                    'total_pnl': round(backtest['total_pnl'], 2),
-                    'win_rate': round(backtest['win_rate'], 2),
-                    'profit_factor': round(backtest['profit_factor'], 2),
-                    'max_drawdown': round(backtest['max_drawdown'], 2),
-                    'expectancy': round(backtest['expectancy'], 2)
-                })
+                results.append(self._summary_row(
+                    backtest,
+                    small_multiplier=round(small_m, 2),
+                    big_multiplier=round(big_m, 2)
+                ))
+                if keep_ledgers:
+                    ledgers[len(results) - 1] = backtest['ledger']
         
         print()  # New line after progress
-        df = pd.DataFrame(results)
-        df = df.sort_values('total_pnl', ascending=False)
+        self._flush_records()
+        df = self._rank_results(results, ledgers, cell_kwargs={
+            'small_percentile': 30, 'big_percentile': 80,
+            'tp_atr_mult': tp_atr_mult, 'sl_atr_mult': sl_atr_mult, 'use_atr': True,
+            'start_hour': start_hour, 'end_hour': end_hour,
+        }, sweep='atr')
         
         print(f"\n✅ Tested {len(df)} combinations")
         print("\nTop 10 Configurations by Profitability:")
@@ -462,8 +1021,9 @@ class StrategyAnalyzer:
         direction: str,
         tp_distance: float,
         sl_distance: float,
-        max_bars: int = 1000
-    ) -> Dict:
+        max_bars: int = MAX_TRADE_BARS,
+        ledger: Optional[TradeLedger] = None
+    ) -> Optional[Tuple[int, float, int, float]]:
         """
         Simulate a single trade and return outcome.
         
@@ -473,189 +1033,69 @@ class StrategyAnalyzer:
             tp_distance: Take profit distance in price units
             sl_distance: Stop loss distance in price units
             max_bars: Maximum bars to hold trade before timeout
+            ledger: If given, the trade is appended to this ledger
         
         Returns:
-            Dictionary with trade outcome details
+            Tuple of (outcome code, pnl, bars_held, exit_price), or None if
+            there is no bar left to trade
         """
-        if entry_idx >= len(self.data) - 1:
+        n_bars = len(self._close)
+        if entry_idx >= n_bars - 1:
             return None
         
-        entry_price = self.data['close'].iloc[entry_idx]
+        entry_price = self._close[entry_idx]
+        sign = 1 if direction == 'buy' else -1
         
         # Set TP and SL levels
-        if direction == 'buy':
-            tp_level = entry_price + tp_distance
-            sl_level = entry_price - sl_distance
-        else:  # sell
-            tp_level = entry_price - tp_distance
-            sl_level = entry_price + sl_distance
+        tp_level = entry_price + sign * tp_distance
+        sl_level = entry_price - sign * sl_distance
+        
+        result = None
         
         # Scan forward bars to find which hits first
-        for i in range(entry_idx + 1, min(entry_idx + max_bars, len(self.data))):
-            high = self.data['high'].iloc[i]
-            low = self.data['low'].iloc[i]
-            open_price = self.data['open'].iloc[i]
+        for i in range(entry_idx + 1, min(entry_idx + max_bars, n_bars)):
+            if sign > 0:
+                tp_hit = self._high[i] >= tp_level
+                sl_hit = self._low[i] <= sl_level
+            else:
+                tp_hit = self._low[i] <= tp_level
+                sl_hit = self._high[i] >= sl_level
             
-            if direction == 'buy':
-                tp_hit = high >= tp_level
-                sl_hit = low <= sl_level
-                
-                # If both hit in same bar, check which is closer to open
-                if tp_hit and sl_hit:
-                    tp_distance_from_open = abs(tp_level - open_price)
-                    sl_distance_from_open = abs(sl_level - open_price)
-                    
-                    # Assume the closer level was hit first
-                    if sl_distance_from_open <= tp_distance_from_open:
-                        return {
-                            'outcome': 'loss',
-                            'pnl': -sl_distance,
-                            'bars_held': i - entry_idx,
-                            'exit_price': sl_level
-                        }
-                    else:
-                        return {
-                            'outcome': 'win',
-                            'pnl': tp_distance,
-                            'bars_held': i - entry_idx,
-                            'exit_price': tp_level
-                        }
-                # Only TP hit
-                elif tp_hit:
-                    return {
-                        'outcome': 'win',
-                        'pnl': tp_distance,
-                        'bars_held': i - entry_idx,
-                        'exit_price': tp_level
-                    }
-                # Only SL hit
-                elif sl_hit:
-                    return {
-                        'outcome': 'loss',
-                        'pnl': -sl_distance,
-                        'bars_held': i - entry_idx,
-                        'exit_price': sl_level
-                    }
-            else:  # sell
-                tp_hit = low <= tp_level
-                sl_hit = high >= sl_level
-                
-                # If both hit in same bar, check which is closer to open
-                if tp_hit and sl_hit:
-                    tp_distance_from_open = abs(tp_level - open_price)
-                    sl_distance_from_open = abs(sl_level - open_price)
-                    
-                    # Assume the closer level was hit first
-                    if sl_distance_from_open <= tp_distance_from_open:
-                        return {
-                            'outcome': 'loss',
-                            'pnl': -sl_distance,
-                            'bars_held': i - entry_idx,
-                            'exit_price': sl_level
-                        }
-                    else:
-                        return {
-                            'outcome': 'win',
-                            'pnl': tp_distance,
-                            'bars_held': i - entry_idx,
-                            'exit_price': tp_level
-                        }
-                # Only TP hit
-                elif tp_hit:
-                    return {
-                        'outcome': 'win',
-                        'pnl': tp_distance,
-                        'bars_held': i - entry_idx,
-                        'exit_price': tp_level
-                    }
-                # Only SL hit
-                elif sl_hit:
-                    return {
-                        'outcome': 'loss',
-                        'pnl': -sl_distance,
-                        'bars_held': i - entry_idx,
-                        'exit_price': sl_level
-                    }
-        
-        # Trade timed out
-        exit_price = self.data['close'].iloc[min(entry_idx + max_bars - 1, len(self.data) - 1)]
-        pnl = (exit_price - entry_price) if direction == 'buy' else (entry_price - exit_price)
-        
-        return {
-            'outcome': 'timeout',
-            'pnl': pnl,
-            'bars_held': max_bars,
-            'exit_price': exit_price
-        }
+            # If both hit in same bar, assume the level closer to the open was hit first
+            if tp_hit and sl_hit:
+                open_price = self._open[i]
+                tp_hit = abs(tp_level - open_price) < abs(sl_level - open_price)
+                sl_hit = not tp_hit
+            
+            if sl_hit:
+                result = (OUTCOME_LOSS, -sl_distance, i - entry_idx, sl_level)
+                break
+            if tp_hit:
+                result = (OUTCOME_WIN, tp_distance, i - entry_idx, tp_level)
+                break
+        
+        if result is None:
+            # Trade timed out
+            exit_price = self._close[min(entry_idx + max_bars - 1, n_bars - 1)]
+            result = (OUTCOME_TIMEOUT, sign * (exit_price - entry_price), max_bars, exit_price)
+        
+        if ledger is not None:
+            ledger.append(entry_idx, sign, *result, tp_distance, sl_distance)
+        
+        return result
     
-    def calculate_performance_metrics(self, trades: List[Dict]) -> Dict:
+    def calculate_performance_metrics(self, ledger: TradeLedger) -> Dict:
         """
-        Calculate comprehensive performance metrics from trade list.
+        Calculate comprehensive performance metrics from a trade ledger.
         
         Args:
-            trades: List of trade outcome dictionaries
+            ledger: TradeLedger (or a TRADE_DTYPE record array) of simulated trades
         
         Returns:
             Dictionary with performance statistics
         """
-        if not trades:
-            return {
-                'total_trades': 0,
-                'win_rate': 0,
-                'profit_factor': 0,
-                'total_pnl': 0,
-                'max_drawdown': 0,
-                'avg_win': 0,
-                'avg_loss': 0,
-                'sharpe_ratio': 0
-            }
-        
-        wins = [t for t in trades if t['outcome'] == 'win']
-        losses = [t for t in trades if t['outcome'] == 'loss']
-        
-        total_wins = sum(t['pnl'] for t in wins)
-        total_losses = abs(sum(t['pnl'] for t in losses))
-        
-        # Calculate equity curve for drawdown
-        equity_curve = [0]
-        for trade in trades:
-            equity_curve.append(equity_curve[-1] + trade['pnl'])
-        
-        # Calculate maximum drawdown
-        peak = equity_curve[0]
-        max_dd = 0
-        for equity in equity_curve:
-            if equity > peak:
-                peak = equity
-            dd = peak - equity
-            if dd > max_dd:
-                max_dd = dd
-        
-        # Calculate metrics
-        win_rate = (len(wins) / len(trades) * 100) if trades else 0
-        profit_factor = (total_wins / total_losses) if total_losses > 0 else float('inf')
-        avg_win = (total_wins / len(wins)) if wins else 0
-        avg_loss = (total_losses / len(losses)) if losses else 0
-        
-        # Sharpe ratio (returns / std dev)
-        # Note: Not annualized since trade frequency varies - use raw ratio
-        pnls = [t['pnl'] for t in trades]
-        sharpe = (np.mean(pnls) / np.std(pnls)) if np.std(pnls) > 0 else 0
-        
-        return {
-            'total_trades': len(trades),
-            'winning_trades': len(wins),
-            'losing_trades': len(losses),
-            'win_rate': win_rate,
-            'profit_factor': profit_factor,
-            'total_pnl': sum(pnls),
-            'max_drawdown': max_dd,
-            'avg_win': avg_win,
-            'avg_loss': avg_loss,
-            'avg_bars_held': np.mean([t['bars_held'] for t in trades]),
-            'sharpe_ratio': sharpe,
-            'expectancy': np.mean(pnls)  # Average P&L per trade
-        }
+        trades = ledger.records if isinstance(ledger, TradeLedger) else ledger
+        return performance_metrics_kernel(trades['pnl'], trades['outcome'], trades['bars_held'])
     
     def backtest_strategy(
         self,
@@ -668,7 +1108,14 @@ class StrategyAnalyzer:
         small_atr_mult: float = 0.5,
         big_atr_mult: float = 1.5,
         start_hour: int = None,
-        end_hour: int = None
+        end_hour: int = None,
+        max_spread_points: Optional[float] = None,
+        max_open_trades: Optional[int] = None,
+        invalidation_bars: Optional[int] = None,
+        trailing_sl_points: Optional[float] = None,
+        abort_rules: Optional[Dict] = None,
+        keep_ledger: bool = True,
+        engine: Optional[str] = None
     ) -> Dict:
         """
         Full backtest with P&L tracking for strategy parameters.
@@ -684,28 +1131,167 @@ class StrategyAnalyzer:
             big_atr_mult: Big candle ATR multiplier (if use_atr=True)
             start_hour: Start hour for time filter (0-23), None to disable
             end_hour: End hour for time filter (0-23), None to disable
+            max_spread_points: Skip signals whose entry bar closed with a wider quoted
+                spread (points); None uses the analyzer's max_spread_points
+            max_open_trades: Skip signals while this many trades are open, like the
+                strategy's MAX_OPEN_TRADES (0 = unlimited)
+            invalidation_bars: Exit at the close of a bar within this many bars of the
+                entry that is a big candle against the trade (0 = off)
+            trailing_sl_points: Trailing stop distance in points on closes (None = off)
+            abort_rules: Early-abort rules (ABORT_RULES keys) overriding the analyzer's;
+                an aborted run returns the metrics of the trades taken until then plus
+                'aborted' (rule, bar, time, progress)
+            keep_ledger: If True, attach the TradeLedger under 'ledger'. Sweeps pass
+                False so only the summary metrics survive each grid cell.
+            engine: Override the analyzer's engine for this call (results are the same)
+        
+        The three sequential rules default to the analyzer's sequential_rules and,
+        like the abort rules, need a sim_kernel engine.
         
         Returns:
             Dictionary with backtest results and performance metrics
         """
-        trades = []
-        signals = []
+        if max_spread_points is None:
+            max_spread_points = self.max_spread_points
+        rules = self._sequential_rules(max_open_trades, invalidation_bars, trailing_sl_points)
+        abort = self._abort_rules(abort_rules, self.abort_rules)
+        engine = self.engine if engine is None else engine
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Choose from {ENGINES}")
+        engine = engine if engine == 'loop' else sim_kernel.resolve_backend(engine)
+        if engine == 'loop' and (rules or abort):
+            raise ValueError(f"{sorted({**rules, **abort})} need a sim_kernel engine (numpy or numba), not 'loop'")
+        memo_key = config_hash(
+            {
+                'small_percentile': small_percentile, 'big_percentile': big_percentile,
+                'tp_atr_mult': tp_atr_mult, 'sl_atr_mult': sl_atr_mult,
+                'lookback_period': lookback_period, 'use_atr': use_atr,
+                'small_atr_mult': small_atr_mult, 'big_atr_mult': big_atr_mult,
+                'start_hour': start_hour, 'end_hour': end_hour,
+                'monte_carlo': [self.mc_paths, self.mc_method, self.mc_ruin_level],
+                # Only keyed when set, so memoized results without a spread limit stay valid
+                **({'max_spread_points': max_spread_points} if max_spread_points is not None else {}),
+                **rules,
+                **abort,
+                # Settings in points depend on the symbol's point size
+                **({'point': self.point} if max_spread_points is not None or 'trailing_sl_points' in rules else {}),
+            },
+            self.data_fingerprint, ENGINE_ANALYZER, self._engine_version()
+        )
+        cached = self.memo.get(memo_key)
+        if cached is not None and (cached['ledger'] is not None or not keep_ledger):
+            metrics = dict(cached['metrics'])
+            metrics.pop('resources', None)  # Nothing was run
+            if keep_ledger:
+                metrics['ledger'] = TradeLedger.from_records(cached['ledger'])
+            return metrics
+        
+        meter = ResourceMeter(self.trace_allocations).start()
+        
+        filters = self._signal_filters(lookback_period, start_hour, end_hour, max_spread_points)
+        signal_kwargs = {
+            'small_percentile': small_percentile, 'big_percentile': big_percentile,
+            'tp_atr_mult': tp_atr_mult, 'sl_atr_mult': sl_atr_mult,
+            'lookback_period': lookback_period, 'use_atr': use_atr,
+            'small_atr_mult': small_atr_mult, 'big_atr_mult': big_atr_mult,
+        }
+        aborted = None
+        if engine == 'loop':
+            ledger = self._simulate_loop(*filters, **signal_kwargs)
+        else:
+            ledger, aborted = self._simulate_kernel(*filters, engine, rules, abort_rules=abort, **signal_kwargs)
+        
+        # Calculate performance metrics (of the trades taken until an abort)
+        metrics = self.calculate_performance_metrics(ledger)
+        if aborted is not None:
+            metrics['aborted'] = aborted
+        if self.mc_paths:
+            metrics['monte_carlo'] = monte_carlo(
+                ledger['pnl'], self.mc_paths, self.mc_method, self.mc_ruin_level
+            )
+        metrics['resources'] = meter.stop().result(bars=len(self.data))
+        self._resources.append(metrics['resources'])
+        self.memo.put(memo_key, {
+            'metrics': dict(metrics),
+            'ledger': ledger.records.copy() if keep_ledger else None,
+        })
+        if keep_ledger:
+            metrics['ledger'] = ledger
         
+        return metrics
+    
+    def _sequential_rules(
+        self,
+        max_open_trades: Optional[int],
+        invalidation_bars: Optional[int],
+        trailing_sl_points: Optional[float]
+    ) -> Dict:
+        """Sequential rules of one backtest (None = analyzer default), only those that are active"""
+        given = {
+            'max_open_trades': max_open_trades,
+            'invalidation_bars': invalidation_bars,
+            'trailing_sl_points': trailing_sl_points,
+        }
+        rules = {}
+        for name, off in SEQUENTIAL_RULES.items():
+            value = self.sequential_rules[name] if given[name] is None else given[name]
+            if value != off:
+                rules[name] = value
+        return rules
+    
+    @staticmethod
+    def _abort_rules(abort_rules: Optional[Dict], defaults: Dict) -> Dict:
+        """Abort rules of one backtest (abort_rules over defaults), only those that are active"""
+        unknown = set(abort_rules or {}) - set(ABORT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown abort rules {sorted(unknown)}. Choose from {list(ABORT_RULES)}")
+        rules = {**ABORT_RULES, **defaults, **(abort_rules or {})}
+        if bool(rules['abort_min_trades']) != bool(rules['abort_min_trades_bar']):
+            raise ValueError("abort_min_trades and abort_min_trades_bar must be set together")
+        return {name: value for name, value in rules.items() if value != ABORT_RULES[name]}
+    
+    def _signal_filters(
+        self,
+        lookback_period: int,
+        start_hour: Optional[int],
+        end_hour: Optional[int],
+        max_spread_points: Optional[float]
+    ) -> Tuple[int, Optional[np.ndarray], Optional[np.ndarray]]:
+        """First bar with enough history, time filter mask and spread filter mask of a backtest"""
         start_idx = max(lookback_period, 14) + 2  # Need ATR and lookback data
         
+        # Time filter (mimics strategy's ENABLE_TIME_FILTER; windows may cross midnight)
+        in_hours = None
+        if start_hour is not None and end_hour is not None:
+            in_hours = self.calendar.hour_mask(start_hour, end_hour)
+        
+        # Spread filter (mimics MAX_SPREAD_POINTS; no-op without quotes)
+        spread_ok = self.spread_mask(max_spread_points) if max_spread_points is not None else None
+        return start_idx, in_hours, spread_ok
+    
+    def _simulate_loop(
+        self,
+        start_idx: int,
+        in_hours: Optional[np.ndarray],
+        spread_ok: Optional[np.ndarray],
+        small_percentile: int,
+        big_percentile: int,
+        tp_atr_mult: float,
+        sl_atr_mult: float,
+        lookback_period: int,
+        use_atr: bool,
+        small_atr_mult: float,
+        big_atr_mult: float
+    ) -> TradeLedger:
+        """Reference engine: bar-by-bar signal scan with simulate_trade per signal"""
+        ledger = TradeLedger()
+        
         for i in range(start_idx, len(self.data) - 1):
-            # Time filter (mimics strategy's ENABLE_TIME_FILTER)
-            if start_hour is not None and end_hour is not None:
-                current_hour = self.data.index[i].hour
-                # Handle time windows that cross midnight (e.g., 20:00 to 05:00)
-                if start_hour <= end_hour:
-                    # Normal case: trade between start_hour and end_hour
-                    if current_hour < start_hour or current_hour >= end_hour:
-                        continue
-                else:
-                    # Crosses midnight: trade if hour >= start_hour OR hour < end_hour
-                    if current_hour < start_hour and current_hour >= end_hour:
-                        continue
+            if in_hours is not None and not in_hours[i]:
+                continue
+            # The strategy checks the spread on the bar it decides (and enters) on
+            if spread_ok is not None and not spread_ok[i]:
+                continue
             
             # Get ATR for this bar
             atr_value = self.data['atr_14'].iloc[i]
@@ -744,30 +1330,419 @@ class StrategyAnalyzer:
                 tp_distance = tp_atr_mult * atr_value
                 sl_distance = sl_atr_mult * atr_value
                 
-                # Simulate trade
-                trade_result = self.simulate_trade(i, direction, tp_distance, sl_distance)
-                
-                if trade_result:
-                    trade_result['entry_idx'] = i
-                    trade_result['direction'] = direction
-                    trade_result['atr'] = atr_value
-                    trade_result['tp_distance'] = tp_distance
-                    trade_result['sl_distance'] = sl_distance
-                    trades.append(trade_result)
-                    
-                    signals.append({
-                        'timestamp': self.data.index[i],
-                        'direction': direction,
-                        'entry_price': self.data['close'].iloc[i]
-                    })
+                # Simulate trade (appends to the ledger)
+                self.simulate_trade(i, direction, tp_distance, sl_distance, ledger=ledger)
+        
+        return ledger
+    
+    def _simulate_kernel(
+        self,
+        start_idx: int,
+        in_hours: Optional[np.ndarray],
+        spread_ok: Optional[np.ndarray],
+        backend: str,
+        rules: Dict,
+        small_percentile: int,
+        big_percentile: int,
+        tp_atr_mult: float,
+        sl_atr_mult: float,
+        lookback_period: int,
+        use_atr: bool,
+        small_atr_mult: float,
+        big_atr_mult: float,
+        abort_rules: Optional[Dict] = None,
+        compiled: bool = True
+    ) -> Tuple[TradeLedger, Optional[Dict]]:
+        """
+        sim_kernel engine: vectorized signal scan, sequential exits on the given backend.
+        
+        With abort rules the bars are scanned in blocks (ABORT_FIRST_BLOCK eligible
+        bars, then doubling), and the trades found so far are simulated after each
+        block, so a run that aborts early also skips most of the threshold scan.
+        Every rule fires at the same bar as in a single pass.
+        
+        Returns:
+            (ledger of the trades taken, 'aborted' tag or None)
+        """
+        abort_rules = abort_rules or {}
+        arrays = self._kernel_arrays()
+        atr = arrays['atr']
+        n_bars = len(atr)
+        idx = sim_kernel.eligible_bars(n_bars, start_idx, atr, in_hours, spread_ok)
+        ends = [len(idx)]
+        if abort_rules:
+            size = ABORT_FIRST_BLOCK
+            while size < len(idx):
+                ends.append(size)
+                size *= 2
+            if 'abort_min_trades_bar' in abort_rules:
+                # A block boundary at the bar the minimum trade count is checked at
+                ends.append(int(np.searchsorted(idx, abort_rules['abort_min_trades_bar'])))
+            ends = sorted({end for end in ends if end > 0}) or [0]
+        reachable = None
+        if 'abort_min_pnl' in abort_rules:
+            ordered = small_atr_mult <= big_atr_mult if use_atr else small_percentile <= big_percentile
+            candidates = idx[sim_kernel.signal_candidates(
+                arrays['range'], arrays['bullish'], arrays['close'], arrays['trend'], idx, ordered
+            )]
+            reachable = sim_kernel.reachable_pnl(n_bars, candidates, tp_atr_mult * atr[candidates])
+        
+        trailing_sl_points = rules.get('trailing_sl_points')
+        entries, signs, invalidation_threshold = [], [], []
+        start = 0
+        for end in ends:
+            block = idx[start:end]
+            if use_atr:
+                small_threshold = small_atr_mult * atr[block]
+                big_threshold = big_atr_mult * atr[block]
+            else:
+                small_threshold, big_threshold = sim_kernel.window_quantiles(
+                    arrays['range'], block, lookback_period, [small_percentile / 100, big_percentile / 100]
+                )
+            signals, block_signs = sim_kernel.entry_signals(
+                arrays['range'], arrays['bullish'], arrays['close'], arrays['trend'],
+                block, small_threshold, big_threshold
+            )
+            entries.append(block[signals])
+            signs.append(block_signs)
+            invalidation_threshold.append(big_threshold[signals])
+            start = end
+            
+            scanned = np.concatenate(entries)
+            trades = sim_kernel.simulate_trades(
+                arrays, scanned, np.concatenate(signs), tp_atr_mult * atr[scanned], sl_atr_mult * atr[scanned],
+                max_bars=MAX_TRADE_BARS,
+                max_open_trades=rules.get('max_open_trades', 0),
+                invalidation_bars=rules.get('invalidation_bars', 0),
+                invalidation_threshold=np.concatenate(invalidation_threshold),
+                trail_offset=trailing_sl_points * self.point if trailing_sl_points is not None else None,
+                reachable=reachable,
+                scanned_to=idx[end] if end < len(idx) else n_bars,
+                backend=backend,
+                compiled=compiled,
+                **abort_rules
+            )
+            if trades['abort_rule'] != sim_kernel.ABORT_NONE:
+                break
+        
+        records = np.empty(len(trades['entry_idx']), dtype=TRADE_DTYPE)
+        for name in TRADE_DTYPE.names:
+            records[name] = trades[name]
+        aborted = None
+        if trades['abort_rule'] != sim_kernel.ABORT_NONE:
+            bar = trades['abort_bar']
+            aborted = {
+                'rule': sim_kernel.ABORT_NAMES[trades['abort_rule']],
+                'bar': bar,
+                'time': str(self.data.index[bar]),
+                'progress': round(bar / n_bars, 4),
+            }
+        return TradeLedger.from_records(records), aborted
+    
+    def _kernel_arrays(self) -> Dict[str, np.ndarray]:
+        """Column arrays the sim_kernel engine reads (built once, in the frame's dtypes)"""
+        arrays = getattr(self, '_kernel_columns', None)
+        if arrays is None:
+            arrays = {
+                'open': self._open, 'high': self._high, 'low': self._low, 'close': self._close,
+                'range': self.data['range'].to_numpy(),
+                'bullish': self.data['bullish'].to_numpy(dtype=bool),
+                'atr': self.data['atr_14'].to_numpy(),
+                'trend': self.data['ema_100'].to_numpy(),
+            }
+            self._kernel_columns = arrays
+        return arrays
+    
+    def check_engine_parity(self, cells: Optional[List[Dict]] = None) -> Dict[str, List[str]]:
+        """
+        Compare every sim_kernel backend with the reference loop, trade by trade.
         
-        # Calculate performance metrics
-        metrics = self.calculate_performance_metrics(trades)
-        metrics['signals'] = signals
-        metrics['trades'] = trades
+        Cells follow the analyzer's sequential and abort rules like backtest_strategy.
+        The reference loop has neither, so cells with active rules compare the numba
+        backend with the numpy backend instead, including the 'aborted' tag. The numba
+        backend's loop runs in Python when numba is not installed, so its rules are
+        checked either way. Memo and sink are bypassed.
+        
+        Args:
+            cells: backtest_strategy arguments to compare (default: a few percentile,
+                ATR and time-filtered cells, and one with every sequential rule)
         
+        Returns:
+            Backend -> list of mismatch descriptions (empty lists = parity)
+        """
+        cells = cells or [
+            {'small_percentile': 30, 'big_percentile': 80, 'tp_atr_mult': 2.0, 'sl_atr_mult': 1.0},
+            {'small_percentile': 20, 'big_percentile': 90, 'tp_atr_mult': 3.0, 'sl_atr_mult': 1.5},
+            {'small_percentile': 30, 'big_percentile': 80, 'tp_atr_mult': 1.5, 'sl_atr_mult': 1.0,
+             'use_atr': True, 'small_atr_mult': 0.5, 'big_atr_mult': 1.5},
+            {'small_percentile': 25, 'big_percentile': 75, 'tp_atr_mult': 2.0, 'sl_atr_mult': 2.0,
+             'start_hour': 8, 'end_hour': 20},
+            {'small_percentile': 30, 'big_percentile': 70, 'tp_atr_mult': 3.0, 'sl_atr_mult': 1.0,
+             'max_open_trades': 2, 'invalidation_bars': 3, 'trailing_sl_points': 300},
+        ]
+        compiled = sim_kernel.numba_available()
+        signal_args = list(inspect.signature(self._simulate_loop).parameters)[3:]
+        mismatches = {backend: [] for backend in sim_kernel.BACKENDS}
+        for cell in cells:
+            bound = inspect.signature(self.backtest_strategy).bind(**cell)
+            bound.apply_defaults()
+            args = bound.arguments
+            max_spread_points = args['max_spread_points']
+            if max_spread_points is None:
+                max_spread_points = self.max_spread_points
+            filters = self._signal_filters(args['lookback_period'], args['start_hour'], args['end_hour'], max_spread_points)
+            signal_kwargs = {name: args[name] for name in signal_args}
+            rules = self._sequential_rules(args['max_open_trades'], args['invalidation_bars'], args['trailing_sl_points'])
+            abort = self._abort_rules(args['abort_rules'], self.abort_rules)
+            backends = sim_kernel.BACKENDS
+            if rules or abort:
+                ledger, reference_aborted = self._simulate_kernel(
+                    *filters, 'numpy', rules, abort_rules=abort, **signal_kwargs
+                )
+                reference = ledger.records
+                backends = [backend for backend in backends if backend != 'numpy']
+            else:
+                reference, reference_aborted = self._simulate_loop(*filters, **signal_kwargs).records, None
+            for backend in backends:
+                ledger, aborted = self._simulate_kernel(
+                    *filters, backend, rules, abort_rules=abort, compiled=compiled, **signal_kwargs
+                )
+                records = ledger.records
+                if aborted != reference_aborted:
+                    mismatches[backend].append(f"{cell}: aborted {aborted}, reference {reference_aborted}")
+                if len(records) != len(reference):
+                    mismatches[backend].append(f"{cell}: {len(records)} trades, reference {len(reference)}")
+                    continue
+                for name in TRADE_DTYPE.names:
+                    if not np.array_equal(records[name], reference[name]):
+                        first = int(np.flatnonzero(records[name] != reference[name])[0])
+                        mismatches[backend].append(
+                            f"{cell}: {name} differs from trade {first} (entry bar {reference['entry_idx'][first]})"
+                        )
+        return mismatches
+    
+    def _run_cell(self, keep_ledger: bool = False, **kwargs) -> Dict:
+        """
+        Evaluate one sweep cell through backtest_strategy, consulting the sink and results store.
+        
+        A cell already in the sink is served from it unless its ledger is needed. With
+        skip_evaluated set, a cell already recorded for the same symbol/period is served
+        from the store (timeframe, compact mode and quotes are part of its parameters,
+        see _cell_params). Newly evaluated cells are streamed to the sink at once, and
+        queued and written in bulk to the store by _flush_records().
+        """
+        if self.results_store is None and self.sink is None:
+            return self.backtest_strategy(keep_ledger=keep_ledger, **kwargs)
+        
+        params = self._cell_params(**kwargs)
+        sink_key = self._sink_key(params)
+        if self.sink is not None and sink_key in self.sink and not keep_ledger:
+            return self.sink.get(sink_key)['metrics']
+        
+        if self.results_store is None:
+            metrics = self.backtest_strategy(keep_ledger=keep_ledger, **kwargs)
+            self._stream(sink_key, params, metrics)
+            return metrics
+        
+        if self.skip_evaluated:
+            stored = self.results_store.find_run(
+                param_hash(params), ENGINE_ANALYZER, self.run_context['symbol'],
+                self.run_context['period_start'], self.run_context['period_end']
+            )
+            if stored is not None:
+                metrics = stored['metrics']
+                if keep_ledger:
+                    metrics['ledger'] = self.results_store.load_ledger(stored['run_id'])
+                return metrics
+        
+        metrics = self.backtest_strategy(keep_ledger=keep_ledger or self.store_ledgers, **kwargs)
+        ledger = metrics['ledger'].records if self.store_ledgers else None
+        self._pending_records.append(ResultsStore.make_record(
+            ENGINE_ANALYZER, params, metrics, ledger=ledger, **self.run_context
+        ))
+        self._stream(sink_key, params, metrics)
+        if self.store_ledgers and not keep_ledger:
+            del metrics['ledger']
         return metrics
     
+    def _engine_version(self) -> str:
+        """Engine part of memo and sink keys: ENGINE_VERSION, the RESULT_SOURCES hash and compact mode"""
+        version = f"{self.ENGINE_VERSION}-{source_hash(*self.RESULT_SOURCES)}"
+        return f"{version}-f32" if self.compact else version
+    
+    def _sink_key(self, params: Dict) -> Optional[str]:
+        """Sink key of a sweep cell (None without a sink)"""
+        if self.sink is None:
+            return None
+        return config_hash(
+            params, self.data_fingerprint, ENGINE_ANALYZER, self._engine_version()
+        )
+    
+    def _stream(self, key: Optional[str], params: Dict, metrics: Dict) -> None:
+        """Append an evaluated sweep cell (without its ledger) to the sink"""
+        if self.sink is not None:
+            self.sink.append({
+                **self.run_context,
+                'params': params,
+                'metrics': {k: v for k, v in metrics.items() if k != 'ledger'},
+            }, key)
+    
+    def _cell_params(self, **kwargs) -> Dict:
+        """Full parameter set of a sweep cell as recorded in the results store"""
+        bound = inspect.signature(self.backtest_strategy).bind(**kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        params.pop('keep_ledger', None)
+        params.pop('engine', None)  # Every engine produces the same trades
+        if params['max_spread_points'] is None:
+            params['max_spread_points'] = self.max_spread_points
+        if params['max_spread_points'] is None:
+            del params['max_spread_points']  # Keeps keys of cells without a spread limit unchanged
+        # Likewise only active sequential rules are recorded
+        params.update(self._sequential_rules(*(params.pop(name) for name in SEQUENTIAL_RULES)))
+        params.update(self._abort_rules(params.pop('abort_rules'), self.abort_rules))
+        if self._custom_indicators:
+            params.update(self.indicator_settings)
+        # Settings of the analyzer that change results, so store lookups never mix them
+        if self.run_context['timeframe'] is not None:
+            params['timeframe'] = self.run_context['timeframe']
+        if self.compact:
+            params['compact'] = True
+        if 'max_spread_points' in params and self._spread is None:
+            params['quotes'] = False  # The spread limit is a no-op without quotes
+        if 'max_spread_points' in params or 'trailing_sl_points' in params:
+            params['point'] = self.point  # Both are in points of this symbol
+        return params
+    
+    def _worker_kwargs(self) -> Dict:
+        """StrategyAnalyzer arguments that make a from_shared() worker evaluate cells like this analyzer"""
+        return {
+            'symbol_spec': self.symbol_spec, 'mc_paths': self.mc_paths, 'mc_method': self.mc_method,
+            'max_spread_points': self.max_spread_points, 'trace_allocations': self.trace_allocations,
+            'engine': self.engine, 'sequential_rules': self.sequential_rules,
+            'abort_rules': self.abort_rules, 'compact': self.compact, 'run_context': self.run_context,
+        }
+    
+    def _flush_records(self) -> None:
+        """Write queued sweep cells to the results store in one transaction"""
+        if self.results_store is not None and self._pending_records:
+            self.results_store.record_runs(self._pending_records)
+            self._pending_records = []
+    
+    @staticmethod
+    def _summary_row(backtest: Dict, **params) -> Dict:
+        """Build a sweep summary row: grid parameters, rounded metrics, Monte Carlo columns"""
+        row = dict(params)
+        row.update({
+            'total_pnl': round(backtest['total_pnl'], 2),
+            'total_trades': backtest['total_trades'],
+            'win_rate': round(backtest['win_rate'], 2),
+            'profit_factor': round(backtest['profit_factor'], 2),
+            'max_drawdown': round(backtest['max_drawdown'], 2),
+            'sharpe_ratio': round(backtest['sharpe_ratio'], 2),
+            'expectancy': round(backtest['expectancy'], 2)
+        })
+        row.update(summary_fields(backtest.get('monte_carlo')))
+        if 'aborted' in backtest:
+            row['aborted'] = backtest['aborted']['rule']
+        return row
+    
+    def _summarize_resources(self, sweep: str) -> Optional[Dict]:
+        """Aggregate the resources of the backtests run since the last summary under a sweep name"""
+        summary = aggregate_resources(self._resources)
+        self._resources = []
+        if summary is not None:
+            self.sweep_resources[sweep] = summary
+            print(f"🧮 Resources ({sweep}): {format_resources(summary)}")
+        return summary
+    
+    def _rank_results(
+        self,
+        results: List[Dict],
+        ledgers: Optional[Dict] = None,
+        cell_kwargs: Optional[Dict] = None,
+        sweep: str = 'sweep'
+    ) -> pd.DataFrame:
+        """
+        Rank sweep summary rows by total P&L.
+        
+        Ledgers (when requested) are attached as df.attrs['ledgers'], keyed by the
+        row's index label so they survive the sort. cell_kwargs, the backtest_strategy
+        arguments shared by every cell, are kept in df.attrs['cell_kwargs'] so
+        robustness_surface() can evaluate cells the sweep did not cover. The
+        resources of the backtests the sweep ran (memo and sink hits excluded) are
+        aggregated into df.attrs['resources'] and self.sweep_resources[sweep].
+        """
+        df = pd.DataFrame(results)
+        df.attrs['sweep'] = sweep
+        df.attrs['resources'] = self._summarize_resources(sweep)
+        if not df.empty and 'aborted' in df.columns:
+            # Aborted cells carry partial metrics: rank them after every completed cell
+            aborted = df['aborted'].notna()
+            print(f"✂️  {int(aborted.sum())} of {len(df)} cells aborted early ({sweep})")
+            df = df.assign(_aborted=aborted).sort_values(['_aborted', 'total_pnl'], ascending=[True, False])
+            df = df.drop(columns='_aborted')
+        elif not df.empty:
+            df = df.sort_values('total_pnl', ascending=False)
+        if ledgers:
+            df.attrs['ledgers'] = ledgers
+        if cell_kwargs is not None:
+            df.attrs['cell_kwargs'] = cell_kwargs
+        return df
+    
+    def robustness_surface(
+        self,
+        results: pd.DataFrame,
+        axes: Optional[List[str]] = None,
+        fixed: Optional[Dict] = None,
+        score: str = 'total_pnl',
+        radius: int = 1,
+        fill_top: int = 10,
+        by: str = 'stability'
+    ) -> pd.DataFrame:
+        """
+        Rank a completed sweep by plateau stability instead of its single best cell.
+        
+        Cells are scored by the mean/min/dispersion of their neighbourhood (see
+        robustness.RobustnessSurface). Neighbours of the fill_top best cells that the
+        sweep did not evaluate are run through _run_cell (memo, sink and results store
+        apply) rather than re-running the grid.
+        
+        Args:
+            results: DataFrame returned by one of the sweeps
+            axes: Swept columns (default: every SWEEP_AXIS_ARGS column with more than one value)
+            fixed: backtest_strategy arguments shared by all cells (default: results.attrs['cell_kwargs'])
+            score: Column to smooth (higher is better)
+            radius: Neighbourhood half-width in grid steps
+            fill_top: Number of best cells whose missing neighbours are evaluated (0 = none)
+            by: Ranking statistic ("stability", "neighborhood_mean" or "neighborhood_min")
+        
+        Returns:
+            Sweep rows plus filled cells with neighborhood_mean, neighborhood_min,
+            neighborhood_std, coverage and stability columns, best first
+        """
+        if by not in RANKINGS:
+            raise ValueError(f"Unknown ranking '{by}'. Choose from {RANKINGS}")
+        axes = axes or [c for c in SWEEP_AXIS_ARGS if c in results.columns and results[c].nunique() > 1]
+        fixed = dict(results.attrs.get('cell_kwargs') or {}) if fixed is None else fixed
+        surface = RobustnessSurface(results, axes, score=score, radius=radius)
+        
+        def evaluate(cell: Dict) -> Dict:
+            kwargs = dict(fixed)
+            kwargs.update({SWEEP_AXIS_ARGS.get(axis, axis): value for axis, value in cell.items()})
+            return self._summary_row(self._run_cell(**kwargs))
+        
+        filled = surface.fill(evaluate, top=fill_top, by=by) if fill_top and fixed else 0
+        self._flush_records()
+        self._summarize_resources(f"{results.attrs.get('sweep', 'sweep')}_robustness")
+        ranked = surface.ranked(by)
+        
+        print(f"\n🧭 Robustness surface over {' x '.join(axes)} "
+              f"({np.count_nonzero(~np.isnan(surface.values))}/{surface.values.size} cells, {filled} filled lazily)")
+        columns = list(dict.fromkeys([*axes, score, 'neighborhood_mean', 'neighborhood_min', 'coverage', by]))
+        print(ranked[columns].head(5).to_string(index=False))
+        return ranked
+    
     def analyze_volatility_patterns(self) -> Dict:
         """Analyze volatility patterns to inform TP/SL settings"""
         print("\n" + "="*70)
@@ -790,7 +1765,7 @@ class StrategyAnalyzer:
         print(f"\nPrice Movement Statistics (1-minute intervals):")
         print(f"  Mean: ${stats['mean_move']:.2f}")
         print(f"  Median: ${stats['median_move']:.2f}")
-        print(f"  Mean ATR: ${stats['mean_atr']:.2f}")
+        print(f"  Mean ATR: ${stats['mean_atr']:.2f} ({stats['mean_atr'] / self.point:.0f} pts @ {self.point:g})")
         
         print(f"\nSuggested Take Profit levels (price movement percentiles):")
         for p, value in stats['percentiles'].items():
@@ -814,7 +1789,8 @@ class StrategyAnalyzer:
         small_atr_mult: float = 0.5,
         big_atr_mult: float = 1.5,
         start_hour: int = None,
-        end_hour: int = None
+        end_hour: int = None,
+        keep_ledgers: bool = False
     ) -> pd.DataFrame:
         """
         Optimize TP/SL ratios using ATR multipliers.
@@ -832,6 +1808,7 @@ class StrategyAnalyzer:
             big_atr_mult: Big candle ATR multiplier (if use_atr=True)
             start_hour: Start hour for time filter (None to disable)
             end_hour: End hour for time filter (None to disable)
+            keep_ledgers: If True, keep each cell's TradeLedger in df.attrs['ledgers']
         
         Returns:
             DataFrame sorted by total P&L
@@ -846,6 +1823,7 @@ class StrategyAnalyzer:
             print(f"Using percentile-based candle detection: {small_percentile}% / {big_percentile}%")
         
         results = []
+        ledgers = {}
         
         tp_multipliers = np.arange(tp_range[0], tp_range[1] + step, step)
         sl_multipliers = np.arange(sl_range[0], sl_range[1] + step, step)
@@ -859,7 +1837,7 @@ class StrategyAnalyzer:
                 print(f"Testing {test_count}/{total_tests}: TP={tp_mult:.1f}x ATR, SL={sl_mult:.1f}x ATR", end='\r')
                 
                 # Run backtest
-                backtest = self.backtest_strategy(
+                backtest = self._run_cell(
                     small_percentile=small_percentile,
                     big_percentile=big_percentile,
                     tp_atr_mult=tp_mult,
@@ -868,25 +1846,26 @@ class StrategyAnalyzer:
                     small_atr_mult=small_atr_mult,
                     big_atr_mult=big_atr_mult,
                     start_hour=start_hour,
-                    end_hour=end_hour
+                    end_hour=end_hour,
+                    keep_ledger=keep_ledgers
                 )
                 
-                results.append({
-                    'tp_multiplier': round(tp_mult, 2),
-                    'sl_multiplier': round(sl_mult, 2),
-                    'risk_reward_ratio': round(tp_mult / sl_mult, 2),
-                    'total_pnl': round(backtest['total_pnl'], 2),
-                    'total_trades': backtest['total_trades'],
-                    'win_rate': round(backtest['win_rate'], 2),
-                    'profit_factor': round(backtest['profit_factor'], 2),
-                    'max_drawdown': round(backtest['max_drawdown'], 2),
-                    'sharpe_ratio': round(backtest['sharpe_ratio'], 2),
-                    'expectancy': round(backtest['expectancy'], 2)
-                })
+                results.append(self._summary_row(
+                    backtest,
+                    tp_multiplier=round(tp_mult, 2),
+                    sl_multiplier=round(sl_mult, 2),
+                    risk_reward_ratio=round(tp_mult / sl_mult, 2)
+                ))
+                if keep_ledgers:
+                    ledgers[len(results) - 1] = backtest['ledger']
         
         print()  # New line after progress
-        df = pd.DataFrame(results)
-        df = df.sort_values('total_pnl', ascending=False)
+        self._flush_records()
+        df = self._rank_results(results, ledgers, cell_kwargs={
+            'small_percentile': small_percentile, 'big_percentile': big_percentile, 'use_atr': use_atr,
+            'small_atr_mult': small_atr_mult, 'big_atr_mult': big_atr_mult,
+            'start_hour': start_hour, 'end_hour': end_hour,
+        }, sweep='tp_sl')
         
         print(f"\n✅ Tested {len(df)} TP/SL combinations")
         print("\nTop 10 Configurations by Total P&L:")
@@ -894,6 +1873,125 @@ class StrategyAnalyzer:
         
         return df
     
+    def optimize_indicator_variants(
+        self,
+        atr_periods: List[int] = (14, 20),
+        ma_periods: List[int] = (50, 100, 200),
+        ma_methods: List[str] = ('ema', 'sma'),
+        small_percentile: int = 30,
+        big_percentile: int = 80,
+        tp_range: Tuple[float, float] = (1.0, 3.0),
+        sl_range: Tuple[float, float] = (0.5, 2.0),
+        step: float = 0.5,
+        use_atr: bool = False,
+        small_atr_mult: float = 0.5,
+        big_atr_mult: float = 1.5,
+        start_hour: int = None,
+        end_hour: int = None,
+        workers: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Sweep indicator settings (ATR period, trend MA period/method) x TP/SL in parallel.
+        
+        Every indicator variant the grid needs is computed once and published in shared
+        memory; worker processes attach to it by name (see shared_indicators) instead of
+        receiving pickled copies of the data.
+        
+        Args:
+            atr_periods: ATR windows to test
+            ma_periods: Trend filter moving average periods to test
+            ma_methods: Trend filter moving average types ("ema", "sma")
+            small_percentile: Small candle percentile to use (if use_atr=False)
+            big_percentile: Big candle percentile to use (if use_atr=False)
+            tp_range: Range of TP multipliers (min, max)
+            sl_range: Range of SL multipliers (min, max)
+            step: Step size for TP/SL
+            use_atr: If True, use ATR multipliers for candle detection instead of percentiles
+            small_atr_mult: Small candle ATR multiplier (if use_atr=True)
+            big_atr_mult: Big candle ATR multiplier (if use_atr=True)
+            start_hour: Start hour for time filter (None to disable)
+            end_hour: End hour for time filter (None to disable)
+            workers: Worker processes (default: CPU count)
+        
+        Returns:
+            DataFrame sorted by total P&L
+        """
+        print("\n" + "="*70)
+        print("OPTIMIZING INDICATOR SETTINGS (PARALLEL)")
+        print("="*70)
+        
+        tp_multipliers = np.arange(tp_range[0], tp_range[1] + step, step)
+        sl_multipliers = np.arange(sl_range[0], sl_range[1] + step, step)
+        settings_grid = [
+            {'atr_period': int(atr_period), 'ma_period': int(ma_period), 'ma_method': ma_method}
+            for atr_period in atr_periods for ma_period in ma_periods for ma_method in ma_methods
+        ]
+        # Tasks are ordered by indicator settings so each worker mostly reuses one attached analyzer
+        tasks = [
+            (settings, {
+                'small_percentile': small_percentile,
+                'big_percentile': big_percentile,
+                'tp_atr_mult': float(tp_mult),
+                'sl_atr_mult': float(sl_mult),
+                'use_atr': use_atr,
+                'small_atr_mult': small_atr_mult,
+                'big_atr_mult': big_atr_mult,
+                'start_hour': start_hour,
+                'end_hour': end_hour,
+            })
+            for settings in settings_grid for tp_mult in tp_multipliers for sl_mult in sl_multipliers
+        ]
+        workers = workers or os.cpu_count() or 1
+        cell_params = [dict(self._cell_params(**cell), **settings) for settings, cell in tasks]
+        
+        # Cells already in the sink are served from it; the rest are streamed as they finish
+        keys = [self._sink_key(params) for params in cell_params]
+        outcomes = [
+            self.sink.get(key)['metrics'] if self.sink is not None and key in self.sink else None for key in keys
+        ]
+        pending = [i for i, backtest in enumerate(outcomes) if backtest is None]
+        if len(pending) < len(tasks):
+            print(f"Resuming: {len(tasks) - len(pending)} cells already in {self.sink.path}")
+        
+        variants = indicator_variants(atr_periods, ma_periods, ma_methods)
+        if pending:
+            with SharedIndicatorStore(self.data, variants, fingerprint=self.data_fingerprint) as shared:
+                print(f"Published {len(variants)} indicator variants ({shared.nbytes / 1024 ** 2:.1f} MB shared); "
+                      f"{len(pending)} cells on {workers} workers")
+                with ProcessPoolExecutor(
+                    max_workers=workers, initializer=_sweep_worker_init,
+                    initargs=(shared.manifest, self._worker_kwargs())
+                ) as pool:
+                    chunksize = max(1, len(pending) // (workers * 4))
+                    runs = pool.map(_sweep_worker_run, [tasks[i] for i in pending], chunksize=chunksize)
+                    for i, backtest in zip(pending, runs):
+                        outcomes[i] = backtest
+                        self._stream(keys[i], cell_params[i], backtest)
+        
+        results = []
+        for (settings, cell), params, backtest in zip(tasks, cell_params, outcomes):
+            results.append(self._summary_row(
+                backtest,
+                **settings,
+                tp_multiplier=round(cell['tp_atr_mult'], 2),
+                sl_multiplier=round(cell['sl_atr_mult'], 2)
+            ))
+            if self.results_store is not None:
+                self._pending_records.append(ResultsStore.make_record(
+                    ENGINE_ANALYZER, params, backtest, **self.run_context
+                ))
+        
+        self._flush_records()
+        # Cells ran in the workers: collect their resources blocks here
+        self._resources.extend(outcomes[i].get('resources') for i in pending)
+        df = self._rank_results(results, sweep='indicators')
+        
+        print(f"\n✅ Tested {len(df)} indicator/TP/SL combinations")
+        print("\nTop 10 Configurations by Total P&L:")
+        print(df.head(10).to_string(index=False))
+        
+        return df
+    
     def optimize_candle_sizes_with_profitability(
         self,
         tp_atr_mult: float = 2.0,
@@ -906,7 +2004,8 @@ class StrategyAnalyzer:
         atr_big_range: Tuple[float, float] = (1.0, 2.5),
         atr_step: float = 0.1,
         start_hour: int = None,
-        end_hour: int = None
+        end_hour: int = None,
+        keep_ledgers: bool = False
     ) -> pd.DataFrame:
         """
         Find which candle size thresholds generate the highest profit.
@@ -926,6 +2025,7 @@ class StrategyAnalyzer:
             atr_step: Step size for ATR multiplier testing
             start_hour: Start hour for time filter (None to disable)
             end_hour: End hour for time filter (None to disable)
+            keep_ledgers: If True, keep each cell's TradeLedger in df.attrs['ledgers']
         
         Returns:
             DataFrame sorted by profitability
@@ -941,6 +2041,7 @@ class StrategyAnalyzer:
             print(f"Optimizing percentile-based candle detection")
         
         results = []
+        ledgers = {}
         
         if use_atr:
             # Test ATR multipliers
@@ -956,7 +2057,7 @@ class StrategyAnalyzer:
                     print(f"Testing {test_count}/{total_tests}: Small={small_m:.2f}x, Big={big_m:.2f}x ATR", end='\r')
                     
                     # Run backtest with ATR-based detection
-                    backtest = self.backtest_strategy(
+                    backtest = self._run_cell(
                         small_percentile=30,  # Not used when use_atr=True
                         big_percentile=80,    # Not used when use_atr=True
                         tp_atr_mult=tp_atr_mult,
@@ -965,20 +2066,17 @@ class StrategyAnalyzer:
                         small_atr_mult=small_m,
                         big_atr_mult=big_m,
                         start_hour=start_hour,
-                        end_hour=end_hour
+                        end_hour=end_hour,
+                        keep_ledger=keep_ledgers
                     )
                     
-                    results.append({
-                        'small_atr_multiplier': round(small_m, 2),
-                        'big_atr_multiplier': round(big_m, 2),
-                        'total_pnl': round(backtest['total_pnl'], 2),
-                        'total_trades': backtest['total_trades'],
-                        'win_rate': round(backtest['win_rate'], 2),
-                        'profit_factor': round(backtest['profit_factor'], 2),
-                        'max_drawdown': round(backtest['max_drawdown'], 2),
-                        'expectancy': round(backtest['expectancy'], 2),
-                        'sharpe_ratio': round(backtest['sharpe_ratio'], 2)
-                    })
+                    results.append(self._summary_row(
+                        backtest,
+                        small_atr_multiplier=round(small_m, 2),
+                        big_atr_multiplier=round(big_m, 2)
+                    ))
+                    if keep_ledgers:
+                        ledgers[len(results) - 1] = backtest['ledger']
         else:
             # Test percentiles
             small_percentiles = range(small_range[0], small_range[1] + 1, step)
@@ -993,31 +2091,34 @@ class StrategyAnalyzer:
                     print(f"Testing {test_count}/{total_tests}: Small={small_p}%, Big={big_p}%", end='\r')
                     
                     # Run backtest with percentile-based detection
-                    backtest = self.backtest_strategy(
+                    backtest = self._run_cell(
                         small_percentile=small_p,
                         big_percentile=big_p,
                         tp_atr_mult=tp_atr_mult,
                         sl_atr_mult=sl_atr_mult,
                         use_atr=False,
                         start_hour=start_hour,
-                        end_hour=end_hour
+                        end_hour=end_hour,
+                        keep_ledger=keep_ledgers
                     )
                     
-                    results.append({
-                        'small_percentile': small_p,
-                        'big_percentile': big_p,
-                        'total_pnl': round(backtest['total_pnl'], 2),
-                        'total_trades': backtest['total_trades'],
-                        'win_rate': round(backtest['win_rate'], 2),
-                        'profit_factor': round(backtest['profit_factor'], 2),
-                        'max_drawdown': round(backtest['max_drawdown'], 2),
-                        'expectancy': round(backtest['expectancy'], 2),
-                        'sharpe_ratio': round(backtest['sharpe_ratio'], 2)
-                    })
+                    results.append(self._summary_row(
+                        backtest,
+                        small_percentile=small_p,
+                        big_percentile=big_p
+                    ))
+                    if keep_ledgers:
+                        ledgers[len(results) - 1] = backtest['ledger']
         
         print()  # New line
-        df = pd.DataFrame(results)
-        df = df.sort_values('total_pnl', ascending=False)
+        self._flush_records()
+        cell_kwargs = {
+            'tp_atr_mult': tp_atr_mult, 'sl_atr_mult': sl_atr_mult, 'use_atr': use_atr,
+            'start_hour': start_hour, 'end_hour': end_hour,
+        }
+        if use_atr:
+            cell_kwargs.update(small_percentile=30, big_percentile=80)
+        df = self._rank_results(results, ledgers, cell_kwargs=cell_kwargs, sweep='candle_profitability')
         
         print(f"\n✅ Tested {len(df)} candle size combinations")
         print("\nTop 10 Most Profitable Candle Size Configs:")
@@ -1091,7 +2192,8 @@ class StrategyAnalyzer:
             small_atr_mult=small_atr_mult,
             big_atr_mult=big_atr_mult,
             start_hour=start_hour,
-            end_hour=end_hour
+            end_hour=end_hour,
+            keep_ledger=False
         )
         
         for spacing in grid_spacings:
@@ -1114,6 +2216,7 @@ class StrategyAnalyzer:
         
         print()  # New line
         df = pd.DataFrame(results)
+        df.attrs['resources'] = self._summarize_resources('grid')
         
         print(f"\n✅ Generated {len(df)} grid configurations")
         print("\n⚠️  NOTE: This is a SIMPLIFIED grid analysis (baseline only)")
@@ -1169,6 +2272,10 @@ class StrategyAnalyzer:
                 'mean_atr': vol_stats['mean_atr'],
                 'suggested_tp': vol_stats['percentiles'][70],  # 70th percentile of moves
                 'suggested_sl': vol_stats['mean_atr'] * 1.5,  # 1.5x ATR
+                # Same distances in points, for TAKE_PROFIT_POINTS / POSITION_SL_POINTS
+                'point': self.point,
+                'suggested_tp_points': vol_stats['percentiles'][70] / self.point,
+                'suggested_sl_points': vol_stats['mean_atr'] * 1.5 / self.point,
             },
             'market_stats': {
                 'candles_analyzed': len(self.data),
@@ -1181,6 +2288,233 @@ class StrategyAnalyzer:
         return recommendations
 
 
+# Per-process state of optimize_indicator_variants workers
+_SWEEP_WORKER = {}
+
+
+def _sweep_worker_init(manifest: Dict, analyzer_kwargs: Optional[Dict] = None) -> None:
+    """Worker initializer: remember the shared block; analyzers are attached lazily"""
+    _SWEEP_WORKER['manifest'] = manifest
+    _SWEEP_WORKER['analyzer_kwargs'] = analyzer_kwargs or {}
+    _SWEEP_WORKER['analyzers'] = {}
+
+
+def _sweep_worker_run(task: Tuple[Dict, Dict]) -> Dict:
+    """Evaluate one (indicator settings, backtest kwargs) cell in a worker"""
+    settings, cell = task
+    key = (settings['atr_period'], settings['ma_period'], settings['ma_method'])
+    analyzer = _SWEEP_WORKER['analyzers'].get(key)
+    if analyzer is None:
+        analyzer = StrategyAnalyzer.from_shared(
+            _SWEEP_WORKER['manifest'], **settings, **_SWEEP_WORKER['analyzer_kwargs']
+        )
+        _SWEEP_WORKER['analyzers'][key] = analyzer
+    return analyzer.backtest_strategy(keep_ledger=False, **cell)
+
+
+def load_bars(
+    api_key: str,
+    symbol: str,
+    asset_class: str,
+    start: str,
+    end: str,
+    timeframe_minutes: int = 1,
+    quotes: bool = False,
+    bar_cache: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Download minute bars (through the bar cache when given) and aggregate them to the timeframe.
+    
+    Args:
+        api_key: Polygon.io API key
+        symbol: Symbol as given on the command line (e.g. XAUUSD)
+        asset_class: Polygon asset class
+        start: First date (YYYY-MM-DD)
+        end: Last date (YYYY-MM-DD)
+        timeframe_minutes: Bar length to aggregate to
+        quotes: Attach each bar's closing bid/ask quote
+        bar_cache: BarStore directory, None to always download
+    
+    Returns:
+        OHLCV DataFrame (plus bid/ask with quotes)
+    """
+    downloader = PolygonDataDownloader(api_key)
+    def download() -> pd.DataFrame:
+        bars = downloader.download_data(symbol, start, end, asset_class)
+        if quotes:
+            bars = attach_quotes(bars, downloader.download_quotes(symbol, start, end, asset_class))
+        return bars
+    
+    session = session_spec(lookup_symbol_spec(symbol))
+    if bar_cache:
+        bar_store = BarStore(bar_cache)
+        key = BarStore.dataset_key(f"{asset_class}:{symbol.upper()}", start, end, "1", "minute")
+        if quotes:
+            key += "_quotes"
+        cacheable = end < datetime.now().strftime('%Y-%m-%d')
+        if key in bar_store:
+            print(f"📦 Loaded {symbol.upper()} minute bars from {bar_cache}")
+        data = bar_store.get_or_fetch(key, download, cache=cacheable)
+        if timeframe_minutes > 1 and cacheable:
+            data = bar_store.resampled(key, timeframe_minutes, session)
+        elif timeframe_minutes > 1:
+            data = resample_bars(data, timeframe_minutes, session)
+    else:
+        data = download()
+        if timeframe_minutes > 1:
+            data = resample_bars(data, timeframe_minutes, session)
+    if timeframe_minutes > 1:
+        print(f"🧱 Aggregated to {len(data)} {timeframe_minutes}-minute bars")
+    return data
+
+
+class QueueAnalyzerWorker:
+    """Runs strategy_optimizer queue jobs, keeping the analyzer of the last few datasets"""
+    
+    def __init__(
+        self,
+        api_key: str,
+        bar_cache: Optional[str] = None,
+        memo: Optional[ResultMemo] = None,
+        max_analyzers: int = 2
+    ):
+        """
+        Args:
+            api_key: Polygon.io API key for downloads
+            bar_cache: BarStore directory shared with other runs (e.g. on the shared filesystem)
+            memo: ResultMemo shared by all jobs (default: one in-process LRU)
+            max_analyzers: Analyzers (one per dataset and settings) kept in memory
+        """
+        self.api_key = api_key
+        self.bar_cache = bar_cache
+        self.memo = memo if memo is not None else ResultMemo()
+        self.max_analyzers = max_analyzers
+        self._analyzers = {}
+    
+    def _analyzer(self, job: Dict) -> StrategyAnalyzer:
+        key = param_hash({k: v for k, v in job.items() if k != 'cell'})
+        analyzer = self._analyzers.pop(key, None)
+        if analyzer is None:
+            data = load_bars(
+                self.api_key, job['symbol'], job['asset_class'], job['start'], job['end'],
+                job['timeframe_minutes'], quotes=job['quotes'], bar_cache=self.bar_cache
+            )
+            analyzer = StrategyAnalyzer(
+                data,
+                run_context={
+                    'symbol': job['symbol'].upper(),
+                    'period_start': job['start'],
+                    'period_end': job['end'],
+                    'timeframe': f"{job['timeframe_minutes']}minute",
+                },
+                memo=self.memo,
+                symbol_spec=lookup_symbol_spec(job['symbol']),
+                **job['analyzer']
+            )
+        self._analyzers[key] = analyzer  # Most recently used last
+        while len(self._analyzers) > self.max_analyzers:
+            self._analyzers.pop(next(iter(self._analyzers)))
+        return analyzer
+    
+    def run_job(self, job: Dict) -> Dict:
+        """Backtest one queued cell; returns its recorded parameters and metrics"""
+        analyzer = self._analyzer(job)
+        metrics = analyzer.backtest_strategy(keep_ledger=False, **job['cell'])
+        return {'params': analyzer._cell_params(**job['cell']), 'metrics': metrics}
+
+
+def _main_queue(args, asset_class: str, analyzer_settings: Dict) -> None:
+    """--queue-db branch of main(): enqueue sweep cells, work on them, or collect their results"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')  # Queue progress is logged by job_queue
+    queue = queue_from_args(args)
+    
+    if args.queue_worker:
+        memo = ResultMemo(args.memo_dir, max_bytes=int(args.memo_max_mb * 1024 * 1024)) if args.memo_dir else None
+        worker = QueueAnalyzerWorker(args.api_key, bar_cache=args.bar_cache, memo=memo)
+        run_worker(queue, worker.run_job, idle_timeout=args.queue_idle_timeout)
+        queue.close()
+        return
+    
+    if args.enqueue:
+        if args.queue_grid and os.path.exists(args.queue_grid):
+            with open(args.queue_grid) as f:
+                grid = json.load(f)
+        elif args.queue_grid:
+            grid = json.loads(args.queue_grid)
+        else:
+            grid = {
+                'small_percentile': list(range(10, 41, 5)), 'big_percentile': list(range(70, 96, 5)),
+                'tp_atr_mult': 2.0, 'sl_atr_mult': 1.0,
+                'start_hour': args.start_hour, 'end_hour': args.end_hour,
+            }
+        cells = grid_combinations(grid)
+        accepted = inspect.signature(StrategyAnalyzer.backtest_strategy).parameters
+        unknown = sorted(set(grid) - set(accepted) | ({'keep_ledger', 'engine'} & set(grid)))
+        if unknown:
+            raise SystemExit(f"❌ --queue-grid: unknown backtest_strategy arguments {unknown}")
+        missing = [
+            name for name, param in accepted.items()
+            if name != 'self' and param.default is inspect.Parameter.empty and name not in grid
+        ]
+        if missing:
+            raise SystemExit(f"❌ --queue-grid: missing backtest_strategy arguments {missing}")
+        periods = load_periods(args.periods, args.start, args.end)
+        jobs = [
+            {
+                'symbol': args.symbol.upper(), 'asset_class': asset_class, 'start': start, 'end': end,
+                'timeframe_minutes': args.timeframe_minutes, 'quotes': args.quotes,
+                'analyzer': analyzer_settings, 'cell': cell,
+            }
+            for start, end in periods
+            for cell in cells
+        ]
+        added, existing = queue.enqueue(jobs)
+        print(f"📬 Enqueued {added} job(s) on '{args.queue_name}' in {args.queue_db} "
+              f"({len(cells)} cells x {len(periods)} period(s); {existing} already queued)")
+        queue.close()
+        return
+    
+    # --queue-wait: rank every finished cell once the queue has drained
+    queue.wait()
+    finished = queue.results()
+    queue.close()
+    results_store = ResultsStore(args.results_db) if args.results_db else None
+    rows, records = [], []
+    for job in finished:
+        payload = job['payload']
+        if job['status'] != 'done':
+            print(f"❌ {payload['symbol']} {payload['start']}..{payload['end']} {payload['cell']}: "
+                  f"failed after {job['attempts']} attempt(s): {job['error']}")
+            continue
+        metrics = job['result']['metrics']
+        rows.append({
+            'symbol': payload['symbol'], 'period_start': payload['start'], 'period_end': payload['end'],
+            **StrategyAnalyzer._summary_row(metrics, **payload['cell']),
+        })
+        if results_store is not None:
+            records.append(ResultsStore.make_record(
+                ENGINE_ANALYZER, job['result']['params'], metrics, symbol=payload['symbol'],
+                period_start=payload['start'], period_end=payload['end'],
+                timeframe=f"{payload['timeframe_minutes']}minute"
+            ))
+    df = pd.DataFrame(rows)
+    if not df.empty:
+        df = df.sort_values('total_pnl', ascending=False)
+        print("\nTop 10 queued cells by profitability:")
+        print(df.head(10).to_string(index=False))
+    resources = aggregate_resources(job['result']['metrics'].get('resources') for job in finished if job['status'] == 'done')
+    if resources:
+        print(f"🧮 Resources (workers): {format_resources(resources)}")
+    if results_store is not None:
+        results_store.record_runs(records)
+        results_store.close()
+        print(f"🗄️  Recorded {len(records)} cells in {args.results_db}")
+    with open(args.output, 'w') as f:
+        json.dump({'queue': args.queue_name, 'queue_results': df.to_dict('records'), 'resources': resources},
+                  f, indent=2, default=str)
+    print(f"💾 {len(df)} queued cells saved to {args.output}")
+
+
 def main():
     """Main execution function"""
     parser = argparse.ArgumentParser(
@@ -1189,8 +2523,8 @@ def main():
     parser.add_argument(
         '--api-key',
         type=str,
-        required=True,
-        help='Polygon.io API key'
+        default=None,
+        help='Polygon.io API key (required unless the run only enqueues or collects queue jobs)'
     )
     parser.add_argument(
         '--symbol',
@@ -1207,14 +2541,14 @@ def main():
     parser.add_argument(
         '--start',
         type=str,
-        required=True,
-        help='Start date in YYYY-MM-DD format'
+        default=None,
+        help='Start date in YYYY-MM-DD format (required except for queue workers and --queue-wait)'
     )
     parser.add_argument(
         '--end',
         type=str,
-        required=True,
-        help='End date in YYYY-MM-DD format'
+        default=None,
+        help='End date in YYYY-MM-DD format (required except for queue workers and --queue-wait)'
     )
     parser.add_argument(
         '--optimize-percentile',
@@ -1311,9 +2645,224 @@ def main():
         default=0.5,
         help='Step size for TP/SL optimization (default: 0.5). Use 0.1 for finer granularity'
     )
+    parser.add_argument(
+        '--results-db',
+        type=str,
+        default=None,
+        help='SQLite results store to record every sweep cell in (e.g. results.db)'
+    )
+    parser.add_argument(
+        '--skip-evaluated',
+        action='store_true',
+        help='Reuse sweep cells already recorded in --results-db for this symbol/period instead of re-running them'
+    )
+    parser.add_argument(
+        '--store-ledgers',
+        action='store_true',
+        help='Also store each sweep cell\'s trade ledger in --results-db'
+    )
+    parser.add_argument(
+        '--robustness',
+        action='store_true',
+        help='Also rank each sweep by neighbourhood (plateau) stability; missing neighbours of the best cells are evaluated'
+    )
+    parser.add_argument(
+        '--robustness-fill',
+        type=int,
+        default=10,
+        help='Best cells whose missing neighbours --robustness evaluates (default: 10; 0 = smooth the sweep only)'
+    )
+    parser.add_argument(
+        '--mc-paths',
+        type=int,
+        default=MC_SWEEP_PATHS,
+        help=f'Monte Carlo paths resampled from each cell\'s trades for the mc_* columns (default: {MC_SWEEP_PATHS}; 0 disables)'
+    )
+    parser.add_argument(
+        '--mc-method',
+        type=str,
+        default='bootstrap',
+        choices=MC_METHODS,
+        help='Monte Carlo resampling: bootstrap (with replacement) or permute (reorder) (default: bootstrap)'
+    )
+    parser.add_argument(
+        '--results-jsonl',
+        type=str,
+        default=None,
+        help='Stream every sweep cell to this JSONL file as it completes; rerun with the same file to resume'
+    )
+    parser.add_argument(
+        '--optimize-indicators',
+        action='store_true',
+        help='Sweep ATR period, trend MA period/method and TP/SL in parallel over shared-memory indicators'
+    )
+    parser.add_argument(
+        '--atr-periods',
+        type=str,
+        default='14,20',
+        help='Comma-separated ATR periods for --optimize-indicators (default: 14,20)'
+    )
+    parser.add_argument(
+        '--ma-periods',
+        type=str,
+        default='50,100,200',
+        help='Comma-separated trend MA periods for --optimize-indicators (default: 50,100,200)'
+    )
+    parser.add_argument(
+        '--ma-methods',
+        type=str,
+        default='ema,sma',
+        help='Comma-separated trend MA types for --optimize-indicators (default: ema,sma)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes for --optimize-indicators (default: CPU count)'
+    )
+    parser.add_argument(
+        '--compact',
+        action='store_true',
+        help='Keep bars and indicators as float32 and skip unused indicator columns (lower memory)'
+    )
+    parser.add_argument(
+        '--memo-dir',
+        type=str,
+        default=None,
+        help='Directory for the on-disk result memo (identical cells on identical data are not re-run)'
+    )
+    parser.add_argument(
+        '--memo-max-mb',
+        type=float,
+        default=512.0,
+        help='Size limit of --memo-dir in MB; least recently used entries are evicted (default: 512)'
+    )
+    parser.add_argument(
+        '--bar-cache',
+        type=str,
+        default=None,
+        help='Directory caching downloaded minute bars (and timeframes derived from them)'
+    )
+    parser.add_argument(
+        '--trace-allocations',
+        action='store_true',
+        help='Record the top tracemalloc allocation sites of every backtest (slower sweeps)'
+    )
+    parser.add_argument(
+        '--quotes',
+        action='store_true',
+        help='Also download bid/ask quotes; every bar carries its closing quote (cached with --bar-cache)'
+    )
+    parser.add_argument(
+        '--max-spread-points',
+        type=float,
+        default=None,
+        help='Skip signals whose entry bar was quoted wider than this many points (needs --quotes)'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='auto',
+        help='Backtest engine: loop (reference pandas loop), numpy or numba (compiled, needs numba); '
+             'auto picks numba if installed, else numpy (default: auto)'
+    )
+    parser.add_argument(
+        '--check-engines',
+        action='store_true',
+        help='Compare the numpy and numba engines with the reference loop trade by trade on the data, then exit'
+    )
+    parser.add_argument(
+        '--max-open-trades',
+        type=int,
+        default=0,
+        help='Skip signals while this many simulated trades are open, like MAX_OPEN_TRADES (default: 0 = unlimited)'
+    )
+    parser.add_argument(
+        '--invalidation-bars',
+        type=int,
+        default=0,
+        help='Exit when a big candle closes against the trade within this many bars of the entry (default: 0 = off)'
+    )
+    parser.add_argument(
+        '--trailing-sl-points',
+        type=float,
+        default=None,
+        help='Trailing stop this many points behind the best close, like TRAILING_POSITION_SL_POINTS (default: off)'
+    )
+    parser.add_argument(
+        '--abort-max-drawdown',
+        type=float,
+        default=None,
+        help='Sweep pruning: stop a backtest once its drawdown exceeds this (price units, like max_drawdown)'
+    )
+    parser.add_argument(
+        '--abort-min-trades',
+        type=int,
+        nargs=2,
+        default=None,
+        metavar=('TRADES', 'BAR'),
+        help='Sweep pruning: stop a backtest that entered fewer than TRADES trades before bar BAR'
+    )
+    parser.add_argument(
+        '--abort-min-pnl',
+        type=float,
+        default=None,
+        help='Sweep pruning: stop a backtest once its total P&L can no longer reach this (e.g. 0)'
+    )
+    parser.add_argument(
+        '--timeframe-minutes',
+        type=int,
+        default=1,
+        help='Analyze N-minute bars aggregated from the 1-minute download (default: 1)'
+    )
+    add_queue_arguments(parser)
+    parser.add_argument(
+        '--queue-grid',
+        type=str,
+        default=None,
+        help='With --enqueue: JSON (or JSON file) of backtest_strategy arguments -> values to enqueue, '
+             'e.g. \'{"small_percentile": [20, 30], "big_percentile": [80, 90], "tp_atr_mult": 2.0, "sl_atr_mult": 1.0}\' '
+             '(default: the percentile sweep grid)'
+    )
     
     args = parser.parse_args()
     
+    queue_role = args.enqueue or args.queue_worker or args.queue_wait
+    if bool(args.queue_db) != bool(queue_role):
+        parser.error("--queue-db needs one of --enqueue, --queue-worker or --queue-wait (and they need --queue-db)")
+    if (args.periods or args.queue_grid) and not args.enqueue:
+        parser.error("--periods and --queue-grid are only used with --enqueue")
+    if not args.api_key and not (args.enqueue or args.queue_wait):
+        parser.error("--api-key is required")
+    if not (args.start and args.end) and not (args.queue_worker or args.queue_wait or (args.enqueue and args.periods)):
+        parser.error("--start and --end are required")
+    
+    if (args.skip_evaluated or args.store_ledgers) and not args.results_db:
+        parser.error("--skip-evaluated and --store-ledgers require --results-db")
+    if args.timeframe_minutes < 1:
+        parser.error("--timeframe-minutes must be at least 1")
+    if args.max_spread_points is not None and not args.quotes:
+        parser.error("--max-spread-points needs --quotes (bars carry no bid/ask otherwise)")
+    sequential_rules = {
+        'max_open_trades': args.max_open_trades,
+        'invalidation_bars': args.invalidation_bars,
+        'trailing_sl_points': args.trailing_sl_points,
+    }
+    if args.engine == 'loop' and sequential_rules != SEQUENTIAL_RULES:
+        parser.error("--max-open-trades, --invalidation-bars and --trailing-sl-points need --engine numpy/numba/auto")
+    abort_rules = {
+        'abort_max_drawdown': args.abort_max_drawdown,
+        'abort_min_trades': args.abort_min_trades[0] if args.abort_min_trades else 0,
+        'abort_min_trades_bar': args.abort_min_trades[1] if args.abort_min_trades else 0,
+        'abort_min_pnl': args.abort_min_pnl,
+    }
+    if args.abort_min_trades and min(args.abort_min_trades) < 1:
+        parser.error("--abort-min-trades needs a positive trade count and bar")
+    if args.engine == 'loop' and abort_rules != ABORT_RULES:
+        parser.error("--abort-* rules need --engine numpy/numba/auto")
+    if args.engine == 'numba' and not sim_kernel.numba_available():
+        parser.error("--engine numba needs numba installed (pip install numba)")
+    
     # Validate time filter arguments
     if (args.start_hour is not None and args.end_hour is None) or (args.start_hour is None and args.end_hour is not None):
         parser.error("--start-hour and --end-hour must be used together or not at all")
@@ -1341,12 +2890,71 @@ def main():
         print("💡 Detected XAUUSD symbol. Automatically setting asset class to 'forex'.")
         asset_class = 'forex'
     
-    # Download data
-    downloader = PolygonDataDownloader(args.api_key)
-    data = downloader.download_data(args.symbol, args.start, args.end, asset_class)
+    # Settings every queue job carries to the analyzer its worker builds
+    analyzer_settings = {
+        'compact': args.compact,
+        'mc_paths': args.mc_paths,
+        'mc_method': args.mc_method,
+        'max_spread_points': args.max_spread_points,
+        'trace_allocations': args.trace_allocations,
+        'engine': args.engine,
+        'sequential_rules': sequential_rules,
+        'abort_rules': abort_rules,
+    }
+    if args.queue_db:
+        _main_queue(args, asset_class, analyzer_settings)
+        return
+    
+    # Download data (minute bars; other timeframes are aggregated from them)
+    data = load_bars(
+        args.api_key, args.symbol, asset_class, args.start, args.end,
+        args.timeframe_minutes, quotes=args.quotes, bar_cache=args.bar_cache
+    )
     
     # Analyze data
-    analyzer = StrategyAnalyzer(data)
+    results_store = ResultsStore(args.results_db) if args.results_db else None
+    sink = ResultSink(args.results_jsonl) if args.results_jsonl else None
+    if sink is not None and len(sink):
+        print(f"📜 Resuming {args.results_jsonl}: {len(sink)} sweep cells already streamed")
+    analyzer = StrategyAnalyzer(
+        data,
+        results_store=results_store,
+        run_context={
+            'symbol': args.symbol.upper(),
+            'period_start': args.start,
+            'period_end': args.end,
+            'timeframe': f'{args.timeframe_minutes}minute'
+        },
+        skip_evaluated=args.skip_evaluated,
+        store_ledgers=args.store_ledgers,
+        memo=ResultMemo(args.memo_dir, max_bytes=int(args.memo_max_mb * 1024 * 1024)) if args.memo_dir else None,
+        compact=args.compact,
+        symbol_spec=lookup_symbol_spec(args.symbol),
+        sink=sink,
+        mc_paths=args.mc_paths,
+        mc_method=args.mc_method,
+        max_spread_points=args.max_spread_points,
+        trace_allocations=args.trace_allocations,
+        engine=args.engine,
+        sequential_rules=sequential_rules,
+        abort_rules=abort_rules
+    )
+    if args.max_spread_points is not None:
+        print(f"📏 Spread filter: entry bars quoted wider than {args.max_spread_points:g} points are skipped")
+    print(f"⚙️  Backtest engine: {analyzer.engine}")
+    
+    if args.check_engines:
+        mismatches = analyzer.check_engine_parity()
+        for backend, problems in mismatches.items():
+            if backend == 'numba' and not sim_kernel.numba_available():
+                backend = 'numba (loop run in Python: numba not installed)'
+            if problems:
+                print(f"❌ {backend}: {len(problems)} mismatches")
+                for problem in problems:
+                    print(f"   {problem}")
+            else:
+                print(f"✅ {backend}: identical trades to the reference loop (numpy backend for cells with rules)")
+        raise SystemExit(1 if any(mismatches.values()) else 0)
     
     # Generate recommendations
     recommendations = analyzer.generate_recommendations()
@@ -1369,6 +2977,10 @@ def main():
             end_hour=args.end_hour
         )
         results['percentile_optimization'] = percentile_results.to_dict('records')
+        if args.robustness:
+            results['percentile_robustness'] = analyzer.robustness_surface(
+                percentile_results, fill_top=args.robustness_fill
+            ).head(20).to_dict('records')
         
         # Update recommendation with best result
         best = percentile_results.iloc[0]
@@ -1387,6 +2999,10 @@ def main():
             end_hour=args.end_hour
         )
         results['atr_optimization'] = atr_results.to_dict('records')
+        if args.robustness:
+            results['atr_robustness'] = analyzer.robustness_surface(
+                atr_results, fill_top=args.robustness_fill
+            ).head(20).to_dict('records')
         
         # Update recommendation with best result
         best = atr_results.iloc[0]
@@ -1411,6 +3027,10 @@ def main():
             end_hour=args.end_hour
         )
         results['tp_sl_optimization'] = tp_sl_results.to_dict('records')
+        if args.robustness:
+            results['tp_sl_robustness'] = analyzer.robustness_surface(
+                tp_sl_results, fill_top=args.robustness_fill
+            ).head(20).to_dict('records')
         
         best = tp_sl_results.iloc[0]
         print(f"\n🏆 BEST TP/SL CONFIG:")
@@ -1429,6 +3049,10 @@ def main():
             end_hour=args.end_hour
         )
         results['candle_profitability_optimization'] = candle_profit_results.to_dict('records')
+        if args.robustness:
+            results['candle_profitability_robustness'] = analyzer.robustness_surface(
+                candle_profit_results, fill_top=args.robustness_fill
+            ).head(20).to_dict('records')
         
         best = candle_profit_results.iloc[0]
         print(f"\n🏆 MOST PROFITABLE CANDLE SIZES:")
@@ -1443,6 +3067,32 @@ def main():
         print(f"   Win Rate: {best['win_rate']:.1f}%")
         print(f"   Profit Factor: {best['profit_factor']:.2f}")
     
+    if args.optimize_indicators:
+        print("\n" + "🧮 Running Indicator Settings Optimization...")
+        indicator_results = analyzer.optimize_indicator_variants(
+            atr_periods=[int(p) for p in args.atr_periods.split(',')],
+            ma_periods=[int(p) for p in args.ma_periods.split(',')],
+            ma_methods=[m.strip().lower() for m in args.ma_methods.split(',')],
+            use_atr=args.use_atr_method,
+            small_atr_mult=args.atr_small_mult,
+            big_atr_mult=args.atr_big_mult,
+            tp_range=(args.tp_range_min, args.tp_range_max),
+            sl_range=(args.sl_range_min, args.sl_range_max),
+            step=args.tp_sl_step,
+            start_hour=args.start_hour,
+            end_hour=args.end_hour,
+            workers=args.workers
+        )
+        results['indicator_optimization'] = indicator_results.to_dict('records')
+        
+        best = indicator_results.iloc[0]
+        print(f"\n🏆 BEST INDICATOR SETTINGS:")
+        print(f"   ATR Period: {best['atr_period']}")
+        print(f"   Trend MA: {best['ma_method'].upper()}({best['ma_period']})")
+        print(f"   TP/SL: {best['tp_multiplier']}x / {best['sl_multiplier']}x ATR")
+        print(f"   Total P&L: ${best['total_pnl']:.2f}")
+        print(f"   Profit Factor: {best['profit_factor']:.2f}")
+    
     if args.optimize_grid or run_all:
         print("\n" + "🔲 Running Grid Parameter Optimization...")
         grid_results = analyzer.optimize_grid_parameters(
@@ -1459,11 +3109,22 @@ def main():
         print(f"   Use lot multiplier: 1.0-1.1x")
         print(f"   Test with caution on demo account first")
     
+    if analyzer.sweep_resources:
+        results['resources'] = analyzer.sweep_resources
+    
     # Save results
     with open(args.output, 'w') as f:
         json.dump(results, f, indent=2, default=str)
     
     print(f"\n✅ Results saved to {args.output}")
+    if results_store is not None:
+        results_store.close()
+        print(f"🗄️  Sweep cells recorded in {args.results_db}")
+    if sink is not None:
+        sink.close()
+        print(f"📜 {sink.appended} new sweep cells streamed to {args.results_jsonl} ({len(sink)} in total)")
+    if analyzer.memo.hits:
+        print(f"♻️  Memo: {analyzer.memo.hits} hit(s), {analyzer.memo.misses} miss(es)")
     print("\n" + "="*70)
     print("ANALYSIS COMPLETE")
     print("="*70)
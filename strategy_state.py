@@ -0,0 +1,140 @@
+"""
+Strategy state snapshots for warm restarts
+
+A restarted GoldCandleKenStrategy used to start cold: ATR(ATR_PERIOD) and the
+MA(MA_PERIOD) had to re-warm from history, and the trade bookkeeping the broker
+knows nothing about (_entries, equity peaks, the trailing-stop counter, the
+entry bar of the invalidation window, a pending limit order) was lost, so the
+strategy and the broker position drifted apart.
+
+A snapshot holds, as of the start of one bar:
+    state       the strategy's bookkeeping attributes (STATE_ATTRIBUTES)
+    bars        the last few OHLCV bars (enough for every indicator period)
+    indicators  the same window of every indicator line, sub-indicators included
+    position    the broker position and cash, to detect a desync on restore
+
+Indicators continue from their previous values (EMA, Wilder's ATR) or from the
+bars (SMA, true range). So writing the stored window back into the lines, with
+the stored bars in the feed, makes the restarted run decide exactly as the
+original would have. Restoring needs next-mode evaluation (cerebro
+runonce=False, which live feeds always use): precomputed runonce lines would
+not pick up the restored values.
+
+Snapshots are pickled builtins only (no classes, so nothing executes on load)
+and are written atomically (temporary file, fsync, rename); a crash mid-write
+leaves the previous snapshot intact.
+
+Usage:
+    cerebro.addstrategy(GoldCandleKenStrategy, STATE_FILE="state/xauusd.snap")
+    # After a restart, feed warm_bars(read_snapshot(path)) ahead of the live bars
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import pickle
+import tempfile
+from array import array
+from typing import Dict, List
+
+from lazy_imports import LazyModule
+
+pd = LazyModule("pandas")
+
+
+STATE_VERSION = 1
+
+# When the strategy writes its snapshot
+SAVE_MODES = ("bar", "trade")
+
+# Bookkeeping attributes of GoldCandleKenStrategy captured in a snapshot
+STATE_ATTRIBUTES = (
+    "_entries",
+    "_last_entry_price",
+    "hard_stop_peak",
+    "trailing_equity_peak",
+    "equity_stop_triggered",
+    "consecutive_trailing_stops",
+    "trailing_stop_level",
+    "last_bar_datetime",
+    "candle_ranges",
+    "bar_count",
+    "adaptive_big_candle",
+    "adaptive_small_candle",
+    "pending_limit_order",
+    "entry_bar",
+)
+
+BAR_LINES = ("open", "high", "low", "close", "volume", "datetime")
+
+
+class _BuiltinsUnpickler(pickle.Unpickler):
+    """Unpickler that refuses every class or function reference"""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Snapshots hold builtins only, found {module}.{name}")
+
+
+def write_snapshot(path: str, snapshot: Dict) -> None:
+    """Atomically replace path with the pickled snapshot"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(path: str) -> Dict:
+    """Load a snapshot written by write_snapshot (ValueError on a version mismatch)"""
+    with open(path, "rb") as f:
+        snapshot = _BuiltinsUnpickler(io.BytesIO(f.read())).load()
+    if snapshot.get("version") != STATE_VERSION:
+        raise ValueError(f"Snapshot {path} has version {snapshot.get('version')}, expected {STATE_VERSION}")
+    return snapshot
+
+
+def indicator_lines(indicators) -> List:
+    """Line buffers of the given indicators and, depth first, of all their sub-indicators"""
+    lines = []
+    for indicator in indicators:
+        lines.extend(indicator.lines)
+        # Line operations (delays, arithmetic) own a buffer but no sub-indicators
+        children = getattr(indicator, "_lineiterators", None)
+        if children:
+            lines.extend(indicator_lines(children[indicator.IndType]))
+    return lines
+
+
+def capture_window(line, size: int) -> bytes:
+    """Last size values of a line (current bar last) as packed doubles"""
+    return array('d', (line[ago] for ago in range(1 - size, 1))).tobytes()
+
+
+def restore_window(line, packed: bytes) -> None:
+    """Write a captured window back, its last value at the current bar"""
+    values = array('d')
+    values.frombytes(packed)
+    for ago, value in zip(range(1 - len(values), 1), values):
+        line[ago] = value
+
+
+def warm_bars(snapshot: Dict) -> pd.DataFrame:
+    """Bars of a snapshot (the snapshot bar last) to feed ahead of the live bars after a restart"""
+    from calendar_index import bt_num2datetime64
+
+    columns = {}
+    for name in BAR_LINES:
+        values = array('d')
+        values.frombytes(snapshot["bars"][name])
+        columns[name] = values
+    index = pd.DatetimeIndex(bt_num2datetime64(columns.pop("datetime")), name="datetime")
+    return pd.DataFrame(columns, index=index)
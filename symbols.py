@@ -0,0 +1,103 @@
+"""
+Symbol metadata registry
+
+GoldCandleKenStrategy was written for XAUUSD (1 lot = 100 oz, 0.01 point). The
+strategy, the backtest runner and the optimizer look up each ticker here for its
+point size, contract size, lot step, minimum lot, commission and trading
+session, so silver, FX and the indices can be screened with the same code and
+the engines never disagree on what one point is.
+
+Tickers are matched without their Polygon market prefix ("C:XAUUSD",
+"X:XAUUSD" and "XAUUSD" are the same instrument).
+
+The built-in table can be extended or overridden with a JSON file of the same
+shape, named by the SYMBOL_REGISTRY environment variable:
+    {"XPTUSD": {"contract_size": 50, "point": 0.01, "session": "fx"}}
+The registry is read once per process and cached.
+"""
+
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Optional
+
+
+REGISTRY_ENV = "SYMBOL_REGISTRY"
+
+# Trading sessions: the trading day starts at `open` in `tz` (used to anchor
+# resampled bars and daily statistics)
+SESSIONS = {
+    "fx": {"tz": "America/New_York", "open": "17:00", "close": "17:00", "days": "Sun-Fri"},
+    "crypto": {"tz": "UTC", "open": "00:00", "close": "00:00", "days": "Mon-Sun"},
+    "us_equity": {"tz": "America/New_York", "open": "09:30", "close": "16:00", "days": "Mon-Fri"},
+}
+
+# Fallback for unknown tickers: the XAUUSD contract
+DEFAULT_SPEC = {
+    "contract_size": 100.0,  # Units per 1.0 lot
+    "point": 0.01,           # Price value of one point
+    "lot_step": 0.01,        # Lot size increment
+    "min_lot": 0.01,         # Smallest tradable lot
+    "commission": 0.0002,    # Fraction of notional per side
+    "session": "fx",         # Key of SESSIONS
+}
+
+SYMBOL_SPECS = {
+    "XAUUSD": {"contract_size": 100.0, "point": 0.01, "lot_step": 0.03, "min_lot": 0.03, "commission": 0.0002},
+    "XAGUSD": {"contract_size": 5000.0, "point": 0.001, "commission": 0.0002},
+    "EURUSD": {"contract_size": 100000.0, "point": 0.00001, "commission": 0.00002},
+    "GBPUSD": {"contract_size": 100000.0, "point": 0.00001, "commission": 0.00002},
+    "USDJPY": {"contract_size": 100000.0, "point": 0.001, "commission": 0.00002},
+    "BTCUSD": {"contract_size": 1.0, "point": 0.01, "commission": 0.001, "session": "crypto"},
+    "ETHUSD": {"contract_size": 1.0, "point": 0.01, "commission": 0.001, "session": "crypto"},
+    "SPX": {"contract_size": 1.0, "point": 0.01, "lot_step": 1.0, "min_lot": 1.0, "commission": 0.0001, "session": "us_equity"},
+    "NDX": {"contract_size": 1.0, "point": 0.01, "lot_step": 1.0, "min_lot": 1.0, "commission": 0.0001, "session": "us_equity"},
+    "DJI": {"contract_size": 1.0, "point": 0.01, "lot_step": 1.0, "min_lot": 1.0, "commission": 0.0001, "session": "us_equity"},
+}
+
+
+def normalize_symbol(ticker: str) -> str:
+    """Strip the Polygon market prefix: 'C:XAUUSD' -> 'XAUUSD'"""
+    return ticker.split(":", 1)[-1].upper()
+
+
+@lru_cache(maxsize=None)
+def load_registry(path: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Built-in specs merged with the JSON file at path (default: $SYMBOL_REGISTRY).
+
+    Cached per path; call load_registry.cache_clear() after editing the file.
+    """
+    registry = {symbol: dict(spec) for symbol, spec in SYMBOL_SPECS.items()}
+    path = path or os.environ.get(REGISTRY_ENV)
+    if path:
+        with open(path) as f:
+            for symbol, fields in json.load(f).items():
+                registry.setdefault(normalize_symbol(symbol), {}).update(fields)
+    return registry
+
+
+def symbol_spec(ticker: str, overrides: Optional[Dict] = None) -> Dict:
+    """
+    Metadata of a ticker (copy; fields missing from the registry come from DEFAULT_SPEC).
+
+    Args:
+        ticker: Ticker with or without market prefix
+        overrides: Fields replacing the registered values (e.g. {"commission": 0.0})
+
+    Returns:
+        Dictionary with symbol, contract_size, point, lot_step, min_lot, commission and session
+    """
+    spec = dict(DEFAULT_SPEC)
+    spec.update(load_registry().get(normalize_symbol(ticker), {}))
+    if overrides:
+        spec.update(overrides)
+    if spec["session"] not in SESSIONS:
+        raise ValueError(f"Unknown session '{spec['session']}' for {ticker}. Choose from {list(SESSIONS)}")
+    spec["symbol"] = normalize_symbol(ticker)
+    return spec
+
+
+def session_spec(spec: Dict) -> Dict:
+    """Trading session of a symbol spec (see SESSIONS)"""
+    return SESSIONS[spec.get("session", DEFAULT_SPEC["session"])]
@@ -0,0 +1,53 @@
+"""Shared fixtures: synthetic bars, so no test needs an API key or network access"""
+
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_bars(n: int = 3000, seed: int = 3, freq: str = "15min", spread: bool = False) -> pd.DataFrame:
+    """
+    Random-walk OHLC bars around 2000 (gold-like prices).
+
+    Args:
+        n: Number of bars
+        seed: Random seed
+        freq: Bar period
+        spread: Also add closing bid/ask quotes whose spread jumps between
+            5 and 30 points (point = 0.01) from bar to bar
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=n, freq=freq)
+    close = 2000 + np.cumsum(rng.normal(0, 3, n))
+    open_ = np.r_[close[0], close[:-1]]
+    bars = pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + np.abs(rng.normal(0, 2, n)),
+        "low": np.minimum(open_, close) - np.abs(rng.normal(0, 2, n)),
+        "close": close,
+        "volume": 1.0,
+    }, index=index)
+    if spread:
+        half = np.where(rng.random(n) < 0.5, 0.05, 0.30) / 2
+        bars["bid"] = close - half
+        bars["ask"] = close + half
+    return bars
+
+
+@pytest.fixture(scope="session")
+def bars() -> pd.DataFrame:
+    return make_bars()
+
+
+@pytest.fixture(autouse=True)
+def _quiet_logs():
+    """The strategy logs every decision; keep test output readable"""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
@@ -0,0 +1,90 @@
+"""Early-abort rules: the StrategyAnalyzer kernel rules and the runner's EarlyAbortAnalyzer."""
+import numpy as np
+import pytest
+
+import strategy_optimizer as so
+from backtest_runner import BacktestRunner
+from strategy_optimizer import StrategyAnalyzer
+
+CELLS = [
+    dict(small_percentile=20, big_percentile=80, tp_atr_mult=2.0, sl_atr_mult=1.0),
+    dict(small_percentile=40, big_percentile=70, tp_atr_mult=1.0, sl_atr_mult=1.0, max_open_trades=1),
+]
+
+
+@pytest.fixture(scope="module")
+def analyzer(bars):
+    return StrategyAnalyzer(bars, mc_paths=0)
+
+
+def rulesets(full):
+    """One rule per kind, set just tight enough that the full run breaks it"""
+    entered = int((full["ledger"].records["entry_idx"] < 1500).sum())
+    return [
+        {"abort_max_drawdown": full["max_drawdown"] / 2},
+        {"abort_min_trades": entered + 1, "abort_min_trades_bar": 1500},
+        {"abort_min_pnl": full["total_pnl"] + 100.0},
+    ]
+
+
+@pytest.mark.parametrize("cell", CELLS)
+def test_aborted_run_is_a_prefix_of_the_full_run(analyzer, cell, monkeypatch):
+    full = analyzer.backtest_strategy(keep_ledger=True, **cell)
+    assert "aborted" not in full
+    records = full["ledger"].records
+    for rules in rulesets(full):
+        aborted = analyzer.backtest_strategy(keep_ledger=True, abort_rules=rules, **cell)
+        rule = aborted["aborted"]["rule"]
+        taken = aborted["ledger"].records
+        assert np.array_equal(taken, records[:len(taken)])
+        # A rule only fires when the full run really breaks it
+        if rule == "max_drawdown":
+            assert full["max_drawdown"] > rules["abort_max_drawdown"]
+        elif rule == "min_trades":
+            assert aborted["aborted"]["bar"] == rules["abort_min_trades_bar"]
+        else:
+            assert rule == "pnl_bound" and full["total_pnl"] < rules["abort_min_pnl"]
+
+        # Scanning in blocks aborts exactly where a single pass does
+        monkeypatch.setattr(so, "ABORT_FIRST_BLOCK", 10**9)
+        single = analyzer.backtest_strategy(keep_ledger=True, abort_rules=rules, **cell)
+        monkeypatch.undo()
+        assert single["aborted"] == aborted["aborted"]
+        assert np.array_equal(single["ledger"].records, taken)
+
+
+@pytest.mark.parametrize("cell", CELLS)
+def test_rules_the_run_satisfies_never_fire(analyzer, cell):
+    full = analyzer.backtest_strategy(keep_ledger=True, **cell)
+    entered = int((full["ledger"].records["entry_idx"] < 1500).sum())
+    # The P&L limit leaves room for rounding: the kernel sums the P&L trade by trade
+    rules = {
+        "abort_max_drawdown": full["max_drawdown"],
+        "abort_min_trades": entered,
+        "abort_min_trades_bar": 1500,
+        "abort_min_pnl": full["total_pnl"] - 1e-6,
+    }
+    metrics = analyzer.backtest_strategy(keep_ledger=True, abort_rules=rules, **cell)
+    assert "aborted" not in metrics
+    assert np.array_equal(metrics["ledger"].records, full["ledger"].records)
+
+
+def test_runner_aborts_and_keeps_partial_metrics(bars):
+    runner = BacktestRunner(analyzer_profile="sweep", abort_rules={"abort_min_trades": 10**6, "abort_min_trades_bar": 500})
+    metrics = runner.run_backtest(runner.data_feed(bars), {"LOT_SIZE": 0.05})
+    aborted = metrics["aborted"]
+    assert aborted["rule"] == "min_trades" and aborted["bar"] == 500
+    assert aborted["progress"] == pytest.approx(500 / len(bars), abs=1e-4)
+    assert aborted["time"] == bars.index[500].isoformat()
+
+
+def test_runner_optimize_resets_the_stop_between_runs(bars):
+    runner = BacktestRunner(abort_rules={"abort_min_trades": 10**6, "abort_min_trades_bar": 500})
+    results = runner.optimize(runner.data_feed(bars), {"LOT_SIZE": [0.05, 0.1]}, maxcpus=1)
+    # A stop flag left set by the first run would end the second one on its first bar
+    assert [r["aborted"]["bar"] for r in results] == [500, 500]
+
+
+def test_runner_rejects_half_a_min_trades_rule():
+    with pytest.raises(ValueError):
+        BacktestRunner(abort_rules={"abort_min_trades": 5})
@@ -0,0 +1,79 @@
+"""Invalidation and pending-limit windows are counted in bars, across weekend gaps."""
+from types import SimpleNamespace
+
+import backtrader as bt
+import pandas as pd
+import pytest
+
+from bt_extensions import NumpyData
+from conftest import make_bars
+from ken_gold_candle import GoldCandleKenStrategy
+
+ENTRY_TIME = pd.Timestamp("2024-01-05 21:00")  # Friday; the next bars are 22:00, 23:00, then Monday
+
+
+class WindowProbe(GoldCandleKenStrategy):
+    """Opens a tracked entry and a limit order on the Friday bar, then only runs the window checks"""
+
+    def __init__(self):
+        super().__init__()
+        self._probe_position = SimpleNamespace(size=0.0, price=0.0)
+        self.states = {}
+
+    @property
+    def position(self):
+        return self._probe_position
+
+    def next(self):
+        bar = self._bar_ordinal()
+        if self.data.datetime.datetime(0) == ENTRY_TIME:
+            self._probe_position.size, self._probe_position.price = 0.01, self.data.close[0]
+            self.entry_bar = bar
+            # A limit the price never reaches, so only MAX_BARS_PENDING can end it
+            self.pending_limit_order = {"direction": 1, "limit_price": 0.0, "signal_bar": bar, "is_buy": True}
+            self.entry_ordinal = bar
+        elif self.entry_bar is not None or self.pending_limit_order is not None:
+            self._check_signal_invalidation()
+            self._check_limit_order()
+        self.states[bar] = (self.entry_bar is not None, self.pending_limit_order is not None)
+
+
+def hourly_weekday_bars():
+    bars = make_bars(n=24 * 14, freq="1h")
+    return bars[bars.index.weekday < 5]
+
+
+def test_friday_windows_survive_the_weekend():
+    bars = hourly_weekday_bars()
+    cerebro = bt.Cerebro(runonce=False)
+    cerebro.adddata(NumpyData(dataname=bars))
+    # No candle is big enough to invalidate: the windows can only expire
+    cerebro.addstrategy(
+        WindowProbe, ENABLE_TIME_FILTER=False, USE_ATR_CALCULATION=False, BIG_CANDLE_POINTS=10**9,
+        INVALIDATION_WINDOW_BARS=3, MAX_BARS_PENDING=5
+    )
+    probe = cerebro.run()[0]
+    entry = probe.entry_ordinal
+    assert bars.index[entry + 3] == pd.Timestamp("2024-01-08 00:00")  # Monday's first bar
+
+    tracked = [probe.states[entry + k][0] for k in range(1, 6)]
+    pending = [probe.states[entry + k][1] for k in range(1, 8)]
+    # Still watched for 3 bars (Friday 22:00, 23:00, Monday 00:00), expired on the 4th
+    assert tracked == [True, True, True, False, False]
+    # Still pending for 5 bars, cancelled on the 6th
+    assert pending == [True, True, True, True, True, False, False]
+
+
+@pytest.mark.parametrize("window", [1, 4])
+def test_window_length_is_in_bars(window):
+    bars = hourly_weekday_bars()
+    cerebro = bt.Cerebro(runonce=False)
+    cerebro.adddata(NumpyData(dataname=bars))
+    cerebro.addstrategy(
+        WindowProbe, ENABLE_TIME_FILTER=False, USE_ATR_CALCULATION=False, BIG_CANDLE_POINTS=10**9,
+        INVALIDATION_WINDOW_BARS=window, MAX_BARS_PENDING=window
+    )
+    probe = cerebro.run()[0]
+    entry = probe.entry_ordinal
+    expired = next(k for k in range(1, 10) if probe.states[entry + k] == (False, False))
+    assert expired == window + 1
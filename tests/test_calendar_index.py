@@ -0,0 +1,57 @@
+"""Trading-hours masks from CalendarIndex match the per-bar hour check they replaced"""
+
+import backtrader as bt
+import numpy as np
+import pytest
+
+from bt_extensions import NumpyData
+from calendar_index import CalendarIndex, hour_window
+from conftest import make_bars
+from ken_gold_candle import GoldCandleKenStrategy
+
+
+def old_in_trading_hours(hour, start_hour, end_hour):
+    """The per-bar check GoldCandleKenStrategy.next() used before the calendar index"""
+    if start_hour <= end_hour:
+        return not (hour < start_hour or hour >= end_hour)
+    return not (hour < start_hour and hour >= end_hour)
+
+
+class HourProbe(GoldCandleKenStrategy):
+    """Records the time filter's verdict for every bar instead of trading"""
+
+    def __init__(self):
+        super().__init__()
+        self.allowed = []
+
+    def next(self):
+        self.allowed.append((self.data.datetime.datetime(0).hour, self._in_trading_hours()))
+
+
+def test_every_window_matches_the_old_check():
+    for start_hour in range(24):
+        for end_hour in range(24):
+            expected = [old_in_trading_hours(hour, start_hour, end_hour) for hour in range(24)]
+            assert hour_window(start_hour, end_hour).tolist() == expected, (start_hour, end_hour)
+
+
+def test_midnight_window_mask():
+    bars = make_bars(n=24 * 5, freq="1h")
+    mask = CalendarIndex(bars.index).hour_mask(22, 3)
+    hours = bars.index.hour
+    assert mask.tolist() == [old_in_trading_hours(hour, 22, 3) for hour in hours]
+    assert set(hours[mask]) == {22, 23, 0, 1, 2}
+    assert mask.sum() == 5 * 5  # Five days of five hours
+
+
+@pytest.mark.parametrize("preload", [True, False])
+def test_strategy_filter_crosses_midnight(preload):
+    bars = make_bars(n=24 * 4, freq="1h")
+    cerebro = bt.Cerebro(preload=preload, runonce=False)
+    cerebro.adddata(NumpyData(dataname=bars))
+    cerebro.addstrategy(HourProbe, START_HOUR=22, END_HOUR=3, USE_ATR_CALCULATION=False)
+    probe = cerebro.run()[0]
+    assert (probe._trading_hours is not None) == preload  # Mask on preloaded feeds, table lookup otherwise
+    assert probe.allowed
+    assert all(allowed == old_in_trading_hours(hour, 22, 3) for hour, allowed in probe.allowed)
+    assert np.mean([allowed for _, allowed in probe.allowed]) == pytest.approx(5 / 24, abs=0.02)
@@ -0,0 +1,95 @@
+"""sim_kernel backends produce the same trades as the reference loop and each other"""
+
+import inspect
+
+import numpy as np
+import pytest
+
+import sim_kernel
+from strategy_optimizer import StrategyAnalyzer
+
+
+def random_cells(seed: int, count: int, rules: bool):
+    """Random backtest_strategy cells; with rules, random sequential and abort rules too"""
+    rng = np.random.default_rng(seed)
+    cells = []
+    for _ in range(count):
+        cell = {
+            'small_percentile': int(rng.integers(10, 60)),
+            'big_percentile': int(rng.integers(40, 95)),
+            'tp_atr_mult': float(rng.choice([0.5, 1.0, 2.0, 3.0])),
+            'sl_atr_mult': float(rng.choice([0.5, 1.0, 1.5])),
+            'lookback_period': int(rng.choice([50, 200])),
+        }
+        if rng.random() < 0.3:
+            cell.update(use_atr=True, small_atr_mult=float(rng.uniform(0.3, 1.0)), big_atr_mult=float(rng.uniform(0.8, 2.0)))
+        if rng.random() < 0.3:
+            cell.update(start_hour=int(rng.integers(0, 24)), end_hour=int(rng.integers(0, 24)))
+        if rules:
+            cell.update(
+                max_open_trades=int(rng.integers(0, 4)),
+                invalidation_bars=int(rng.integers(0, 5)),
+                trailing_sl_points=float(rng.choice([100, 300, 600])) if rng.random() < 0.5 else None,
+            )
+            abort = {}
+            if rng.random() < 0.5:
+                abort['abort_max_drawdown'] = float(rng.uniform(10, 80))
+            if rng.random() < 0.5:
+                abort.update(abort_min_trades=int(rng.integers(1, 40)), abort_min_trades_bar=int(rng.integers(300, 2900)))
+            if rng.random() < 0.5:
+                abort['abort_min_pnl'] = float(rng.uniform(-50, 50))
+            cell['abort_rules'] = abort
+        cells.append(cell)
+    return cells
+
+
+def simulate(analyzer: StrategyAnalyzer, cell: dict, backend: str, compiled: bool):
+    """_simulate_kernel of a cell, with the arguments backtest_strategy would pass"""
+    bound = inspect.signature(analyzer.backtest_strategy).bind(**cell)
+    bound.apply_defaults()
+    args = bound.arguments
+    filters = analyzer._signal_filters(args['lookback_period'], args['start_hour'], args['end_hour'], None)
+    rules = analyzer._sequential_rules(args['max_open_trades'], args['invalidation_bars'], args['trailing_sl_points'])
+    abort = analyzer._abort_rules(args['abort_rules'], analyzer.abort_rules)
+    signal_args = list(inspect.signature(analyzer._simulate_loop).parameters)[3:]
+    ledger, aborted = analyzer._simulate_kernel(
+        *filters, backend, rules, abort_rules=abort, compiled=compiled, **{name: args[name] for name in signal_args}
+    )
+    return ledger.records, aborted
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["float64", "compact"])
+def analyzer(request, bars):
+    return StrategyAnalyzer(bars, compact=request.param, mc_paths=0)
+
+
+def test_backends_match_reference_loop(analyzer):
+    mismatches = analyzer.check_engine_parity(random_cells(seed=1, count=6, rules=False))
+    assert mismatches == {backend: [] for backend in sim_kernel.BACKENDS}
+
+
+def test_parity_check_covers_rules(bars):
+    analyzer = StrategyAnalyzer(
+        bars, mc_paths=0, sequential_rules={'max_open_trades': 1, 'invalidation_bars': 2},
+        abort_rules={'abort_max_drawdown': 20.0}
+    )
+    assert analyzer.check_engine_parity() == {backend: [] for backend in sim_kernel.BACKENDS}
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_numba_loop_matches_numpy_with_rules(analyzer, seed):
+    for cell in random_cells(seed, count=5, rules=True):
+        expected, expected_aborted = simulate(analyzer, cell, 'numpy', compiled=False)
+        records, aborted = simulate(analyzer, cell, 'numba', compiled=False)
+        assert aborted == expected_aborted, cell
+        np.testing.assert_array_equal(records, expected, err_msg=str(cell))
+
+
+@pytest.mark.skipif(not sim_kernel.numba_available(), reason="numba not installed")
+@pytest.mark.parametrize("seed", range(4))
+def test_compiled_numba_matches_numpy_with_rules(analyzer, seed):
+    for cell in random_cells(seed, count=5, rules=True):
+        expected, expected_aborted = simulate(analyzer, cell, 'numpy', compiled=False)
+        records, aborted = simulate(analyzer, cell, 'numba', compiled=True)
+        assert aborted == expected_aborted, cell
+        np.testing.assert_array_equal(records, expected, err_msg=str(cell))
@@ -0,0 +1,112 @@
+"""Intrabar execution: minute bars decide whether TP or SL was touched first"""
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import IntrabarIndex, resample_bars
+from bt_extensions import IntrabarBroker, NumpyData
+from ken_gold_candle import GoldCandleKenStrategy
+
+ENTRY, TP, SL = 2000.0, 2005.0, 1995.0
+EXIT_BAR = 3  # Hourly bar whose range touches both levels
+
+
+def minute_bars(path):
+    """Five hours of minute bars: flat at ENTRY, then `path` (minute closes) from 03:00"""
+    closes = np.full(300, ENTRY)
+    closes[180:180 + len(path)] = path
+    closes[180 + len(path):] = path[-1]
+    opens = np.concatenate(([ENTRY], closes[:-1]))
+    index = pd.date_range("2024-01-08 00:00", periods=300, freq="1min")
+    return pd.DataFrame({
+        "open": opens, "high": np.maximum(opens, closes), "low": np.minimum(opens, closes),
+        "close": closes, "volume": 1.0,
+    }, index=index)
+
+
+DOWN_THEN_UP = np.concatenate((np.linspace(1999, 1994, 10), np.linspace(1995, 2006, 20)))
+UP_THEN_DOWN = np.concatenate((np.linspace(2001, 2006, 10), np.linspace(2005, 1994, 20)))
+
+
+class TargetProbe(GoldCandleKenStrategy):
+    """Buys on bar 0 with fixed TP/SL, then only runs the single-trade exit check"""
+
+    def __init__(self):
+        super().__init__()
+        self.closed_on = None
+
+    def prenext(self):
+        self.next()  # Five bars are fewer than the indicators' warm-up
+
+    def next(self):
+        bar = self._bar_ordinal()
+        if bar == 0:
+            self.buy(size=1)
+            self._entries = [{"dir": 1, "entry": ENTRY, "tp": TP, "sl": SL}]
+        elif self.closed_on is None and self._manage_single_targets():
+            self.closed_on = bar
+
+
+class Fills(bt.Analyzer):
+    def start(self):
+        self.fills = []
+
+    def notify_order(self, order):
+        if order.status == order.Completed:
+            self.fills.append((bt.num2date(order.executed.dt), order.isbuy(), order.executed.price))
+
+    def get_analysis(self):
+        return self.fills
+
+
+def run(minutes, intrabar=True):
+    hours = resample_bars(minutes, 60)
+    cerebro = bt.Cerebro(runonce=False)
+    cerebro.adddata(NumpyData(dataname=hours))
+    settings = dict(ENABLE_TIME_FILTER=False, USE_ATR_CALCULATION=False)
+    if intrabar:
+        settings["intrabar"] = IntrabarIndex(hours.index, minutes)
+        cerebro.setbroker(IntrabarBroker())
+    cerebro.addstrategy(TargetProbe, **settings)
+    cerebro.addanalyzer(Fills, _name="fills")
+    probe = cerebro.run()[0]
+    return probe, probe.analyzers.fills.get_analysis()
+
+
+@pytest.mark.parametrize("path, level", [(DOWN_THEN_UP, SL), (UP_THEN_DOWN, TP)])
+def test_minute_order_picks_the_exit(path, level):
+    minutes = minute_bars(path)
+    hour = resample_bars(minutes, 60).iloc[EXIT_BAR]
+    assert hour["low"] <= SL and hour["high"] >= TP  # The hourly bar alone cannot tell
+
+    probe, fills = run(minutes)
+    assert probe.closed_on == EXIT_BAR
+    (opened, buy, entry_price), (closed, sell, exit_price) = fills
+    assert buy and not sell and entry_price == ENTRY
+    assert exit_price == level  # Filled at the touched level, not the bar close
+    assert closed == pd.Timestamp("2024-01-08 03:00")  # Dated to the bar that touched it
+
+
+def test_without_minutes_the_close_decides():
+    probe, fills = run(minute_bars(DOWN_THEN_UP), intrabar=False)
+    # The bar closes above TP, so the close-based check takes profit on the next open
+    assert probe.closed_on == EXIT_BAR
+    assert fills[-1][2] == pytest.approx(DOWN_THEN_UP[-1])
+
+
+def test_first_exit_ties_and_gaps():
+    minutes = minute_bars(np.array([2000.0, 2000.0]))
+    minutes.iloc[181, [0, 1, 2, 3]] = [2004.0, 2006.0, 1994.0, 2000.0]  # Both levels in one minute
+    index = IntrabarIndex(resample_bars(minutes, 60).index, minutes)
+    assert index.has_minutes(EXIT_BAR) and not index.has_minutes(len(index))
+    assert [index.starts[EXIT_BAR], index.ends[EXIT_BAR]] == [180, 240]
+    assert index.first_exit(EXIT_BAR, True, SL, TP) == ("tp", TP)  # Closer to the minute's open
+    assert index.first_exit(EXIT_BAR, False, TP, SL) == ("sl", TP)
+    assert index.first_exit(EXIT_BAR, True, None, None) is None
+    assert index.first_exit(0, True, SL, TP) is None
+
+    minutes.iloc[181, [0, 1, 2, 3]] = [1990.0, 1992.0, 1989.0, 1991.0]  # Opens through the stop
+    index = IntrabarIndex(resample_bars(minutes, 60).index, minutes)
+    assert index.first_exit(EXIT_BAR, True, SL, TP) == ("sl", 1990.0)
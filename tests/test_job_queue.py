@@ -0,0 +1,125 @@
+"""JobQueue with several worker processes: every job runs to completion exactly once"""
+
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from job_queue import JobQueue, run_worker
+
+
+def _handler(payload):
+    """Trivial job: square a number, logging each execution to the job's run log"""
+    with open(payload["log"], "a") as log:
+        log.write(json.dumps({"n": payload["n"], "pid": os.getpid()}) + "\n")
+    if payload.get("hang_once") and not os.path.exists(payload["hang_once"]):
+        open(payload["hang_once"], "w").close()
+        time.sleep(600)  # Killed by the test while holding the lease
+    return {"square": payload["n"] ** 2, "pid": os.getpid()}
+
+
+def _worker(path, lease_seconds):
+    with JobQueue(path, lease_seconds=lease_seconds) as queue:
+        run_worker(queue, _handler, poll_seconds=0.05)
+
+
+def _start_workers(path, count, lease_seconds=30.0):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_worker, args=(path, lease_seconds)) for _ in range(count)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def _join(workers, timeout=120):
+    for worker in workers:
+        worker.join(timeout)
+        assert worker.exitcode == 0
+
+
+def _executions(log):
+    with open(log) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_workers_complete_every_job_once(tmp_path):
+    path, log = str(tmp_path / "queue.db"), str(tmp_path / "runs.log")
+    with JobQueue(path) as queue:
+        assert queue.enqueue([{"n": n, "log": log} for n in range(40)]) == (40, 0)
+        assert queue.enqueue([{"n": n, "log": log} for n in range(40)]) == (0, 40)
+
+    _join(_start_workers(path, 4))
+
+    with JobQueue(path) as queue:
+        assert queue.counts() == {"pending": 0, "leased": 0, "done": 40, "failed": 0}
+        results = queue.results()
+    assert sorted(run["n"] for run in _executions(log)) == list(range(40))
+    assert [r["result"]["square"] for r in results] == [n * n for n in range(40)]
+    assert all(r["attempts"] == 1 for r in results)
+    assert len({r["result"]["pid"] for r in results}) > 1
+
+
+def test_killed_worker_job_is_requeued(tmp_path):
+    path, log, marker = str(tmp_path / "queue.db"), str(tmp_path / "runs.log"), str(tmp_path / "hung")
+    with JobQueue(path, lease_seconds=1.0) as queue:
+        queue.enqueue([{"n": 100, "log": log, "hang_once": marker}])
+        queue.enqueue([{"n": n, "log": log} for n in range(10)])
+
+    (stuck,) = _start_workers(path, 1, lease_seconds=1.0)
+    deadline = time.time() + 60
+    while not os.path.exists(marker):
+        assert time.time() < deadline, "worker never leased the first job"
+        time.sleep(0.05)
+    stuck.kill()
+    stuck.join()
+
+    _join(_start_workers(path, 3, lease_seconds=1.0))
+
+    with JobQueue(path) as queue:
+        assert queue.counts() == {"pending": 0, "leased": 0, "done": 11, "failed": 0}
+        retried = [r for r in queue.results() if r["payload"]["n"] == 100]
+    assert len(retried) == 1
+    assert retried[0]["attempts"] == 2
+    assert retried[0]["result"]["pid"] != stuck.pid
+    runs = [run for run in _executions(log) if run["n"] == 100]
+    assert [run["pid"] == stuck.pid for run in runs] == [True, False]
+
+
+def test_lost_lease_cannot_complete(tmp_path):
+    path = str(tmp_path / "queue.db")
+    with JobQueue(path, lease_seconds=0.05) as first, JobQueue(path, lease_seconds=30.0) as second:
+        first.enqueue([{"n": 1}])
+        stale = first.lease("a")
+        time.sleep(0.1)
+        taken = second.lease("b")
+        assert taken.job_id == stale.job_id and taken.attempts == 2
+        assert not first.heartbeat(stale)
+        assert not first.complete(stale, {"square": 1})
+        assert second.complete(taken, {"square": 1})
+        assert second.counts()["done"] == 1
+
+
+def test_failing_job_is_retried_then_failed(tmp_path):
+    path = str(tmp_path / "queue.db")
+    with JobQueue(path, max_attempts=2) as queue:
+        queue.enqueue([{"n": 1}])
+
+        def boom(payload):
+            raise RuntimeError("boom")
+
+        assert run_worker(queue, boom, poll_seconds=0.01) == 0
+        (result,) = queue.results()
+        assert result["status"] == "failed" and result["attempts"] == 2
+        assert result["error"] == "RuntimeError: boom"
+        assert queue.retry_failed() == 1
+        assert queue.counts()["pending"] == 1
+
+
+@pytest.mark.parametrize("journal_mode", ["wal", "delete"])
+def test_journal_modes(tmp_path, journal_mode):
+    with JobQueue(str(tmp_path / "queue.db"), journal_mode=journal_mode) as queue:
+        queue.enqueue([{"n": 3}])
+        assert run_worker(queue, lambda payload: {"square": payload["n"] ** 2}) == 1
+        assert queue.results()[0]["result"] == {"square": 9}
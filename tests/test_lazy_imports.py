@@ -0,0 +1,33 @@
+"""CLI entry points import no heavy library until a run needs it"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("numpy", "pandas", "backtrader", "requests")
+
+
+@pytest.mark.parametrize("module", ["backtest_runner", "backtest_worker", "bar_store", "monte_carlo", "results_store"])
+def test_import_loads_no_heavy_library(module):
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    loaded = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert loaded == ""
+
+
+def test_runner_help_loads_no_heavy_library():
+    code = (
+        "import sys, runpy\n"
+        "sys.argv = ['backtest_runner.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_module('backtest_runner', run_name='__main__')\n"
+        "except SystemExit:\n"
+        f"    print('loaded:' + ','.join(m for m in {HEAVY!r} if m in sys.modules), file=sys.stderr)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True, check=True)
+    assert "usage:" in result.stdout
+    assert result.stderr.strip().splitlines()[-1] == "loaded:"
@@ -0,0 +1,42 @@
+"""Batched performance_metrics_kernel rows match the single-ledger kernel"""
+
+import numpy as np
+import pytest
+
+from strategy_optimizer import (
+    OUTCOME_INVALIDATED, OUTCOME_LOSS, OUTCOME_TIMEOUT, OUTCOME_TRAILING_SL, OUTCOME_WIN, TradeLedger,
+    performance_metrics_kernel, stack_ledgers
+)
+
+OUTCOMES = [OUTCOME_WIN, OUTCOME_LOSS, OUTCOME_TIMEOUT, OUTCOME_INVALIDATED, OUTCOME_TRAILING_SL]
+
+
+def random_ledger(n, seed):
+    rng = np.random.default_rng(seed)
+    ledger = TradeLedger(capacity=4)
+    for i in range(n):
+        outcome = OUTCOMES[rng.integers(len(OUTCOMES))]
+        pnl = {OUTCOME_WIN: 3.0, OUTCOME_LOSS: -1.5}.get(outcome, rng.normal())
+        ledger.append(i, 1, outcome, pnl * rng.uniform(0.5, 1.5), int(rng.integers(1, 40)), 2000.0)
+    return ledger
+
+
+def test_stacked_rows_match_the_scalar_kernel():
+    ledgers = [random_ledger(n, seed) for seed, n in enumerate([17, 0, 3, 40, 1])]
+    pnl, outcome, bars_held = stack_ledgers(ledgers)
+    assert pnl.shape == (5, 40)
+    assert np.isnan(pnl[1]).all() and np.isnan(pnl[2, 3:]).all() and not np.isnan(pnl[3]).any()
+
+    batch = performance_metrics_kernel(pnl, outcome, bars_held)
+    for row, ledger in enumerate(ledgers):
+        single = performance_metrics_kernel(ledger['pnl'], ledger['outcome'], ledger['bars_held'])
+        assert set(single) == set(batch)
+        for key, value in single.items():
+            assert batch[key][row] == pytest.approx(value), (row, key)
+
+
+def test_empty_ledger_row_is_all_zeros():
+    pnl, outcome, bars_held = stack_ledgers([random_ledger(6, 0), TradeLedger()])
+    batch = performance_metrics_kernel(pnl, outcome, bars_held)
+    assert all(values[1] == 0 for values in batch.values())
+    assert performance_metrics_kernel(np.array([])) == {key: 0 for key in batch}
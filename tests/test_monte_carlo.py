@@ -0,0 +1,56 @@
+"""Trade-bootstrap Monte Carlo: path statistics, ruin and reproducibility."""
+import numpy as np
+import pytest
+
+from monte_carlo import monte_carlo, simulate, summary_fields
+
+
+def test_permute_keeps_the_trades():
+    pnl = np.array([3.0, -1.0, -2.0, 4.0, -1.0, 0.5])
+    paths = simulate(pnl, paths=2000, method="permute", seed=1)
+    np.testing.assert_allclose(paths["final_pnl"], pnl.sum())
+    assert paths["loss_streak"].min() >= 1 and paths["loss_streak"].max() == 3
+    # Drawdown is at least the worst loss and at most every loss in a row
+    assert paths["max_drawdown"].min() >= 2.0 and paths["max_drawdown"].max() == 4.0
+    assert (paths["min_equity"] <= 0).all()
+
+
+def test_losing_trades_only():
+    pnl = np.full(50, -2.0)
+    for method in ("bootstrap", "permute"):
+        paths = simulate(pnl, paths=100, method=method)
+        np.testing.assert_allclose(paths["final_pnl"], -100.0)
+        np.testing.assert_allclose(paths["max_drawdown"], 100.0)
+        np.testing.assert_allclose(paths["min_equity"], -100.0)
+        assert (paths["loss_streak"] == 50).all()
+
+
+def test_ruin_probability_counts_paths_through_the_level():
+    # Equity reaches -1 only when the loss comes first: one ordering in three
+    summary = monte_carlo([2.0, 2.0, -1.0], paths=30_000, method="permute", ruin_level=1.0)
+    assert summary["ruin_probability"] == pytest.approx(1 / 3, abs=0.02)
+    assert summary["prob_loss"] == 0.0
+    assert summary["method"] == "permute" and summary["paths"] == 30_000
+
+
+def test_bootstrap_is_reproducible_and_unbiased():
+    pnl = np.random.default_rng(5).normal(0.5, 3.0, 200)
+    first = monte_carlo(pnl, paths=5000, seed=7)
+    assert first == monte_carlo(pnl, paths=5000, seed=7)
+    assert first != monte_carlo(pnl, paths=5000, seed=8)
+    assert first["final_pnl"]["mean"] == pytest.approx(pnl.sum(), rel=0.1)
+
+
+def test_empty_ledger_and_bad_method():
+    summary = monte_carlo([], paths=10, ruin_level=100.0)
+    assert summary["final_pnl"]["p50"] == 0.0 and summary["ruin_probability"] == 0.0
+    assert summary_fields(None) == {}
+    with pytest.raises(ValueError):
+        simulate([1.0], method="shuffle")
+
+
+def test_summary_fields_are_flat_and_rounded():
+    fields = summary_fields(monte_carlo([1.0, -1.0, 2.0], paths=1000, ruin_level=5.0))
+    assert set(fields) == {"mc_pnl_p5", "mc_drawdown_p95", "mc_loss_streak_p95", "mc_prob_loss", "mc_ruin_pct"}
+    assert isinstance(fields["mc_loss_streak_p95"], int)
+    assert 0.0 <= fields["mc_prob_loss"] <= 100.0
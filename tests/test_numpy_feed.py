@@ -0,0 +1,69 @@
+"""NumpyData feeds the same bars, and so the same trades, as PandasData"""
+
+import backtrader as bt
+import numpy as np
+import pytest
+
+from bt_extensions import NumpyData
+from conftest import make_bars
+from ken_gold_candle import GoldCandleKenStrategy
+
+LINES = ("datetime", "open", "high", "low", "close", "volume")
+
+
+class LineRecorder(bt.Strategy):
+    """Every bar's line values as the strategy sees them"""
+
+    def __init__(self):
+        self.rows = []
+
+    def next(self):
+        self.rows.append(tuple(getattr(self.data, name)[0] for name in LINES))
+
+
+class Fills(bt.Analyzer):
+    """Completed orders: (time, buy, price, size)"""
+
+    def start(self):
+        self.fills = []
+
+    def notify_order(self, order):
+        if order.status == order.Completed:
+            self.fills.append((bt.num2date(order.executed.dt), order.isbuy(), order.executed.price, order.executed.size))
+
+    def get_analysis(self):
+        return self.fills
+
+
+def run(feed, strategy, **settings):
+    cerebro = bt.Cerebro(runonce=settings.pop("runonce", True))
+    cerebro.adddata(feed)
+    cerebro.addstrategy(strategy, **settings)
+    cerebro.broker.setcash(10000)
+    cerebro.broker.addcommissioninfo(
+        bt.CommInfoBase(commission=0.0002, mult=100, margin=True, commtype=bt.CommInfoBase.COMM_PERC)
+    )
+    cerebro.addanalyzer(Fills, _name="fills")
+    result = cerebro.run()[0]
+    return result, cerebro.broker.getvalue()
+
+
+@pytest.mark.parametrize("freq", ["15min", "1h"])
+def test_same_bars(freq):
+    bars = make_bars(n=1500, freq=freq)
+    numpy_bars, _ = run(NumpyData(dataname=bars), LineRecorder)
+    pandas_bars, _ = run(bt.feeds.PandasData(dataname=bars), LineRecorder)
+    assert len(numpy_bars.rows) == len(bars)
+    assert numpy_bars.rows == pandas_bars.rows  # Bit-identical, datetimes included
+    assert np.array_equal([row[4] for row in numpy_bars.rows], bars["close"].to_numpy())
+
+
+@pytest.mark.parametrize("runonce", [True, False])
+def test_same_strategy_results(bars, runonce):
+    settings = dict(ENABLE_TIME_FILTER=False, runonce=runonce)
+    numpy_run, numpy_value = run(NumpyData(dataname=bars), GoldCandleKenStrategy, **settings)
+    pandas_run, pandas_value = run(bt.feeds.PandasData(dataname=bars), GoldCandleKenStrategy, **settings)
+    fills = numpy_run.analyzers.fills.get_analysis()
+    assert len(fills) > 10
+    assert fills == pandas_run.analyzers.fills.get_analysis()
+    assert numpy_value == pandas_value
@@ -0,0 +1,26 @@
+"""BacktestRunner.optimize: every grid combination scores like a plain run_backtest"""
+
+from itertools import product
+
+from backtest_runner import BacktestRunner
+
+GRID = {"MA_PERIOD": [20, 40], "LOT_SIZE": [0.03, 0.06]}
+FIXED = {"ENABLE_TIME_FILTER": False}
+RUN_ONLY = {"run_name", "timestamp", "resources", "params"}
+
+
+def test_optimize_matches_run_backtest(bars):
+    results = BacktestRunner(analyzer_profile="sweep").optimize(
+        BacktestRunner().data_feed(bars), GRID, maxcpus=1, strategy_params=FIXED
+    )
+    assert sorted(tuple(r["params"].values()) for r in results) == sorted(product(*GRID.values()))
+    assert len({r["trades"]["total"] for r in results}) > 1  # The grid changes what is traded
+
+    for swept in results:
+        # A fresh runner, so the plain run is not served from optimize's memo entries
+        runner = BacktestRunner(analyzer_profile="sweep")
+        plain = runner.run_backtest(runner.data_feed(bars), {**FIXED, **swept["params"]})
+        # Same process, same bars and settings: the numbers are identical, not just close
+        assert {k: v for k, v in swept.items() if k not in RUN_ONLY} == {
+            k: v for k, v in plain.items() if k not in RUN_ONLY
+        }
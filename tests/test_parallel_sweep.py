@@ -0,0 +1,46 @@
+"""Parallel indicator sweeps (shared-memory workers) match serial evaluation"""
+
+import pytest
+
+from result_sink import ResultSink
+from shared_indicators import (
+    DEFAULT_ATR_PERIOD, DEFAULT_MA_METHOD, DEFAULT_MA_PERIOD, SharedIndicatorStore, indicator_variants
+)
+from strategy_optimizer import StrategyAnalyzer
+
+CONTEXT = {'symbol': 'XAUUSD', 'period_start': '2024-01-01', 'period_end': '2024-02-01', 'timeframe': '15minute'}
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_parallel_records_match_serial(bars, tmp_path, compact):
+    sink = ResultSink(str(tmp_path / "parallel.jsonl"))
+    analyzer = StrategyAnalyzer(bars, compact=compact, run_context=CONTEXT, sink=sink, mc_paths=0)
+    analyzer.optimize_indicator_variants(
+        atr_periods=(DEFAULT_ATR_PERIOD,), ma_periods=(DEFAULT_MA_PERIOD,), ma_methods=(DEFAULT_MA_METHOD,),
+        tp_range=(1.0, 2.0), sl_range=(1.0, 1.0), step=1.0, workers=2
+    )
+    parallel = list(ResultSink(str(tmp_path / "parallel.jsonl")))
+    assert len(parallel) == 2
+
+    serial = StrategyAnalyzer(bars, compact=compact, run_context=CONTEXT, mc_paths=0)
+    for record in parallel:
+        assert {key: record[key] for key in CONTEXT} == CONTEXT
+        assert record['params'].get('compact', False) == compact
+        assert record['params']['timeframe'] == CONTEXT['timeframe']
+        cell = {key: record['params'][key] for key in ('small_percentile', 'big_percentile', 'tp_atr_mult', 'sl_atr_mult')}
+        expected = serial.backtest_strategy(keep_ledger=False, **cell)
+        for metric in ('total_trades', 'total_pnl', 'max_drawdown', 'win_rate'):
+            assert record['metrics'][metric] == pytest.approx(expected[metric]), metric
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_worker_analyzer_matches_parent(bars, compact):
+    parent = StrategyAnalyzer(bars, compact=compact, run_context=CONTEXT, mc_paths=0, max_spread_points=20)
+    variants = indicator_variants((DEFAULT_ATR_PERIOD,), (DEFAULT_MA_PERIOD,), (DEFAULT_MA_METHOD,))
+    with SharedIndicatorStore(parent.data, variants, fingerprint=parent.data_fingerprint) as shared:
+        worker = StrategyAnalyzer.from_shared(shared.manifest, **parent._worker_kwargs())
+        cell = {'small_percentile': 30, 'big_percentile': 80, 'tp_atr_mult': 2.0, 'sl_atr_mult': 1.0}
+        assert worker.compact == compact
+        assert worker.run_context == parent.run_context
+        assert worker._cell_params(**cell) == parent._cell_params(**cell)
+        assert worker._sink_key(worker._cell_params(**cell)) == parent._sink_key(parent._cell_params(**cell))
@@ -0,0 +1,78 @@
+"""resample_bars: OHLCV aggregation, bucket alignment and gaps"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import resample_bars
+from conftest import make_bars
+from symbols import SESSIONS
+
+
+def minute_bars(n=6000, start="2024-01-08 00:00"):
+    bars = make_bars(n=n, freq="1min")
+    bars.index = pd.date_range(start, periods=n, freq="1min")
+    bars["volume"] = np.random.default_rng(5).integers(1, 50, n).astype(float)
+    return bars
+
+
+def reference(bars, minutes, tz="UTC", offset="0min"):
+    """pandas resample in the session timezone, empty buckets dropped"""
+    local = bars.tz_localize("UTC").tz_convert(tz)
+    out = local.resample(f"{minutes}min", origin="start_day", offset=offset).agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    )
+    out = out[local.resample(f"{minutes}min", origin="start_day", offset=offset).size() > 0]
+    out = out.tz_convert("UTC").tz_localize(None)
+    return out.set_axis(out.index.as_unit("ns"))
+
+
+@pytest.mark.parametrize("minutes", [5, 15, 60, 240])
+def test_ohlcv_match_pandas_on_utc_boundaries(minutes):
+    bars = minute_bars()
+    out = resample_bars(bars, minutes)
+    expected = reference(bars, minutes)
+    pd.testing.assert_frame_equal(out[expected.columns], expected, check_freq=False, check_names=False)
+    assert ((out.index.hour * 60 + out.index.minute) % minutes == 0).all()  # Counted from UTC midnight
+
+
+def test_one_bucket_by_hand():
+    bars = minute_bars(n=120, start="2024-01-08 09:50")
+    out = resample_bars(bars, 60)
+    bucket = bars.loc["2024-01-08 10:00":"2024-01-08 10:59"]
+    row = out.loc[pd.Timestamp("2024-01-08 10:00")]
+    assert row["open"] == bucket["open"].iloc[0] and row["close"] == bucket["close"].iloc[-1]
+    assert row["high"] == bucket["high"].max() and row["low"] == bucket["low"].min()
+    assert row["volume"] == bucket["volume"].sum()
+    # The partial first hour starts at 09:00, not at the first bar
+    assert list(out.index[:2]) == [pd.Timestamp("2024-01-08 09:00"), pd.Timestamp("2024-01-08 10:00")]
+
+
+@pytest.mark.parametrize("session, offset", [("fx", "17h"), ("us_equity", "9h30min")])
+def test_buckets_anchor_at_the_session_open(session, offset):
+    bars = minute_bars()  # January: New York is UTC-5
+    out = resample_bars(bars, 240, session=SESSIONS[session])
+    expected = reference(bars, 240, tz=SESSIONS[session]["tz"], offset=offset)
+    pd.testing.assert_frame_equal(out[expected.columns], expected, check_freq=False, check_names=False)
+    open_utc = {"fx": 22 * 60, "us_equity": 14 * 60 + 30}[session]
+    assert ((out.index.hour * 60 + out.index.minute - open_utc) % 240 == 0).all()
+
+
+def test_empty_buckets_are_dropped_not_filled():
+    bars = minute_bars(n=600)
+    gapped = bars.drop(bars.loc["2024-01-08 03:00":"2024-01-08 05:59"].index)
+    out = resample_bars(gapped, 60)
+    assert len(out) == 7
+    assert not out.loc["2024-01-08 03:00":"2024-01-08 05:59"].size
+    assert out.index[3] == pd.Timestamp("2024-01-08 06:00")
+    assert out.loc[pd.Timestamp("2024-01-08 06:00"), "open"] == gapped.loc["2024-01-08 06:00", "open"]
+    assert not out.isna().any().any()
+
+
+def test_timezone_is_kept_and_minutes_checked():
+    bars = minute_bars(n=300).tz_localize("UTC").tz_convert("Europe/London")
+    out = resample_bars(bars, 30)
+    assert str(out.index.tz) == "Europe/London"
+    assert len(out) == 10
+    with pytest.raises(ValueError):
+        resample_bars(bars, 0)
@@ -0,0 +1,61 @@
+"""ResourceMeter blocks and their sweep aggregate."""
+import time
+
+import pytest
+
+import resource_meter
+from resource_meter import ResourceMeter, aggregate_resources, format_resources
+
+
+def busy(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_block_measures_time_and_throughput():
+    with ResourceMeter() as meter:
+        busy(0.05)
+    block = meter.result(bars=500)
+    assert block["cpu_s"] >= 0.05 and block["wall_s"] >= block["cpu_s"] * 0.9
+    assert 0.5 < block["cpu_util"] <= 1.1
+    assert block["bars"] == 500
+    assert block["bars_per_sec"] == pytest.approx(500 / block["wall_s"], rel=0.01)
+    assert "allocations" not in block
+
+
+@pytest.mark.skipif(not resource_meter._reset_peak_rss(), reason="peak RSS cannot be reset on this platform")
+def test_peak_rss_is_the_runs_own():
+    big = bytearray(64 * 2**20)  # An earlier peak the next run must not report
+    del big
+    with ResourceMeter() as meter:
+        small = bytearray(16 * 2**20)
+    del small
+    assert 12 <= meter.result()["peak_rss_delta_mb"] < 40
+
+
+def test_allocation_sites_point_at_the_run():
+    with ResourceMeter(trace_allocations=True, top=3) as meter:
+        kept = [bytes(1024) for _ in range(2000)]
+    sites = meter.result()["allocations"]
+    assert len(sites) <= 3
+    assert sites[0]["site"].startswith("test_resource_meter.py:")
+    assert sites[0]["size_kb"] >= 2000
+    del kept
+
+
+def test_aggregate_skips_unmeasured_runs():
+    blocks = [
+        {"wall_s": 1.0, "cpu_s": 0.5, "bars": 100, "peak_rss_delta_mb": 4.0},
+        None,
+        {"wall_s": 3.0, "cpu_s": 3.0, "bars": 300, "peak_rss_delta_mb": None},
+    ]
+    summary = aggregate_resources(blocks)
+    assert summary["runs"] == 2
+    assert summary["wall_s"] == 4.0 and summary["wall_s_mean"] == 2.0 and summary["wall_s_max"] == 3.0
+    assert summary["cpu_util"] == 0.875
+    assert summary["peak_rss_delta_mb_max"] == 4.0 and summary["peak_rss_delta_mb_mean"] == 4.0
+    assert summary["bars_per_sec"] == 100.0
+    assert format_resources(summary).startswith("2 runs, 4.00s wall")
+    assert aggregate_resources([None, {}]) is None
+    assert format_resources(None) == "no measured runs"
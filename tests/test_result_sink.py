@@ -0,0 +1,52 @@
+"""ResultSink: resume by key, crash safety and streaming rankings."""
+import numpy as np
+
+from result_sink import ResultSink, iter_records, top_records
+
+
+def test_reopened_sink_serves_keyed_records(tmp_path):
+    path = str(tmp_path / "sweep.jsonl")
+    with ResultSink(path) as sink:
+        sink.append({"metrics": {"total_pnl": np.float64(12.5)}}, key="a")
+        sink.append({"metrics": {"total_pnl": -3.0}}, key="b")
+        sink.append({"note": "unkeyed"})
+        assert "a" in sink and None not in sink
+        assert sink.get("b")["metrics"]["total_pnl"] == -3.0
+
+    with ResultSink(path) as sink:
+        assert len(sink) == 3 and sink.appended == 0
+        assert sink.get("a") == {"key": "a", "metrics": {"total_pnl": 12.5}}
+        assert sink.get("missing") is None
+        assert sink.resumed == 1
+        sink.append({"metrics": {"total_pnl": 7.0}}, key="c")
+        assert [record.get("key") for record in sink] == ["a", "b", None, "c"]
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    path = tmp_path / "sweep.jsonl"
+    with ResultSink(str(path)) as sink:
+        sink.append({"value": 1}, key="a")
+    intact = path.read_bytes()
+    with open(path, "ab") as f:
+        f.write(b'{"key": "b", "val')  # A run killed mid-write
+
+    assert [record["key"] for record in iter_records(str(path))] == ["a"]
+    with ResultSink(str(path)) as sink:
+        assert len(sink) == 1 and "b" not in sink
+        assert path.read_bytes() == intact
+        sink.append({"value": 2}, key="b")
+    assert [record["value"] for record in iter_records(str(path))] == [1, 2]
+
+
+def test_top_records_rank_by_dotted_field():
+    records = [
+        {"name": "low", "metrics": {"total_pnl": -5.0}},
+        {"name": "none", "metrics": {"total_pnl": None}},
+        {"name": "high", "metrics": {"total_pnl": 9.0}},
+        {"name": "missing"},
+        {"name": "mid", "metrics": {"total_pnl": 2}},
+    ]
+    best = top_records(iter(records), 2, "metrics.total_pnl")
+    assert [record["name"] for record in best] == ["high", "mid"]
+    worst = top_records(iter(records), 1, "metrics.total_pnl", ascending=True)
+    assert [record["name"] for record in worst] == ["low"]
@@ -0,0 +1,91 @@
+"""ResultsStore lookups used by --skip-evaluated, and the engine part of memo keys"""
+
+import pytest
+
+import backtest_runner
+import strategy_optimizer
+from backtest_runner import BacktestRunner
+from bar_store import resample_bars
+from results_store import ENGINE_ANALYZER, ResultsStore, param_hash, source_hash
+from strategy_optimizer import StrategyAnalyzer
+
+CELL = {'small_percentile': 30, 'big_percentile': 70, 'tp_atr_mult': 2.0, 'sl_atr_mult': 1.0}
+
+
+def _analyzer(data, store, timeframe, **kwargs):
+    context = {'symbol': 'XAUUSD', 'period_start': '2024-01-01', 'period_end': '2024-01-31', 'timeframe': timeframe}
+    return StrategyAnalyzer(data, results_store=store, run_context=context, skip_evaluated=True, mc_paths=0, **kwargs)
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(str(tmp_path / "results.db")) as store:
+        yield store
+
+
+def test_skip_evaluated_serves_same_cell(bars, store):
+    first = _analyzer(bars, store, "15minute")
+    expected = first._run_cell(**CELL)
+    first._flush_records()
+
+    again = _analyzer(bars, store, "15minute")
+    assert again._run_cell(**CELL)['total_trades'] == expected['total_trades']
+    assert again._pending_records == []  # Served from the store, not re-run
+
+
+def test_skip_evaluated_keeps_timeframes_apart(bars, store):
+    minute = _analyzer(bars, store, "15minute")
+    minute._run_cell(**CELL)
+    minute._flush_records()
+
+    hourly_bars = resample_bars(bars, 60)
+    hourly = _analyzer(hourly_bars, store, "60minute")
+    served = hourly._run_cell(**CELL)
+    assert served['total_trades'] == StrategyAnalyzer(hourly_bars, mc_paths=0).backtest_strategy(**CELL)['total_trades']
+    assert len(hourly._pending_records) == 1
+
+
+def test_skip_evaluated_keeps_compact_apart(bars, store):
+    full = _analyzer(bars, store, "15minute")
+    full._run_cell(**CELL)
+    full._flush_records()
+
+    compact = _analyzer(bars, store, "15minute", compact=True)
+    compact._run_cell(**CELL)
+    assert len(compact._pending_records) == 1
+    params = compact._cell_params(**CELL)
+    assert params['compact'] is True
+    assert store.find_run(param_hash(params), ENGINE_ANALYZER, 'XAUUSD', '2024-01-01', '2024-01-31') is None
+
+
+def test_infinite_profit_factor_ranks_first(store):
+    metrics = [
+        {'total_pnl': 50.0, 'profit_factor': 1.5, 'win_rate': 60.0, 'max_drawdown': 10.0, 'total_trades': 10},
+        {'total_pnl': 20.0, 'profit_factor': float('inf'), 'win_rate': 100.0, 'max_drawdown': 0.0, 'total_trades': 2},
+        {'total_pnl': 0.0, 'profit_factor': 0.0, 'win_rate': 0.0, 'max_drawdown': 0.0, 'total_trades': 0},
+    ]
+    store.record_runs([
+        ResultsStore.make_record(ENGINE_ANALYZER, {'cell': i}, m) for i, m in enumerate(metrics)
+    ])
+    ranked = [run['params']['cell'] for run in store.top_runs(order_by='profit_factor')]
+    assert ranked == [1, 0, 2]
+
+
+def test_memo_keys_follow_the_result_sources(bars, monkeypatch):
+    runner = BacktestRunner()
+    feed = runner.data_feed(bars)
+    analyzer = StrategyAnalyzer(bars, mc_paths=0)
+    runner_key, analyzer_key = runner.memo_key(feed, {}, "full"), analyzer._engine_version()
+
+    # An edit to the strategy (or simulator) source changes every key
+    monkeypatch.setattr(backtest_runner, "source_hash", lambda *modules: "edited")
+    monkeypatch.setattr(strategy_optimizer, "source_hash", lambda *modules: "edited")
+    assert runner.memo_key(feed, {}, "full") != runner_key
+    assert analyzer._engine_version() != analyzer_key
+
+
+def test_source_hash_covers_the_strategy_module():
+    assert "ken_gold_candle.py" in BacktestRunner.RESULT_SOURCES
+    assert "sim_kernel.py" in StrategyAnalyzer.RESULT_SOURCES
+    assert source_hash("ken_gold_candle.py") == source_hash("ken_gold_candle.py")
+    assert source_hash("ken_gold_candle.py") != source_hash("ken_gold_candle.py", "bt_extensions.py")
@@ -0,0 +1,92 @@
+"""RobustnessSurface: neighbourhood statistics, ranking and hole filling."""
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from robustness import RobustnessSurface
+
+
+def sweep(shape, seed=0, holes=0.2):
+    """Random scores on a grid with some cells left out"""
+    rng = np.random.default_rng(seed)
+    rows = [
+        {"a": 0.5 * i, "b": 10 + j, "c": k, "total_pnl": rng.normal()}
+        for i, j, k in product(*(range(n) for n in shape))
+    ]
+    keep = rng.random(len(rows)) >= holes
+    return pd.DataFrame([row for row, kept in zip(rows, keep) if kept])
+
+
+@pytest.mark.parametrize("radius", [1, 2])
+def test_statistics_match_a_direct_scan(radius):
+    surface = RobustnessSurface(sweep((5, 4, 3)), ["a", "b", "c"], radius=radius)
+    stats = surface.statistics()
+    values = surface.values
+    for cell in product(*(range(n) for n in values.shape)):
+        box = tuple(slice(max(i - radius, 0), i + radius + 1) for i in cell)
+        window = values[box]
+        known = window[~np.isnan(window)]
+        full = np.prod([min(i + radius, n - 1) - max(i - radius, 0) + 1 for i, n in zip(cell, values.shape)])
+        assert stats["coverage"][cell] == pytest.approx(len(known) / full)
+        if not len(known):
+            assert np.isnan(stats["neighborhood_mean"][cell])
+            continue
+        assert stats["neighborhood_mean"][cell] == pytest.approx(known.mean())
+        assert stats["neighborhood_min"][cell] == pytest.approx(known.min())
+        assert stats["neighborhood_std"][cell] == pytest.approx(known.std(), abs=1e-7)
+        assert stats["stability"][cell] == pytest.approx(known.mean() - known.std(), abs=1e-7)
+
+
+def test_plateau_outranks_a_spike():
+    rows = [{"tp": tp, "sl": sl, "total_pnl": 1.0} for tp in range(6) for sl in range(6)]
+    for row in rows:
+        if row["tp"] >= 3 and row["sl"] >= 3:
+            row["total_pnl"] = 5.0  # Plateau
+        if (row["tp"], row["sl"]) == (0, 0):
+            row["total_pnl"] = 20.0  # Spike among 1.0 neighbours
+    ranked = RobustnessSurface(pd.DataFrame(rows), ["tp", "sl"]).ranked()
+    assert (ranked.loc[0, "tp"], ranked.loc[0, "sl"]) == (4, 4)
+    assert ranked.loc[0, "stability"] == 5.0
+    spike = ranked[(ranked["tp"] == 0) & (ranked["sl"] == 0)].iloc[0]
+    assert spike["neighborhood_mean"] == pytest.approx(5.75)
+    assert spike["neighborhood_min"] == 1.0
+    assert not ranked["filled"].any()
+
+
+def test_fill_completes_the_best_neighbourhoods_only():
+    full = sweep((6, 6, 1), seed=2, holes=0.0)
+    truth = {(row.a, row.b): row.total_pnl for row in full.itertuples()}
+    holes = full.sample(frac=0.4, random_state=1)
+    surface = RobustnessSurface(full.drop(holes.index), ["a", "b"])
+    missing = surface.missing_neighbours(list(product(range(6), range(6))))
+    asked = []
+
+    def evaluate(params):
+        asked.append((params["a"], params["b"]))
+        if params["a"] == 0.0:
+            return None  # Cells that cannot be evaluated stay holes
+        return {"total_pnl": truth[(params["a"], params["b"])], "c": 0}
+
+    evaluated = surface.fill(evaluate, top=2, rounds=5)
+    assert len(asked) == len(set(asked))  # Nothing is asked twice
+    assert 0 < evaluated < len(missing)
+    assert evaluated == sum(a != 0.0 for a, _ in asked)
+
+    ranked = surface.ranked()
+    assert ranked["filled"].sum() == evaluated
+    filled = ranked[ranked["filled"]]
+    assert all(truth[(row.a, row.b)] == row.total_pnl for row in filled.itertuples())
+    # Nothing is left to ask about the best cell's neighbourhood
+    best = ranked.iloc[0]
+    cell = tuple(int(np.searchsorted(c, best[axis])) for axis, c in zip(surface.axes, surface.coords))
+    assert surface.missing_neighbours([cell]) == []
+
+
+def test_bad_columns_and_ranking():
+    with pytest.raises(KeyError):
+        RobustnessSurface(pd.DataFrame({"a": [1], "total_pnl": [0.0]}), ["a", "b"])
+    surface = RobustnessSurface(pd.DataFrame({"a": [1, 2], "total_pnl": [0.0, 1.0]}), ["a"])
+    with pytest.raises(ValueError):
+        surface.ranked(by="sharpe")
@@ -0,0 +1,102 @@
+"""Behaviour of the vectorized signal and trade kernels."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import sim_kernel as sk
+
+# The numba backend's loop runs in Python when numba is missing
+BACKENDS = [("numpy", True), ("numba", False)]
+
+
+def flat_prices(n=20, level=100.0):
+    """Bars of range 1 around a flat close, to be edited per test"""
+    close = np.full(n, level)
+    high, low = close + 0.5, close - 0.5
+    return {"open": close.copy(), "high": high, "low": low, "close": close}
+
+
+def simulate(prices, entries, signs, tp=2.0, sl=1.0, backend=("numpy", True), **kwargs):
+    prices = dict(prices, range=prices["high"] - prices["low"])
+    n = len(entries)
+    return sk.simulate_trades(
+        prices, entries, signs, np.full(n, tp), np.full(n, sl),
+        backend=backend[0], compiled=backend[1], **kwargs
+    )
+
+
+def test_window_quantiles_match_pandas():
+    rng = np.random.default_rng(0)
+    values = rng.random(500)
+    values[[40, 41, 300]] = np.nan
+    idx = np.arange(100, 500, 7)
+    got = sk.window_quantiles(values, idx, 100, [0.25, 0.9])
+    series = pd.Series(values)
+    for row, q in enumerate([0.25, 0.9]):
+        expected = [series.iloc[i - 100:i].quantile(q) for i in idx]
+        np.testing.assert_allclose(got[row], expected)
+
+
+def test_eligible_bars_apply_every_filter():
+    atr = np.ones(10)
+    atr[3] = np.nan
+    in_hours = np.ones(10, dtype=bool)
+    in_hours[4] = False
+    spread_ok = np.ones(10, dtype=bool)
+    spread_ok[5] = False
+    idx = sk.eligible_bars(10, 2, atr, in_hours, spread_ok)
+    # The spread is checked on the entry bar itself; the last bar never enters
+    assert idx.tolist() == [2, 6, 7, 8]
+
+
+def test_reachable_pnl_sums_later_gains():
+    reachable = sk.reachable_pnl(6, np.array([1, 4]), np.array([2.0, 3.0]))
+    assert reachable.tolist() == [5.0, 5.0, 3.0, 3.0, 3.0, 0.0, 0.0]
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda b: b[0])
+def test_take_profit_stop_loss_and_timeout(backend):
+    prices = flat_prices()
+    prices["high"][3] = 102.5  # Long from bar 0 takes profit here
+    prices["high"][8] = 101.5  # Short from bar 6 stops out here
+    trades = simulate(prices, [0, 6, 10], [1, -1, 1], backend=backend, max_bars=4)
+    assert trades["outcome"].tolist() == [sk.EXIT_TP, sk.EXIT_SL, sk.EXIT_TIMEOUT]
+    assert trades["bars_held"].tolist() == [3, 2, 4]
+    assert trades["pnl"].tolist() == [2.0, -1.0, 0.0]
+    assert trades["exit_price"].tolist() == [102.0, 101.0, 100.0]
+    assert trades["abort_rule"] == sk.ABORT_NONE
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda b: b[0])
+def test_same_bar_hit_resolves_to_level_nearer_the_open(backend):
+    prices = flat_prices()
+    prices["high"][2], prices["low"][2] = 103.0, 98.0
+    prices["open"][2] = 99.5  # Nearer the stop at 99 than the target at 102
+    prices["high"][12], prices["low"][12] = 103.0, 98.0
+    prices["open"][12] = 101.5
+    trades = simulate(prices, [0, 10], [1, 1], backend=backend)
+    assert trades["outcome"].tolist() == [sk.EXIT_SL, sk.EXIT_TP]
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda b: b[0])
+def test_max_open_trades_skips_overlapping_signals(backend):
+    prices = flat_prices()
+    prices["high"][6] = 102.5
+    trades = simulate(prices, [0, 2, 4, 7], [1, 1, 1, 1], backend=backend, max_bars=10, max_open_trades=1)
+    # 2 and 4 arrive while the trade from 0 is open; it exits on bar 6
+    assert trades["entry_idx"].tolist() == [0, 7]
+    unlimited = simulate(prices, [0, 2, 4, 7], [1, 1, 1, 1], backend=backend, max_bars=10)
+    assert unlimited["entry_idx"].tolist() == [0, 2, 4, 7]
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=lambda b: b[0])
+def test_max_drawdown_abort_stops_the_ledger(backend):
+    prices = flat_prices(40)
+    for bar in (2, 5, 8, 11):
+        prices["low"][bar] = 98.5  # Every long stops out for -1
+    entries = [0, 3, 6, 9]
+    trades = simulate(prices, entries, [1] * 4, backend=backend, abort_max_drawdown=1.5)
+    assert trades["abort_rule"] == sk.ABORT_MAX_DRAWDOWN
+    # The second loss takes the drawdown to 2; the rule fires at that trade's entry
+    assert trades["entry_idx"].tolist() == [0, 3]
+    assert trades["abort_bar"] == 3
@@ -0,0 +1,72 @@
+"""The analyzer engines apply MAX_SPREAD_POINTS on the same bar as the strategy, in the symbol's points"""
+
+import backtrader as bt
+import pytest
+
+from bt_extensions import QuoteData, bar_arrays
+from ken_gold_candle import GoldCandleKenStrategy
+from results_store import ResultMemo
+from strategy_optimizer import StrategyAnalyzer
+
+from conftest import make_bars
+
+MAX_SPREAD_POINTS = 20
+CELL = {'small_percentile': 60, 'big_percentile': 40, 'tp_atr_mult': 2.0, 'sl_atr_mult': 1.0}
+
+
+class RecordingStrategy(GoldCandleKenStrategy):
+    """Strategy that records each spread filter decision by bar ordinal"""
+
+    def start(self):
+        super().start()
+        self.spread_decisions = {}
+
+    def _spread_allowed(self) -> bool:
+        allowed = super()._spread_allowed()
+        self.spread_decisions[self._bar_ordinal()] = allowed
+        return allowed
+
+
+@pytest.fixture(scope="module")
+def quoted_bars():
+    return make_bars(n=2000, spread=True)
+
+
+@pytest.fixture(scope="module")
+def strategy_decisions(quoted_bars):
+    cerebro = bt.Cerebro()
+    cerebro.adddata(QuoteData(dataname=quoted_bars, arrays=bar_arrays(quoted_bars)))
+    cerebro.addstrategy(RecordingStrategy, MAX_SPREAD_POINTS=MAX_SPREAD_POINTS, ENABLE_TIME_FILTER=False)
+    cerebro.broker.setcash(100000)
+    strategy = cerebro.run()[0]
+    assert strategy._spread_ok is not None
+    return strategy.spread_decisions
+
+
+@pytest.mark.parametrize("engine", ["loop", "numpy"])
+def test_engines_filter_spread_on_strategy_bar(quoted_bars, strategy_decisions, engine):
+    analyzer = StrategyAnalyzer(quoted_bars, engine=engine, mc_paths=0)
+    unfiltered = analyzer.backtest_strategy(**CELL)['ledger'].records['entry_idx']
+    filtered = set(analyzer.backtest_strategy(**CELL, max_spread_points=MAX_SPREAD_POINTS)['ledger'].records['entry_idx'])
+
+    decided = [int(bar) for bar in unfiltered if int(bar) in strategy_decisions]
+    # The data flips the spread between bars, so a one-bar offset changes the outcome
+    assert len(decided) > 50
+    assert {True, False} <= {strategy_decisions[bar] for bar in decided}
+    for bar in decided:
+        assert (bar in filtered) == strategy_decisions[bar], bar
+    assert filtered <= set(int(bar) for bar in unfiltered)
+
+
+@pytest.mark.parametrize("setting", [
+    {'max_spread_points': MAX_SPREAD_POINTS},
+    {'trailing_sl_points': 300, 'engine': 'numpy'},
+])
+def test_memo_keeps_point_sizes_apart(quoted_bars, setting):
+    memo = ResultMemo()
+    gold = StrategyAnalyzer(quoted_bars, memo=memo, mc_paths=0)
+    fine = {**gold.symbol_spec, 'point': gold.point / 10}
+    first = gold.backtest_strategy(**CELL, **setting)
+    served = StrategyAnalyzer(quoted_bars, memo=memo, mc_paths=0, symbol_spec=fine).backtest_strategy(**CELL, **setting)
+    fresh = StrategyAnalyzer(quoted_bars, mc_paths=0, symbol_spec=fine).backtest_strategy(**CELL, **setting)
+    assert served['total_pnl'] == fresh['total_pnl'] != first['total_pnl']
@@ -0,0 +1,116 @@
+"""Strategy snapshots: safe storage and warm restarts that decide like an uninterrupted run."""
+import datetime
+import os
+import pickle
+import shutil
+
+import backtrader as bt
+import pandas as pd
+import pytest
+
+from bt_extensions import NumpyData
+from ken_gold_candle import GoldCandleKenStrategy
+from strategy_state import STATE_VERSION, read_snapshot, warm_bars, write_snapshot
+
+SETTINGS = dict(ENABLE_TIME_FILTER=False, USE_MOMENTUM_FILTER=False)
+CUT = 1722  # Two short entries open here: a cold restart trades differently
+
+
+class Fills(bt.Analyzer):
+    """Completed orders: (time, buy, price, size)"""
+
+    def start(self):
+        self.fills = []
+
+    def notify_order(self, order):
+        if order.status == order.Completed:
+            self.fills.append((
+                bt.num2date(order.executed.dt), order.isbuy(), round(order.executed.price, 4), order.executed.size
+            ))
+
+    def get_analysis(self):
+        return self.fills
+
+
+class BrokerRestoringStrategy(GoldCandleKenStrategy):
+    """A live broker still holds the position after a restart; the backtest broker starts flat"""
+
+    def restore_state(self, snapshot):
+        super().restore_state(snapshot)
+        position = self.broker.getposition(self.data)
+        position.size = snapshot["position"]["size"]
+        position.price = snapshot["position"]["price"]
+        position.adjbase = self.data.close[0]
+        position.datetime = self.data.datetime.datetime()
+        self.broker.cash = snapshot["cash"]
+
+
+def run(bars, strategy=GoldCandleKenStrategy, runonce=False, **settings):
+    cerebro = bt.Cerebro(runonce=runonce)
+    cerebro.adddata(NumpyData(dataname=bars))
+    cerebro.addstrategy(strategy, **{**SETTINGS, **settings})
+    cerebro.broker.setcash(10000)
+    cerebro.broker.addcommissioninfo(
+        bt.CommInfoBase(commission=0.0002, mult=100, margin=True, commtype=bt.CommInfoBase.COMM_PERC)
+    )
+    cerebro.addanalyzer(Fills, _name="fills")
+    return cerebro.run()[0].analyzers.fills.get_analysis()
+
+
+@pytest.fixture(scope="module")
+def snapshot_path(bars, tmp_path_factory):
+    """Snapshot taken on bar CUT by a run that stops there"""
+    path = str(tmp_path_factory.mktemp("state") / "xauusd.snap")
+    run(bars.iloc[:CUT + 1], STATE_FILE=path)
+    return path
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "s.snap")
+    snapshot = {"version": STATE_VERSION, "state": {"_entries": [(1, 2000.5)]}, "bars": {"open": b"\x00" * 8}}
+    write_snapshot(path, snapshot)
+    assert read_snapshot(path) == snapshot
+    assert os.listdir(tmp_path) == ["s.snap"]  # No temporary file left behind
+
+
+def test_snapshot_rejects_classes_and_other_versions(tmp_path):
+    path = tmp_path / "s.snap"
+    path.write_bytes(pickle.dumps({"version": STATE_VERSION, "when": datetime.datetime(2024, 1, 1)}))
+    with pytest.raises(pickle.UnpicklingError):
+        read_snapshot(str(path))
+    write_snapshot(str(path), {"version": STATE_VERSION + 1})
+    with pytest.raises(ValueError):
+        read_snapshot(str(path))
+
+
+def test_warm_bars_end_on_the_snapshot_bar(bars, snapshot_path):
+    snapshot = read_snapshot(snapshot_path)
+    warm = warm_bars(snapshot)
+    assert snapshot["datetime"] == bt.date2num(bars.index[CUT].to_pydatetime())
+    assert warm.index[-1] == bars.index[CUT]
+    expected = bars.iloc[CUT + 1 - len(warm):CUT + 1]
+    assert (warm.index == expected.index).all()
+    pd.testing.assert_frame_equal(warm[["open", "high", "low", "close"]], expected[["open", "high", "low", "close"]],
+                                  check_names=False, check_freq=False)
+
+
+def test_warm_restart_fills_like_an_uninterrupted_run(bars, snapshot_path, tmp_path):
+    full = run(bars)
+    path = str(tmp_path / "restart.snap")
+    shutil.copyfile(snapshot_path, path)
+    restart = pd.concat([warm_bars(read_snapshot(path)), bars.iloc[CUT + 1:]])
+    fills = run(restart, BrokerRestoringStrategy, STATE_FILE=path)
+    # Fills on the snapshot bar itself happened before the snapshot was written
+    after = [fill for fill in full if fill[0] > bars.index[CUT]]
+    assert after
+    assert [fill for fill in fills if fill[0] > bars.index[CUT]] == after
+
+
+def test_restore_refuses_changed_settings_and_runonce(bars, snapshot_path, tmp_path):
+    path = str(tmp_path / "restart.snap")
+    shutil.copyfile(snapshot_path, path)
+    restart = warm_bars(read_snapshot(path))
+    with pytest.raises(ValueError, match="different settings"):
+        run(restart, STATE_FILE=path, ATR_PERIOD=20)
+    with pytest.raises(ValueError, match="runonce=False"):
+        run(restart, runonce=True, STATE_FILE=path)
@@ -0,0 +1,32 @@
+"""--symbol-specs overrides apply to single-symbol runs as they do with --symbols"""
+
+import sys
+
+import backtest_runner
+from backtest_runner import BacktestRunner
+from conftest import make_bars
+
+
+def test_single_symbol_run_uses_spec_overrides(tmp_path, monkeypatch):
+    bars = make_bars(n=500)
+    used = []
+    run_backtest = BacktestRunner.run_backtest
+
+    def recording_run(self, *args, **kwargs):
+        used.append(kwargs["symbol_spec"])
+        return run_backtest(self, *args, **kwargs)
+
+    monkeypatch.setattr(BacktestRunner, "run_backtest", recording_run)
+    monkeypatch.setattr(backtest_runner, "PolygonDataFetcher", lambda api_key: None)
+    monkeypatch.setattr(backtest_runner, "fetch_bars", lambda fetcher, tickers, *args, **kwargs: {tickers[0]: bars})
+    monkeypatch.setattr(sys, "argv", [
+        "backtest_runner.py", "--api-key", "test", "--ticker", "C:XAGUSD",
+        "--start-date", "2024-01-01", "--end-date", "2024-01-31",
+        "--symbol-specs", '{"C:XAGUSD": {"commission": 0.0001, "min_lot": 0.05}}',
+        "--output", str(tmp_path / "results.json"),
+    ])
+    backtest_runner.main()
+
+    assert len(used) == 1
+    assert used[0]["commission"] == 0.0001 and used[0]["min_lot"] == 0.05
+    assert used[0]["contract_size"] == 5000.0  # Fields not overridden keep the registry values
@@ -0,0 +1,56 @@
+"""TradeLedger: columnar trade rows that grow in place"""
+
+import numpy as np
+
+from strategy_optimizer import OUTCOME_LOSS, OUTCOME_WIN, TRADE_DTYPE, TradeLedger
+
+
+def filled_ledger(n, capacity=2):
+    ledger = TradeLedger(capacity=capacity)
+    for i in range(n):
+        win = i % 3 == 0
+        ledger.append(
+            entry_idx=10 * i, direction=1 if i % 2 else -1, outcome=OUTCOME_WIN if win else OUTCOME_LOSS,
+            pnl=2.5 if win else -1.0, bars_held=i + 1, exit_price=2000.0 + i, tp_distance=2.5, sl_distance=1.0
+        )
+    return ledger
+
+
+def test_append_grows_past_capacity():
+    ledger = filled_ledger(37, capacity=2)
+    assert len(ledger) == 37
+    assert ledger.records.dtype == TRADE_DTYPE
+    assert ledger['entry_idx'].tolist() == [10 * i for i in range(37)]
+    assert ledger['bars_held'].tolist() == list(range(1, 38))
+    assert ledger['pnl'][:4].tolist() == [2.5, -1.0, -1.0, 2.5]
+    assert ledger['direction'].dtype == np.int8 and ledger['pnl'].dtype == np.float64
+
+
+def test_columns_and_records_are_views():
+    ledger = filled_ledger(5)
+    ledger['pnl'][0] = 9.0
+    assert ledger.records['pnl'][0] == 9.0
+    assert len(ledger['pnl']) == len(ledger.records) == 5
+
+
+def test_optional_distances_default_to_nan():
+    ledger = TradeLedger()
+    ledger.append(entry_idx=1, direction=1, outcome=OUTCOME_WIN, pnl=1.0, bars_held=2, exit_price=3.0)
+    assert np.isnan(ledger['tp_distance'][0]) and np.isnan(ledger['sl_distance'][0])
+
+
+def test_from_records_round_trip_copies():
+    ledger = filled_ledger(20)
+    copy = TradeLedger.from_records(ledger.records)
+    assert np.array_equal(copy.records, ledger.records)
+    copy.append(entry_idx=999, direction=1, outcome=OUTCOME_WIN, pnl=1.0, bars_held=1, exit_price=1.0)
+    copy['pnl'][0] = -50.0
+    assert len(ledger) == 20 and ledger['pnl'][0] == 2.5  # The source is untouched
+    assert len(TradeLedger.from_records(np.empty(0, dtype=TRADE_DTYPE))) == 0
+
+
+def test_to_dicts_names_codes():
+    rows = filled_ledger(2).to_dicts()
+    assert rows[0]['direction'] == 'sell' and rows[0]['outcome'] == 'win'
+    assert rows[1]['direction'] == 'buy' and rows[1]['outcome'] == 'loss'
+    assert set(rows[0]) == set(TRADE_DTYPE.names)